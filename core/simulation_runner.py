@@ -2,85 +2,299 @@ import genesis as gs
 import numpy as np
 import os
 import sys
+import threading
+import time
+from collections import deque
 
 # Ensure root directory is in sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from xrobocon.env import XRoboconEnv
 from xrobocon.step_env import XRoboconStepEnv
+from xrobocon.step_hard_env import XRoboconStepHardEnv
+from xrobocon.robot_configs import SIM_PARAMS
+from core.state_buffer import StateDoubleBuffer
+from xrobocon.policy_runtime import PolicyRuntime, is_exported_policy
 import xrobocon.common as common
 from stable_baselines3 import PPO
 
 class SimulationRunner:
-    def __init__(self, render=True):
+    def __init__(self, render=True, offscreen=False, camera_res=(640, 480)):
+        """
+        Args:
+            render: Genesisのビューアウィンドウを表示するか
+            offscreen: ビューアを使わずにカメラ画像を render_frame() で取得するか (GUI埋め込み用)
+            camera_res: オフスクリーン描画の解像度 (幅, 高さ)
+        """
         self.env = None
         self.model = None
-        self.render = render
+        self.model_path = None
+        self.render = render and not offscreen
+        self.offscreen = offscreen
+        self.camera_res = tuple(camera_res)
         self.running = False
         self.current_obs = None
         self.robot_type = 'tristar'
         self.env_type = 'flat'
+        
+        # 最新の状態（バックグラウンド実行時に UI が読む）
+        self.state = StateDoubleBuffer()
+        self.episode_reward = 0.0
+        self.episode_steps = 0
+        self.sim_time = 0.0
+        # 終了したエピソードの結果 (reward, steps, success, scenario)。読み手が popleft で取り出す
+        self.finished_episodes = deque(maxlen=100)
+        
+        # バックグラウンド実行
+        self.rtf = 1.0
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._model_lock = threading.Lock()
+        # 物理ステップと描画が別スレッドから同時にシーンに触れないようにする
+        self._sim_lock = threading.Lock()
+        self.background_error = None
 
     def setup_environment(self, env_type='flat', robot_type='tristar'):
         """Initialize the simulation environment."""
+        if self.is_background_running():
+            raise RuntimeError("Stop background stepping before changing the environment.")
+
         self.env_type = env_type
         self.robot_type = robot_type
-        
         if self.env:
             self.env.close()
-        
+        # 環境が変わるとモデルの入出力次元も変わりうるため、モデルは読み直す
+        self.model = None
+        self.model_path = None
+
         # Initialize Genesis if not already done (handled by env or common)
         # common.setup_genesis() # This might be needed if not called elsewhere
-        
-        if env_type == 'step':
-            self.env = XRoboconStepEnv(render_mode="human" if self.render else None, robot_type=robot_type)
+
+        if self.offscreen:
+            render_mode = "rgb_array"
         else:
-            self.env = XRoboconEnv(render_mode="human" if self.render else None, robot_type=robot_type)
-            
+            render_mode = "human" if self.render else None
+
+        if env_type == 'step_hard':
+            self.env = XRoboconStepHardEnv(render_mode=render_mode, robot_type=robot_type, camera_res=self.camera_res)
+        elif env_type == 'step':
+            self.env = XRoboconStepEnv(render_mode=render_mode, robot_type=robot_type, camera_res=self.camera_res)
+        else:
+            self.env = XRoboconEnv(render_mode=render_mode, robot_type=robot_type, camera_res=self.camera_res)
+
         self.current_obs, _ = self.env.reset()
+        self.episode_reward = 0.0
+        self.episode_steps = 0
         print(f"Environment setup: {env_type} with {robot_type}")
 
     def load_model(self, model_path):
-        """Load a trained RL model."""
+        """
+        Load a trained RL model.
+        既にモデルを読み込んでいる場合は、シーンやモデルを作り直さずに重みだけを入れ替える。
+        .pt / .onnx の書き出し済みポリシーは PolicyRuntime で読み込む。
+        """
         if not self.env:
             raise ValueError("Environment not set up. Call setup_environment first.")
-        
+
         if not os.path.exists(model_path):
              if os.path.exists(model_path + ".zip"):
                  model_path += ".zip"
              else:
                  raise FileNotFoundError(f"Model file not found: {model_path}")
 
-        # Use CPU for inference to avoid MPS issues on Mac
-        self.model = PPO.load(model_path, env=self.env, device='cpu')
+        # バックグラウンド実行中でも推論の途中で重みが変わらないようにロック
+        with self._model_lock:
+            if is_exported_policy(model_path):
+                self.model = PolicyRuntime(model_path)
+                self.model_path = model_path
+                print(f"Exported policy loaded from {model_path}")
+                return
+            
+            if self.model is not None and not isinstance(self.model, PolicyRuntime):
+                try:
+                    self.model.set_parameters(model_path, exact_match=True, device='cpu')
+                    self.model_path = model_path
+                    print(f"Model weights swapped from {model_path}")
+                    return
+                except (ValueError, RuntimeError, KeyError):
+                    # ネットワーク構造が異なる場合は通常の読み込み
+                    pass
+
+            # Use CPU for inference to avoid MPS issues on Mac
+            self.model = PPO.load(model_path, env=self.env, device='cpu')
+            self.model_path = model_path
         print(f"Model loaded from {model_path}")
 
+    def unload_model(self):
+        """モデルを外してアイドル動作に戻す"""
+        with self._model_lock:
+            self.model = None
+            self.model_path = None
+
     def step(self):
         """Advance the simulation by one step."""
         if not self.env:
             return None
-        
+
         action = None
-        if self.model:
-            action, _ = self.model.predict(self.current_obs, deterministic=True)
-        else:
-            # Default action (idle) - 4 dimensions for tristar
-            action = np.zeros(4, dtype=np.float32)
-            
-        self.current_obs, reward, terminated, truncated, info = self.env.step(action)
+        with self._model_lock:
+            if self.model:
+                action, _ = self.model.predict(self.current_obs, deterministic=True)
+            else:
+                # Default action (idle)
+                action = np.zeros(self.env.action_space.shape, dtype=np.float32)
+
+        with self._sim_lock:
+            self.current_obs, reward, terminated, truncated, info = self.env.step(action)
+            self.sim_time += SIM_PARAMS['dt']
+            self.episode_reward += float(reward)
+            self.episode_steps += 1
+            # 状態を読むのはバックグラウンド実行中の UI だけなので、同期実行では書き込まない
+            if self._thread is not None:
+                self._publish_state(reward, terminated, truncated, info)
+
+            if terminated or truncated:
+                self.finished_episodes.append({
+                    'reward': self.episode_reward,
+                    'steps': self.episode_steps,
+                    'success': bool(info.get('is_success', False)),
+                    'scenario': info.get('scenario_type'),
+                })
+                self.current_obs, _ = self.env.reset()
+                self.episode_reward = 0.0
+                self.episode_steps = 0
+
+        return self.current_obs, reward, terminated, truncated, info
+
+    def _publish_state(self, reward, terminated, truncated, info):
+        """最新の観測・姿勢・ゲーム情報をダブルバッファに書き込む"""
+        self.state.publish(
+            obs=np.asarray(self.current_obs, dtype=np.float32),
+            pos=self.env.robot.get_pos().cpu().numpy(),
+            euler=np.asarray(self.env.robot.get_euler(), dtype=np.float32),
+            reward=float(reward),
+            episode_reward=self.episode_reward,
+            episode_steps=self.episode_steps,
+            done=bool(terminated or truncated),
+            info=dict(info),
+            scenario=getattr(self.env, 'current_scenario_type', None),
+            game=self.env.game.get_info(),
+            sim_time=self.sim_time,
+        )
+
+    def get_state(self):
+        """最新の状態のコピー（まだなければNone）。バックグラウンド実行中も待たずに読める"""
+        return self.state.read()
+
+    def is_background_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start_background(self, rtf=1.0):
+        """
+        専用スレッドで推論とステップを実行する
         
-        if terminated or truncated:
-            self.current_obs, _ = self.env.reset()
+        Args:
+            rtf: 目標の実時間倍率 (1.0 = 実時間, 4.0 = 4倍速, None または 0 = 最大速度)
+        """
+        if not self.env:
+            raise ValueError("Environment not set up. Call setup_environment first.")
+        if self.render:
+            # Genesisのビューアはメインスレッドで動かす必要がある
+            raise ValueError("Background stepping requires render=False (or offscreen).")
+        if self.is_background_running() and not self._stop_event.is_set():
+            self.set_rtf(rtf)
+            return
+        # 停止を指示したスレッドがまだ動いていれば、終わるまで待つ（2本目を起動しない）
+        self.stop_background()
+        self.set_rtf(rtf)
+        self.background_error = None
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._background_loop, daemon=True)
+        self._thread.start()
+
+    def set_rtf(self, rtf):
+        """目標の実時間倍率を変更 (None または 0 で最大速度)"""
+        self.rtf = rtf if rtf else None
+
+    def stop_background(self, timeout=5.0):
+        """
+        バックグラウンド実行を止め、スレッドの終了を待つ
+
+        Args:
+            timeout: 待つ秒数 (None = 終了するまで待つ)。初回のステップはカーネルのコンパイルで数秒以上かかることがある
+
+        Raises:
+            RuntimeError: timeout までにスレッドが終了しなかった場合。
+                スレッドの参照は残すので reset() などは引き続き拒否され、再度呼べば待ち直せる
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise RuntimeError(f"Background stepping did not stop within {timeout} s.")
+        self._thread = None
+
+    def _background_loop(self):
+        try:
+            self._run_paced()
+        except Exception as e:
+            # スレッド内の例外は呼び出し側から見えないので記録しておく
+            self.background_error = f"{type(e).__name__}: {e}"
+
+    def _run_paced(self):
+        wall_start = time.perf_counter()
+        sim_start = self.sim_time
+        rtf = self.rtf
+        while not self._stop_event.is_set():
+            if self.rtf != rtf:
+                # 倍率が変わったら基準を取り直す
+                rtf = self.rtf
+                wall_start = time.perf_counter()
+                sim_start = self.sim_time
             
-        return self.current_obs, reward, terminated, truncated, info
+            self.step()
+            
+            if rtf is None:
+                continue
+            # シミュレーション時間に対して実時間が先行していれば待つ
+            lag = (self.sim_time - sim_start) / rtf - (time.perf_counter() - wall_start)
+            if lag > 0:
+                self._stop_event.wait(lag)
+            elif lag < -0.5:
+                # 目標倍率に追いつけない場合は基準を取り直す（後でまとめて早送りしない）
+                wall_start = time.perf_counter()
+                sim_start = self.sim_time
+
+    def render_frame(self, follow=True, distance=3.0, height=2.0):
+        """
+        オフスクリーン描画した画像を返す (H, W, 3) uint8
+        follow=True の場合はカメラをロボットの後方上空に追従させる
+        """
+        if not self.env or not self.offscreen:
+            return None
+        # シーンは複数スレッドから同時に操作できないため、描画が終わるまでバックグラウンドのステップは待つ
+        with self._sim_lock:
+            if follow:
+                robot_pos = self.env.robot.get_pos().cpu().numpy()
+                cam_pos = (robot_pos[0] - distance, robot_pos[1] - distance, robot_pos[2] + height)
+                lookat = (robot_pos[0], robot_pos[1], robot_pos[2])
+                self.env.camera.set_pose(pos=cam_pos, lookat=lookat)
+            return self.env.render()
 
     def reset(self):
         """Reset the environment."""
+        if self.is_background_running():
+            raise RuntimeError("Stop background stepping before resetting.")
         if self.env:
             self.current_obs, _ = self.env.reset()
+            self.episode_reward = 0.0
+            self.episode_steps = 0
 
     def close(self):
         """Close the environment."""
+        # ステップ中の環境を閉じないよう、スレッドが終わるまで待つ
+        self.stop_background(timeout=None)
         if self.env:
             self.env.close()
             self.env = None
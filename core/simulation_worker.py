@@ -0,0 +1,256 @@
+"""
+GUI埋め込み用のシミュレーションワーカー
+
+SimulationRunner を別プロセスで常駐させ、オフスクリーン描画した画像を共有メモリ経由で GUI に渡す。
+シーンの構築は起動時（環境・ロボット・解像度の変更時）のみで、モデルの切り替えは重みの入れ替えで行う。
+"""
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Ensure root directory is in sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class SharedFrameBuffer:
+    """
+    共有メモリ上のダブルバッファ
+
+    ヘッダ (int64 x 4): [書き込み回数, 表示中のスロット, 幅, 高さ]
+    その後に (高さ, 幅, 3) の uint8 画像スロットが2つ続く。
+    書き手は表示中でない側のスロットに書いてから表示スロットを切り替えるため、読み手はロックなしで読める。
+    """
+
+    HEADER_SIZE = 4 * 8
+
+    def __init__(self, shm, width, height, owner):
+        self.shm = shm
+        self.width = width
+        self.height = height
+        self.owner = owner
+        self.header = np.ndarray((4,), dtype=np.int64, buffer=shm.buf)
+        frame_size = height * width * 3
+        self.slots = [
+            np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf, offset=self.HEADER_SIZE + i * frame_size)
+            for i in range(2)
+        ]
+        self.last_seq = 0
+
+    @classmethod
+    def create(cls, width, height):
+        size = cls.HEADER_SIZE + 2 * height * width * 3
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        buf = cls(shm, width, height, owner=True)
+        buf.header[:] = (0, 0, width, height)
+        return buf
+
+    @classmethod
+    def attach(cls, name, width, height):
+        return cls(shared_memory.SharedMemory(name=name), width, height, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame):
+        """画像を書き込む（サイズが異なる場合は左上に収まる範囲のみ）"""
+        slot = 1 - int(self.header[1])
+        h = min(frame.shape[0], self.height)
+        w = min(frame.shape[1], self.width)
+        self.slots[slot][:h, :w] = frame[:h, :w, :3]
+        self.header[1] = slot
+        self.header[0] += 1
+
+    def read(self):
+        """新しい画像があればコピーを返す（なければNone）"""
+        seq = int(self.header[0])
+        if seq == self.last_seq:
+            return None
+        frame = self.slots[int(self.header[1])].copy()
+        # 読み取り中に2回以上書き込まれた場合は同じスロットが上書きされた可能性があるので次回に読む
+        if int(self.header[0]) - seq >= 2:
+            return None
+        self.last_seq = seq
+        return frame
+
+    def close(self):
+        del self.header
+        self.slots = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _simulation_worker_main(commands, status, shm_name, width, height, env_type, robot_type, fps, rtf=1.0):
+    """
+    ワーカープロセスのメインループ
+
+    物理ステップと実時間倍率の調整は SimulationRunner のバックグラウンドスレッドが行い、
+    このループはコマンド処理と、fps に合わせた描画・状態通知だけを行う。
+    停止はステップの途中（初回はカーネルのコンパイル）を待つ必要があるため、時間制限なしで待つ。
+    """
+    from core.simulation_runner import SimulationRunner
+
+    frames = SharedFrameBuffer.attach(shm_name, width, height)
+    runner = SimulationRunner(offscreen=True, camera_res=(width, height))
+    runner.setup_environment(env_type=env_type, robot_type=robot_type)
+
+    paused = False
+    rtf = rtf if rtf else None
+    frame_interval = 1.0 / fps
+    next_frame_time = time.time()
+
+    def send_status(**data):
+        try:
+            status.put_nowait(data)
+        except queue.Full:
+            pass
+
+    runner.start_background(rtf)
+    send_status(event='ready')
+    try:
+        while True:
+            # コマンド処理（ブロックしない）
+            while True:
+                try:
+                    cmd, arg = commands.get_nowait()
+                except queue.Empty:
+                    break
+                if cmd == 'stop':
+                    return
+                elif cmd == 'load_model':
+                    try:
+                        if arg:
+                            runner.load_model(arg)
+                        else:
+                            runner.unload_model()
+                        send_status(event='model', path=arg)
+                    except Exception as e:
+                        send_status(event='error', message=str(e))
+                elif cmd == 'reset':
+                    runner.stop_background(timeout=None)
+                    runner.reset()
+                    if not paused:
+                        runner.start_background(rtf)
+                elif cmd == 'pause':
+                    paused = bool(arg)
+                    if paused:
+                        runner.stop_background(timeout=None)
+                    else:
+                        runner.start_background(rtf)
+                elif cmd == 'fps':
+                    frame_interval = 1.0 / max(1, arg)
+                elif cmd == 'rtf':
+                    rtf = arg if arg else None
+                    runner.set_rtf(rtf)
+
+            while runner.finished_episodes:
+                send_status(event='episode', **runner.finished_episodes.popleft())
+
+            if paused:
+                time.sleep(0.05)
+                continue
+            if not runner.is_background_running():
+                send_status(event='error', message=runner.background_error or 'simulation thread stopped')
+                return
+
+            # 描画中はステップとロックで排他されるため、物理スレッドは描画1回分待たされる。
+            # 実時間倍率を指定していれば待った分は次のステップで追いつくが、最大速度や余裕がない場合は描画の分だけ遅くなる
+            frames.write(runner.render_frame())
+            state = runner.get_state()
+            if state is not None:
+                send_status(event='frame', steps=state['episode_steps'], reward=state['episode_reward'],
+                            sim_time=state['sim_time'])
+            next_frame_time = max(next_frame_time + frame_interval, time.time())
+            time.sleep(max(0.0, next_frame_time - time.time()))
+    finally:
+        frames.close()
+        runner.close()
+
+
+class SimulationWorker:
+    """GUIから操作する常駐シミュレーションワーカー（別プロセス）"""
+
+    def __init__(self, env_type='step', robot_type='tristar', width=480, height=360, fps=20, rtf=1.0):
+        self.env_type = env_type
+        self.robot_type = robot_type
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.rtf = rtf
+        self.process = None
+        self.frames = None
+        self.commands = None
+        self.status = None
+
+    def start(self):
+        # GenesisやCUDAをforkしたプロセスで使わないよう spawn を使用
+        ctx = multiprocessing.get_context('spawn')
+        self.frames = SharedFrameBuffer.create(self.width, self.height)
+        self.commands = ctx.Queue()
+        self.status = ctx.Queue(maxsize=100)
+        self.process = ctx.Process(
+            target=_simulation_worker_main,
+            args=(self.commands, self.status, self.frames.name, self.width, self.height,
+                  self.env_type, self.robot_type, self.fps, self.rtf),
+            daemon=True,
+        )
+        self.process.start()
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def matches(self, env_type, robot_type, width, height):
+        """同じ設定で起動済みか（モデル以外の変更はシーンの再構築が必要）"""
+        return (self.is_alive() and self.env_type == env_type and self.robot_type == robot_type
+                and self.width == width and self.height == height)
+
+    def load_model(self, model_path):
+        self.commands.put(('load_model', model_path))
+
+    def set_paused(self, paused):
+        self.commands.put(('pause', paused))
+
+    def set_fps(self, fps):
+        self.fps = fps
+        self.commands.put(('fps', fps))
+
+    def set_rtf(self, rtf):
+        """目標の実時間倍率 (None または 0 で最大速度)"""
+        self.rtf = rtf
+        self.commands.put(('rtf', rtf))
+
+    def reset(self):
+        self.commands.put(('reset', None))
+
+    def read_frame(self):
+        """新しい画像 (H, W, 3) があれば返す"""
+        return self.frames.read() if self.frames is not None else None
+
+    def poll_status(self):
+        """ワーカーからの状態通知をすべて取り出す"""
+        events = []
+        while self.status is not None:
+            try:
+                events.append(self.status.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def stop(self, timeout=5.0):
+        if self.process is not None:
+            if self.process.is_alive():
+                self.commands.put(('stop', None))
+                self.process.join(timeout)
+                if self.process.is_alive():
+                    self.process.terminate()
+                    self.process.join()
+            self.process = None
+        if self.frames is not None:
+            self.frames.close()
+            self.frames = None
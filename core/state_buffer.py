@@ -0,0 +1,64 @@
+"""
+シミュレーション状態のダブルバッファ
+
+シミュレーションスレッド（書き手）が最新の観測・姿勢・ゲーム情報を書き込み、
+UI（読み手）は自分のペースで最新の状態を読む。どちらもロックで相手を待たない。
+"""
+import numpy as np
+
+
+class StateDoubleBuffer:
+    """
+    書き手1・読み手複数のダブルバッファ
+
+    書き手は表示中でない側のスロットに書き込んでから表示スロットを切り替える。
+    各スロットはバージョン番号を持ち（書き込み中は奇数）、読み手はコピーの前後で
+    バージョンが変わっていないことを確認する（seqlock）。
+    配列はスロットごとに事前確保した領域へコピーするため、書き込みごとのメモリ確保はない。
+    """
+
+    def __init__(self):
+        self._slots = [{}, {}]
+        self._versions = [0, 0]
+        self._front = 0
+        self.publish_count = 0
+
+    def publish(self, **values):
+        """状態を書き込む（ndarray はスロットの配列へコピー、それ以外はそのまま保持）"""
+        back = 1 - self._front
+        slot = self._slots[back]
+        self._versions[back] += 1  # 書き込み中 (奇数)
+        for key, value in values.items():
+            if isinstance(value, np.ndarray):
+                buf = slot.get(key)
+                if buf is None or buf.shape != value.shape or buf.dtype != value.dtype:
+                    buf = np.empty_like(value)
+                    slot[key] = buf
+                np.copyto(buf, value)
+            else:
+                slot[key] = value
+        self._versions[back] += 1  # 書き込み完了 (偶数)
+        self._front = back
+        self.publish_count += 1
+
+    def read(self, retries=3):
+        """
+        最新の状態のコピーを返す
+        まだ書き込みがない場合や、読み直しても書き換え中だった場合はNone（前回の値を使い続ければよい）
+        """
+        for _ in range(retries):
+            front = self._front
+            version = self._versions[front]
+            if version == 0:
+                return None
+            if version % 2 == 1:
+                continue
+            try:
+                snapshot = {k: (v.copy() if isinstance(v, np.ndarray) else v)
+                            for k, v in list(self._slots[front].items())}
+            except RuntimeError:
+                # 読み取り中にキーが追加された
+                continue
+            if self._versions[front] == version:
+                return snapshot
+        return None
@@ -19,29 +19,35 @@ class GUIProgressCallback(BaseCallback):
         self.update_callback = update_callback
         self.episode_rewards = []
         self.episode_lengths = []
-        self.current_episode_reward = 0
-        self.current_episode_length = 0
+        self.current_episode_rewards = None
+        self.current_episode_lengths = None
         
-    def _on_step(self) -> bool:
-        self.current_episode_reward += self.locals['rewards'][0]
-        self.current_episode_length += 1
+    def _on_training_start(self) -> None:
+        self.current_episode_rewards = [0.0] * self.training_env.num_envs
+        self.current_episode_lengths = [0] * self.training_env.num_envs
         
-        if self.locals['dones'][0]:
-            self.episode_rewards.append(self.current_episode_reward)
-            self.episode_lengths.append(self.current_episode_length)
-            
-            # Report progress
-            if self.update_callback:
-                avg_reward = sum(self.episode_rewards[-10:]) / min(len(self.episode_rewards), 10)
-                self.update_callback({
-                    'steps': self.num_timesteps,
-                    'episodes': len(self.episode_rewards),
-                    'last_reward': self.current_episode_reward,
-                    'avg_reward': avg_reward
-                })
+    def _on_step(self) -> bool:
+        # 全環境のエピソードを集計（env 0 のみではなく）
+        for i, (reward, done) in enumerate(zip(self.locals['rewards'], self.locals['dones'])):
+            self.current_episode_rewards[i] += reward
+            self.current_episode_lengths[i] += 1
             
-            self.current_episode_reward = 0
-            self.current_episode_length = 0
+            if done:
+                self.episode_rewards.append(self.current_episode_rewards[i])
+                self.episode_lengths.append(self.current_episode_lengths[i])
+                
+                # Report progress
+                if self.update_callback:
+                    avg_reward = sum(self.episode_rewards[-10:]) / min(len(self.episode_rewards), 10)
+                    self.update_callback({
+                        'steps': self.num_timesteps,
+                        'episodes': len(self.episode_rewards),
+                        'last_reward': self.current_episode_rewards[i],
+                        'avg_reward': avg_reward
+                    })
+                
+                self.current_episode_rewards[i] = 0.0
+                self.current_episode_lengths[i] = 0
         
         return True
 
@@ -1,13 +1,15 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                                QPushButton, QComboBox, QLabel, QGroupBox,
-                               QSpinBox, QTextEdit, QProgressBar)
-from PySide6.QtCore import QTimer
+                               QSpinBox, QTextEdit, QProgressBar,
+                               QTableWidget, QTableWidgetItem, QHeaderView)
+from PySide6.QtCore import QProcess, QProcessEnvironment
+from PySide6.QtGui import QColor
 import sys
 import os
-import subprocess
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from core.robot_config_manager import RobotConfigManager
+from xrobocon.eval_protocol import parse_progress
 
 class EvaluationTab(QWidget):
     def __init__(self):
@@ -15,6 +17,8 @@ class EvaluationTab(QWidget):
         
         self.process = None
         self.is_evaluating = False
+        self.output_buffer = ""
+        self.output_lines = []
         self.config_manager = RobotConfigManager()
         
         self.init_ui()
@@ -83,6 +87,11 @@ class EvaluationTab(QWidget):
         self.eval_btn.clicked.connect(self.start_evaluation)
         button_layout.addWidget(self.eval_btn)
         
+        self.cancel_btn = QPushButton("中止")
+        self.cancel_btn.clicked.connect(self.cancel_evaluation)
+        self.cancel_btn.setEnabled(False)
+        button_layout.addWidget(self.cancel_btn)
+        
         self.save_btn = QPushButton("結果を保存")
         self.save_btn.clicked.connect(self.save_results)
         self.save_btn.setEnabled(False)  # 初期状態では無効
@@ -100,6 +109,16 @@ class EvaluationTab(QWidget):
         results_group = QGroupBox("評価結果")
         results_layout = QVBoxLayout()
         
+        # Episode table (live)
+        self.episode_table = QTableWidget(0, 6)
+        self.episode_table.setHorizontalHeaderLabels(["Episode", "シナリオ", "結果", "報酬", "ステップ", "最小距離"])
+        self.episode_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.episode_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        results_layout.addWidget(self.episode_table)
+        
+        self.summary_label = QLabel("")
+        results_layout.addWidget(self.summary_label)
+        
         # Text results
         self.results_text = QTextEdit()
         self.results_text.setReadOnly(True)
@@ -166,7 +185,8 @@ class EvaluationTab(QWidget):
                 '--model', model_path,
                 '--env', env_type,
                 '--robot', robot_type,
-                '--episodes', str(num_episodes)
+                '--episodes', str(num_episodes),
+                '--progress_json'
             ]
             
             # Add --render flag if checkbox is checked
@@ -175,40 +195,116 @@ class EvaluationTab(QWidget):
             
             self.results_text.append(f"コマンド: {' '.join(cmd)}\n\n")
             
-            # Start process
-            self.process = subprocess.Popen(
-                cmd,
-                cwd=project_root,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-            
-            # Wait for completion and read output
-            output, _ = self.process.communicate()
-            
-            self.results_text.append(output)
-            
-            # 結果を保存できるように保存ボタンを有効化
-            self.last_evaluation_output = output
             self.last_evaluation_config = {
                 'robot': robot_type,
                 'model': os.path.basename(model_data),
                 'env': env_type,
                 'episodes': num_episodes
             }
-            self.save_btn.setEnabled(True)
+            self.output_buffer = ""
+            self.output_lines = []
+            self.episode_table.setRowCount(0)
+            self.summary_label.setText("")
+            self.progress_bar.setRange(0, num_episodes)
+            self.progress_bar.setValue(0)
             
-            self.is_evaluating = False
-            self.eval_btn.setEnabled(True)
-            self.progress_bar.setVisible(False)
+            # Start process (UIスレッドをブロックしないよう QProcess のシグナルで出力を受け取る)
+            self.process = QProcess(self)
+            self.process.setWorkingDirectory(project_root)
+            self.process.setProcessChannelMode(QProcess.MergedChannels)
+            env = QProcessEnvironment.systemEnvironment()
+            env.insert("PYTHONUNBUFFERED", "1")
+            self.process.setProcessEnvironment(env)
+            self.process.readyReadStandardOutput.connect(self.read_process_output)
+            self.process.finished.connect(self.on_evaluation_finished)
+            self.process.errorOccurred.connect(self.on_process_error)
+            self.process.start(cmd[0], cmd[1:])
+            self.cancel_btn.setEnabled(True)
             
         except Exception as e:
             import traceback
             self.results_text.append(f"\nエラー: {str(e)}\n{traceback.format_exc()}\n")
-            self.is_evaluating = False
-            self.eval_btn.setEnabled(True)
-            self.progress_bar.setVisible(False)
+            self.reset_ui()
+    
+    def read_process_output(self):
+        """評価プロセスの出力を読み取り、進捗行は表に、それ以外はテキストに表示"""
+        if self.process is None:
+            return
+        data = bytes(self.process.readAllStandardOutput()).decode('utf-8', errors='replace')
+        self.output_buffer += data
+        *lines, self.output_buffer = self.output_buffer.split('\n')
+        
+        text_lines = []
+        for line in lines:
+            event = parse_progress(line)
+            if event is None:
+                text_lines.append(line)
+                self.output_lines.append(line)
+            else:
+                self.handle_progress_event(event)
+        if text_lines:
+            self.results_text.append('\n'.join(text_lines))
+    
+    def handle_progress_event(self, event):
+        """構造化進捗イベントを表示に反映"""
+        if event['event'] == 'episode':
+            row = self.episode_table.rowCount()
+            self.episode_table.insertRow(row)
+            success = event['success']
+            items = [
+                str(event['index'] + 1),
+                event['scenario'],
+                "成功" if success else "失敗",
+                f"{event['reward']:.2f}",
+                str(event['steps']),
+                f"{event['min_dist']:.3f}m",
+            ]
+            for col, text in enumerate(items):
+                item = QTableWidgetItem(text)
+                if col == 2:
+                    item.setForeground(QColor("green") if success else QColor("red"))
+                self.episode_table.setItem(row, col, item)
+            self.episode_table.scrollToBottom()
+            self.progress_bar.setValue(min(row + 1, self.progress_bar.maximum()))
+        elif event['event'] == 'summary':
+            self.summary_label.setText(
+                f"成功率: {event['success_rate']*100:.1f}% ({event['episodes_run']}エピソード)  "
+                f"平均報酬: {event['avg_reward']:.2f}  平均ステップ: {event['avg_steps']:.1f}")
+            self.progress_bar.setValue(self.progress_bar.maximum())
+    
+    def cancel_evaluation(self):
+        """評価を中止"""
+        if self.process is not None and self.process.state() != QProcess.NotRunning:
+            self.results_text.append("\n評価を中止しています...\n")
+            self.process.kill()
+    
+    def on_process_error(self, error):
+        if error == QProcess.FailedToStart:
+            self.results_text.append("\nエラー: 評価プロセスを起動できませんでした\n")
+            self.reset_ui()
+    
+    def on_evaluation_finished(self, exit_code, exit_status):
+        """評価プロセス終了時の処理"""
+        self.read_process_output()
+        if self.output_buffer:
+            self.results_text.append(self.output_buffer)
+            self.output_lines.append(self.output_buffer)
+            self.output_buffer = ""
+        
+        if exit_status == QProcess.CrashExit:
+            self.results_text.append("\n評価は中止されました\n")
+        
+        # 結果を保存できるように保存ボタンを有効化
+        self.last_evaluation_output = '\n'.join(self.output_lines)
+        self.save_btn.setEnabled(True)
+        self.reset_ui()
+    
+    def reset_ui(self):
+        self.is_evaluating = False
+        self.eval_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.process = None
     
     def save_results(self):
         """評価結果をファイルに保存"""
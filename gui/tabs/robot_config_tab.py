@@ -178,7 +178,7 @@ class RobotConfigTab(QWidget):
             self,
             "学習済みモデルを選択",
             models_dir,
-            "Model Files (*.zip)"
+            "Model Files (*.zip *.pt *.onnx)"
         )
         
         if filename:
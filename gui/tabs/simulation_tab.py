@@ -1,5 +1,6 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                               QPushButton, QComboBox, QLabel, QGroupBox)
+                               QPushButton, QComboBox, QLabel, QGroupBox,
+                               QSpinBox, QCheckBox, QApplication)
 from PySide6.QtCore import QTimer
 import sys
 import os
@@ -7,18 +8,43 @@ import subprocess
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from core.robot_config_manager import RobotConfigManager
+from core.simulation_worker import SimulationWorker
+from gui.widgets.frame_view import FrameView
+
+# シミュレーション速度（実時間倍率）の選択肢 (None = 最大速度)
+SIMULATION_SPEEDS = {
+    "1x": 1.0,
+    "4x": 4.0,
+    "最大": None,
+}
+
+# 埋め込み表示の解像度の選択肢
+VIEW_RESOLUTIONS = {
+    "320x240": (320, 240),
+    "480x360": (480, 360),
+    "640x480": (640, 480),
+}
 
 class SimulationTab(QWidget):
     def __init__(self):
         super().__init__()
         
         self.process = None
+        self.worker = None
         self.is_running = False
         self.model_path = None
         self.config_manager = RobotConfigManager()
         
+        # 埋め込みビューアの画像・状態の取得
+        self.frame_timer = QTimer()
+        self.frame_timer.timeout.connect(self.update_frame)
+        
         self.init_ui()
         
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown_worker)
+        
     def init_ui(self):
         layout = QVBoxLayout()
         
@@ -30,7 +56,7 @@ class SimulationTab(QWidget):
         env_layout = QHBoxLayout()
         env_layout.addWidget(QLabel("環境:"))
         self.env_combo = QComboBox()
-        self.env_combo.addItems(["flat", "step"])
+        self.env_combo.addItems(["flat", "step", "step_hard"])
         self.env_combo.setCurrentText("step")
         env_layout.addWidget(self.env_combo)
         env_layout.addStretch()
@@ -50,10 +76,34 @@ class SimulationTab(QWidget):
         model_layout = QHBoxLayout()
         model_layout.addWidget(QLabel("モデル:"))
         self.model_combo = QComboBox()
+        self.model_combo.currentIndexChanged.connect(self.on_model_changed)
         model_layout.addWidget(self.model_combo)
         model_layout.addStretch()
         control_layout.addLayout(model_layout)
         
+        # Embedded viewer settings
+        view_layout = QHBoxLayout()
+        view_layout.addWidget(QLabel("解像度:"))
+        self.resolution_combo = QComboBox()
+        self.resolution_combo.addItems(list(VIEW_RESOLUTIONS.keys()))
+        self.resolution_combo.setCurrentText("480x360")
+        view_layout.addWidget(self.resolution_combo)
+        view_layout.addWidget(QLabel("FPS:"))
+        self.fps_spin = QSpinBox()
+        self.fps_spin.setRange(1, 60)
+        self.fps_spin.setValue(20)
+        self.fps_spin.valueChanged.connect(self.on_fps_changed)
+        view_layout.addWidget(self.fps_spin)
+        view_layout.addWidget(QLabel("速度:"))
+        self.speed_combo = QComboBox()
+        self.speed_combo.addItems(list(SIMULATION_SPEEDS.keys()))
+        self.speed_combo.currentTextChanged.connect(self.on_speed_changed)
+        view_layout.addWidget(self.speed_combo)
+        self.external_check = QCheckBox("別ウィンドウで表示 (Genesisビューア)")
+        view_layout.addWidget(self.external_check)
+        view_layout.addStretch()
+        control_layout.addLayout(view_layout)
+        
         control_group.setLayout(control_layout)
         layout.addWidget(control_group)
         
@@ -62,6 +112,9 @@ class SimulationTab(QWidget):
         self.start_btn = QPushButton("シミュレーション開始")
         self.start_btn.clicked.connect(self.toggle_simulation)
         button_layout.addWidget(self.start_btn)
+        self.reset_btn = QPushButton("リセット")
+        self.reset_btn.clicked.connect(self.reset_simulation)
+        button_layout.addWidget(self.reset_btn)
         button_layout.addStretch()
         layout.addLayout(button_layout)
         
@@ -69,7 +122,12 @@ class SimulationTab(QWidget):
         self.status_label = QLabel("ステータス: 準備完了")
         layout.addWidget(self.status_label)
         
-        layout.addStretch()        
+        # Embedded viewer
+        self.frame_view = FrameView()
+        layout.addWidget(self.frame_view, stretch=1)
+        self.info_label = QLabel("")
+        layout.addWidget(self.info_label)
+        
         self.setLayout(layout)
         
         # Load models for first robot
@@ -100,6 +158,108 @@ class SimulationTab(QWidget):
             self.stop_simulation()
             
     def start_simulation(self):
+        if self.external_check.isChecked():
+            self.start_external_simulation()
+        else:
+            self.start_embedded_simulation()
+    
+    def _model_path(self):
+        model_data = self.model_combo.currentData()
+        if not model_data:  # model_data is None for "なし"
+            return None
+        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+        return os.path.join(project_root, model_data)
+    
+    def start_embedded_simulation(self):
+        """常駐ワーカーでオフスクリーン描画し、タブ内に表示"""
+        try:
+            env_type = self.env_combo.currentText()
+            robot_type = self.robot_combo.currentText()
+            width, height = VIEW_RESOLUTIONS[self.resolution_combo.currentText()]
+            
+            # 環境・ロボット・解像度が同じならシーンを再利用
+            if self.worker is None or not self.worker.matches(env_type, robot_type, width, height):
+                self.shutdown_worker()
+                self.status_label.setText("ステータス: シミュレーター起動中 (シーン構築)...")
+                self.worker = SimulationWorker(env_type=env_type, robot_type=robot_type,
+                                               width=width, height=height, fps=self.fps_spin.value(),
+                                               rtf=SIMULATION_SPEEDS[self.speed_combo.currentText()])
+                self.worker.start()
+            else:
+                self.status_label.setText("ステータス: 実行中")
+            
+            self.worker.load_model(self._model_path())
+            self.worker.set_paused(False)
+            
+            self.is_running = True
+            self.start_btn.setText("停止")
+            self.start_btn.setStyleSheet("background-color: #ff4444;")
+            self.frame_timer.start(15)
+            
+        except Exception as e:
+            import traceback
+            print(f"エラー: {str(e)}\n{traceback.format_exc()}")
+            self.status_label.setText(f"エラー: {str(e)}")
+            self.is_running = False
+            self.start_btn.setText("シミュレーション開始")
+            self.start_btn.setStyleSheet("")
+    
+    def on_model_changed(self, index):
+        """実行中にモデルを切り替えた場合は重みだけを入れ替える"""
+        if self.is_running and self.worker is not None and self.worker.is_alive():
+            self.worker.load_model(self._model_path())
+    
+    def on_fps_changed(self, fps):
+        if self.worker is not None and self.worker.is_alive():
+            self.worker.set_fps(fps)
+    
+    def on_speed_changed(self, text):
+        if self.worker is not None and self.worker.is_alive():
+            self.worker.set_rtf(SIMULATION_SPEEDS[text])
+    
+    def reset_simulation(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.worker.reset()
+    
+    def update_frame(self):
+        if self.worker is None:
+            return
+        frame = self.worker.read_frame()
+        if frame is not None:
+            self.frame_view.show_frame(frame)
+        
+        for event in self.worker.poll_status():
+            kind = event.get('event')
+            if kind == 'ready':
+                self.status_label.setText("ステータス: 実行中")
+            elif kind == 'model':
+                name = os.path.basename(event['path']) if event['path'] else "なし (アイドル)"
+                self.status_label.setText(f"ステータス: 実行中 (モデル: {name})")
+            elif kind == 'error':
+                self.status_label.setText(f"エラー: {event['message']}")
+            elif kind == 'frame':
+                self.info_label.setText(f"ステップ: {event['steps']}  報酬: {event['reward']:.2f}")
+            elif kind == 'episode':
+                result = "成功" if event['success'] else "失敗"
+                self.status_label.setText(
+                    f"ステータス: 実行中 - 前回 [{event['scenario']}] {result}, "
+                    f"報酬={event['reward']:.2f}, ステップ={event['steps']}")
+        
+        if not self.worker.is_alive():
+            self.status_label.setText("エラー: シミュレーションワーカーが終了しました")
+            self.shutdown_worker()
+            self.stop_simulation()
+    
+    def shutdown_worker(self):
+        self.frame_timer.stop()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+            
+    def start_external_simulation(self):
+        if self.env_combo.currentText() not in ("flat", "step"):
+            self.status_label.setText("エラー: 別ウィンドウ表示は flat / step 環境のみ対応しています")
+            return
         try:
             # Get selected model
             robot_type = self.robot_combo.currentText()
@@ -143,6 +303,10 @@ class SimulationTab(QWidget):
             self.process.wait(timeout=5)
             self.process = None
         
+        # 埋め込みワーカーは一時停止のみ（次回の開始時にシーンを再利用）
+        if self.worker is not None and self.worker.is_alive():
+            self.worker.set_paused(True)
+        
         self.is_running = False
         self.start_btn.setText("シミュレーション開始")
         self.start_btn.setStyleSheet("")
@@ -1,14 +1,23 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                               QPushButton, QLineEdit, QLabel, QTextEdit, 
+                               QPushButton, QLineEdit, QLabel, QPlainTextEdit, 
                                QGroupBox, QComboBox, QFileDialog)
-from PySide6.QtCore import QTimer, QProcess
+from PySide6.QtCore import QTimer, QProcess, QProcessEnvironment
+from collections import deque
 import sys
 import os
-import subprocess
 import traceback
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from core.robot_config_manager import RobotConfigManager
+from gui.widgets.metrics_plot import MetricsPlotWidget
+from xrobocon.metrics_stream import metrics_stream_path
+
+# 学習ログの表示行数の上限（古い行から削除され、GUIの負荷は出力量に依存しない）
+LOG_MAX_LINES = 5000
+# ログ表示を更新する間隔 (ms)
+LOG_FLUSH_INTERVAL_MS = 100
+# メトリクスグラフを更新する間隔 (ms)
+METRICS_POLL_INTERVAL_MS = 1000
 
 class TrainingTab(QWidget):
     def __init__(self):
@@ -16,8 +25,13 @@ class TrainingTab(QWidget):
         
         self.process = None
         self.is_training = False
-        self.check_timer = QTimer()
-        self.check_timer.timeout.connect(self.check_process_output)
+        # 受信済みで未表示の行（表示上限を超える分は古い行から捨てる）
+        self.pending_lines = deque(maxlen=LOG_MAX_LINES)
+        self.partial_line = ""
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self.flush_log)
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.poll_metrics)
         self.config_manager = RobotConfigManager()
         
         self.init_ui()
@@ -88,11 +102,20 @@ class TrainingTab(QWidget):
         button_layout.addStretch()
         layout.addLayout(button_layout)
         
+        # Live metrics (train_rl_step.py が書き出すメトリクスストリーム)
+        metrics_group = QGroupBox("学習メトリクス")
+        metrics_layout = QVBoxLayout()
+        self.metrics_plot = MetricsPlotWidget()
+        metrics_layout.addWidget(self.metrics_plot)
+        metrics_group.setLayout(metrics_layout)
+        layout.addWidget(metrics_group, stretch=2)
+        
         # Progress log
         log_group = QGroupBox("学習ログ")
         log_layout = QVBoxLayout()
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(LOG_MAX_LINES)
         log_layout.addWidget(self.log_text)
         log_group.setLayout(log_layout)
         layout.addWidget(log_group)
@@ -162,81 +185,123 @@ class TrainingTab(QWidget):
                 if save_name:
                     cmd.extend(['--save_name', save_name])
             
-            self.log_text.append(f"学習を開始しています...\n")
-            self.log_text.append(f"総ステップ数: {steps}\n")
-            self.log_text.append(f"ロボット: {robot_type}, 環境: {env_type}\n")
+            self.log_text.appendPlainText(f"学習を開始しています...\n")
+            self.log_text.appendPlainText(f"総ステップ数: {steps}\n")
+            self.log_text.appendPlainText(f"ロボット: {robot_type}, 環境: {env_type}\n")
             if save_name:
-                self.log_text.append(f"保存名: {save_name}.zip\n")
+                self.log_text.appendPlainText(f"保存名: {save_name}.zip\n")
             else:
                 if env_type == "flat":
-                    self.log_text.append(f"保存名: xrobocon_ppo_{robot_type}_flat.zip (デフォルト)\n")
+                    self.log_text.appendPlainText(f"保存名: xrobocon_ppo_{robot_type}_flat.zip (デフォルト)\n")
                 elif env_type == "step_hard":
-                    self.log_text.append(f"保存名: xrobocon_ppo_{robot_type}_step_hard.zip (デフォルト)\n")
+                    self.log_text.appendPlainText(f"保存名: xrobocon_ppo_{robot_type}_step_hard.zip (デフォルト)\n")
                 else:
-                    self.log_text.append(f"保存名: xrobocon_ppo_{robot_type}_step.zip (デフォルト)\n")
+                    self.log_text.appendPlainText(f"保存名: xrobocon_ppo_{robot_type}_step.zip (デフォルト)\n")
             if base_model_data:
-                self.log_text.append(f"ベースモデル: {os.path.basename(base_model_data)}\n")
+                self.log_text.appendPlainText(f"ベースモデル: {os.path.basename(base_model_data)}\n")
                 if env_type != "flat":
-                    self.log_text.append(f"注意: train_step_loopは既存モデルから自動的に再開します\n")
-            self.log_text.append(f"コマンド: {' '.join(cmd)}\n\n")
+                    self.log_text.appendPlainText(f"注意: train_step_loopは既存モデルから自動的に再開します\n")
+            self.log_text.appendPlainText(f"コマンド: {' '.join(cmd)}\n\n")
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
             self.is_training = True
             
-            # Start process
-            self.process = subprocess.Popen(
-                cmd,
-                cwd=project_root,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1
-            )
+            # Start process (出力は readyRead で受け取り、タイマーでまとめて表示)
+            self.pending_lines.clear()
+            self.partial_line = ""
+            self.process = QProcess(self)
+            self.process.setWorkingDirectory(project_root)
+            self.process.setProcessChannelMode(QProcess.MergedChannels)
+            env = QProcessEnvironment.systemEnvironment()
+            env.insert("PYTHONUNBUFFERED", "1")
+            self.process.setProcessEnvironment(env)
+            self.process.readyReadStandardOutput.connect(self.read_process_output)
+            self.process.finished.connect(self.on_process_finished)
+            self.process.errorOccurred.connect(self.on_process_error)
+            self.process.start(cmd[0], cmd[1:])
+            
+            self.flush_timer.start(LOG_FLUSH_INTERVAL_MS)
             
-            # Monitor output
-            self.check_timer.start(100) # Check every 100 ms
+            # メトリクスストリーム（チャンクをまたいで同じファイルに追記される）
+            if save_name:
+                model_name = save_name
+            else:
+                model_name = f"xrobocon_ppo_{robot_type}_{env_type}"
+            self.metrics_plot.set_path(os.path.join(project_root, metrics_stream_path(model_name)))
+            self.metrics_timer.start(METRICS_POLL_INTERVAL_MS)
             
         except Exception as e:
-            self.log_text.append(f"エラー: {str(e)}\n{traceback.format_exc()}\n")
+            self.log_text.appendPlainText(f"エラー: {str(e)}\n{traceback.format_exc()}\n")
             self.start_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
             self.is_training = False
 
-    def check_process_output(self):
-        if self.process and self.process.poll() is None: # Process is still running
-            output = self.process.stdout.readline()
-            if output:
-                self.log_text.append(output.strip())
-                self.log_text.verticalScrollBar().setValue(
-                    self.log_text.verticalScrollBar().maximum()
-                )
-        elif self.process and self.process.poll() is not None: # Process has finished
-            self.check_timer.stop()
-            # Read any remaining output
-            for output in self.process.stdout.readlines():
-                if output:
-                    self.log_text.append(output.strip())
-            
-            return_code = self.process.returncode
-            if return_code == 0:
-                self.log_text.append("\n学習が正常に完了しました。\n")
-            else:
-                self.log_text.append(f"\n学習がエラーで終了しました。終了コード: {return_code}\n")
-            
+    def read_process_output(self):
+        """利用可能な出力をすべて読み取り、行単位で保留キューに追加（ブロックしない）"""
+        if self.process is None:
+            return
+        data = bytes(self.process.readAllStandardOutput()).decode('utf-8', errors='replace')
+        if not data:
+            return
+        *lines, self.partial_line = (self.partial_line + data).split('\n')
+        for line in lines:
+            # プログレスバー等の \r による上書きは最後の状態のみ表示
+            line = line.rstrip('\r').rsplit('\r', 1)[-1]
+            self.pending_lines.append(line)
+    
+    def flush_log(self):
+        """保留中の行をまとめてログに追加"""
+        if not self.pending_lines:
+            return
+        scrollbar = self.log_text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        
+        self.log_text.appendPlainText('\n'.join(self.pending_lines))
+        self.pending_lines.clear()
+        
+        # ユーザーが過去のログを見ている間は自動スクロールしない
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+    
+    def on_process_finished(self, exit_code, exit_status):
+        self.read_process_output()
+        if self.partial_line:
+            self.pending_lines.append(self.partial_line)
+            self.partial_line = ""
+        self.flush_log()
+        
+        if exit_status == QProcess.NormalExit and exit_code == 0:
+            self.log_text.appendPlainText("\n学習が正常に完了しました。\n")
+        elif self.is_training:
+            self.log_text.appendPlainText(f"\n学習がエラーで終了しました。終了コード: {exit_code}\n")
+        else:
+            self.log_text.appendPlainText("学習が停止されました。\n")
+        
+        self.training_finished()
+
+    def on_process_error(self, error):
+        if error == QProcess.FailedToStart:
+            self.log_text.appendPlainText("エラー: 学習プロセスを起動できませんでした\n")
             self.training_finished()
 
     def stop_training(self):
-        if self.process and self.process.poll() is None:
-            self.log_text.append("\n学習を停止しています...\n")
-            self.process.terminate() # or .kill() for a more forceful stop
-            self.process.wait() # Wait for the process to terminate
-            self.log_text.append("学習が停止されました。\n")
-            self.training_finished()
+        if self.process and self.process.state() != QProcess.NotRunning:
+            self.log_text.appendPlainText("\n学習を停止しています...\n")
+            self.is_training = False
+            self.process.terminate()
+            # 一定時間内に終了しない場合は強制終了（終了処理は finished シグナルで行う）
+            process = self.process
+            QTimer.singleShot(5000, lambda: process.kill() if process.state() != QProcess.NotRunning else None)
         else:
-            self.log_text.append("実行中の学習プロセスはありません。\n")
+            self.log_text.appendPlainText("実行中の学習プロセスはありません。\n")
+
+    def poll_metrics(self):
+        self.metrics_plot.poll()
 
     def training_finished(self):
-        self.check_timer.stop()
+        self.flush_timer.stop()
+        self.metrics_timer.stop()
+        self.metrics_plot.poll()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.is_training = False
@@ -0,0 +1,36 @@
+from PySide6.QtWidgets import QLabel, QSizePolicy
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import Qt
+
+
+class FrameView(QLabel):
+    """シミュレーション画像 (H, W, 3) uint8 を表示するウィジェット（アスペクト比を保って拡大縮小）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(320, 240)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setStyleSheet("background-color: #202020; color: #aaaaaa;")
+        self.setText("シミュレーション停止中")
+        self._pixmap = None
+
+    def show_frame(self, frame):
+        height, width, _ = frame.shape
+        # QImage はバッファを参照するだけなので、QPixmap に変換するまで frame を保持する
+        image = QImage(frame.data, width, height, 3 * width, QImage.Format_RGB888)
+        self._pixmap = QPixmap.fromImage(image)
+        self._update_scaled()
+
+    def clear_frame(self, text="シミュレーション停止中"):
+        self._pixmap = None
+        self.clear()
+        self.setText(text)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scaled()
+
+    def _update_scaled(self):
+        if self._pixmap is not None:
+            self.setPixmap(self._pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.FastTransformation))
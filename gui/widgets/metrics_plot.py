@@ -0,0 +1,145 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from xrobocon.metrics_stream import (MetricsStreamReader, RECORD_DTYPE, KIND_EPISODE, KIND_UPDATE,
+                                     NO_SCENARIO, decimate_minmax)
+
+# シナリオ別成功率の移動平均の幅（エピソード数）
+SUCCESS_WINDOW = 50
+
+
+class _RecordBuffer:
+    """レコードを追記する可変長配列（容量は倍々で確保し、追記ごとの全体コピーを避ける）"""
+
+    def __init__(self, capacity=1024):
+        self.data = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.size = 0
+
+    def extend(self, records):
+        needed = self.size + len(records)
+        if needed > len(self.data):
+            capacity = max(needed, len(self.data) * 2)
+            data = np.zeros(capacity, dtype=RECORD_DTYPE)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+        self.data[self.size:needed] = records
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+    def clear(self):
+        self.size = 0
+
+
+def _rolling_mean(values, window):
+    cumsum = np.cumsum(np.insert(values.astype(np.float64), 0, 0.0))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    starts = np.arange(1, len(values) + 1) - counts
+    return (cumsum[1:] - cumsum[starts]) / counts
+
+
+class MetricsPlotWidget(QWidget):
+    """学習メトリクスストリームをライブ表示するグラフ（min/max間引きで描画点数を一定に保つ）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.reader = None
+        self.episodes = _RecordBuffer()
+        self.updates = _RecordBuffer()
+
+        self.figure = Figure(figsize=(8, 5), tight_layout=True)
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.ax_reward = self.figure.add_subplot(2, 2, 1)
+        self.ax_success = self.figure.add_subplot(2, 2, 2)
+        self.ax_fps = self.figure.add_subplot(2, 2, 3)
+        self.ax_loss = self.figure.add_subplot(2, 2, 4)
+
+        self.ax_reward.set_title("エピソード報酬", fontsize=9)
+        self.ax_success.set_title(f"シナリオ別成功率 (直近{SUCCESS_WINDOW})", fontsize=9)
+        self.ax_fps.set_title("FPS", fontsize=9)
+        self.ax_loss.set_title("損失", fontsize=9)
+        self.ax_success.set_ylim(-0.05, 1.05)
+
+        self.reward_line, = self.ax_reward.plot([], [], linewidth=0.8)
+        self.fps_line, = self.ax_fps.plot([], [], linewidth=0.8)
+        self.loss_lines = {
+            name: self.ax_loss.plot([], [], linewidth=0.8, label=name)[0]
+            for name in ('policy_loss', 'value_loss', 'entropy_loss')
+        }
+        self.ax_loss.legend(fontsize=7, loc='upper right')
+        self.success_lines = {}
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.canvas)
+        self.setLayout(layout)
+
+    def set_path(self, path):
+        """表示するメトリクスファイルを切り替える"""
+        self.reader = MetricsStreamReader(path)
+        self.episodes.clear()
+        self.updates.clear()
+        for line in self.success_lines.values():
+            line.remove()
+        self.success_lines = {}
+        self.redraw()
+
+    def poll(self):
+        """新しいレコードを読み込み、あれば再描画"""
+        if self.reader is None:
+            return
+        records = self.reader.read_new()
+        if len(records) == 0:
+            return
+        self.episodes.extend(records[records['kind'] == KIND_EPISODE])
+        self.updates.extend(records[records['kind'] == KIND_UPDATE])
+        self.redraw()
+
+    def _max_points(self):
+        # 描画幅1pxあたり min/max の2点
+        return max(200, self.canvas.width() * 2)
+
+    def _set_line(self, line, x, y):
+        valid = ~np.isnan(y)
+        x, y = decimate_minmax(x[valid], y[valid], self._max_points())
+        line.set_data(x, y)
+
+    def redraw(self):
+        episodes = self.episodes.view()
+        updates = self.updates.view()
+        steps = episodes['timesteps'].astype(np.float64)
+
+        self._set_line(self.reward_line, steps, episodes['ep_reward'].astype(np.float64))
+
+        # シナリオ別の成功率（成功フラグのあるエピソードのみ）
+        scenarios = self.reader.scenarios if self.reader else []
+        for index in np.unique(episodes['scenario']):
+            if index == NO_SCENARIO:
+                continue
+            mask = (episodes['scenario'] == index) & (episodes['success'] >= 0)
+            if not np.any(mask):
+                continue
+            name = scenarios[index] if index < len(scenarios) else str(index)
+            if name not in self.success_lines:
+                self.success_lines[name] = self.ax_success.plot([], [], linewidth=0.8, label=name)[0]
+                self.ax_success.legend(fontsize=7, loc='lower right')
+            rate = _rolling_mean(episodes['success'][mask], SUCCESS_WINDOW)
+            self._set_line(self.success_lines[name], steps[mask], rate)
+
+        update_steps = updates['timesteps'].astype(np.float64)
+        self._set_line(self.fps_line, update_steps, updates['fps'].astype(np.float64))
+        for name, line in self.loss_lines.items():
+            self._set_line(line, update_steps, updates[name].astype(np.float64))
+
+        for ax in (self.ax_reward, self.ax_fps, self.ax_loss):
+            ax.relim()
+            ax.autoscale_view()
+        self.ax_success.relim()
+        self.ax_success.autoscale_view(scaley=False)
+        self.canvas.draw_idle()
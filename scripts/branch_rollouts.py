@@ -0,0 +1,220 @@
+"""
+XROBOCON 分岐ロールアウト
+エピソードを途中まで1回だけ実行して状態を保存 (env.snapshot())し、そこから複数のポリシー・行動列・
+行動ノイズを分岐させて結果を比較します。段の縁での失敗を調べるときに、毎回シナリオの最初から
+同じ接近部分をシミュレーションし直す必要がなくなります。
+
+分岐は spawn したワーカープロセスで並列に実行します（各ワーカーは環境を一度だけ作成し、分岐ごとに
+reset() → restore() してから走らせる）。
+
+使用例:
+    python scripts/branch_rollouts.py --prefix xrobocon_ppo_tristar_large_step.zip --robot tristar_large \\
+        --scenario step_straight --seed 3 --fork_dist 0.8 --branches xrobocon_ppo_tristar_large_step.zip scripted \\
+        --noise 0.2 --noise_branches 8 --workers 4
+    python scripts/branch_rollouts.py --prefix best_model.zip --fork_step 250 --actions edge_sequences.npy
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import json
+import multiprocessing
+import numpy as np
+
+
+def load_branch_policy(spec, env):
+    """'scripted' はスクリプト制御器、それ以外はモデル (.zip / .pt / .onnx)"""
+    if spec == 'scripted':
+        from xrobocon.scripted_controllers import make_controller
+        return make_controller(env.robot_type)
+    from xrobocon.policy_runtime import load_policy
+    if not os.path.exists(spec) and os.path.exists(spec + ".zip"):
+        spec += ".zip"
+    return load_policy(spec, env)
+
+
+def policy_action(policy, obs):
+    """act(obs) を持つもの（書き出したポリシー・制御器）はそれを、SB3 モデルは決定論的な predict を使う"""
+    if hasattr(policy, 'act'):
+        return np.asarray(policy.act(obs), dtype=np.float32)
+    action, _ = policy.predict(obs, deterministic=True)
+    return np.asarray(action, dtype=np.float32)
+
+
+def _target_dist(env):
+    robot_pos = env.robot.get_pos().cpu().numpy()
+    return float(np.linalg.norm(robot_pos[:2] - np.array(env.current_target['pos'])[:2]))
+
+
+def run_prefix(env, policy, scenario, seed, fork_step=None, fork_dist=None):
+    """
+    分岐点まで1回だけ実行してスナップショットを返す
+
+    fork_step ステップ後、または fork_dist (m) までターゲットに近づいた時点で分岐する。
+
+    Returns:
+        dict: {'snapshot', 'steps', 'reward', 'dist'}
+    """
+    obs, _ = env.reset(seed=seed, options={'scenario': scenario, 'jitter_seed': seed})
+    steps = 0
+    total_reward = 0.0
+    while True:
+        if fork_step is not None and steps >= fork_step:
+            break
+        if fork_dist is not None and _target_dist(env) <= fork_dist:
+            break
+        obs, reward, terminated, truncated, _ = env.step(policy_action(policy, obs))
+        total_reward += reward
+        steps += 1
+        if terminated or truncated:
+            raise RuntimeError(f"Episode ended after {steps} steps before reaching the fork point")
+    return {'snapshot': env.snapshot(), 'steps': steps, 'reward': total_reward, 'dist': _target_dist(env)}
+
+
+# ワーカーの状態（環境は一度だけ作成し、ポリシーはパスごとにキャッシュ）
+_worker_env = None
+_worker_policies = {}
+
+
+def _init_branch_worker(robot_type, env_type, stall_detection=None):
+    global _worker_env
+    from scripts.evaluate_model import make_env
+    _worker_env = make_env(env_type, robot_type, stall_detection=stall_detection)
+
+
+def _run_branch(job):
+    """
+    スナップショットから1本の分岐を実行
+
+    Args:
+        job: {'name', 'scenario', 'seed', 'snapshot', 'horizon', 'policy' (パス / 'scripted' / None),
+              'actions' (開ループの行動列), 'noise', 'noise_seed'}
+    """
+    env = _worker_env
+    policy = None
+    if job.get('policy'):
+        if job['policy'] not in _worker_policies:
+            _worker_policies[job['policy']] = load_branch_policy(job['policy'], env)
+        policy = _worker_policies[job['policy']]
+    actions = job.get('actions')
+    rng = np.random.default_rng(job.get('noise_seed'))
+
+    # シーンを初期化してから、分岐点の状態を復元
+    env.reset(seed=job['seed'], options={'scenario': job['scenario'], 'jitter_seed': job['seed']})
+    obs = env.restore(job['snapshot'])
+
+    total_reward = 0.0
+    min_dist = _target_dist(env)
+    max_height = float(env.robot.get_pos().cpu().numpy()[2])
+    info = {}
+    steps = 0
+    horizon = job['horizon'] if actions is None else min(job['horizon'], len(actions))
+    for steps in range(1, horizon + 1):
+        action = actions[steps - 1] if actions is not None else policy_action(policy, obs)
+        if job.get('noise'):
+            action = np.clip(action + rng.normal(0.0, job['noise'], size=action.shape), -1.0, 1.0)
+        obs, reward, terminated, truncated, info = env.step(np.asarray(action, dtype=np.float32))
+        total_reward += reward
+        min_dist = min(min_dist, _target_dist(env))
+        max_height = max(max_height, float(env.robot.get_pos().cpu().numpy()[2]))
+        if terminated or truncated:
+            break
+    return {
+        'name': job['name'],
+        'success': bool(info.get('is_success', False)),
+        'reward': float(total_reward),
+        'steps': steps,
+        'min_dist': float(min_dist),
+        'final_dist': _target_dist(env),
+        'max_height': max_height,
+        'end': info.get('truncation_reason') or ('terminated' if 'is_success' in info else 'horizon'),
+    }
+
+
+def make_branch_jobs(policies=(), noise_policy=None, noise=0.0, noise_branches=0, action_sequences=None):
+    """分岐の一覧 (ポリシー・ノイズ付きポリシー・開ループの行動列)"""
+    jobs = [{'name': os.path.basename(p), 'policy': p} for p in policies]
+    for k in range(noise_branches):
+        jobs.append({'name': f"{os.path.basename(noise_policy)}+noise{noise:g}#{k}", 'policy': noise_policy,
+                     'noise': noise, 'noise_seed': k})
+    if action_sequences is not None:
+        for k, sequence in enumerate(action_sequences):
+            jobs.append({'name': f"actions#{k}", 'actions': np.asarray(sequence, dtype=np.float32)})
+    return jobs
+
+
+def run_branches(jobs, snapshot, scenario, seed, robot_type, env_type, horizon, workers=1, env=None,
+                 stall_detection=None):
+    """
+    分岐を実行して結果を一覧の順に返す
+
+    workers <= 1 の場合は env（分岐点まで走らせた環境）をそのまま使う
+    """
+    for job in jobs:
+        job.update(scenario=scenario, seed=seed, snapshot=snapshot, horizon=horizon)
+
+    global _worker_env
+    if workers <= 1 or len(jobs) <= 1:
+        _worker_env = env
+        if _worker_env is None:
+            _init_branch_worker(robot_type, env_type, stall_detection)
+        return [_run_branch(job) for job in jobs]
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes=min(workers, len(jobs)), initializer=_init_branch_worker,
+                  initargs=(robot_type, env_type, stall_detection)) as pool:
+        return pool.map(_run_branch, jobs)
+
+
+def print_branch_report(prefix, results):
+    print(f"\n分岐点: {prefix['steps']} ステップ, 報酬 {prefix['reward']:.1f}, ターゲットまで {prefix['dist']:.3f}m")
+    print(f"\n{'branch':<40} {'result':>7} {'reward':>9} {'steps':>6} {'min dist':>9} {'max z':>7} {'end':>11}")
+    for r in sorted(results, key=lambda r: -r['reward']):
+        print(f"{r['name'][:40]:<40} {'成功' if r['success'] else '失敗':>6} {r['reward']:>9.1f} {r['steps']:>6} "
+              f"{r['min_dist']:>8.3f}m {r['max_height']:>7.3f} {r['end']:>11}")
+    print(f"\n成功 {sum(r['success'] for r in results)}/{len(results)} 分岐")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fork rollouts from a mid-episode snapshot and compare outcomes')
+    parser.add_argument('--prefix', type=str, required=True, help='Policy that drives the episode up to the fork point')
+    parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--env', type=str, default='step', choices=['flat', 'step', 'step_hard'], help='Environment')
+    parser.add_argument('--scenario', type=str, default='step_straight', help='Scenario type')
+    parser.add_argument('--seed', type=int, default=0, help='Episode seed (start position jitter)')
+    parser.add_argument('--fork_step', type=int, default=None, help='Fork after this many steps')
+    parser.add_argument('--fork_dist', type=float, default=None, help='Fork when this close to the target (m)')
+    parser.add_argument('--branches', type=str, nargs='*', default=[], help="Policies to fork ('scripted' allowed)")
+    parser.add_argument('--noise', type=float, default=0.1, help='Action noise std for the noise branches')
+    parser.add_argument('--noise_branches', type=int, default=0, help='Prefix policy + action noise branches')
+    parser.add_argument('--actions', type=str, default=None, help='Open-loop action sequences .npy (K, T, action_dim)')
+    parser.add_argument('--horizon', type=int, default=200, help='Max steps per branch')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel workers')
+    parser.add_argument('--out', type=str, default=None, help='Write the results as JSON')
+    args = parser.parse_args()
+
+    if args.fork_step is None and args.fork_dist is None:
+        parser.error("--fork_step または --fork_dist を指定してください")
+
+    from scripts.evaluate_model import make_env
+    env = make_env(args.env, args.robot)
+    prefix = run_prefix(env, load_branch_policy(args.prefix, env), args.scenario, args.seed,
+                        fork_step=args.fork_step, fork_dist=args.fork_dist)
+
+    jobs = make_branch_jobs(args.branches, args.prefix, args.noise, args.noise_branches,
+                            np.load(args.actions) if args.actions else None)
+    if not jobs:
+        # 分岐の指定がなければ、復元の再現性確認として同じポリシーで続きを走らせる
+        jobs = make_branch_jobs([args.prefix])
+    results = run_branches(jobs, prefix['snapshot'], args.scenario, args.seed, args.robot, args.env, args.horizon,
+                           workers=args.workers, env=env)
+    print_branch_report(prefix, results)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'scenario': args.scenario, 'seed': args.seed, 'fork_steps': prefix['steps'],
+                       'fork_dist': prefix['dist'], 'branches': results}, f, indent=2, ensure_ascii=False)
+        print(f"Results saved to {args.out}")
+    env.close()
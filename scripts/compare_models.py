@@ -0,0 +1,56 @@
+"""
+評価結果ストアからモデルを比較するスクリプト
+evaluate_model.py が保存したエピソード結果を集計し、再評価せずにモデル・シナリオ別の成功率を表示します。
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from xrobocon.evaluation_store import EvaluationStore
+
+
+def print_comparison(store, env_type=None, robot_type=None):
+    conditions = {}
+    if env_type:
+        conditions['env_type'] = env_type
+    if robot_type:
+        conditions['robot_type'] = robot_type
+
+    summary = store.summarize(**conditions)
+    if not summary:
+        print("該当する評価結果がありません")
+        return
+
+    scenarios = sorted({s for per_model in summary.values() for s in per_model})
+
+    # 同じモデルでも環境・ロボット・物理プロファイル（報酬の重みを含む）が違う結果は別の行にする
+    rows = []
+    for (model_hash, env, robot, profile), per_model in summary.items():
+        total = sum(s['count'] for s in per_model.values())
+        success = sum(s['success'] for s in per_model.values())
+        model_path = next(iter(per_model.values()))['model_path']
+        label = f"{os.path.basename(model_path or '')} [{model_hash[:8]}] {env}/{robot} profile={str(profile)[:8]}"
+        rows.append((success / total, label, total, per_model))
+    rows.sort(key=lambda r: r[0], reverse=True)
+
+    print("\n" + "=" * 70)
+    print("モデル比較（評価結果ストア）")
+    print("=" * 70)
+    for rank, (rate, label, total, per_model) in enumerate(rows, 1):
+        print(f"{rank:2d}. {label}  全体 {rate*100:5.1f}% (n={total})")
+        for s in scenarios:
+            if s in per_model:
+                st = per_model[s]
+                print(f"      {s:<28s} {st['success_rate']*100:5.1f}% (n={st['count']}), 平均報酬={st['avg_reward']:.2f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='評価結果ストアによるモデル比較')
+    parser.add_argument('--store', type=str, default=None, help='評価結果ストアのパス (デフォルト: evaluation_results/episodes.jsonl)')
+    parser.add_argument('--env', type=str, default=None, choices=['flat', 'step', 'step_hard'], help='環境タイプで絞り込み')
+    parser.add_argument('--robot', type=str, default=None, help='ロボットタイプで絞り込み')
+    args = parser.parse_args()
+
+    print_comparison(EvaluationStore(args.store), env_type=args.env, robot_type=args.robot)
@@ -0,0 +1,196 @@
+"""
+XROBOCON ポリシー蒸留
+学習済みPPO（教師）の行動を、アクターだけの小さなMLP（生徒）に教師あり学習で写し取ります。
+生徒は TorchScript (.pt) で保存され（オプションで int8 動的量子化）、PolicyRuntime で推論できます。
+
+1. 教師で XRoboconStepEnv を描画なしで走らせ、観測と教師の行動をデモデータセットに保存（並列ワーカー可）
+2. データセットからミニバッチを読みながら生徒を学習
+3. evaluate_model.py で教師と生徒を同じエピソード一覧で評価し、成功率・推論時間・サイズを比較
+
+使用例:
+    python scripts/distill_policy.py --teacher xrobocon_ppo_tristar_large_step.zip --robot tristar_large --hidden 64 64
+    python scripts/distill_policy.py --teacher best_model.zip --hidden 32 32 --int8 --episodes 200 --workers 4
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from xrobocon.demo_dataset import DemoDataset, DemoDatasetWriter, is_dataset, remove_dataset
+from xrobocon.policy_runtime import PolicyRuntime, measure_latency, write_metadata
+
+
+class StudentActor(nn.Module):
+    """観測から決定論的な行動を出す小さなMLP（行動空間の範囲でクリップ）"""
+
+    def __init__(self, obs_dim, action_dim, hidden=(64, 64), low=-1.0, high=1.0):
+        super().__init__()
+        layers = []
+        in_dim = obs_dim
+        for units in hidden:
+            layers += [nn.Linear(in_dim, units), nn.Tanh()]
+            in_dim = units
+        layers.append(nn.Linear(in_dim, action_dim))
+        self.net = nn.Sequential(*layers)
+        self.register_buffer('low', torch.as_tensor(low, dtype=torch.float32).expand(action_dim).clone())
+        self.register_buffer('high', torch.as_tensor(high, dtype=torch.float32).expand(action_dim).clone())
+
+    def forward(self, obs):
+        return torch.max(torch.min(self.net(obs), self.high), self.low)
+
+
+def collect_teacher_rollouts(teacher_path, dataset_dir, robot_type, episodes, workers=1, seed=0, max_steps=500):
+    """教師だけで走らせたロールアウトをデータセットに保存（DAgger のワーカーを β=1 で使う）"""
+    from scripts.evaluate_model import make_episode_plan
+    import scripts.train_dagger as dagger
+
+    plan = make_episode_plan('step', episodes, seed=seed)
+    jobs = [dict(ep, policy_path=None, beta=1.0, max_steps=max_steps) for ep in plan]
+    writer = None
+    successes = 0
+    pool = dagger.open_workers(robot_type, teacher_path, workers)
+    try:
+        for result in dagger.run_rollouts(pool, jobs, workers):
+            if writer is None:
+                writer = DemoDatasetWriter(dataset_dir, obs_dim=result['obs'].shape[1],
+                                           action_dim=result['actions'].shape[1])
+            writer.begin_episode()
+            writer.add_batch(result['obs'], result['actions'], result['rewards'])
+            writer.end_episode(keep=True, source='teacher', teacher=teacher_path, scenario=result['scenario'],
+                               seed=result['seed'], success=result['success'])
+            successes += int(result['success'])
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        elif dagger._worker_env is not None:
+            dagger._worker_env.close()
+        if writer is not None:
+            writer.close()
+    print(f"Collected {episodes} teacher episodes (success rate {successes / episodes:.1%})")
+
+
+def train_student(dataset_dir, action_space, hidden=(64, 64), epochs=30, batch_size=256, lr=1e-3, seed=0):
+    """データセットから生徒を学習"""
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    dataset = DemoDataset(dataset_dir)
+    student = StudentActor(dataset.obs_dim, dataset.action_dim, hidden,
+                           low=torch.as_tensor(action_space.low), high=torch.as_tensor(action_space.high))
+    optimizer = optim.Adam(student.parameters(), lr=lr)
+    loss_fn = nn.MSELoss()
+
+    print(f"\nTraining student {list(hidden)} on {len(dataset)} samples...")
+    for epoch in range(epochs):
+        total_loss = 0.0
+        num_batches = 0
+        for obs, actions in dataset.iter_batches(batch_size, shuffle=True, rng=rng):
+            optimizer.zero_grad()
+            loss = loss_fn(student(torch.from_numpy(obs)), torch.from_numpy(actions))
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+            num_batches += 1
+        if (epoch + 1) % 5 == 0 or epoch == 0:
+            print(f"Epoch {epoch + 1}/{epochs}, Loss: {total_loss / max(num_batches, 1):.6f}")
+    return student.eval()
+
+
+def save_student(student, output_prefix, observation_space, action_space, teacher_path, int8=False):
+    """生徒を TorchScript で保存（int8 の場合は Linear 層を動的量子化）"""
+    params = sum(p.numel() for p in student.parameters())
+    if int8:
+        student = torch.ao.quantization.quantize_dynamic(student, {nn.Linear}, dtype=torch.qint8)
+        scripted = torch.jit.script(student)
+    else:
+        scripted = torch.jit.freeze(torch.jit.script(student))
+    path = output_prefix + '.pt'
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    scripted.save(path)
+    write_metadata(output_prefix, observation_space, action_space, [path], source=teacher_path,
+                   distilled=True, int8=int8, params=params)
+    return path
+
+
+def compare_report(teacher, teacher_path, student_path, robot_type, eval_episodes, workers, seed):
+    """教師と生徒の成功率・推論時間・サイズを比較"""
+    from scripts.evaluate_model import evaluate_model
+
+    print(f"\n{'='*60}\nParity evaluation ({eval_episodes} episodes, same plan)\n{'='*60}")
+    teacher_result = evaluate_model(teacher_path, num_episodes=eval_episodes, robot_type=robot_type, env_type='step',
+                                    workers=workers, seed=seed)
+    student_result = evaluate_model(student_path, num_episodes=eval_episodes, robot_type=robot_type, env_type='step',
+                                    workers=workers, seed=seed)
+
+    obs = np.random.default_rng(seed).normal(size=int(np.prod(teacher.observation_space.shape))).astype(np.float32)
+    runtime = PolicyRuntime(student_path)
+    teacher_latency = measure_latency(lambda o: teacher.predict(o, deterministic=True), obs)
+    student_latency = measure_latency(runtime.act, obs)
+    teacher_params = sum(p.numel() for p in teacher.policy.parameters())
+
+    print(f"\n{'':<10} {'success':>8} {'reward':>10} {'latency':>11} {'size':>10} {'params':>10}")
+    print(f"{'teacher':<10} {teacher_result['success_rate']:>7.1%} {teacher_result['avg_reward']:>10.1f} "
+          f"{teacher_latency['mean_us']:>9.1f}us {os.path.getsize(teacher_path) / 1024:>8.1f}KB {teacher_params:>10}")
+    print(f"{'student':<10} {student_result['success_rate']:>7.1%} {student_result['avg_reward']:>10.1f} "
+          f"{student_latency['mean_us']:>9.1f}us {os.path.getsize(student_path) / 1024:>8.1f}KB "
+          f"{runtime.metadata.get('params', '-'):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Distill a PPO policy into a compact actor')
+    parser.add_argument('--teacher', type=str, required=True, help='Teacher model (.zip)')
+    parser.add_argument('--out', type=str, default=None, help='Output path without extension (default: <teacher>_student)')
+    parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--hidden', type=int, nargs='+', default=[64, 64], help='Student hidden layer sizes')
+    parser.add_argument('--int8', action='store_true', help='Dynamic int8 quantization of the student')
+    parser.add_argument('--episodes', type=int, default=100, help='Teacher rollouts to collect')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel rollout / evaluation workers')
+    parser.add_argument('--data', type=str, default=None, help='Rollout dataset directory (default: <out>_data)')
+    parser.add_argument('--recollect', action='store_true',
+                        help='Discard the existing teacher rollouts and collect them again')
+    parser.add_argument('--epochs', type=int, default=30, help='Training epochs')
+    parser.add_argument('--batch_size', type=int, default=256, help='Minibatch size')
+    parser.add_argument('--eval_episodes', type=int, default=50, help='Episodes for the parity check (0: skip)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed')
+    args = parser.parse_args()
+
+    from stable_baselines3 import PPO
+
+    teacher_path = args.teacher
+    if not os.path.exists(teacher_path) and os.path.exists(teacher_path + ".zip"):
+        teacher_path += ".zip"
+    teacher = PPO.load(teacher_path, device='cpu')
+
+    output_prefix = args.out or os.path.splitext(teacher_path)[0] + '_student'
+    dataset_dir = args.data or output_prefix + '_data'
+
+    if args.recollect and is_dataset(dataset_dir):
+        # 同じシードで追記すると同じ教師エピソードが重複するので、作り直す
+        others = {e.get('source') for e in DemoDataset(dataset_dir).episodes} - {'teacher'}
+        if others:
+            parser.error(f"--recollect: {dataset_dir} also contains {sorted(map(str, others))} episodes; "
+                         f"use a separate --data directory for teacher rollouts")
+        remove_dataset(dataset_dir)
+        print(f"Removed existing rollouts in {dataset_dir}")
+
+    if args.recollect or not is_dataset(dataset_dir):
+        collect_teacher_rollouts(teacher_path, dataset_dir, args.robot, args.episodes,
+                                 workers=args.workers, seed=args.seed)
+    else:
+        print(f"Using existing rollouts in {dataset_dir}")
+
+    student = train_student(dataset_dir, teacher.action_space, hidden=tuple(args.hidden), epochs=args.epochs,
+                            batch_size=args.batch_size, seed=args.seed)
+    student_path = save_student(student, output_prefix, teacher.observation_space, teacher.action_space,
+                                teacher_path, int8=args.int8)
+    print(f"Student saved to {student_path}")
+
+    if args.eval_episodes > 0:
+        compare_report(teacher, teacher_path, student_path, args.robot, args.eval_episodes, args.workers,
+                       args.seed)
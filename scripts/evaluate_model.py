@@ -13,12 +13,218 @@ import xrobocon.common as common
 import os
 import numpy as np
 import argparse
+import multiprocessing
 from xrobocon.env import XRoboconEnv
 from xrobocon.step_env import XRoboconStepEnv
 from xrobocon.step_hard_env import XRoboconStepHardEnv
+from xrobocon.eval_stats import wilson_interval, SequentialStopper
+from xrobocon.evaluation_store import EvaluationStore, file_hash, physics_profile
+from xrobocon.eval_protocol import format_progress
+from xrobocon.policy_runtime import load_policy, print_policy_latency
+from xrobocon.policy_server import PolicyClient
+from xrobocon.stall_detector import TRUNCATION_STALLED, parse_stall_option, stall_params
 import xrobocon.common as common
 
-def evaluate_model(model_path, num_episodes=10, render=False, robot_type='standard', env_type='flat'):
+def run_episode(env, model, env_type='flat', seed=None, max_steps=500, options=None):
+    """
+    1エピソードを実行して結果を返す
+    
+    Args:
+        env: 評価環境
+        model: 訓練済みモデル (predict(obs, deterministic=True) を持つもの)
+        env_type: 環境タイプ ('flat', 'step', 'step_hard')
+        seed: リセット時のシード (Noneの場合は指定しない)
+        max_steps: 最大ステップ数
+        options: reset() の options ({'scenario': ..., 'jitter_seed': ...})
+    
+    Returns:
+        dict: scenario_type, success, reward, steps, min_dist, stalled (停滞検出で打ち切られたか)
+    """
+    obs, info = env.reset(seed=seed, options=options)
+    done = False
+    total_reward = 0
+    steps = 0
+    min_dist = float('inf')
+    
+    # シナリオタイプ取得 (step_envの場合)
+    scenario_type = info.get('scenario_type', 'default')
+    
+    episode_success = False  # エピソードの成功フラグ
+    stalled = False
+    final_robot_pos = None
+    target_pos = np.array(env.current_target['pos'])
+    
+    while not done and steps < max_steps:
+        action, _ = model.predict(obs, deterministic=True)
+        obs, reward, terminated, truncated, info = env.step(action)
+        total_reward += reward
+        steps += 1
+        done = terminated or truncated
+        stalled = info.get('truncation_reason') == TRUNCATION_STALLED
+        
+        # ターゲットまでの距離を計算
+        robot_pos = env.robot.get_pos().cpu().numpy()
+        target_pos = np.array(env.current_target['pos'])
+        dist = np.linalg.norm(robot_pos[:2] - target_pos[:2])
+        min_dist = min(min_dist, dist)
+        final_robot_pos = robot_pos  # 最終位置を保存
+        
+        # ターゲット到達判定（早期終了用）
+        if env_type in ['step', 'step_hard']:
+            height_diff = robot_pos[2] - target_pos[2]
+            if dist < 0.5 and height_diff > -0.05:
+                episode_success = True
+                break
+        else:
+            if dist < 0.5:
+                episode_success = True
+                break
+    
+    # エピソード終了後の最終成功判定（min_distベース）
+    if not episode_success and final_robot_pos is not None:
+        # 早期終了しなかった場合、min_distで最終判定
+        if env_type in ['step', 'step_hard']:
+            height_diff = final_robot_pos[2] - target_pos[2]
+            if min_dist < 0.5 and height_diff > -0.05:
+                episode_success = True
+        else:
+            if min_dist < 0.5:
+                episode_success = True
+    
+    return {
+        'scenario_type': scenario_type,
+        'success': episode_success,
+        'reward': float(total_reward),
+        'steps': steps,
+        'min_dist': float(min_dist),
+        'stalled': stalled,
+    }
+
+def make_env(env_type, robot_type, render=False, stall_detection=None):
+    """環境タイプに応じて評価環境を作成（停滞検出は段差環境のみ）"""
+    if env_type == 'step_hard':
+        return XRoboconStepHardEnv(render_mode="human" if render else None, robot_type=robot_type,
+                                   stall_detection=stall_detection)
+    elif env_type == 'step':
+        return XRoboconStepEnv(render_mode="human" if render else None, robot_type=robot_type,
+                               stall_detection=stall_detection)
+    else:
+        return XRoboconEnv(render_mode="human" if render else None, robot_type=robot_type)
+
+def make_episode_plan(env_type, num_episodes, seed=0, scenario=None):
+    """
+    評価するエピソードの一覧 (シナリオ, シード) を決定的に作成
+    環境を作らずにクラスのシナリオレジストリから割合を取得するため、ワーカー数に関係なく同じ一覧になる
+    
+    Args:
+        env_type: 環境タイプ ('flat', 'step', 'step_hard')
+        num_episodes: エピソード数
+        seed: 一覧生成用のシード
+        scenario: シナリオタイプを固定する場合に指定
+    
+    Returns:
+        list: [{'index': i, 'scenario': シナリオタイプ, 'seed': エピソードのシード}, ...]
+    """
+    env_class = {'step_hard': XRoboconStepHardEnv, 'step': XRoboconStepEnv}.get(env_type, XRoboconEnv)
+    rng = np.random.default_rng(seed)
+    
+    plan = []
+    for i in range(num_episodes):
+        if scenario:
+            scenario_type = scenario
+        else:
+            scenario_type = str(rng.choice(env_class.SCENARIO_TYPES, p=env_class.SCENARIO_WEIGHTS))
+        plan.append({'index': i, 'scenario': scenario_type, 'seed': int(rng.integers(2**31 - 1))})
+    return plan
+
+def run_planned_episode(env, model, env_type, episode):
+    """エピソード一覧の1件を実行（シナリオとランダム性をシードで固定）"""
+    options = {'scenario': episode['scenario'], 'jitter_seed': episode['seed']}
+    result = run_episode(env, model, env_type, seed=episode['seed'], options=options)
+    result['index'] = episode['index']
+    result['seed'] = episode['seed']
+    return result
+
+# 並列評価ワーカーの状態（各プロセスで環境とモデルを一度だけ作成）
+_worker_env = None
+_worker_model = None
+_worker_env_type = None
+
+def load_eval_policy(model_path, env, policy_server=None):
+    """評価用のモデルを読み込む（policy_server を指定した場合は推論サーバーのクライアント）"""
+    if policy_server:
+        return PolicyClient(policy_server, model_path)
+    return load_policy(model_path, env)
+
+def _init_eval_worker(model_path, robot_type, env_type, policy_server=None, stall_detection=None):
+    global _worker_env, _worker_model, _worker_env_type
+    _worker_env = make_env(env_type, robot_type, stall_detection=stall_detection)
+    _worker_model = load_eval_policy(model_path, _worker_env, policy_server)
+    _worker_env_type = env_type
+
+def _run_eval_worker(episode):
+    return run_planned_episode(_worker_env, _worker_model, _worker_env_type, episode)
+
+def run_episode_plan(plan, model_path, robot_type, env_type, render=False, workers=1, should_run=None,
+                     cached=None, policy_server=None, stall_detection=None):
+    """
+    エピソード一覧を実行し、完了した結果を index 順に返すジェネレータ
+    workers > 1 の場合はプロセスプールで分散実行する（描画時は1プロセスのみ）
+    
+    should_run(episode) が False を返したエピソードは実行しない（早期停止用）。
+    並列時は判定がディスパッチ時点になるため、呼び出し側でも結果を読み飛ばす必要がある
+    cached ({index: 結果}) に含まれるエピソードは実行せず、その結果を返す
+    """
+    cached = cached or {}
+    num_to_run = sum(1 for episode in plan if episode['index'] not in cached)
+    
+    if workers <= 1 or render or num_to_run <= 1:
+        # 環境は実行が必要になった時点で作成（全てキャッシュ済みならGenesisを起動しない）
+        env = None
+        model = None
+        try:
+            for episode in plan:
+                if should_run is not None and not should_run(episode):
+                    continue
+                if episode['index'] in cached:
+                    yield cached[episode['index']]
+                    continue
+                if env is None:
+                    env = make_env(env_type, robot_type, render=render, stall_detection=stall_detection)
+                    model = load_eval_policy(model_path, env, policy_server)
+                yield run_planned_episode(env, model, env_type, episode)
+        finally:
+            if env is not None:
+                env.close()
+        return
+    
+    # GenesisやCUDAをforkしたプロセスで使わないよう spawn を使用
+    ctx = multiprocessing.get_context('spawn')
+    processes = min(workers, num_to_run)
+    queue = list(plan)
+    in_flight = []
+    with ctx.Pool(processes=processes, initializer=_init_eval_worker,
+                  initargs=(model_path, robot_type, env_type, policy_server, stall_detection)) as pool:
+        while queue or in_flight:
+            # 先読みは最大 2×ワーカー数 まで（早期停止したシナリオを無駄に実行しないため）
+            while queue and len(in_flight) < processes * 2:
+                episode = queue.pop(0)
+                if should_run is not None and not should_run(episode):
+                    continue
+                if episode['index'] in cached:
+                    in_flight.append(cached[episode['index']])
+                else:
+                    in_flight.append(pool.apply_async(_run_eval_worker, (episode,)))
+            if not in_flight:
+                break
+            # 出力がワーカー数に依存しないよう、一覧の順に返す
+            item = in_flight.pop(0)
+            yield item if isinstance(item, dict) else item.get()
+
+def evaluate_model(model_path, num_episodes=10, render=False, robot_type='standard', env_type='flat', scenario=None,
+                   workers=1, seed=0, early_stop=False, ci_width=0.2, threshold=0.5, confidence=0.95,
+                   min_episodes=5, use_store=True, store_path=None, progress_json=False, policy_server=None,
+                   stall_detection=None):
     """
     訓練済みモデルを評価
     
@@ -28,109 +234,99 @@ def evaluate_model(model_path, num_episodes=10, render=False, robot_type='standa
         render: 描画を有効にするか
         robot_type: ロボットタイプ ('standard', 'tristar')
         env_type: 環境タイプ ('flat', 'step', 'step_hard')
+        scenario: 評価するシナリオタイプ (Noneの場合は環境の SCENARIO_WEIGHTS でサンプリング)
+        workers: 並列ワーカー数 (結果はワーカー数に関係なく同じ)
+        seed: エピソード一覧のシード
+        early_stop: シナリオごとに成功率の信頼区間が十分に決まった時点で評価を打ち切るか
+        ci_width: 早期停止する信頼区間の幅
+        threshold: 信頼区間がこの値より明らかに上/下なら早期停止
+        confidence: 信頼区間の信頼水準
+        min_episodes: 早期停止を判定する前に最低限実行するシナリオごとのエピソード数
+        use_store: 評価結果ストアを使うか（保存済みのエピソードは再実行しない）
+        store_path: 評価結果ストアのパス (Noneの場合は evaluation_results/episodes.jsonl)
+        progress_json: GUI向けの構造化進捗行 (xrobocon/eval_protocol.py) も出力するか
+        policy_server: 推論サーバー (scripts/policy_server.py) のソケット。指定すると各ワーカーはモデルを読み込まずにサーバーへ問い合わせる
+        stall_detection: 停滞したエピソードの打ち切り (段差環境のみ。True / DEFAULT_STALL_PARAMS の上書き dict)
     
     Returns:
-        dict: 評価結果（成功率、平均報酬、平均ステップ数）
+        dict: 評価結果（成功率、平均報酬、平均ステップ数、実行/節約エピソード数）
     """
-    # 環境作成
-    if env_type == 'step_hard':
-        env = XRoboconStepHardEnv(render_mode="human" if render else None, robot_type=robot_type)
-    elif env_type == 'step':
-        env = XRoboconStepEnv(render_mode="human" if render else None, robot_type=robot_type)
-    else:
-        env = XRoboconEnv(render_mode="human" if render else None, robot_type=robot_type)
-    
-    # モデルロード
-    model = common.load_trained_model(model_path, env)
+    # 評価するエピソード (シナリオ, シード) の一覧
+    plan = make_episode_plan(env_type, num_episodes, seed=seed, scenario=scenario)
     
     # 統計用データ
     stats = {
-        'total': {'success': 0, 'reward': [], 'steps': [], 'dist': []},
+        'total': {'success': 0, 'stalled': 0, 'reward': [], 'steps': [], 'dist': []},
         'scenarios': {} # シナリオごとの統計
     }
     
-    print(f"\n{num_episodes}エピソードの評価を開始 ({env_type} environment)...")
+    # 評価結果ストア: 同じ (モデル, 環境, ロボット, シナリオ, シード, 物理条件) のエピソードは再利用
+    # 停滞検出の設定はエピソードの長さと結果を変えるため、物理条件の識別子に含める
+    store = None
+    cached = {}
+    if use_store:
+        store = EvaluationStore(store_path)
+        key_base = {
+            'model_hash': file_hash(model_path),
+            'env_type': env_type,
+            'robot_type': robot_type,
+            'physics_profile': physics_profile(robot_type, stall_params(stall_detection) if env_type != 'flat' else None),
+        }
+        for ep in plan:
+            record = store.get(scenario=ep['scenario'], seed=ep['seed'], **key_base)
+            if record is not None:
+                cached[ep['index']] = {
+                    'index': ep['index'], 'seed': ep['seed'], 'scenario_type': record['scenario'],
+                    'success': record['success'], 'reward': record['reward'],
+                    'steps': record['steps'], 'min_dist': record['min_dist'],
+                    'stalled': record.get('stalled', False),
+                }
+        if cached:
+            print(f"評価結果ストアから {len(cached)}/{num_episodes} エピソードを再利用します ({store.path})")
+    
+    stopper = SequentialStopper(ci_width, threshold, confidence, min_episodes) if early_stop else None
+    should_run = (lambda ep: not stopper.is_stopped(ep['scenario'])) if early_stop else None
+    
+    print(f"\n{num_episodes}エピソードの評価を開始 ({env_type} environment, workers={workers})...")
+    if progress_json:
+        print(format_progress('start', num_episodes=num_episodes, env_type=env_type, robot_type=robot_type),
+              flush=True)
     
-    # step_hard環境の場合、シナリオ割合を段差中心に変更
-    if env_type == 'step_hard' and hasattr(env, 'reset'):
-        # 元のresetメソッドを保存
-        original_reset = env.reset
+    episodes_run = 0
+    for result in run_episode_plan(plan, model_path, robot_type, env_type, render=render, workers=workers,
+                                   should_run=should_run, cached=cached, policy_server=policy_server,
+                                   stall_detection=stall_detection):
+        episode = result['index']
+        scenario_type = result['scenario_type']
         
-        # シナリオ割合を変更したresetメソッドを定義
-        def custom_reset(seed=None, options=None):
-            if seed is not None:
-                np.random.seed(seed)
-            
-            # 段差80%、平地20%
-            scenario_type = np.random.choice(
-                ['flat_easy', 'step_straight', 'step_tier3_to_tier2'],
-                p=[0.2, 0.4, 0.4]
-            )
-            
-            # 元のresetを呼び出してシナリオタイプを上書き
-            obs, info = original_reset(seed=seed, options=options)
-            # シナリオタイプを強制的に変更するため、再度reset
-            env.current_scenario_type = scenario_type
-            return obs, info
+        if store is not None and episode not in cached:
+            store.add(dict(key_base, scenario=scenario_type, seed=result['seed'], model_path=model_path,
+                           success=bool(result['success']), reward=float(result['reward']),
+                           steps=int(result['steps']), min_dist=float(result['min_dist']),
+                           stalled=bool(result['stalled'])))
         
-        # resetメソッドを置き換え
-        env.reset = custom_reset
-    
-    for episode in range(num_episodes):
-        obs, info = env.reset()
-        done = False
-        total_reward = 0
-        steps = 0
-        min_dist = float('inf')
+        if stopper is not None:
+            # 並列時に先読みで実行された停止済みシナリオの結果は捨てる（出力をワーカー数に依存させない）
+            if stopper.is_stopped(scenario_type):
+                continue
+            stopper.update(scenario_type, result['success'])
+        episodes_run += 1
+        total_reward = result['reward']
+        steps = result['steps']
+        min_dist = result['min_dist']
+        episode_success = result['success']
         
-        # シナリオタイプ取得 (step_envの場合)
-        scenario_type = info.get('scenario_type', 'default')
         if scenario_type not in stats['scenarios']:
-            stats['scenarios'][scenario_type] = {'success': 0, 'reward': [], 'steps': [], 'dist': [], 'count': 0}
-        
-        episode_success = False  # エピソードの成功フラグ
-        final_robot_pos = None
-        
-        while not done and steps < 500:  # 最大500ステップ
-            action, _ = model.predict(obs, deterministic=True)
-            obs, reward, terminated, truncated, _ = env.step(action)
-            total_reward += reward
-            steps += 1
-            done = terminated or truncated
-            
-            # ターゲットまでの距離を計算
-            robot_pos = env.robot.get_pos().cpu().numpy()
-            target_pos = np.array(env.current_target['pos'])
-            dist = np.linalg.norm(robot_pos[:2] - target_pos[:2])
-            min_dist = min(min_dist, dist)
-            final_robot_pos = robot_pos  # 最終位置を保存
-            
-            # ターゲット到達判定（早期終了用）
-            if env_type in ['step', 'step_hard']:
-                height_diff = robot_pos[2] - target_pos[2]
-                if dist < 0.5 and height_diff > -0.05:
-                    episode_success = True
-                    break
-            else:
-                if dist < 0.5:
-                    episode_success = True
-                    break
-        
-        # エピソード終了後の最終成功判定（min_distベース）
-        if not episode_success and final_robot_pos is not None:
-            # 早期終了しなかった場合、min_distで最終判定
-            if env_type in ['step', 'step_hard']:
-                height_diff = final_robot_pos[2] - target_pos[2]
-                if min_dist < 0.5 and height_diff > -0.05:
-                    episode_success = True
-            else:
-                if min_dist < 0.5:
-                    episode_success = True
+            stats['scenarios'][scenario_type] = {'success': 0, 'stalled': 0, 'reward': [], 'steps': [], 'dist': [],
+                                                 'count': 0}
         
         # 統計更新
         if episode_success:
             stats['total']['success'] += 1
             stats['scenarios'][scenario_type]['success'] += 1
+        if result['stalled']:
+            stats['total']['stalled'] += 1
+            stats['scenarios'][scenario_type]['stalled'] += 1
         
         stats['total']['reward'].append(total_reward)
         stats['total']['steps'].append(steps)
@@ -141,7 +337,17 @@ def evaluate_model(model_path, num_episodes=10, render=False, robot_type='standa
         stats['scenarios'][scenario_type]['dist'].append(min_dist)
         stats['scenarios'][scenario_type]['count'] += 1
         
-        print(f"Episode {episode+1:2d} [{scenario_type}]: 報酬={total_reward:7.2f}, ステップ={steps:4d}, 最小距離={min_dist:.3f}m, {'成功' if episode_success else '失敗'}")
+        print(f"Episode {episode+1:2d} [{scenario_type}]: 報酬={total_reward:7.2f}, ステップ={steps:4d}, 最小距離={min_dist:.3f}m, {'成功' if episode_success else '失敗'}"
+              f"{' (停滞で打ち切り)' if result['stalled'] else ''}")
+        if progress_json:
+            print(format_progress('episode', index=episode, scenario=scenario_type, success=bool(episode_success),
+                                  reward=float(total_reward), steps=int(steps), min_dist=float(min_dist),
+                                  stalled=bool(result['stalled']), cached=episode in cached), flush=True)
+        
+        if stopper is not None and stopper.is_stopped(scenario_type):
+            low, high = stopper.interval(scenario_type)
+            print(f"  -> [{scenario_type}] 評価打ち切り ({stopper.stop_reasons[scenario_type]}): "
+                  f"成功率 {low*100:.1f}%〜{high*100:.1f}% (n={stopper.counts[scenario_type]})")
     
     # 結果集計と表示
     print("\n" + "="*70)
@@ -149,17 +355,19 @@ def evaluate_model(model_path, num_episodes=10, render=False, robot_type='standa
     print("="*70)
     
     # 全体
-    total_success_rate = stats['total']['success'] / num_episodes
+    total_success_rate = stats['total']['success'] / max(episodes_run, 1)
     avg_reward = np.mean(stats['total']['reward'])
     std_reward = np.std(stats['total']['reward'])
     avg_steps = np.mean(stats['total']['steps'])
     avg_dist = np.mean(stats['total']['dist'])
     
     print(f"【全体】")
-    print(f"  成功率:         {total_success_rate*100:.1f}% ({stats['total']['success']}/{num_episodes})")
+    print(f"  成功率:         {total_success_rate*100:.1f}% ({stats['total']['success']}/{episodes_run})")
     print(f"  平均報酬:       {avg_reward:.2f} ± {std_reward:.2f}")
     print(f"  平均ステップ数: {avg_steps:.1f}")
     print(f"  平均最小距離:   {avg_dist:.3f}m")
+    if stall_detection:
+        print(f"  停滞打ち切り:   {stats['total']['stalled']}/{episodes_run}")
     
     # シナリオ別
     for s_type, s_stats in stats['scenarios'].items():
@@ -171,20 +379,34 @@ def evaluate_model(model_path, num_episodes=10, render=False, robot_type='standa
             s_dist = np.mean(s_stats['dist'])
             
             print(f"\n【{s_type}】 (n={count})")
-            print(f"  成功率:         {s_rate*100:.1f}% ({s_stats['success']}/{count})")
+            low, high = wilson_interval(s_stats['success'], count, confidence)
+            print(f"  成功率:         {s_rate*100:.1f}% ({s_stats['success']}/{count}) "
+                  f"[{confidence*100:.0f}%信頼区間 {low*100:.1f}%〜{high*100:.1f}%]")
             print(f"  平均報酬:       {s_reward:.2f}")
             print(f"  平均ステップ数: {s_steps:.1f}")
             print(f"  平均最小距離:   {s_dist:.3f}m")
+            if stall_detection:
+                print(f"  停滞打ち切り:   {s_stats['stalled']}/{count}")
             
+    if early_stop:
+        episodes_saved = num_episodes - episodes_run
+        print(f"\n【早期停止】 実行 {episodes_run}/{num_episodes} エピソード (節約 {episodes_saved} エピソード)")
     print("="*70)
     
-    return {
+    results = {
         'success_rate': total_success_rate,
         'avg_reward': avg_reward,
         'std_reward': std_reward,
         'avg_steps': avg_steps,
-        'avg_dist': avg_dist
+        'avg_dist': avg_dist,
+        'stalled_episodes': stats['total']['stalled'],
+        'episodes_run': episodes_run,
+        'episodes_saved': num_episodes - episodes_run
     }
+    if progress_json:
+        print(format_progress('summary', **{k: (v if isinstance(v, int) else float(v)) for k, v in results.items()}),
+              flush=True)
+    return results
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='XROBOCON RL Model Evaluation')
@@ -197,6 +419,25 @@ if __name__ == "__main__":
     parser.add_argument('--env', type=str, default='flat', 
                         choices=['flat', 'step', 'step_hard'],
                         help='環境タイプ (flat, step, step_hard)')
+    parser.add_argument('--scenario', type=str, default=None,
+                        help='評価するシナリオタイプ (例: step_straight)。省略時は環境のシナリオ割合でサンプリング')
+    parser.add_argument('--workers', type=int, default=1, help='並列ワーカー数 (結果はワーカー数に関係なく同じ)')
+    parser.add_argument('--seed', type=int, default=0, help='エピソード一覧 (シナリオ・シード) のシード')
+    parser.add_argument('--early_stop', action='store_true',
+                        help='シナリオごとの成功率の信頼区間が決まった時点で評価を打ち切る')
+    parser.add_argument('--ci_width', type=float, default=0.2, help='早期停止する信頼区間の幅')
+    parser.add_argument('--threshold', type=float, default=0.5, help='信頼区間がこの成功率より明らかに上/下なら早期停止')
+    parser.add_argument('--confidence', type=float, default=0.95, help='信頼区間の信頼水準')
+    parser.add_argument('--min_episodes', type=int, default=5, help='早期停止判定前のシナリオごとの最小エピソード数')
+    parser.add_argument('--no_store', action='store_true', help='評価結果ストアを使わずに全エピソードを実行する')
+    parser.add_argument('--store', type=str, default=None, help='評価結果ストアのパス (デフォルト: evaluation_results/episodes.jsonl)')
+    parser.add_argument('--progress_json', action='store_true', help='GUI向けの構造化進捗行を出力する')
+    parser.add_argument('--policy_server', type=str, default=None,
+                        help='推論サーバーのソケット (scripts/policy_server.py)。指定するとワーカーはモデルを読み込まない')
+    parser.add_argument('--stall', type=str, nargs='*', default=None, metavar='KEY=VALUE',
+                        help='停滞したエピソードを打ち切る (段差環境のみ)。例: --stall window=150 max_speed=0.2')
+    parser.add_argument('--latency', action='store_true',
+                        help='評価の前に predict() 1回あたりの推論時間を表示する (書き出したポリシーは元のSB3モデルと比較)')
     args = parser.parse_args()
     
     # Mac (MPS) 用の環境変数設定
@@ -208,8 +449,16 @@ if __name__ == "__main__":
         print("先に訓練を実行してください")
         exit(1)
     
+    if args.latency:
+        print_policy_latency(load_policy(args.model))
+    
     # 評価実行
-    results = evaluate_model(args.model, num_episodes=args.episodes, render=args.render, robot_type=args.robot, env_type=args.env)
+    results = evaluate_model(args.model, num_episodes=args.episodes, render=args.render, robot_type=args.robot, env_type=args.env, scenario=args.scenario,
+                             workers=args.workers, seed=args.seed, early_stop=args.early_stop,
+                             ci_width=args.ci_width, threshold=args.threshold, confidence=args.confidence,
+                             min_episodes=args.min_episodes, use_store=not args.no_store, store_path=args.store,
+                             progress_json=args.progress_json, policy_server=args.policy_server,
+                             stall_detection=parse_stall_option(args.stall))
     
     # 評価基準の表示
     print("\n" + "="*60)
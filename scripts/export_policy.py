@@ -0,0 +1,82 @@
+"""
+学習済みPPOモデルを推論専用のポリシー (TorchScript / ONNX) に書き出す
+
+書き出したファイルは evaluate_model.py / log_model_actions.py / visualize_trained_model.py の --model や
+GUI のシミュレーションにそのまま指定できます。
+書き出し後に SB3 の predict() との出力差と、1回あたりの推論時間を表示します。
+ONNX の書き出しには onnx と onnxruntime が必要です（インストールされていない場合は TorchScript だけ書き出します）。
+
+使用例:
+    python scripts/export_policy.py --model xrobocon_ppo_tristar_large_step.zip
+    python scripts/export_policy.py --model best_model.zip --out exported/best --format both --batch 64
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import numpy as np
+
+from xrobocon.policy_runtime import export_policy, PolicyRuntime, measure_latency, missing_onnx_modules
+
+
+def latency_report(model, exported_paths, batch_size=64, repeats=1000, seed=0):
+    """SB3 predict() と書き出したポリシーの出力差・推論時間を比較して表示"""
+    rng = np.random.default_rng(seed)
+    obs_dim = int(np.prod(model.observation_space.shape))
+    single = rng.normal(size=obs_dim).astype(np.float32)
+    batch = rng.normal(size=(batch_size, obs_dim)).astype(np.float32)
+
+    def sb3_predict(obs):
+        return model.predict(obs, deterministic=True)[0]
+
+    rows = [('SB3 predict', sb3_predict)]
+    for path in exported_paths:
+        runtime = PolicyRuntime(path)
+        diff = np.abs(runtime.act(batch) - sb3_predict(batch)).max()
+        print(f"{os.path.basename(path)}: max |action - predict| = {diff:.2e}")
+        rows.append((os.path.basename(path), runtime.act))
+
+    print(f"\n{'':<28} {'batch=1 mean':>13} {'p99':>10} {f'batch={batch_size} mean':>15} {'per obs':>10}")
+    for name, fn in rows:
+        one = measure_latency(fn, single, repeats=repeats)
+        many = measure_latency(fn, batch, repeats=max(repeats // 10, 10))
+        print(f"{name:<28} {one['mean_us']:>11.1f}us {one['p99_us']:>8.1f}us "
+              f"{many['mean_us']:>13.1f}us {many['mean_us'] / batch_size:>8.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export a trained PPO model to TorchScript / ONNX')
+    parser.add_argument('--model', type=str, required=True, help='Path to trained model (.zip)')
+    parser.add_argument('--out', type=str, default=None, help='Output path without extension (default: model path)')
+    parser.add_argument('--format', type=str, default='torchscript', choices=['torchscript', 'onnx', 'both'],
+                        help='Export format (onnx / both need the onnx and onnxruntime packages)')
+    parser.add_argument('--batch', type=int, default=64, help='Batch size for the latency report')
+    parser.add_argument('--repeats', type=int, default=1000, help='Calls per latency measurement')
+    parser.add_argument('--no_report', action='store_true', help='Skip the parity / latency report')
+    args = parser.parse_args()
+
+    formats = ('torchscript', 'onnx') if args.format == 'both' else (args.format,)
+    missing = missing_onnx_modules()
+    if 'onnx' in formats and missing:
+        if args.format == 'onnx':
+            parser.error(f"ONNX export needs {' and '.join(missing)} (pip install onnx onnxruntime)")
+        print(f"Skipping ONNX export: {' and '.join(missing)} not installed (pip install onnx onnxruntime)")
+        formats = ('torchscript',)
+
+    from stable_baselines3 import PPO
+
+    model_path = args.model
+    if not os.path.exists(model_path) and os.path.exists(model_path + ".zip"):
+        model_path += ".zip"
+    model = PPO.load(model_path, device='cpu')
+
+    output_prefix = args.out or os.path.splitext(model_path)[0]
+    paths = export_policy(model, output_prefix, formats=formats, source=model_path)
+    for path in paths:
+        print(f"Exported {path}")
+
+    if not args.no_report:
+        print()
+        latency_report(model, paths, batch_size=args.batch, repeats=args.repeats)
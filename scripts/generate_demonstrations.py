@@ -0,0 +1,158 @@
+"""
+XROBOCON スクリプト制御器によるデモ生成
+xrobocon/scripted_controllers.py の制御器を描画なしで走らせ、デモデータセットに追記します。
+人手の操作なしに大量のデモを作れるほか、シナリオごとの成功率をベースラインとして表示します。
+
+エピソード一覧は evaluate_model.py と同じ make_episode_plan で作るため、ワーカー数に関係なく同じ結果になります。
+
+使用例:
+    python scripts/generate_demonstrations.py --robot tristar_large --env step --episodes 200 --workers 4
+    python scripts/generate_demonstrations.py --robot rocker_bogie --env flat --episodes 50 --no_save
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import multiprocessing
+import numpy as np
+
+from xrobocon.demo_dataset import DemoDatasetWriter
+from xrobocon.scripted_controllers import make_controller
+
+
+# ワーカーの状態（環境と制御器は起動時に一度だけ作成）
+_worker_env = None
+_worker_controller = None
+
+
+def _init_generate_worker(robot_type, env_type):
+    global _worker_env, _worker_controller
+    from scripts.evaluate_model import make_env
+    _worker_env = make_env(env_type, robot_type)
+    _worker_controller = make_controller(robot_type)
+
+
+def _run_scripted_episode(job):
+    """制御器で1エピソードを実行し、観測・行動・報酬を返す"""
+    env = _worker_env
+    obs, _ = env.reset(options={'scenario': job['scenario'], 'jitter_seed': job['seed']})
+    observations = []
+    actions = []
+    rewards = []
+    success = False
+    for _ in range(job['max_steps']):
+        action = _worker_controller.act(obs)
+        observations.append(obs)
+        actions.append(action)
+        obs, reward, terminated, truncated, info = env.step(action)
+        rewards.append(reward)
+        if terminated or truncated:
+            success = bool(info.get('is_success', False))
+            break
+
+    return {
+        'index': job['index'],
+        'scenario': job['scenario'],
+        'seed': job['seed'],
+        'obs': np.asarray(observations, dtype=np.float32),
+        'actions': np.asarray(actions, dtype=np.float32),
+        'rewards': np.asarray(rewards, dtype=np.float32),
+        'success': success,
+    }
+
+
+def run_scripted_episodes(jobs, robot_type, env_type, workers=1):
+    """ジョブを実行し、結果をジョブの順に返すジェネレータ"""
+    if workers <= 1:
+        _init_generate_worker(robot_type, env_type)
+        try:
+            for job in jobs:
+                yield _run_scripted_episode(job)
+        finally:
+            _worker_env.close()
+        return
+
+    # GenesisやCUDAをforkしたプロセスで使わないよう spawn を使用
+    ctx = multiprocessing.get_context('spawn')
+    processes = min(workers, len(jobs))
+    chunksize = max(1, len(jobs) // (processes * 4))
+    with ctx.Pool(processes=processes, initializer=_init_generate_worker,
+                  initargs=(robot_type, env_type)) as pool:
+        yield from pool.imap(_run_scripted_episode, jobs, chunksize=chunksize)
+
+
+def generate_demonstrations(robot_type='tristar_large', env_type='step', num_episodes=100, output_dir='demonstrations',
+                            workers=1, seed=0, scenario=None, max_steps=500, success_only=False, save=True):
+    """
+    スクリプト制御器でデモを生成
+
+    Args:
+        success_only: 成功したエピソードだけを保存するか
+        save: Falseの場合は保存せず、成功率（ベースライン）だけを表示
+
+    Returns:
+        dict: {シナリオタイプ: {'episodes', 'successes', 'mean_reward'}}
+    """
+    from scripts.evaluate_model import make_episode_plan
+
+    plan = make_episode_plan(env_type, num_episodes, seed=seed, scenario=scenario)
+    jobs = [dict(ep, max_steps=max_steps) for ep in plan]
+
+    print(f"\n{'='*60}")
+    print(f"Scripted demonstrations: {robot_type} on {env_type} ({num_episodes} episodes, workers={workers})")
+    print(f"{'='*60}")
+
+    writer = None
+    stats = {}
+    saved_steps = 0
+    try:
+        for result in run_scripted_episodes(jobs, robot_type, env_type, workers):
+            s = stats.setdefault(result['scenario'], {'episodes': 0, 'successes': 0, 'rewards': []})
+            s['episodes'] += 1
+            s['successes'] += int(result['success'])
+            s['rewards'].append(float(result['rewards'].sum()))
+
+            if not save or (success_only and not result['success']) or len(result['obs']) == 0:
+                continue
+            if writer is None:
+                writer = DemoDatasetWriter(output_dir, obs_dim=result['obs'].shape[1],
+                                           action_dim=result['actions'].shape[1])
+            writer.begin_episode()
+            writer.add_batch(result['obs'], result['actions'], result['rewards'])
+            writer.end_episode(keep=True, source='scripted', robot_type=robot_type, env_type=env_type,
+                               scenario=result['scenario'], seed=result['seed'], success=result['success'])
+            saved_steps += len(result['obs'])
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"\n{'シナリオ':<24} {'成功率':>8} {'平均報酬':>10}")
+    summary = {}
+    for scenario_type, s in sorted(stats.items()):
+        mean_reward = float(np.mean(s['rewards']))
+        summary[scenario_type] = {'episodes': s['episodes'], 'successes': s['successes'], 'mean_reward': mean_reward}
+        print(f"{scenario_type:<24} {s['successes'] / s['episodes']:>7.1%} {mean_reward:>10.1f}")
+    if save:
+        print(f"\nSaved {saved_steps} steps to {output_dir}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate demonstrations with scripted controllers')
+    parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--env', type=str, default='step', choices=['flat', 'step', 'step_hard'], help='Environment type')
+    parser.add_argument('--episodes', type=int, default=100, help='Number of episodes')
+    parser.add_argument('--out', type=str, default='demonstrations', help='Demonstration dataset directory')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel workers')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the episode plan')
+    parser.add_argument('--scenario', type=str, default=None, help='Fix the scenario type')
+    parser.add_argument('--max_steps', type=int, default=500, help='Max steps per episode')
+    parser.add_argument('--success_only', action='store_true', help='Only keep successful episodes')
+    parser.add_argument('--no_save', action='store_true', help='Only report the baseline success rate')
+    args = parser.parse_args()
+
+    generate_demonstrations(args.robot, args.env, args.episodes, args.out, workers=args.workers, seed=args.seed,
+                            scenario=args.scenario, max_steps=args.max_steps, success_only=args.success_only,
+                            save=not args.no_save)
@@ -15,22 +15,34 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from xrobocon.step_env import XRoboconStepEnv
+from xrobocon.policy_runtime import PolicyRuntime, is_exported_policy
+from xrobocon.trajectory_log import TrajectoryLogger
+from xrobocon.reward_terms import STEP_REWARD_TERMS
 import argparse
 import torch
 
 
-def log_model_actions(model_path, num_steps=500, robot_type='tristar_large'):
-    """モデルのアクション出力を記録"""
+def log_model_actions(model_path, num_steps=500, robot_type='tristar_large', trajectory_path=None):
+    """モデルのアクション出力を記録 (trajectory_path を指定すると軌跡ログにも書き出す)"""
     
     # 環境とモデルのロード
     env = XRoboconStepEnv(render_mode="human", robot_type=robot_type)
     
-    # CPUでモデルをロード
-    model = PPO.load(model_path, device='cpu')
+    # CPUでモデルをロード (.pt / .onnx の書き出し済みポリシーも可)
+    if is_exported_policy(model_path):
+        model = PolicyRuntime(model_path)
+    else:
+        model = PPO.load(model_path, device='cpu')
     
     obs, info = env.reset()
     
     action_log = []
+    trajectory = None
+    if trajectory_path:
+        # 関節位置は浮遊ベースの7要素を含むので n_qpos と n_dofs は異なる
+        n_qpos = len(env.robot.entity.get_qpos())
+        trajectory = TrajectoryLogger(trajectory_path, n_qpos, env.robot.n_dofs, env.action_space.shape[0],
+                                      term_names=STEP_REWARD_TERMS, robot_type=robot_type, env_type='step', model=os.path.basename(model_path))
     
     print("\n" + "="*70)
     print("モデルアクション記録開始")
@@ -58,11 +70,16 @@ def log_model_actions(model_path, num_steps=500, robot_type='tristar_large'):
                   f"Pitch={robot_euler[1]:.1f}°")
         
         # ステップ実行
-        obs, reward, terminated, truncated, _ = env.step(action)
+        obs, reward, terminated, truncated, info = env.step(action)
+        if trajectory is not None:
+            trajectory.log_env_step(env, action, reward, terminated, truncated, info,
+                                    reward_terms=env.step_reward_terms)
         
         if terminated or truncated:
             print(f"\nエピソード終了 (Step {step})")
             obs, info = env.reset()
+            if trajectory is not None:
+                trajectory.begin_episode()
     
     # 統計情報を出力
     action_log = np.array(action_log)
@@ -80,6 +97,9 @@ def log_model_actions(model_path, num_steps=500, robot_type='tristar_large'):
           f"min={action_log[:, 3].min():.3f}, max={action_log[:, 3].max():.3f}")
     print("="*70)
     
+    if trajectory is not None:
+        trajectory.close()
+        print(f"Trajectory saved to {trajectory_path} ({trajectory.meta['num_records']} records)")
     env.close()
 
 if __name__ == "__main__":
@@ -87,7 +107,9 @@ if __name__ == "__main__":
     parser.add_argument('--model', type=str, required=True, help='Path to trained model')
     parser.add_argument('--steps', type=int, default=500, help='Number of steps to log')
     parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--trajectory', type=str, default=None,
+                        help='Also write a trajectory log directory (replay with scripts/replay_trajectory.py)')
     
     args = parser.parse_args()
     
-    log_model_actions(args.model, args.steps, args.robot)
+    log_model_actions(args.model, args.steps, args.robot, args.trajectory)
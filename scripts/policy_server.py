@@ -0,0 +1,55 @@
+"""
+XROBOCON ローカル推論サーバー
+複数の評価・DAgger プロセスからの推論要求を1か所で受け付け、モデルごとにバッチ推論します。
+モデルはファイルのハッシュごとに一度だけ読み込まれます（zip / .pt / .onnx）。
+
+使用例:
+    python scripts/policy_server.py --socket /tmp/xrobocon_policy.sock --window_ms 2
+    python scripts/evaluate_model.py --model best_model.zip --env step --robot tristar_large --workers 8 \\
+        --policy_server /tmp/xrobocon_policy.sock
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import threading
+import time
+
+from xrobocon.policy_server import PolicyServer, DEFAULT_SOCKET
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local batching policy inference server')
+    parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET, help='Unix socket path')
+    parser.add_argument('--window_ms', type=float, default=2.0, help='Batching window after the first request (ms)')
+    parser.add_argument('--max_batch', type=int, default=256, help='Max observations per forward pass')
+    parser.add_argument('--preload', type=str, nargs='*', default=[], help='Models to load at startup')
+    parser.add_argument('--max_models', type=int, default=8,
+                        help='Models kept loaded; the least recently used one is unloaded beyond this')
+    parser.add_argument('--stats_interval', type=float, default=30.0, help='Print batching stats every N seconds (0: off)')
+    args = parser.parse_args()
+
+    server = PolicyServer(args.socket, window=args.window_ms / 1000.0, max_batch=args.max_batch,
+                          max_models=args.max_models)
+    for path in args.preload:
+        server.load(path)
+
+    if args.stats_interval > 0:
+        def report():
+            while True:
+                time.sleep(args.stats_interval)
+                for key, s in server.stats().items():
+                    if s['batches']:
+                        print(f"[{key[:12]}] requests={s['requests']} batches={s['batches']} "
+                              f"avg batch={s['requests'] / s['batches']:.1f}")
+        threading.Thread(target=report, daemon=True).start()
+
+    print(f"Policy server listening on {args.socket} (window={args.window_ms}ms, max_batch={args.max_batch})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.shutdown()
@@ -0,0 +1,119 @@
+"""
+XROBOCON 代理環境での事前学習
+Genesis を使わない平地の運動学的代理環境 (xrobocon/surrogate_env.py) で PPO を高速に事前学習し、
+train_rl_step.py の --base として物理環境での微調整に渡せるモデルを保存します。
+
+使用例:
+    python scripts/pretrain_surrogate.py --robot tristar --steps 2000000 --num_envs 64
+    python scripts/train_rl_step.py --train --env flat --robot tristar --base xrobocon_ppo_tristar_surrogate.zip
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import time
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecEnv
+
+from xrobocon.surrogate_env import SurrogateVecEnv
+
+
+class SurrogateSB3VecEnv(VecEnv):
+    """SurrogateVecEnv を SB3 の VecEnv として使うアダプタ（全台を1回の NumPy 演算で進める）"""
+
+    def __init__(self, surrogate):
+        self.surrogate = surrogate
+        super().__init__(surrogate.num_envs, surrogate.observation_space, surrogate.action_space)
+        self._actions = None
+
+    def seed(self, seed=None):
+        self.surrogate.seed(seed)
+        return [seed] * self.num_envs
+
+    def reset(self):
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self.surrogate.reset()
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        obs, rewards, terminated, truncated, infos = self.surrogate.step(self._actions)
+        return obs, rewards, terminated | truncated, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self.surrogate, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self.surrogate, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        result = getattr(self.surrogate, method_name)(*method_args, **method_kwargs)
+        return [result] * len(self._get_indices(indices))
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
+
+
+def benchmark(surrogate, steps=1000):
+    """ランダム行動での1秒あたりの環境ステップ数"""
+    surrogate.reset()
+    actions = np.random.default_rng(0).uniform(-1, 1, size=(steps, surrogate.num_envs, surrogate.action_space.shape[0]))
+    start = time.perf_counter()
+    for a in actions:
+        surrogate.step(a)
+    return steps * surrogate.num_envs / (time.perf_counter() - start)
+
+
+def pretrain_surrogate(robot_type='tristar', steps=2_000_000, num_envs=64, save_name=None, seed=0,
+                       response_time=0.15, speed_scale=1.0, init_model=None):
+    """
+    代理環境で PPO を学習して保存
+
+    Returns:
+        str: 保存したモデルのパス (.zip)
+    """
+    save_name = save_name or f"xrobocon_ppo_{robot_type}_surrogate"
+    surrogate = SurrogateVecEnv(num_envs=num_envs, robot_type=robot_type, seed=seed,
+                                response_time=response_time, speed_scale=speed_scale)
+    env = SurrogateSB3VecEnv(surrogate)
+    print(f"代理環境: {robot_type} x {num_envs}, {benchmark(surrogate):,.0f} steps/s (random actions)")
+
+    # 物理環境の train_rl_step.py と同じ "MlpPolicy" 既定構成にして、そのまま --base に渡せるようにする
+    if init_model:
+        model = PPO.load(init_model, env=env, device='cpu')
+    else:
+        # 1台あたりのロールアウト長は並列数に合わせて短くし、更新あたりのサンプル数を 2048 * 8 程度に保つ
+        n_steps = max(2048 * 8 // num_envs, 64)
+        model = PPO("MlpPolicy", env, n_steps=n_steps, batch_size=256, seed=seed, verbose=1, device='cpu')
+
+    try:
+        model.learn(total_timesteps=steps, progress_bar=True, reset_num_timesteps=init_model is None)
+    except KeyboardInterrupt:
+        print("\n\n訓練が中断されました。モデルを保存しています...")
+    model.save(save_name)
+    print(f"モデルを保存しました: {save_name}.zip")
+    return save_name + ".zip"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pretrain a flat-ground policy in the kinematic surrogate')
+    parser.add_argument('--robot', type=str, default='tristar', help='Robot type')
+    parser.add_argument('--steps', type=int, default=2_000_000, help='Total timesteps')
+    parser.add_argument('--num_envs', type=int, default=64, help='Vectorized surrogate instances')
+    parser.add_argument('--save_name', type=str, default=None, help='Output model name (default: xrobocon_ppo_<robot>_surrogate)')
+    parser.add_argument('--init_model', type=str, default=None, help='Continue from an existing model')
+    parser.add_argument('--response_time', type=float, default=0.15, help='Wheel speed response time constant (s)')
+    parser.add_argument('--speed_scale', type=float, default=1.0, help='Scale on the configured max_speed')
+    parser.add_argument('--seed', type=int, default=0, help='Seed')
+    args = parser.parse_args()
+
+    pretrain_surrogate(robot_type=args.robot, steps=args.steps, num_envs=args.num_envs, save_name=args.save_name,
+                       seed=args.seed, response_time=args.response_time, speed_scale=args.speed_scale,
+                       init_model=args.init_model)
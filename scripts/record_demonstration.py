@@ -10,22 +10,32 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 import cv2
 from xrobocon.step_env import XRoboconStepEnv
+from xrobocon.demo_dataset import DemoDatasetWriter
+from xrobocon.frame_capture import FrameCapture, capture_fps, make_frame_sink
 
 class ManualRecorder:
-    def __init__(self, robot_type='tristar_large', output_dir='demonstrations'):
+    def __init__(self, robot_type='tristar_large', output_dir='demonstrations', render_every=2, video=None):
+        """
+        Args:
+            render_every: プレビューの描画間隔 (シミュレーションのステップ数)
+            video: 操作画面の録画先 (.mp4 または PNG 連番のディレクトリ。None なら録画しない)
+        """
         # Use rgb_array mode to enable renderer but disable built-in viewer
         self.env = XRoboconStepEnv(render_mode="rgb_array", robot_type=robot_type)
+        self.robot_type = robot_type
         self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+        self.render_every = render_every
+        self.video = video
+        
+        # 記録データはデータセットに直接書き込む（保存するかは録画停止後に決める）
+        self.writer = DemoDatasetWriter(output_dir,
+                                        obs_dim=self.env.observation_space.shape[0],
+                                        action_dim=self.env.action_space.shape[0])
         
         # アクション状態
         # [frame_L, frame_R, wheel_L, wheel_R]
         self.current_action = np.zeros(4, dtype=np.float32)
         
-        # 記録データ
-        self.observations = []
-        self.actions = []
-        self.rewards = []
         self.recording = False
         self.waiting_for_save_decision = False
         
@@ -48,28 +58,52 @@ class ManualRecorder:
         self.recording = not self.recording
         if self.recording:
             print("\nRecording STARTED...")
-            self.observations = []
-            self.actions = []
-            self.rewards = []
+            self.writer.begin_episode()
         else:
             print("\nRecording STOPPED.")
-            print(f"Recorded {len(self.observations)} steps. Save this episode? (y/n)")
+            print(f"Recorded {self.writer.current_length} steps. Save this episode? (y/n)")
             self.waiting_for_save_decision = True
 
     def save_demonstration(self):
-        if len(self.observations) == 0:
+        length = self.writer.end_episode(keep=True, source='manual', robot_type=self.robot_type,
+                                         scenario=getattr(self.env, 'current_scenario_type', None),
+                                         timestamp=int(time.time()))
+        if length == 0:
             print("No data to save.")
             return
-            
-        timestamp = int(time.time())
-        filename = os.path.join(self.output_dir, f"demo_{timestamp}.npz")
         
-        np.savez(filename, 
-                 obs=np.array(self.observations), 
-                 actions=np.array(self.actions),
-                 rewards=np.array(self.rewards))
+        print(f"Saved demonstration to {self.output_dir} ({length} steps, "
+              f"{self.writer.num_episodes} episodes / {self.writer.num_transitions} steps in total)")
+
+    def discard_demonstration(self):
+        self.writer.end_episode(keep=False)
+
+    def _follow_camera(self, camera):
+        """ロボットの少し後ろ・上から追従するカメラ (Z/X キーで距離を調整)"""
+        robot_pos = self.env.robot.get_pos().cpu().numpy()
+        # カメラ位置: ロボットからX軸方向に-dist, Z軸方向に+pitch
+        # より高度にするならロボットの向きに合わせるが、まずは固定アングル追従で十分
+        cam_pos = np.array([robot_pos[0] - self.camera_dist, robot_pos[1], robot_pos[2] + self.camera_pitch])
+        cam_lookat = np.array([robot_pos[0], robot_pos[1], robot_pos[2] + 0.5])
+        camera.set_pose(pos=cam_pos, lookat=cam_lookat)
+
+    def _draw_overlay(self, bgr):
+        """プレビュー用の表示 (録画中マーク・保存確認・アクション状態)"""
+        # アクション状態を表示 (画面上部に大きく)
+        action_str = f"Frame:{self.current_action[0]:.1f} Wheel:{self.current_action[2]:.1f}"
+        # 背景を描画 (視認性向上)
+        cv2.rectangle(bgr, (5, 5), (400, 45), (255, 255, 255), -1)
+        cv2.putText(bgr, action_str, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+        
+        # 録画中マーク
+        if self.recording:
+            cv2.circle(bgr, (30, 70), 10, (0, 0, 255), -1)
+            cv2.putText(bgr, "REC", (50, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         
-        print(f"Saved demonstration to {filename} ({len(self.observations)} steps)")
+        # 保存待機中メッセージ
+        if self.waiting_for_save_decision:
+            cv2.putText(bgr, "Save? (Y/N)", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+        return bgr
 
     def run(self):
         obs, info = self.env.reset()
@@ -81,53 +115,23 @@ class ManualRecorder:
         else:
             print("Error: No camera found in the environment.")
             return
+        
+        # 描画は render_every ステップごと。変換と録画はバックグラウンドスレッドで行い、
+        # プレビューは変換済みの最新フレームを表示する (xrobocon/frame_capture.py)
+        sink = make_frame_sink(self.video, capture_fps(self.render_every)) if self.video else None
+        capture = FrameCapture(camera, sink=sink, every=self.render_every, queue_size=4, keep_latest=True)
+        shown_frame = None
+        self.camera_dist = 4.0
+        self.camera_pitch = 2.5
+        self.frame_count = 0
 
         try:
             while True:
-                # 1. カメラ更新 (Follow Camera)
-                if camera:
-                    # ロボットの位置を取得
-                    robot_pos = self.env.robot.get_pos().cpu().numpy()
-                    
-                    # カメラ位置を計算 (ロボットの少し後ろ・上)
-                    # 現在のカメラ距離と角度を維持
-                    # 簡易的に: ロボットの座標 + オフセット
-                    # ズーム機能: self.camera_dist を調整
-                    if not hasattr(self, 'camera_dist'):
-                        self.camera_dist = 4.0
-                        self.camera_pitch = 2.5
-                    
-                    # カメラ位置: ロボットからX軸方向に-dist, Z軸方向に+pitch
-                    # より高度にするならロボットの向きに合わせるが、まずは固定アングル追従で十分
-                    cam_pos = np.array([robot_pos[0] - self.camera_dist, robot_pos[1], robot_pos[2] + self.camera_pitch])
-                    cam_lookat = np.array([robot_pos[0], robot_pos[1], robot_pos[2] + 0.5])
-                    
-                    camera.set_pose(pos=cam_pos, lookat=cam_lookat)
-
-                    # レンダリング (OpenCV)
-                    # render() returns (rgb, depth, segmentation, normal)
-                    rgb, _, _, _ = camera.render()
-                    # rgb is likely (H, W, 3) or (H, W, 4)
-                    
-                    # BGRに変換 (OpenCV用)
-                    # Genesis returns RGB in [0, 1] or [0, 255]? Usually [0, 1] float or [0, 255] uint8.
-                    # Assuming [0, 1] float based on typical renderers, or check type.
-                    # If it's float, convert to uint8.
-                    if rgb.dtype == np.float32 or rgb.dtype == np.float64:
-                        rgb = (rgb * 255).astype(np.uint8)
-                    
-                    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
-                    
-                    # 録画中マーク
-                    if self.recording:
-                        cv2.circle(bgr, (30, 30), 10, (0, 0, 255), -1)
-                        cv2.putText(bgr, "REC", (50, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    
-                    # 保存待機中メッセージ
-                    if self.waiting_for_save_decision:
-                        cv2.putText(bgr, "Save? (Y/N)", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
-                    
-                    cv2.imshow("Manual Control", bgr)
+                # 1. プレビュー表示 (新しいフレームが届いたとき・保存確認中)
+                frame = capture.latest
+                if frame is not None and (frame is not shown_frame or self.waiting_for_save_decision):
+                    shown_frame = frame
+                    cv2.imshow("Manual Control", self._draw_overlay(frame.copy()))
                 
                 # 2. キー入力処理 (OpenCV)
                 key = cv2.waitKey(1) & 0xFF
@@ -138,6 +142,7 @@ class ManualRecorder:
                         self.waiting_for_save_decision = False
                         print("Ready for next episode.")
                     elif key == ord('n'):
+                        self.discard_demonstration()
                         print("Discarded episode.")
                         self.waiting_for_save_decision = False
                         print("Ready for next episode.")
@@ -177,15 +182,7 @@ class ManualRecorder:
                 elif key == ord('i'): self.current_action[0], self.current_action[1] = action_scale, action_scale
                 elif key == ord('k'): self.current_action[0], self.current_action[1] = -action_scale, -action_scale
                 
-                # アクション状態を表示 (画面上部に大きく)
-                action_str = f"Frame:{self.current_action[0]:.1f} Wheel:{self.current_action[2]:.1f}"
-                # 背景を描画 (視認性向上)
-                cv2.rectangle(bgr, (5, 5), (400, 45), (255, 255, 255), -1)
-                cv2.putText(bgr, action_str, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-                
                 # コンソールにも出力 (10フレームごと)
-                if not hasattr(self, 'frame_count'):
-                    self.frame_count = 0
                 self.frame_count += 1
                 if self.frame_count % 10 == 0:
                     # ロボットの状態も出力
@@ -195,28 +192,23 @@ class ManualRecorder:
                     print(f"Action: Frame={self.current_action[0]:.2f}, Wheel={self.current_action[2]:.2f} | "
                           f"Pos: Z={robot_pos[2]:.3f} | Vel: Z={robot_vel[2]:.3f} | "
                           f"Pitch={robot_euler[1]:.1f}°")
-                
-                # 描画完了後に表示
-                cv2.imshow("Manual Control", bgr)
 
                 # 3. シミュレーションステップ
-                # トルク不足の可能性があるので、アクション値を少し強調する（環境側でクリップされるが）
-                # しかし環境のmax_torqueが20なので、1.0を送れば20Nm。
-                # 動かない場合は物理パラメータの問題か、アクションが適用されていないか。
-                # とりあえずそのまま送る。
-                
                 next_obs, reward, terminated, truncated, _ = self.env.step(self.current_action)
                 
+                # 4. 描画 (render_every ステップごと。描画するステップだけカメラを追従させる)
+                if capture.due():
+                    self._follow_camera(camera)
+                capture.step()
+                
                 if self.recording:
-                    self.observations.append(obs)
-                    self.actions.append(self.current_action.copy())
-                    self.rewards.append(reward)
+                    self.writer.add(obs, self.current_action, reward)
                 
                 obs = next_obs
                 
                 if terminated or truncated:
                     if self.recording:
-                        print(f"Episode finished. Reward: {sum(self.rewards):.2f}")
+                        print(f"Episode finished. Reward: {self.writer.episode_return:.2f}")
                         self.toggle_recording()
                     
                     obs, info = self.env.reset()
@@ -226,9 +218,22 @@ class ManualRecorder:
         except KeyboardInterrupt:
             print("\nExiting...")
         finally:
+            stats = capture.close()
+            if self.video:
+                print(f"Video saved to {self.video} ({stats['written']} frames, {stats['dropped']} dropped)")
             cv2.destroyAllWindows()
+            # 保存を決めていない記録中のエピソードは破棄される
+            self.writer.close()
             self.env.close()
 
 if __name__ == "__main__":
-    recorder = ManualRecorder()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--out', type=str, default='demonstrations', help='Demonstration dataset directory')
+    parser.add_argument('--render_every', type=int, default=2, help='Render the preview every N simulation steps')
+    parser.add_argument('--video', type=str, default=None, help='Also record the session (.mp4 or PNG directory)')
+    args = parser.parse_args()
+    
+    recorder = ManualRecorder(robot_type=args.robot, output_dir=args.out, render_every=args.render_every,
+                              video=args.video)
     recorder.run()
@@ -0,0 +1,124 @@
+"""
+XROBOCON 軌跡ログの再生
+xrobocon/trajectory_log.py で記録したログを、物理を計算せずに表示します。
+
+    (既定)     エピソードごとの長さ・報酬・成功・得点の一覧
+    --plot     高さ・ピッチ・行動・累積報酬・報酬内訳のグラフ
+    --viewer   Genesis ビューアで関節位置を順に設定して再生（scene.step() は呼ばない）
+
+使用例:
+    python scripts/log_model_actions.py --model best_model.zip --trajectory runs/edge_case
+    python scripts/replay_trajectory.py runs/edge_case --plot --episode 0
+    python scripts/replay_trajectory.py runs/edge_case --viewer --episode 0 --speed 0.5
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import time
+import numpy as np
+
+from xrobocon.trajectory_log import FLAG_SUCCESS, episode_slices, load_trajectory
+
+
+def quat_to_pitch_deg(quat):
+    """クォータニオン (w, x, y, z) の配列からピッチ角 (度)。XRoboconRobot.get_euler と同じ式"""
+    w, x, y, z = quat[:, 0], quat[:, 1], quat[:, 2], quat[:, 3]
+    return np.degrees(np.arcsin(np.clip(2.0 * (w * y - z * x), -1.0, 1.0)))
+
+
+def print_summary(data, meta):
+    print(f"{meta.get('robot_type', '?')} / {meta.get('env_type', '?')}: {meta['num_records']} records, "
+          f"{meta['num_episodes']} episodes")
+    print(f"\n{'episode':>7} {'steps':>6} {'time':>7} {'return':>9} {'score':>6} {'result':>6}")
+    for episode, sl in episode_slices(data['episode']).items():
+        success = bool(data['flags'][sl.stop - 1] & FLAG_SUCCESS)
+        print(f"{episode:>7} {sl.stop - sl.start:>6} {data['time'][sl.stop - 1]:>6.2f}s "
+              f"{float(np.sum(data['reward'][sl])):>9.1f} {int(data['score'][sl.stop - 1]):>6} "
+              f"{'成功' if success else '-':>6}")
+
+
+def plot_episode(data, meta, episode, output=None):
+    import matplotlib
+    if output:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    sl = episode_slices(data['episode'])[episode]
+    t = np.asarray(data['time'][sl])
+    term_names = meta.get('term_names', [])
+    rows = 4 if term_names else 3
+    fig, axes = plt.subplots(rows, 1, figsize=(10, 2.5 * rows), sharex=True)
+
+    axes[0].plot(t, data['pos'][sl][:, 2], label='z')
+    axes[0].set_ylabel('height (m)')
+    ax = axes[0].twinx()
+    ax.plot(t, quat_to_pitch_deg(np.asarray(data['quat'][sl])), color='tab:orange', label='pitch')
+    ax.set_ylabel('pitch (deg)')
+
+    actions = np.asarray(data['action'][sl])
+    labels = ['frame_L', 'frame_R', 'wheel_L', 'wheel_R'] if actions.shape[1] == 4 else ['left', 'right']
+    for i, label in enumerate(labels):
+        axes[1].plot(t, actions[:, i], label=label)
+    axes[1].set_ylabel('action')
+    axes[1].legend(loc='upper right', fontsize='small')
+
+    axes[2].plot(t, np.cumsum(data['reward'][sl]))
+    axes[2].set_ylabel('return')
+
+    if term_names:
+        terms = np.cumsum(np.asarray(data['reward_terms'][sl]), axis=0)
+        for i, name in enumerate(term_names):
+            axes[3].plot(t, terms[:, i], label=name)
+        axes[3].set_ylabel('term sums')
+        axes[3].legend(loc='upper left', fontsize='x-small', ncol=2)
+    axes[-1].set_xlabel('time (s)')
+    fig.suptitle(f"episode {episode}")
+    fig.tight_layout()
+    if output:
+        fig.savefig(output)
+        print(f"Saved {output}")
+    else:
+        plt.show()
+
+
+def replay_in_viewer(data, meta, episode, speed=1.0):
+    """ビューアで関節位置を順に設定して表示（物理は進めない）"""
+    import torch
+    import genesis as gs
+    from scripts.evaluate_model import make_env
+
+    env = make_env(meta.get('env_type', 'step'), meta['robot_type'], render=True)
+    env.reset()
+    sl = episode_slices(data['episode'])[episode]
+    qpos = np.asarray(data['qpos'][sl])
+    times = np.asarray(data['time'][sl])
+    start = time.perf_counter()
+    for i in range(len(qpos)):
+        env.robot.entity.set_qpos(torch.as_tensor(qpos[i], dtype=torch.float32, device=gs.device))
+        env.scene.visualizer.update()
+        # 記録時の時刻に合わせて待つ
+        delay = (times[i] - times[0]) / speed - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+    env.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay a trajectory log without running physics')
+    parser.add_argument('log', type=str, help='Trajectory log directory')
+    parser.add_argument('--episode', type=int, default=0, help='Episode to plot / replay')
+    parser.add_argument('--plot', action='store_true', help='Plot height, pitch, actions and rewards')
+    parser.add_argument('--save', type=str, default=None, help='Save the plot to a file instead of showing it')
+    parser.add_argument('--viewer', action='store_true', help='Replay in the Genesis viewer')
+    parser.add_argument('--speed', type=float, default=1.0, help='Viewer playback speed')
+    args = parser.parse_args()
+
+    data, meta = load_trajectory(args.log)
+    print_summary(data, meta)
+    if args.plot or args.save:
+        plot_episode(data, meta, args.episode, output=args.save)
+    if args.viewer:
+        replay_in_viewer(data, meta, args.episode, speed=args.speed)
@@ -0,0 +1,348 @@
+"""
+XROBOCON ハイパーパラメータスイープ
+報酬重み (robot_configs.py の reward_params) と PPO 設定の探索空間を定義し、
+ローカルのプロセスプールで複数の試行を並列に訓練・評価します。
+Successive Halving により、途中評価の成功率が低い試行を早期に打ち切ります。
+
+使用例:
+    python scripts/sweep_hyperparams.py --robot tristar_large --env step \\
+        --trials 9 --min_steps 10000 --eta 3 --rungs 3
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import math
+import time
+import argparse
+import multiprocessing
+import numpy as np
+
+# デフォルトの探索空間
+# 'reward_params' は robot_configs.ROBOT_CONFIGS[robot]['reward_params'] を上書き
+# 'ppo' は PPO のコンストラクタ引数（既存モデルからの再開時は custom_objects）として使用
+DEFAULT_SEARCH_SPACE = {
+    'reward_params': {
+        'height_gain_weight': {'type': 'loguniform', 'low': 200.0, 'high': 2000.0},
+        'alignment_reward_weight': {'type': 'uniform', 'low': 0.0, 'high': 5.0},
+        'z_velocity_penalty_weight': {'type': 'uniform', 'low': 0.5, 'high': 10.0},
+    },
+    'ppo': {
+        'learning_rate': {'type': 'loguniform', 'low': 3e-5, 'high': 3e-4},
+        'ent_coef': {'type': 'choice', 'values': [0.0, 0.001, 0.01]},
+        'gamma': {'type': 'choice', 'values': [0.98, 0.99, 0.995]},
+    },
+}
+
+
+def sample_params(search_space, rng):
+    """
+    探索空間から1組のパラメータをサンプリング
+
+    Args:
+        search_space: 探索空間の定義（DEFAULT_SEARCH_SPACE と同じ形式）
+        rng: numpy.random.Generator
+
+    Returns:
+        dict: {'reward_params': {...}, 'ppo': {...}}
+    """
+    params = {}
+    for group, space in search_space.items():
+        params[group] = {}
+        for name, spec in space.items():
+            if spec['type'] == 'uniform':
+                value = rng.uniform(spec['low'], spec['high'])
+            elif spec['type'] == 'loguniform':
+                value = math.exp(rng.uniform(math.log(spec['low']), math.log(spec['high'])))
+            elif spec['type'] == 'choice':
+                value = spec['values'][rng.integers(len(spec['values']))]
+            else:
+                raise ValueError(f"Unknown search space type: {spec['type']} ({group}.{name})")
+            # JSONに保存できるようにPythonの型へ変換
+            params[group][name] = value.item() if hasattr(value, 'item') else value
+    return params
+
+
+def _make_env(env_type, robot_type):
+    """スイープ用の環境を作成（描画なし）"""
+    if env_type == 'step_hard':
+        from xrobocon.step_hard_env import XRoboconStepHardEnv
+        return XRoboconStepHardEnv(render_mode=None, robot_type=robot_type)
+    elif env_type == 'step':
+        from xrobocon.step_env import XRoboconStepEnv
+        return XRoboconStepEnv(render_mode=None, robot_type=robot_type)
+    else:
+        from xrobocon.env import XRoboconEnv
+        return XRoboconEnv(render_mode=None, robot_type=robot_type)
+
+
+def _run_trial_rung(job):
+    """
+    1試行の1ラングを実行（ワーカープロセス内）
+    前のラングのチェックポイントから訓練を継続し、途中評価の結果を返す。
+    Genesisのメモリリークを避けるため、ワーカーは1タスクごとに再起動される。
+    """
+    # 共通モジュールを最初にインポートして設定（MPS Fallback等）を適用
+    import xrobocon.common as common
+    from stable_baselines3 import PPO
+    from xrobocon.robot_configs import ROBOT_CONFIGS
+    from scripts.evaluate_model import run_episode
+
+    robot_type = job['robot_type']
+    params = job['params']
+
+    # 報酬パラメータを上書き（環境は毎ステップ get_robot_config() を参照する）
+    ROBOT_CONFIGS[robot_type].setdefault('reward_params', {}).update(params.get('reward_params', {}))
+    ppo_params = params.get('ppo', {})
+
+    env = _make_env(job['env_type'], robot_type)
+    start_time = time.time()
+
+    try:
+        if job['checkpoint'] and os.path.exists(job['checkpoint']):
+            model = PPO.load(job['checkpoint'], env=env, custom_objects=ppo_params)
+        elif job['base_model'] and os.path.exists(job['base_model']):
+            model = PPO.load(job['base_model'], env=env, custom_objects=ppo_params)
+        else:
+            model = PPO("MlpPolicy", env, verbose=0, seed=job['seed'], **ppo_params)
+
+        model.learn(total_timesteps=job['steps'], reset_num_timesteps=False)
+        model.save(job['output_checkpoint'])
+
+        # 途中評価（シードはラングごとに固定し、試行間で同じ条件にする）
+        results = []
+        for i in range(job['eval_episodes']):
+            results.append(run_episode(env, model, job['env_type'], seed=job['eval_seed'] + i))
+    finally:
+        env.close()
+
+    success_rate = float(np.mean([r['success'] for r in results])) if results else 0.0
+    return {
+        'trial_id': job['trial_id'],
+        'rung': job['rung'],
+        'total_steps': job['total_steps'],
+        'success_rate': success_rate,
+        'avg_reward': float(np.mean([r['reward'] for r in results])) if results else 0.0,
+        'avg_steps': float(np.mean([r['steps'] for r in results])) if results else 0.0,
+        'wall_time': time.time() - start_time,
+        'checkpoint': job['output_checkpoint'] + '.zip',
+    }
+
+
+class SweepIndex:
+    """スイープ結果のインデックス（各試行の設定・指標・チェックポイント）を管理するクラス"""
+
+    def __init__(self, sweep_dir):
+        self.sweep_dir = sweep_dir
+        self.path = os.path.join(sweep_dir, 'index.json')
+        os.makedirs(sweep_dir, exist_ok=True)
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = {'settings': {}, 'trials': {}}
+
+    def trial_dir(self, trial_id):
+        """試行ごとのディレクトリを取得"""
+        path = os.path.join(self.sweep_dir, trial_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def add_trial(self, trial_id, params):
+        """試行を登録し、設定を config.json に保存"""
+        self.data['trials'][trial_id] = {
+            'params': params,
+            'status': 'running',
+            'rungs': [],
+            'checkpoint': None,
+        }
+        with open(os.path.join(self.trial_dir(trial_id), 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump(params, f, indent=2, ensure_ascii=False)
+
+    def record_rung(self, result):
+        """ラングの評価結果を記録"""
+        trial = self.data['trials'][result['trial_id']]
+        trial['rungs'].append({k: v for k, v in result.items() if k not in ('trial_id', 'checkpoint')})
+        trial['checkpoint'] = result['checkpoint']
+
+    def set_status(self, trial_id, status):
+        self.data['trials'][trial_id]['status'] = status
+
+    def save(self):
+        """一時ファイル経由で書き込み（中断時にインデックスが壊れないように）"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def run_sweep(robot_type='tristar_large', env_type='step', num_trials=9, min_steps=10000, eta=3,
+              max_rungs=3, eval_episodes=10, workers=None, base_model=None, search_space=None,
+              sweep_dir='sweeps/sweep', seed=0):
+    """
+    Successive Halving によるハイパーパラメータスイープ
+
+    Args:
+        robot_type: ロボットタイプ
+        env_type: 環境タイプ ('flat', 'step', 'step_hard')
+        num_trials: 初期試行数
+        min_steps: 最初のラングの訓練ステップ数（以降のラングは eta 倍ずつ増加）
+        eta: 各ラングで残す割合の逆数（上位 1/eta を次のラングへ）
+        max_rungs: 最大ラング数
+        eval_episodes: 各ラングの途中評価エピソード数
+        workers: 並列ワーカー数（Noneの場合はCPUコア数）
+        base_model: 転移学習のベースモデル（Noneの場合はスクラッチ）
+        search_space: 探索空間（Noneの場合は DEFAULT_SEARCH_SPACE）
+        sweep_dir: 結果の保存先ディレクトリ
+        seed: サンプリング・訓練用のシード
+
+    Returns:
+        dict: 最良試行の情報
+    """
+    if search_space is None:
+        search_space = DEFAULT_SEARCH_SPACE
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    rng = np.random.default_rng(seed)
+    index = SweepIndex(sweep_dir)
+    index.data['settings'] = {
+        'robot_type': robot_type,
+        'env_type': env_type,
+        'num_trials': num_trials,
+        'min_steps': min_steps,
+        'eta': eta,
+        'max_rungs': max_rungs,
+        'eval_episodes': eval_episodes,
+        'base_model': base_model,
+        'search_space': search_space,
+        'seed': seed,
+    }
+
+    # 試行の生成
+    survivors = []
+    for i in range(num_trials):
+        trial_id = f"trial_{i:03d}"
+        index.add_trial(trial_id, sample_params(search_space, rng))
+        survivors.append(trial_id)
+    index.save()
+
+    print(f"\n{'='*70}")
+    print(f"ハイパーパラメータスイープ開始 ({robot_type}, {env_type})")
+    print(f"試行数: {num_trials}, ラング数: {max_rungs}, eta: {eta}, ワーカー数: {workers}")
+    print(f"{'='*70}\n")
+
+    # GenesisやCUDAをforkしたプロセスで使わないよう spawn を使用
+    ctx = multiprocessing.get_context('spawn')
+    total_steps = 0
+
+    for rung in range(max_rungs):
+        rung_steps = min_steps * (eta ** rung)
+        train_steps = rung_steps - total_steps
+        total_steps = rung_steps
+
+        jobs = []
+        for trial_id in survivors:
+            trial = index.data['trials'][trial_id]
+            checkpoint = trial['checkpoint']
+            jobs.append({
+                'trial_id': trial_id,
+                'rung': rung,
+                'robot_type': robot_type,
+                'env_type': env_type,
+                'params': trial['params'],
+                'steps': train_steps,
+                'total_steps': total_steps,
+                'checkpoint': checkpoint,
+                'base_model': base_model,
+                'output_checkpoint': os.path.join(index.trial_dir(trial_id), 'checkpoint'),
+                'eval_episodes': eval_episodes,
+                'eval_seed': seed * 1000 + rung * 100,
+                'seed': seed + int(trial_id.split('_')[1]),
+            })
+
+        print(f"\nラング {rung + 1}/{max_rungs}: {len(jobs)}試行 x {train_steps}ステップ (累積 {total_steps})")
+
+        results = []
+        with ctx.Pool(processes=min(workers, len(jobs)), maxtasksperchild=1) as pool:
+            for result in pool.imap_unordered(_run_trial_rung, jobs):
+                index.record_rung(result)
+                index.save()
+                results.append(result)
+                print(f"  {result['trial_id']}: 成功率={result['success_rate']*100:5.1f}%, "
+                      f"平均報酬={result['avg_reward']:8.2f}, 時間={result['wall_time']:.0f}s")
+
+        # 成功率（同率なら平均報酬）で順位付け
+        results.sort(key=lambda r: (r['success_rate'], r['avg_reward']), reverse=True)
+
+        if rung == max_rungs - 1:
+            for r in results:
+                index.set_status(r['trial_id'], 'completed')
+            survivors = [r['trial_id'] for r in results]
+            break
+
+        keep = max(1, len(results) // eta)
+        survivors = [r['trial_id'] for r in results[:keep]]
+        for r in results[keep:]:
+            index.set_status(r['trial_id'], 'pruned')
+        index.save()
+        print(f"  -> 上位{keep}試行を次のラングへ: {', '.join(survivors)}")
+
+    index.save()
+
+    best_id = survivors[0]
+    best = index.data['trials'][best_id]
+    print(f"\n{'='*70}")
+    print(f"最良試行: {best_id}")
+    print(f"  成功率: {best['rungs'][-1]['success_rate']*100:.1f}%")
+    print(f"  チェックポイント: {best['checkpoint']}")
+    print(f"  パラメータ: {json.dumps(best['params'], ensure_ascii=False)}")
+    print(f"  インデックス: {index.path}")
+    print(f"{'='*70}\n")
+
+    return {'trial_id': best_id, **best}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='XROBOCON ハイパーパラメータスイープ (Successive Halving)')
+    parser.add_argument('--robot', type=str, default='tristar_large',
+                        choices=['standard', 'tristar', 'tristar_large', 'rocker_bogie', 'rocker_bogie_large'],
+                        help='ロボットタイプ')
+    parser.add_argument('--env', type=str, default='step', choices=['flat', 'step', 'step_hard'],
+                        help='環境タイプ (flat, step, step_hard)')
+    parser.add_argument('--trials', type=int, default=9, help='初期試行数')
+    parser.add_argument('--min_steps', type=int, default=10000, help='最初のラングの訓練ステップ数')
+    parser.add_argument('--eta', type=int, default=3, help='各ラングで上位 1/eta を残す')
+    parser.add_argument('--rungs', type=int, default=3, help='最大ラング数')
+    parser.add_argument('--eval_episodes', type=int, default=10, help='途中評価のエピソード数')
+    parser.add_argument('--workers', type=int, default=None, help='並列ワーカー数（デフォルト: CPUコア数）')
+    parser.add_argument('--base', type=str, default=None, help='ベースモデル（転移学習）')
+    parser.add_argument('--space', type=str, default=None, help='探索空間のJSONファイル')
+    parser.add_argument('--out', type=str, default=None, help='結果の保存先ディレクトリ')
+    parser.add_argument('--seed', type=int, default=0, help='シード')
+    args = parser.parse_args()
+
+    search_space = None
+    if args.space:
+        with open(args.space, 'r', encoding='utf-8') as f:
+            search_space = json.load(f)
+
+    sweep_dir = args.out or os.path.join('sweeps', f"sweep_{args.robot}_{args.env}_{time.strftime('%Y%m%d_%H%M%S')}")
+
+    run_sweep(
+        robot_type=args.robot,
+        env_type=args.env,
+        num_trials=args.trials,
+        min_steps=args.min_steps,
+        eta=args.eta,
+        max_rungs=args.rungs,
+        eval_episodes=args.eval_episodes,
+        workers=args.workers,
+        base_model=args.base,
+        search_space=search_space,
+        sweep_dir=sweep_dir,
+        seed=args.seed,
+    )
@@ -0,0 +1,230 @@
+"""
+XROBOCON チェックポイントトーナメント
+複数のモデル (zip) を同じエピソード一覧 (シナリオ, シード) で評価し、成功率順の表を表示します。
+
+各ワーカープロセスは起動時に環境を一度だけ作成し、(モデル, エピソード) のジョブを順に処理します。
+モデルが切り替わる際は環境を作り直さずに重みだけを読み込むため、
+N個のチェックポイントの評価コストは Genesis 起動N回分ではなく、N×エピソード数のステップ分になります。
+評価結果は evaluation_results/episodes.jsonl に保存され、evaluate_model.py と共有されます。
+
+使用例:
+    python scripts/tournament.py "training_flat/xrobocon_ppo*.zip" --robot standard --env flat --episodes 20 --workers 4
+    python scripts/tournament.py xrobocon_ppo_tristar_large_step*.zip --robot tristar_large --env step
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import glob
+import argparse
+import multiprocessing
+import numpy as np
+
+from xrobocon.eval_stats import wilson_interval
+from xrobocon.evaluation_store import EvaluationStore, file_hash, physics_profile
+from xrobocon.policy_runtime import EXPORTED_EXTENSIONS, PolicyRuntime, is_exported_policy
+
+
+def expand_model_paths(patterns):
+    """グロブパターンを展開し、重複を除いたモデルパスの一覧を返す"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            if path.endswith(('.zip',) + EXPORTED_EXTENSIONS) and os.path.exists(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+# ワーカーの状態（環境は起動時に一度だけ作成し、モデルは重みだけを入れ替える）
+_worker_env = None
+_worker_env_type = None
+_worker_model = None
+_worker_model_path = None
+
+
+def _init_tournament_worker(robot_type, env_type):
+    global _worker_env, _worker_env_type
+    from scripts.evaluate_model import make_env
+    _worker_env = make_env(env_type, robot_type)
+    _worker_env_type = env_type
+
+
+def _load_worker_model(model_path):
+    """ワーカーのモデルを切り替える（同じ構造なら重みのみ読み込む）"""
+    global _worker_model, _worker_model_path
+    if model_path == _worker_model_path:
+        return _worker_model
+
+    import xrobocon.common as common
+    if is_exported_policy(model_path):
+        # 書き出したポリシーは読み込みが軽いので毎回作り直す
+        _worker_model = PolicyRuntime(model_path)
+    elif _worker_model is None or isinstance(_worker_model, PolicyRuntime):
+        _worker_model = common.load_trained_model(model_path, _worker_env)
+    else:
+        try:
+            _worker_model.set_parameters(model_path, exact_match=True, device=_worker_model.device)
+        except (ValueError, RuntimeError, KeyError):
+            # ネットワーク構造が異なるモデルは作り直す
+            _worker_model = common.load_trained_model(model_path, _worker_env)
+    _worker_model_path = model_path
+    return _worker_model
+
+
+def _run_tournament_job(job):
+    from scripts.evaluate_model import run_planned_episode
+    model = _load_worker_model(job['model_path'])
+    result = run_planned_episode(_worker_env, model, _worker_env_type, job['episode'])
+    result['model_path'] = job['model_path']
+    return result
+
+
+def run_jobs(jobs, robot_type, env_type, workers=1):
+    """ジョブを実行し、完了した結果を順に返すジェネレータ"""
+    if not jobs:
+        return
+    if workers <= 1:
+        _init_tournament_worker(robot_type, env_type)
+        try:
+            for job in jobs:
+                yield _run_tournament_job(job)
+        finally:
+            _worker_env.close()
+        return
+
+    # GenesisやCUDAをforkしたプロセスで使わないよう spawn を使用
+    ctx = multiprocessing.get_context('spawn')
+    processes = min(workers, len(jobs))
+    # ジョブはモデルごとに並んでいるので、まとめて渡すと重みの入れ替え回数が減る
+    chunksize = max(1, len(jobs) // (processes * 4))
+    with ctx.Pool(processes=processes, initializer=_init_tournament_worker,
+                  initargs=(robot_type, env_type)) as pool:
+        for result in pool.imap_unordered(_run_tournament_job, jobs, chunksize=chunksize):
+            yield result
+
+
+def run_tournament(model_paths, robot_type='standard', env_type='flat', num_episodes=10, scenario=None,
+                   workers=1, seed=0, use_store=True, store_path=None):
+    """
+    複数モデルを同じエピソード一覧で評価してランキングを返す
+
+    Returns:
+        list: 成功率（同率は平均報酬）の降順に並べた各モデルの集計
+    """
+    from scripts.evaluate_model import make_episode_plan
+
+    plan = make_episode_plan(env_type, num_episodes, seed=seed, scenario=scenario)
+    store = EvaluationStore(store_path) if use_store else None
+    profile = physics_profile(robot_type)
+
+    results = {path: [] for path in model_paths}
+    key_bases = {}
+    jobs = []
+    for path in model_paths:
+        key_bases[path] = {
+            'model_hash': file_hash(path),
+            'env_type': env_type,
+            'robot_type': robot_type,
+            'physics_profile': profile,
+        }
+        for ep in plan:
+            record = store.get(scenario=ep['scenario'], seed=ep['seed'], **key_bases[path]) if store else None
+            if record is not None:
+                results[path].append({'scenario_type': record['scenario'], 'success': record['success'],
+                                      'reward': record['reward'], 'steps': record['steps'],
+                                      'min_dist': record['min_dist']})
+            else:
+                jobs.append({'model_path': path, 'episode': ep})
+
+    total_jobs = len(jobs)
+    print(f"\n{len(model_paths)}モデル × {num_episodes}エピソードのトーナメントを開始 "
+          f"({env_type} environment, workers={workers})")
+    print(f"実行するエピソード: {total_jobs} (ストアから再利用: {len(model_paths) * num_episodes - total_jobs})")
+
+    for done, result in enumerate(run_jobs(jobs, robot_type, env_type, workers), 1):
+        path = result['model_path']
+        results[path].append(result)
+        if store is not None:
+            store.add(dict(key_bases[path], scenario=result['scenario_type'], seed=result['seed'],
+                           model_path=path, success=bool(result['success']), reward=float(result['reward']),
+                           steps=int(result['steps']), min_dist=float(result['min_dist'])))
+        print(f"[{done:4d}/{total_jobs}] {os.path.basename(path)} [{result['scenario_type']}] "
+              f"報酬={result['reward']:7.2f}, {'成功' if result['success'] else '失敗'}")
+
+    ranking = []
+    for path, episodes in results.items():
+        n = len(episodes)
+        success = sum(1 for r in episodes if r['success'])
+        scenarios = {}
+        for r in episodes:
+            s = scenarios.setdefault(r['scenario_type'], {'count': 0, 'success': 0})
+            s['count'] += 1
+            s['success'] += 1 if r['success'] else 0
+        ranking.append({
+            'model_path': path,
+            'episodes': n,
+            'success': success,
+            'success_rate': success / n if n else 0.0,
+            'ci': wilson_interval(success, n),
+            'avg_reward': float(np.mean([r['reward'] for r in episodes])) if n else 0.0,
+            'avg_steps': float(np.mean([r['steps'] for r in episodes])) if n else 0.0,
+            'scenarios': scenarios,
+        })
+    ranking.sort(key=lambda r: (r['success_rate'], r['avg_reward']), reverse=True)
+    return ranking
+
+
+def print_ranking(ranking):
+    """ランキング表を表示"""
+    scenario_types = sorted({s for r in ranking for s in r['scenarios']})
+
+    print("\n" + "=" * 70)
+    print("トーナメント結果")
+    print("=" * 70)
+    header = f"{'順位':>4s}  {'モデル':<40s} {'成功率':>7s} {'95%信頼区間':>15s} {'平均報酬':>9s} {'平均ステップ':>8s}"
+    print(header)
+    print("-" * 70)
+    for rank, r in enumerate(ranking, 1):
+        low, high = r['ci']
+        print(f"{rank:4d}  {os.path.basename(r['model_path']):<40s} {r['success_rate']*100:6.1f}% "
+              f"{low*100:6.1f}%〜{high*100:5.1f}% {r['avg_reward']:9.2f} {r['avg_steps']:8.1f}")
+        if len(scenario_types) > 1:
+            parts = []
+            for s in scenario_types:
+                st = r['scenarios'].get(s)
+                if st:
+                    parts.append(f"{s}: {st['success']}/{st['count']}")
+            print(f"      {' | '.join(parts)}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='XROBOCON Checkpoint Tournament')
+    parser.add_argument('models', nargs='+', help='評価するモデルのパスまたはグロブパターン')
+    parser.add_argument('--robot', type=str, default='standard',
+                        choices=['standard', 'tristar', 'tristar_large', 'rocker_bogie', 'rocker_bogie_large'],
+                        help='ロボットタイプ')
+    parser.add_argument('--env', type=str, default='flat', choices=['flat', 'step', 'step_hard'],
+                        help='環境タイプ (flat, step, step_hard)')
+    parser.add_argument('--episodes', type=int, default=10, help='モデルあたりの評価エピソード数')
+    parser.add_argument('--scenario', type=str, default=None, help='評価するシナリオタイプ')
+    parser.add_argument('--workers', type=int, default=1, help='並列ワーカー数')
+    parser.add_argument('--seed', type=int, default=0, help='エピソード一覧 (シナリオ・シード) のシード')
+    parser.add_argument('--no_store', action='store_true', help='評価結果ストアを使わない')
+    parser.add_argument('--store', type=str, default=None, help='評価結果ストアのパス')
+    args = parser.parse_args()
+
+    # Mac (MPS) 用の環境変数設定
+    os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'
+
+    model_paths = expand_model_paths(args.models)
+    if not model_paths:
+        print(f"エラー: モデルファイルが見つかりません: {args.models}")
+        exit(1)
+
+    ranking = run_tournament(model_paths, robot_type=args.robot, env_type=args.env, num_episodes=args.episodes,
+                             scenario=args.scenario, workers=args.workers, seed=args.seed,
+                             use_store=not args.no_store, store_path=args.store)
+    print_ranking(ranking)
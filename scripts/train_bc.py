@@ -2,7 +2,6 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import TensorDataset, DataLoader
 import sys
 import os
 # Add parent directory to sys.path to allow importing xrobocon
@@ -11,91 +10,123 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from stable_baselines3 import PPO
 from stable_baselines3.common.policies import ActorCriticPolicy
 from xrobocon.step_env import XRoboconStepEnv
+from xrobocon.demo_dataset import DemoDataset, is_dataset, import_legacy_demos
 import argparse
-import glob
 import os
 
-def train_bc(demo_dir='demonstrations', output_model='xrobocon_ppo_tristar_large_bc', epochs=50, batch_size=64, lr=3e-4):
+def train_bc(demo_dir='demonstrations', output_model='xrobocon_ppo_tristar_large_bc', epochs=50, batch_size=64, lr=3e-4,
+             robot_type='tristar_large', steps_per_epoch=None, seed=0, init_model=None, env=None, import_legacy=True):
+    """
+    Args:
+        demo_dir: デモデータセットのディレクトリ
+        steps_per_epoch: 1エポックあたりの更新回数（Noneの場合はデータセットを1周）
+        init_model: 学習を続けるモデルのパス（Noneの場合は新規に作成）
+        env: モデルの観測・行動空間に使う環境（Noneの場合は作成して終了時に閉じる）
+        import_legacy: 旧形式の *.npz があれば取り込んでから使うか
+            (データセットを書き込み中の呼び出し側は、開く前に取り込んで False を渡す)
+    
+    Returns:
+        str: 保存したモデルのパス（データがない場合はNone）
+    """
     print(f"\n{'='*60}")
     print(f"Behavior Cloning Training")
     print(f"{'='*60}")
     
     # 1. デモンストレーションデータの読み込み
-    obs_list = []
-    actions_list = []
+    # 旧形式の npz ファイルはデータセットに取り込む（取り込み済みのものは飛ばす）
+    if import_legacy:
+        imported = import_legacy_demos(demo_dir, source='manual')
+        if imported:
+            print(f"Imported {imported} legacy demonstration files into {demo_dir}")
     
-    demo_files = glob.glob(os.path.join(demo_dir, "*.npz"))
-    if not demo_files:
-        print(f"Error: No demonstration files found in {demo_dir}")
+    if not is_dataset(demo_dir):
+        print(f"Error: No demonstration dataset found in {demo_dir}")
         return
-        
-    print(f"Loading {len(demo_files)} demonstration files...")
-    for f in demo_files:
-        data = np.load(f)
-        obs_list.append(data['obs'])
-        actions_list.append(data['actions'])
-        
-    # 結合
-    observations = np.concatenate(obs_list, axis=0)
-    actions = np.concatenate(actions_list, axis=0)
     
-    print(f"Total samples: {len(observations)}")
+    # データはメモリマップのまま使い、ミニバッチごとにデバイスへ送る
+    dataset = DemoDataset(demo_dir)
+    if len(dataset) == 0:
+        print(f"Error: Demonstration dataset in {demo_dir} is empty")
+        return
+    print(f"Total samples: {len(dataset)} ({len(dataset.episodes)} episodes, {dataset.num_chunks} chunks)")
     
-    # Tensor変換
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     if torch.backends.mps.is_available():
         device = torch.device("mps")
-        
-    obs_tensor = torch.FloatTensor(observations).to(device)
-    actions_tensor = torch.FloatTensor(actions).to(device)
+    rng = np.random.default_rng(seed)
     
-    dataset = TensorDataset(obs_tensor, actions_tensor)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    def minibatches():
+        if steps_per_epoch is None:
+            yield from dataset.iter_batches(batch_size, shuffle=True, rng=rng)
+        else:
+            for _ in range(steps_per_epoch):
+                yield dataset.sample(batch_size, rng=rng)
     
     # 2. PPOモデルの作成 (Student)
-    env = XRoboconStepEnv(render_mode=None, robot_type='tristar_large')
-    model = PPO("MlpPolicy", env, verbose=1)
-    
-    # ポリシーネットワークの抽出
-    policy = model.policy.to(device)
-    optimizer = optim.Adam(policy.parameters(), lr=lr)
-    loss_fn = nn.MSELoss()
-    
-    # 3. 教師あり学習 (Behavior Cloning)
-    print(f"\nStarting training on {device}...")
-    policy.train()
-    
-    for epoch in range(epochs):
-        total_loss = 0
-        for batch_obs, batch_actions in dataloader:
-            optimizer.zero_grad()
-            
-            # ポリシーからアクション分布を取得 -> 平均値(mean)を使用
-            # get_distribution returns a distribution object
-            dist = policy.get_distribution(batch_obs)
-            pred_actions = dist.mode() # 決定論的アクション (mean)
-            
-            loss = loss_fn(pred_actions, batch_actions)
-            loss.backward()
-            optimizer.step()
-            
-            total_loss += loss.item()
-            
-        avg_loss = total_loss / len(dataloader)
-        if (epoch + 1) % 5 == 0:
-            print(f"Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.6f}")
-            
-    print("\nTraining finished.")
-    
-    # 4. モデル保存
-    model.save(output_model)
-    print(f"Model saved to {output_model}.zip")
+    owns_env = env is None
+    if owns_env:
+        env = XRoboconStepEnv(render_mode=None, robot_type=robot_type)
+    try:
+        if init_model is not None:
+            print(f"Continuing from {init_model}")
+            model = PPO.load(init_model, env=env)
+        else:
+            model = PPO("MlpPolicy", env, verbose=1)
+        
+        # ポリシーネットワークの抽出
+        policy = model.policy.to(device)
+        optimizer = optim.Adam(policy.parameters(), lr=lr)
+        loss_fn = nn.MSELoss()
+        
+        # 3. 教師あり学習 (Behavior Cloning)
+        print(f"\nStarting training on {device}...")
+        policy.train()
+        
+        for epoch in range(epochs):
+            total_loss = 0
+            num_batches = 0
+            for obs_np, actions_np in minibatches():
+                batch_obs = torch.as_tensor(obs_np, device=device)
+                batch_actions = torch.as_tensor(actions_np, device=device)
+                optimizer.zero_grad()
+                
+                # ポリシーからアクション分布を取得 -> 平均値(mean)を使用
+                # get_distribution returns a distribution object
+                dist = policy.get_distribution(batch_obs)
+                pred_actions = dist.mode() # 決定論的アクション (mean)
+                
+                loss = loss_fn(pred_actions, batch_actions)
+                loss.backward()
+                optimizer.step()
+                
+                total_loss += loss.item()
+                num_batches += 1
+                
+            avg_loss = total_loss / max(num_batches, 1)
+            if (epoch + 1) % 5 == 0:
+                print(f"Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.6f}")
+                
+        print("\nTraining finished.")
+        
+        # 4. モデル保存
+        model.save(output_model)
+        print(f"Model saved to {output_model}.zip")
+    finally:
+        if owns_env:
+            env.close()
+    return output_model + ".zip"
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--dir', type=str, default='demonstrations', help='Directory containing .npz files')
+    parser.add_argument('--dir', type=str, default='demonstrations', help='Demonstration dataset directory (legacy .npz files are imported)')
     parser.add_argument('--out', type=str, default='xrobocon_ppo_tristar_large_bc', help='Output model name')
     parser.add_argument('--epochs', type=int, default=50, help='Training epochs')
+    parser.add_argument('--batch_size', type=int, default=64, help='Minibatch size')
+    parser.add_argument('--steps_per_epoch', type=int, default=None,
+                        help='Random minibatches per epoch (default: one pass over the dataset)')
+    parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--init', type=str, default=None, help='Continue training from this model')
     args = parser.parse_args()
     
-    train_bc(args.dir, args.out, args.epochs)
+    train_bc(args.dir, args.out, args.epochs, batch_size=args.batch_size,
+             robot_type=args.robot, steps_per_epoch=args.steps_per_epoch, init_model=args.init)
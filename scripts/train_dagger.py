@@ -0,0 +1,313 @@
+"""
+XROBOCON DAgger (Dataset Aggregation)
+現在のBCポリシーで段差環境を走らせ、訪れた状態にエキスパートの行動をラベル付けしてデモデータセットに追加し、
+追加後のデータセットでポリシーを追加学習する、を繰り返します。
+
+各イテレーションの実行ポリシーは β の確率でエキスパート、1-β の確率で学習中のポリシーの行動を選びます（ステップごと）。
+β は beta_decay 倍ずつ減らし、学習中のポリシー自身が訪れる状態のラベルを増やしていきます。
+ロールアウトは spawn したワーカープロセスで並列に実行し、各ワーカーは環境とエキスパートを起動時に一度だけ作成します。
+
+使用例:
+    python scripts/train_dagger.py --expert xrobocon_ppo_tristar_large_step.zip --iterations 5 --episodes 32 --workers 4
+    python scripts/train_dagger.py --expert best_model.zip --init xrobocon_ppo_tristar_large_bc.zip --dir demonstrations
+    python scripts/train_dagger.py --expert scripted --robot tristar_large --workers 8
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import multiprocessing
+import numpy as np
+
+from xrobocon.demo_dataset import DemoDatasetWriter, import_legacy_demos
+
+
+class CheckpointExpert:
+    """
+    学習済みチェックポイントをエキスパートとして使う（決定論的な行動）
+
+    エキスパートはどれも act(obs) で行動の配列だけを返す
+    （スクリプト制御器・推論サーバーの PolicyClient と同じ）。
+    """
+
+    def __init__(self, model_path, env):
+        from stable_baselines3 import PPO
+        # 小さなMLPの1サンプル推論はCPUの方が速い
+        self.model = PPO.load(model_path, env=env, device='cpu')
+
+    def act(self, obs):
+        action, _ = self.model.predict(obs, deterministic=True)
+        return action
+
+
+def load_expert(spec, env):
+    """
+    エキスパートを作成
+
+    Args:
+        spec: 'scripted' (ロボットタイプに対応するスクリプト制御器) またはチェックポイントのパス
+        env: エキスパートを動かす環境
+    """
+    if spec == 'scripted':
+        from xrobocon.scripted_controllers import make_controller
+        return make_controller(env.robot_type)
+    if not os.path.exists(spec) and os.path.exists(spec + ".zip"):
+        spec += ".zip"
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"Expert model not found: {spec}")
+    return CheckpointExpert(spec, env)
+
+
+# ワーカーの状態（環境とエキスパートは起動時に一度だけ作成し、ポリシーは重みだけを入れ替える）
+_worker_env = None
+_worker_expert = None
+_worker_policy = None
+_worker_policy_key = None
+
+
+_worker_policy_server = None
+
+
+def _init_dagger_worker(robot_type, expert_spec, policy_server=None):
+    global _worker_env, _worker_expert, _worker_policy_server
+    from xrobocon.step_env import XRoboconStepEnv
+    _worker_env = XRoboconStepEnv(render_mode=None, robot_type=robot_type)
+    _worker_policy_server = policy_server
+    if policy_server and expert_spec != 'scripted':
+        # チェックポイントのエキスパートも推論サーバーで共有する
+        from xrobocon.policy_server import PolicyClient
+        _worker_expert = PolicyClient(policy_server, expert_spec)
+    else:
+        _worker_expert = load_expert(expert_spec, _worker_env)
+
+
+def _policy_key(policy_path):
+    """
+    ワーカーのポリシーのキャッシュキー（ファイル内容のハッシュ）
+
+    train_bc は毎イテレーション同じパスに上書き保存するため、パスだけでは新しいポリシーを区別できない。
+    """
+    from xrobocon.evaluation_store import file_hash
+    if not os.path.exists(policy_path) and os.path.exists(policy_path + ".zip"):
+        policy_path += ".zip"
+    return file_hash(policy_path)
+
+
+def _load_worker_policy(policy_path):
+    """ワーカーのポリシーを切り替える（同じ構造なら重みのみ読み込む）"""
+    global _worker_policy, _worker_policy_key
+    key = _policy_key(policy_path)
+    if key == _worker_policy_key:
+        return _worker_policy
+
+    if _worker_policy_server:
+        from xrobocon.policy_server import PolicyClient
+        if _worker_policy is None:
+            _worker_policy = PolicyClient(_worker_policy_server)
+        _worker_policy.load(policy_path)
+        _worker_policy_key = key
+        return _worker_policy
+
+    from stable_baselines3 import PPO
+    if _worker_policy is None:
+        _worker_policy = PPO.load(policy_path, env=_worker_env, device='cpu')
+    else:
+        try:
+            _worker_policy.set_parameters(policy_path, exact_match=True, device='cpu')
+        except (ValueError, RuntimeError, KeyError):
+            _worker_policy = PPO.load(policy_path, env=_worker_env, device='cpu')
+    _worker_policy_key = key
+    return _worker_policy
+
+
+def _run_dagger_episode(job):
+    """
+    1エピソードを実行し、訪れた状態とエキスパートの行動を返す
+
+    Args:
+        job: {'index', 'scenario', 'seed', 'policy_path', 'beta', 'max_steps'}
+    """
+    env = _worker_env
+    policy = _load_worker_policy(job['policy_path']) if job['policy_path'] else None
+    beta = job['beta'] if policy is not None else 1.0
+    rng = np.random.default_rng(job['seed'])
+
+    obs, _ = env.reset(options={'scenario': job['scenario'], 'jitter_seed': job['seed']})
+    observations = []
+    expert_actions = []
+    rewards = []
+    expert_steps = 0
+    success = False
+    for _ in range(job['max_steps']):
+        expert_action = np.asarray(_worker_expert.act(obs), dtype=np.float32)
+        if policy is None or rng.random() < beta:
+            action = expert_action
+            expert_steps += 1
+        else:
+            action, _ = policy.predict(obs, deterministic=True)
+
+        observations.append(obs)
+        expert_actions.append(expert_action)
+
+        obs, reward, terminated, truncated, info = env.step(action)
+        rewards.append(reward)
+        if terminated or truncated:
+            success = bool(info.get('is_success', False))
+            break
+
+    return {
+        'index': job['index'],
+        'scenario': job['scenario'],
+        'seed': job['seed'],
+        'obs': np.asarray(observations, dtype=np.float32),
+        'actions': np.asarray(expert_actions, dtype=np.float32),
+        'rewards': np.asarray(rewards, dtype=np.float32),
+        'success': success,
+        'expert_fraction': expert_steps / max(len(rewards), 1),
+    }
+
+
+def open_workers(robot_type, expert_spec, workers=1, policy_server=None):
+    """ワーカーを起動（workers<=1 の場合は自プロセスで実行し None を返す）"""
+    if workers <= 1:
+        _init_dagger_worker(robot_type, expert_spec, policy_server)
+        return None
+    # GenesisやCUDAをforkしたプロセスで使わないよう spawn を使用
+    ctx = multiprocessing.get_context('spawn')
+    return ctx.Pool(processes=workers, initializer=_init_dagger_worker,
+                    initargs=(robot_type, expert_spec, policy_server))
+
+
+def run_rollouts(pool, jobs, workers=1):
+    """ジョブを実行し、結果をジョブの順に返すジェネレータ"""
+    if pool is None:
+        for job in jobs:
+            yield _run_dagger_episode(job)
+        return
+    # 同じイテレーションのジョブは同じポリシーを使うため、まとめて渡しても重みの入れ替えは1回
+    chunksize = max(1, len(jobs) // (workers * 4))
+    yield from pool.imap(_run_dagger_episode, jobs, chunksize=chunksize)
+
+
+def train_dagger(expert, dataset_dir='demonstrations', output_model='xrobocon_ppo_tristar_large_dagger',
+                 robot_type='tristar_large', iterations=5, episodes=32, workers=1, beta=1.0, beta_decay=0.5,
+                 epochs=10, steps_per_epoch=None, batch_size=64, max_steps=500, scenario=None, seed=0,
+                 init_model=None, policy_server=None):
+    """
+    DAgger のメインループ
+
+    Args:
+        expert: エキスパートの指定（load_expert を参照）
+        dataset_dir: ラベルを追加するデモデータセット
+        output_model: 各イテレーションで保存するポリシー名
+        iterations: イテレーション数
+        episodes: 1イテレーションあたりのロールアウト数
+        beta: 最初のイテレーションでエキスパートの行動を実行する確率
+        beta_decay: イテレーションごとの beta の減衰率
+        epochs: 1イテレーションあたりの追加学習エポック数
+        init_model: 最初のポリシー（Noneの場合、最初のイテレーションはエキスパートのみで実行）
+        policy_server: 推論サーバーのソケット。指定するとワーカーはポリシーとエキスパートをサーバーで推論する
+
+    Returns:
+        str: 最終ポリシーのパス
+    """
+    from scripts.evaluate_model import make_episode_plan
+    from scripts.train_bc import train_bc
+
+    print(f"\n{'='*60}")
+    print(f"DAgger Training")
+    print(f"{'='*60}")
+    print(f"Expert: {expert}")
+    print(f"Robot: {robot_type}, Iterations: {iterations}, Episodes/iter: {episodes}, Workers: {workers}")
+
+    # 旧形式の npz は書き込み側を開く前に一度だけ取り込む
+    # (train_bc が途中で取り込むと、開いている writer の manifest と書き込み位置が古くなり上書きしてしまう)
+    imported = import_legacy_demos(dataset_dir, source='manual')
+    if imported:
+        print(f"Imported {imported} legacy demonstration files into {dataset_dir}")
+
+    writer = None
+    bc_env = None
+    policy_path = init_model
+    pool = open_workers(robot_type, expert, workers, policy_server)
+    try:
+        # train_bc がモデルの観測・行動空間に使う環境（自プロセス実行ならワーカーの環境を共用し、シーンは増やさない）
+        if pool is None:
+            bc_env = _worker_env
+        else:
+            from xrobocon.step_env import XRoboconStepEnv
+            bc_env = XRoboconStepEnv(render_mode=None, robot_type=robot_type)
+
+        for iteration in range(iterations):
+            iter_beta = beta * (beta_decay ** iteration) if policy_path else 1.0
+            plan = make_episode_plan('step', episodes, seed=seed + iteration, scenario=scenario)
+            jobs = [dict(ep, policy_path=policy_path, beta=iter_beta, max_steps=max_steps) for ep in plan]
+            print(f"\n--- Iteration {iteration + 1}/{iterations} (beta={iter_beta:.3f}) ---")
+
+            successes = 0
+            steps = 0
+            for result in run_rollouts(pool, jobs, workers):
+                if writer is None:
+                    writer = DemoDatasetWriter(dataset_dir, obs_dim=result['obs'].shape[1],
+                                               action_dim=result['actions'].shape[1])
+                writer.begin_episode()
+                writer.add_batch(result['obs'], result['actions'], result['rewards'])
+                writer.end_episode(keep=True, source='dagger', robot_type=robot_type, expert=expert,
+                                   iteration=iteration, beta=iter_beta, scenario=result['scenario'],
+                                   seed=result['seed'], success=result['success'],
+                                   expert_fraction=result['expert_fraction'])
+                successes += int(result['success'])
+                steps += len(result['obs'])
+
+            print(f"Rollout success rate: {successes / len(jobs):.1%} "
+                  f"({steps} labeled steps, dataset total {writer.num_transitions})")
+
+            # 集約したデータセットで現在のポリシーから追加学習
+            policy_path = train_bc(dataset_dir, output_model, epochs=epochs, batch_size=batch_size,
+                                   robot_type=robot_type, steps_per_epoch=steps_per_epoch,
+                                   seed=seed + iteration, init_model=policy_path, env=bc_env,
+                                   import_legacy=False)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+            if bc_env is not None:
+                bc_env.close()
+        elif _worker_env is not None:
+            _worker_env.close()
+        if writer is not None:
+            writer.close()
+
+    print(f"\nDAgger finished. Final policy: {policy_path}")
+    return policy_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='DAgger training on the step environment')
+    parser.add_argument('--expert', type=str, required=True, help="Expert checkpoint (.zip) or 'scripted'")
+    parser.add_argument('--dir', type=str, default='demonstrations', help='Demonstration dataset directory')
+    parser.add_argument('--out', type=str, default='xrobocon_ppo_tristar_large_dagger', help='Output model name')
+    parser.add_argument('--init', type=str, default=None, help='Initial policy (e.g. BC model)')
+    parser.add_argument('--robot', type=str, default='tristar_large', help='Robot type')
+    parser.add_argument('--iterations', type=int, default=5, help='DAgger iterations')
+    parser.add_argument('--episodes', type=int, default=32, help='Rollouts per iteration')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel rollout workers')
+    parser.add_argument('--beta', type=float, default=1.0, help='Initial probability of executing the expert action')
+    parser.add_argument('--beta_decay', type=float, default=0.5, help='Beta decay per iteration')
+    parser.add_argument('--epochs', type=int, default=10, help='BC epochs per iteration')
+    parser.add_argument('--steps_per_epoch', type=int, default=None, help='Random minibatches per epoch')
+    parser.add_argument('--max_steps', type=int, default=500, help='Max steps per rollout')
+    parser.add_argument('--scenario', type=str, default=None, help='Fix the scenario type')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the rollout plan')
+    parser.add_argument('--policy_server', type=str, default=None,
+                        help='Socket of scripts/policy_server.py (workers query it instead of loading models)')
+    args = parser.parse_args()
+
+    train_dagger(args.expert, dataset_dir=args.dir, output_model=args.out, robot_type=args.robot,
+                 iterations=args.iterations, episodes=args.episodes, workers=args.workers,
+                 beta=args.beta, beta_decay=args.beta_decay, epochs=args.epochs,
+                 steps_per_epoch=args.steps_per_epoch, max_steps=args.max_steps,
+                 scenario=args.scenario, seed=args.seed, init_model=args.init,
+                 policy_server=args.policy_server)
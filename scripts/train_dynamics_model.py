@@ -0,0 +1,116 @@
+"""
+XROBOCON ダイナミクスモデルの学習と想像ロールアウトでの PPO 学習
+デモ・スクリプト制御器・蒸留の教師のデータセットからアンサンブルのダイナミクスモデルを学習し、
+検証用エピソードでの1ステップ予測誤差をシナリオごとに表示します。
+DAgger のエピソードは、保存された行動（エキスパートのラベル）を全ステップで実行したもの (β=1) だけを使います。
+--ppo_model を指定すると、モデル内の短い想像ロールアウト (ModelVecEnv) で PPO を追加学習します。
+
+使用例:
+    python scripts/train_dynamics_model.py --data demonstrations teacher_data --out dynamics_tristar_large.pt
+    python scripts/train_dynamics_model.py --data demonstrations --load dynamics_tristar_large.pt \\
+        --ppo_model xrobocon_ppo_tristar_large_step.zip --imagined_steps 500000 --horizon 20
+"""
+import sys
+import os
+# Add parent directory to sys.path to allow importing xrobocon
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import numpy as np
+
+from xrobocon.demo_dataset import DemoDataset
+from xrobocon.dynamics_model import (EnsembleDynamics, ModelVecEnv, error_by_scenario, executed_action_episodes,
+                                     split_episodes, transitions_from_dataset)
+
+
+def load_transitions(dataset_dirs, holdout_fraction=0.1, seed=0):
+    """複数のデータセットから学習用・検証用の遷移を作る（エピソード単位で分割）"""
+    train_parts, holdout_parts = [], []
+    for root in dataset_dirs:
+        dataset = DemoDataset(root)
+        episodes = executed_action_episodes(dataset.episodes)
+        skipped = len(dataset.episodes) - len(episodes)
+        if skipped:
+            print(f"{root}: 実行した行動が保存されていない DAgger のエピソード {skipped} 件を除外")
+        if not episodes:
+            continue
+        train_eps, holdout_eps = split_episodes(episodes, holdout_fraction, seed)
+        train_parts.append(transitions_from_dataset(dataset, train_eps))
+        if holdout_eps:
+            holdout_parts.append(transitions_from_dataset(dataset, holdout_eps))
+
+    def merge(parts):
+        return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]} if parts else None
+    return merge(train_parts), merge(holdout_parts)
+
+
+def print_error_report(report):
+    print(f"\n{'scenario':<24} {'n':>8} {'obs rmse':>10} {'pos err(m)':>11} {'reward mae':>11} {'disagree':>9}")
+    for scenario, r in report.items():
+        print(f"{scenario:<24} {r['transitions']:>8} {r['obs_rmse']:>10.4f} {r['pos_error']:>11.4f} "
+              f"{r['reward_mae']:>11.3f} {r['disagreement']:>9.3f}")
+
+
+def train_ppo_in_model(model, start_obs, ppo_model, output, imagined_steps, num_envs=64, horizon=20,
+                       env_type='step', max_disagreement=None, seed=0):
+    """
+    ダイナミクスモデル内の想像ロールアウトで PPO を追加学習
+
+    Returns:
+        str: 保存したモデルのパス (.zip)
+    """
+    from stable_baselines3 import PPO
+    from scripts.pretrain_surrogate import SurrogateSB3VecEnv
+
+    imagined = ModelVecEnv(model, start_obs, num_envs=num_envs, horizon=horizon, env_type=env_type,
+                           max_disagreement=max_disagreement, seed=seed)
+    env = SurrogateSB3VecEnv(imagined)
+    agent = PPO.load(ppo_model, env=env, device='cpu')
+    print(f"\nImagined rollouts: {num_envs} envs x horizon {horizon}, {imagined_steps} steps")
+    agent.learn(total_timesteps=imagined_steps, progress_bar=True, reset_num_timesteps=False)
+    agent.save(output)
+    print(f"Model saved to {output}.zip (fine-tune it in Genesis with train_rl_step.py --base)")
+    return output + ".zip"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fit an ensemble dynamics model and train PPO on imagined rollouts')
+    parser.add_argument('--data', type=str, nargs='+', required=True, help='Dataset directories')
+    parser.add_argument('--out', type=str, default='dynamics_model.pt', help='Output dynamics model')
+    parser.add_argument('--load', type=str, default=None, help='Load a fitted model instead of training')
+    parser.add_argument('--members', type=int, default=5, help='Ensemble size')
+    parser.add_argument('--hidden', type=int, nargs='+', default=[200, 200], help='Hidden layer sizes')
+    parser.add_argument('--epochs', type=int, default=50, help='Training epochs')
+    parser.add_argument('--batch_size', type=int, default=256, help='Minibatch size')
+    parser.add_argument('--holdout', type=float, default=0.1, help='Fraction of episodes held out for the error report')
+    parser.add_argument('--env', type=str, default='step', choices=['flat', 'step'], help='Termination rule')
+    parser.add_argument('--ppo_model', type=str, default=None, help='PPO model to train on imagined rollouts')
+    parser.add_argument('--ppo_out', type=str, default=None, help='Output PPO name (default: <ppo_model>_imagined)')
+    parser.add_argument('--imagined_steps', type=int, default=200000, help='PPO timesteps inside the model')
+    parser.add_argument('--num_envs', type=int, default=64, help='Parallel imagined rollouts')
+    parser.add_argument('--horizon', type=int, default=20, help='Imagined rollout length')
+    parser.add_argument('--max_disagreement', type=float, default=None, help='Cut rollouts above this ensemble spread')
+    parser.add_argument('--seed', type=int, default=0, help='Seed')
+    args = parser.parse_args()
+
+    train_data, holdout_data = load_transitions(args.data, args.holdout, args.seed)
+    if train_data is None:
+        parser.error("使える遷移がありません（実行した行動を保存したエピソードがない）")
+    print(f"Transitions: {len(train_data['obs'])} train, {0 if holdout_data is None else len(holdout_data['obs'])} holdout")
+
+    if args.load:
+        model = EnsembleDynamics.load(args.load)
+    else:
+        model = EnsembleDynamics(train_data['obs'].shape[1], train_data['actions'].shape[1],
+                                 num_members=args.members, hidden=tuple(args.hidden), seed=args.seed)
+        model.fit(train_data, epochs=args.epochs, batch_size=args.batch_size)
+        model.save(args.out)
+        print(f"Dynamics model saved to {args.out}")
+
+    print_error_report(error_by_scenario(model, holdout_data if holdout_data is not None else train_data))
+
+    if args.ppo_model:
+        output = args.ppo_out or os.path.splitext(args.ppo_model)[0] + '_imagined'
+        train_ppo_in_model(model, train_data['obs'], args.ppo_model, output, args.imagined_steps,
+                           num_envs=args.num_envs, horizon=args.horizon, env_type=args.env,
+                           max_disagreement=args.max_disagreement, seed=args.seed)
@@ -11,10 +11,15 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import xrobocon.common as common
 
 import os
+import time
 import argparse
+import numpy as np
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.callbacks import BaseCallback, CallbackList
 from xrobocon.env import XRoboconEnv
+from xrobocon.stall_detector import parse_stall_option
+from xrobocon.metrics_stream import (MetricsStreamWriter, LOSS_KEYS, metrics_stream_path, load_metrics,
+                                     reward_term_means)
 
 class ProgressCallback(BaseCallback):
     """訓練進捗を表示するカスタムコールバック"""
@@ -50,13 +55,108 @@ class ProgressCallback(BaseCallback):
         
         return True
 
-def train_step_model(steps=10000, base_model='xrobocon_ppo.zip', env_type='flat', robot_type='tristar', save_name='xrobocon_ppo_tristar_flat'):
+class MetricsStreamCallback(BaseCallback):
+    """
+    学習メトリクスをバイナリストリーム (xrobocon/metrics_stream.py) に書き出すコールバック
+    全環境のエピソード結果と、PPO更新ごとのFPS・損失を記録する
+    環境が報酬内訳 (info['reward_terms']) を返す場合はその合計も記録し、学習終了時に平均を表示する
+    """
+    def __init__(self, path, verbose=0):
+        super().__init__(verbose)
+        self.path = path
+        self.writer = None
+        self.episode_rewards = None
+        self.episode_lengths = None
+        self.last_time = None
+        self.last_timesteps = 0
+    
+    def _on_training_start(self) -> None:
+        self.writer = MetricsStreamWriter(self.path)
+        self.episode_rewards = np.zeros(self.training_env.num_envs)
+        self.episode_lengths = np.zeros(self.training_env.num_envs, dtype=np.int64)
+        self.last_time = time.time()
+        self.last_timesteps = self.num_timesteps
+    
+    def _on_step(self) -> bool:
+        self.episode_rewards += self.locals['rewards']
+        self.episode_lengths += 1
+        
+        for i, done in enumerate(self.locals['dones']):
+            if done:
+                info = self.locals['infos'][i]
+                self.writer.write_episode(
+                    self.num_timesteps,
+                    float(self.episode_rewards[i]),
+                    int(self.episode_lengths[i]),
+                    scenario_type=info.get('scenario_type'),
+                    success=info.get('is_success'),
+                )
+                if 'reward_terms' in info:
+                    self.writer.write_reward_terms(self.num_timesteps, info['reward_terms'],
+                                                   scenario_type=info.get('scenario_type'))
+                self.episode_rewards[i] = 0.0
+                self.episode_lengths[i] = 0
+        return True
+    
+    def _write_update(self):
+        now = time.time()
+        elapsed = now - self.last_time
+        fps = (self.num_timesteps - self.last_timesteps) / elapsed if elapsed > 0 else None
+        # 直前の PPO 更新で記録された損失（ロガーの出力前の値）
+        values = self.logger.name_to_value
+        losses = {name: values[key] for name, key in LOSS_KEYS.items() if key in values}
+        self.writer.write_update(self.num_timesteps, fps=fps, **losses)
+        self.last_time = now
+        self.last_timesteps = self.num_timesteps
+    
+    def _on_rollout_start(self) -> None:
+        # SB3 はロールアウト収集 → 更新 の順なので、ここで前回の更新結果を記録できる
+        if self.num_timesteps > self.last_timesteps:
+            self._write_update()
+    
+    def _on_training_end(self) -> None:
+        if self.num_timesteps > self.last_timesteps:
+            self._write_update()
+        self.writer.close()
+        
+        if self.writer.reward_terms:
+            records, _ = load_metrics(self.path)
+            means = reward_term_means(records, self.writer.reward_terms, last=100)
+            print("\n報酬内訳 (直近100エピソードの平均合計):")
+            for name, value in sorted(means.items(), key=lambda item: -abs(item[1])):
+                print(f"  {name:<12} {value:>10.1f}")
+
+def make_callbacks(save_name, metrics=True):
+    """学習用のコールバック（進捗表示 + メトリクスストリーム）"""
+    callbacks = [ProgressCallback()]
+    if metrics:
+        callbacks.append(MetricsStreamCallback(metrics_stream_path(save_name)))
+    return CallbackList(callbacks)
+
+def save_checkpoint(model, save_name, curriculum=None):
+    """モデルとカリキュラム状態を保存"""
+    model.save(save_name)
+    if curriculum is not None:
+        from xrobocon.curriculum import curriculum_state_path
+        curriculum.save(curriculum_state_path(save_name))
+        print(f"カリキュラム: {curriculum.summary()}")
+
+def train_step_model(steps=10000, base_model='xrobocon_ppo.zip', env_type='flat', robot_type='tristar', save_name='xrobocon_ppo_tristar_flat', use_curriculum=False, metrics=True, stall_detection=None, reward_breakdown=False):
     """ロボットの訓練（転移学習）"""
     
+    curriculum = None
+    
     # 環境作成
     if env_type == 'step':
         from xrobocon.step_env import XRoboconStepEnv
-        env = XRoboconStepEnv(render_mode=None, robot_type=robot_type)
+        if use_curriculum:
+            # 成功率に応じてシナリオ確率を調整（状態はモデルと一緒に保存・再開）
+            from xrobocon.curriculum import ScenarioCurriculum, curriculum_state_path
+            curriculum = ScenarioCurriculum(XRoboconStepEnv.SCENARIO_TYPES, XRoboconStepEnv.SCENARIO_WEIGHTS)
+            if curriculum.load(curriculum_state_path(save_name)):
+                print(f"カリキュラム状態を読み込みました: {curriculum.summary()}")
+        env = XRoboconStepEnv(render_mode=None, robot_type=robot_type, curriculum=curriculum,
+                              stall_detection=stall_detection, reward_breakdown=reward_breakdown)
         print(f"環境: 段差乗り越え (Step Climbing), ロボット: {robot_type}")
     else:
         env = XRoboconEnv(render_mode=None, robot_type=robot_type)
@@ -79,13 +179,13 @@ def train_step_model(steps=10000, base_model='xrobocon_ppo.zip', env_type='flat'
         try:
             model.learn(
                 total_timesteps=steps,
-                callback=ProgressCallback(),
+                callback=make_callbacks(save_name, metrics),
                 progress_bar=True,
                 reset_num_timesteps=False
             )
         except KeyboardInterrupt:
             print("\n\n訓練が中断されました。モデルを保存しています...")
-            model.save(save_name)
+            save_checkpoint(model, save_name, curriculum)
             print(f"モデルを保存しました: {save_name}.zip")
             return
             
@@ -98,12 +198,12 @@ def train_step_model(steps=10000, base_model='xrobocon_ppo.zip', env_type='flat'
         try:
             model.learn(
                 total_timesteps=steps,
-                callback=ProgressCallback(),
+                callback=make_callbacks(save_name, metrics),
                 progress_bar=True
             )
         except KeyboardInterrupt:
             print("\n\n訓練が中断されました。モデルを保存しています...")
-            model.save(save_name)
+            save_checkpoint(model, save_name, curriculum)
             print(f"モデルを保存しました: {save_name}.zip")
             return
 
@@ -117,17 +217,17 @@ def train_step_model(steps=10000, base_model='xrobocon_ppo.zip', env_type='flat'
         try:
             model.learn(
                 total_timesteps=steps,
-                callback=ProgressCallback(),
+                callback=make_callbacks(save_name, metrics),
                 progress_bar=True
             )
         except KeyboardInterrupt:
             print("\n\n訓練が中断されました。モデルを保存しています...")
-            model.save(save_name)
+            save_checkpoint(model, save_name, curriculum)
             print(f"モデルを保存しました: {save_name}.zip")
             return
     
     # モデル保存
-    model.save(save_name)
+    save_checkpoint(model, save_name, curriculum)
     print(f"\n{'='*70}")
     print(f"モデルを保存しました: {save_name}.zip")
     print(f"{'='*70}\n")
@@ -176,10 +276,16 @@ if __name__ == "__main__":
     parser.add_argument('--env', type=str, default='flat', choices=['flat', 'step'], help='環境タイプ (flat, step)')
     parser.add_argument('--save_name', type=str, default='xrobocon_ppo_tristar_flat', help='保存モデル名')
     parser.add_argument('--robot', type=str, default='tristar', help='ロボットタイプ (tristar, tristar_large)')
+    parser.add_argument('--curriculum', action='store_true', help='成功率に応じたシナリオカリキュラムを使用 (stepのみ)')
+    parser.add_argument('--stall', type=str, nargs='*', default=None, metavar='KEY=VALUE',
+                        help='停滞したエピソードを打ち切る (stepのみ)。例: --stall window=150 max_speed=0.2')
+    parser.add_argument('--reward_terms', action='store_true',
+                        help='報酬の項目ごとのエピソード合計をメトリクスストリームに記録 (stepのみ)')
+    parser.add_argument('--no_metrics', action='store_true', help='メトリクスストリーム (<save_name>_metrics.bin) を書き出さない')
     args = parser.parse_args()
     
     if args.train:
-        train_step_model(steps=args.steps, base_model=args.base, env_type=args.env, robot_type=args.robot, save_name=args.save_name)
+        train_step_model(steps=args.steps, base_model=args.base, env_type=args.env, robot_type=args.robot, save_name=args.save_name, use_curriculum=args.curriculum, metrics=not args.no_metrics, stall_detection=parse_stall_option(args.stall), reward_breakdown=args.reward_terms)
     elif args.test:
         test_step_model(episodes=args.episodes, env_type=args.env, robot_type=args.robot, model_path=args.save_name)
     else:
@@ -9,7 +9,7 @@ from stable_baselines3 import PPO
 from xrobocon.step_hard_env import XRoboconStepHardEnv
 from xrobocon.common import load_trained_model
 
-def train_step_hard_loop(total_timesteps=100000, chunk_size=10000, base_model_path=None, robot_type='tristar', save_name=None):
+def train_step_hard_loop(total_timesteps=100000, chunk_size=10000, base_model_path=None, robot_type='tristar', save_name=None, use_curriculum=False):
     """
     段差乗り越え特化訓練ループ（段差80%、平地20%）
     
@@ -19,6 +19,7 @@ def train_step_hard_loop(total_timesteps=100000, chunk_size=10000, base_model_pa
         base_model_path: ベースとなるモデルのパス
         robot_type: ロボットタイプ ('tristar', 'tristar_large', etc.)
         save_name: 保存するモデル名（拡張子なし）。Noneの場合はデフォルト名を使用
+        use_curriculum: シナリオカリキュラムを使用するか（状態はモデルと一緒に保存され、次のループに引き継がれる）
     """
     
     # モデル保存ディレクトリとモデル名
@@ -60,6 +61,8 @@ def train_step_hard_loop(total_timesteps=100000, chunk_size=10000, base_model_pa
         # train_rl_step.py をサブプロセスとして実行
         # メモリリーク回避のため、Genesisを毎回再起動する
         cmd = f"python {script_path} --train --steps {chunk_size} --base {current_base_model} --env step --robot {robot_type} --save_name {model_name}"
+        if use_curriculum:
+            cmd += " --curriculum"
         
         print(f"コマンド実行: {cmd}")
         exit_code = os.system(cmd)
@@ -86,6 +89,7 @@ if __name__ == "__main__":
                         choices=['tristar', 'tristar_large', 'rocker_bogie', 'rocker_bogie_large'],
                         help='ロボットタイプ')
     parser.add_argument('--save_name', type=str, default=None, help='保存するモデル名（拡張子なし）')
+    parser.add_argument('--curriculum', action='store_true', help='成功率に応じたシナリオカリキュラムを使用')
     
     args = parser.parse_args()
     
@@ -100,5 +104,6 @@ if __name__ == "__main__":
         chunk_size=args.chunk,
         base_model_path=base_model_path,
         robot_type=args.robot,
-        save_name=args.save_name
+        save_name=args.save_name,
+        use_curriculum=args.curriculum
     )
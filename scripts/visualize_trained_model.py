@@ -1,5 +1,14 @@
 """
 訓練済みモデルの動作を可視化し、停滞時点のスクリーンショットを撮影
+
+--video を指定するとエピソードごとに動画 (.mp4) または PNG 連番 (ディレクトリ) を記録する。
+描画は --every ステップごとで、変換・書き出しはバックグラウンドスレッド (xrobocon/frame_capture.py)。
+--headless と組み合わせるとビューアを開かず、シミュレーションを待たせずに録画できる。
+
+使用例:
+    python scripts/visualize_trained_model.py --model xrobocon_ppo_tristar_large_step.zip --env step --robot tristar_large
+    python scripts/visualize_trained_model.py --model xrobocon_ppo_tristar_large_step.zip --env step --robot tristar_large \
+        --headless --video videos/step.mp4 --every 4
 """
 import sys
 import os
@@ -15,23 +24,41 @@ import argparse
 import genesis as gs
 from xrobocon.env import XRoboconEnv
 from xrobocon.step_env import XRoboconStepEnv
+from xrobocon.policy_runtime import load_policy, print_policy_latency
+from xrobocon.frame_capture import FrameCapture, capture_fps, make_frame_sink
 import xrobocon.common as common
 
-def visualize_trained_model(model_path, env_type='flat', robot_type='tristar'):
-    """訓練済みモデルの動作を可視化"""
+def episode_video_path(video, episode):
+    """エピソードごとの出力先 (videos/step.mp4 → videos/step_ep1.mp4, frames → frames/ep1)"""
+    root, ext = os.path.splitext(video)
+    if ext:
+        return f"{root}_ep{episode + 1}{ext}"
+    return os.path.join(video, f"ep{episode + 1}")
+
+def visualize_trained_model(model_path, env_type='flat', robot_type='tristar', video=None, every=4, headless=False,
+                            latency=False):
+    """訓練済みモデルの動作を可視化（video を指定すると録画、latency で推論時間を表示）"""
     
-    # 環境作成（描画あり）
+    # 環境作成（headless ではビューアを開かず、オフスクリーンのカメラだけ使う）
+    render_mode = "rgb_array" if headless else "human"
     if env_type == 'step':
-        env = XRoboconStepEnv(render_mode="human", robot_type=robot_type)
+        env = XRoboconStepEnv(render_mode=render_mode, robot_type=robot_type)
         # カメラ位置を段差エリアに調整
-        env.scene.viewer.set_camera_pose(pos=np.array([8.0, -3.0, 2.5]), lookat=np.array([4.0, 0.0, 0.5]))
+        camera_pos, camera_lookat = np.array([8.0, -3.0, 2.5]), np.array([4.0, 0.0, 0.5])
     else:
-        env = XRoboconEnv(render_mode="human", robot_type=robot_type)
+        env = XRoboconEnv(render_mode=render_mode, robot_type=robot_type)
         # カメラ位置を訓練エリアに調整
-        env.scene.viewer.set_camera_pose(pos=np.array([8.0, -3.0, 2.5]), lookat=np.array([5.0, 0.0, 0.0]))
+        camera_pos, camera_lookat = np.array([8.0, -3.0, 2.5]), np.array([5.0, 0.0, 0.0])
+    if not headless:
+        env.scene.viewer.set_camera_pose(pos=camera_pos, lookat=camera_lookat)
+    if video:
+        env.camera.set_pose(pos=camera_pos, lookat=camera_lookat)
     
-    # モデル読み込み
-    model = common.load_trained_model(model_path, env)
+    # モデル読み込み (.pt / .onnx の書き出し済みポリシーも可)
+    model = load_policy(model_path, env)
+    if latency:
+        obs, _ = env.reset()
+        print_policy_latency(model, obs)
     
     print("\n" + "="*70)
     print(f"訓練済みモデルの動作を可視化 ({env_type} environment)")
@@ -53,9 +80,18 @@ def visualize_trained_model(model_path, env_type='flat', robot_type='tristar'):
         min_dist = 999
         min_dist_step = 0
         
+        capture = None
+        if video:
+            output = episode_video_path(video, episode)
+            if os.path.dirname(output):
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+            capture = FrameCapture(env.camera, make_frame_sink(output, capture_fps(every)), every=every)
+        
         for step in range(1000): # ステップ数を増やす
             action, _ = model.predict(obs, deterministic=True)
             obs, reward, terminated, truncated, _ = env.step(action)
+            if capture is not None:
+                capture.step()
             
             # 現在の距離を計算
             robot_pos = env.robot.get_pos().cpu().numpy()
@@ -85,6 +121,9 @@ def visualize_trained_model(model_path, env_type='flat', robot_type='tristar'):
                 break
         
         print(f"  最終的な最小距離: {min_dist:.3f}m")
+        if capture is not None:
+            stats = capture.close()
+            print(f"  録画: {output} ({stats['written']} フレーム, 破棄 {stats['dropped']})")
         
         # 成功判定
         success = False
@@ -109,6 +148,12 @@ if __name__ == "__main__":
     parser.add_argument('--model', type=str, default='xrobocon_ppo.zip', help='モデルファイルのパス')
     parser.add_argument('--env', type=str, default='flat', choices=['flat', 'step'], help='環境タイプ (flat, step)')
     parser.add_argument('--robot', type=str, default='tristar', help='ロボットタイプ')
+    parser.add_argument('--video', type=str, default=None,
+                        help='録画の出力先 (.mp4 なら動画、それ以外は PNG 連番のディレクトリ。エピソードごとに番号を付加)')
+    parser.add_argument('--every', type=int, default=4, help='録画で描画する間隔 (ステップ数)')
+    parser.add_argument('--headless', action='store_true', help='ビューアを開かずに実行 (--video と併用)')
+    parser.add_argument('--latency', action='store_true',
+                        help='可視化の前に predict() 1回あたりの推論時間を表示する (書き出したポリシーは元のSB3モデルと比較)')
     args = parser.parse_args()
     
     # Mac (MPS) 用の環境変数設定
@@ -118,4 +163,5 @@ if __name__ == "__main__":
          print(f"エラー: モデルファイルが見つかりません: {args.model}")
          exit(1)
 
-    visualize_trained_model(args.model, args.env, args.robot)
+    visualize_trained_model(args.model, args.env, args.robot, video=args.video, every=args.every,
+                            headless=args.headless, latency=args.latency)
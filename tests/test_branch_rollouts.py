@@ -0,0 +1,54 @@
+"""
+スナップショットと分岐ロールアウトのテスト (Genesis 不要の部分)
+ゲーム状態の保存・復元と、分岐一覧の作成を確認
+"""
+import numpy as np
+from xrobocon.game import XRoboconGame
+from scripts.branch_rollouts import make_branch_jobs
+
+class _FixedRobot:
+    """指定位置に止まっているロボット"""
+    def __init__(self, pos):
+        self.pos = np.array(pos, dtype=np.float64)
+
+    def get_pos(self):
+        return self.pos
+
+def test_game_state_roundtrip():
+    """復元後は保存時点の時間・得点・スポットから同じように進む"""
+    game = XRoboconGame(field=None, robot=_FixedRobot((4.0, 0.0, 0.105)))
+    game.time_limit = 5.0
+    game.start()
+    for _ in range(50):
+        game.update(0.01)
+    state = game.get_state()
+
+    for _ in range(200):
+        game.update(0.01)
+    after = (game.elapsed_time, game.spots[0]['stay_timer'], game.score)
+
+    game.set_state(state)
+    assert np.isclose(game.elapsed_time, 0.5)
+    assert np.isclose(game.spots[0]['stay_timer'], 0.5)
+    for _ in range(200):
+        game.update(0.01)
+    assert np.isclose(game.elapsed_time, after[0]) and np.isclose(game.spots[0]['stay_timer'], after[1])
+    assert game.score == after[2]
+
+    # 保存した状態は後の更新で書き換わらない
+    assert np.isclose(state['spots'][0]['stay_timer'], 0.5)
+
+def test_branch_jobs():
+    sequences = np.zeros((2, 10, 4))
+    jobs = make_branch_jobs(['a.zip', 'scripted'], noise_policy='a.zip', noise=0.2, noise_branches=3,
+                            action_sequences=sequences)
+    assert [j['name'] for j in jobs][:2] == ['a.zip', 'scripted']
+    noise_jobs = [j for j in jobs if j.get('noise')]
+    assert len(noise_jobs) == 3 and len({j['noise_seed'] for j in noise_jobs}) == 3
+    action_jobs = [j for j in jobs if 'actions' in j]
+    assert len(action_jobs) == 2 and action_jobs[0]['actions'].shape == (10, 4)
+
+if __name__ == "__main__":
+    test_game_state_roundtrip()
+    test_branch_jobs()
+    print("OK")
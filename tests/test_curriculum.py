@@ -0,0 +1,53 @@
+"""
+シナリオカリキュラムのテスト
+成功率に応じてサンプリング確率が境界シナリオへ寄ることを確認
+"""
+import os
+import tempfile
+import numpy as np
+from xrobocon.curriculum import ScenarioCurriculum
+
+SCENARIOS = ['flat_easy', 'step_straight', 'step_tier3_to_tier2']
+
+def test_frontier_weighting():
+    """習得済みシナリオより、成功率50%前後のシナリオが多くサンプリングされる"""
+    curriculum = ScenarioCurriculum(SCENARIOS, window=20, min_episodes=5, min_prob=0.05)
+    
+    for i in range(20):
+        curriculum.update('flat_easy', True)               # 習得済み (100%)
+        curriculum.update('step_straight', i % 2 == 0)     # 境界 (50%)
+        curriculum.update('step_tier3_to_tier2', False)    # 未習得 (0%)
+    
+    weights = curriculum.get_weights()
+    assert np.isclose(weights.sum(), 1.0)
+    assert weights[1] > 0.8
+    # 習得済み・未習得にも最低確率は残る
+    assert weights[0] >= 0.04 and weights[2] >= 0.04
+
+def test_disabled_scenarios_are_never_sampled():
+    """事前の重みが0のシナリオは選ばれない"""
+    curriculum = ScenarioCurriculum(SCENARIOS, base_weights=[1.0, 0.0, 0.0])
+    np.random.seed(0)
+    assert all(curriculum.sample() == 'flat_easy' for _ in range(50))
+
+def test_save_and_load():
+    """状態を保存して別インスタンスで再開できる"""
+    curriculum = ScenarioCurriculum(SCENARIOS, min_episodes=1)
+    curriculum.update('step_straight', True)
+    curriculum.update('step_straight', False)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model_curriculum.json')
+        curriculum.save(path)
+        
+        restored = ScenarioCurriculum(SCENARIOS, min_episodes=1)
+        assert restored.load(path)
+        assert restored.success_rates()['step_straight'] == 0.5
+        assert restored.episode_counts['step_straight'] == 2
+        assert np.allclose(restored.get_weights(), curriculum.get_weights())
+
+if __name__ == "__main__":
+    test_frontier_weighting()
+    test_disabled_scenarios_are_never_sampled()
+    test_save_and_load()
+    print("OK")
@@ -0,0 +1,71 @@
+"""
+DAgger ワーカーのテスト (Genesis / SB3 不要の部分)
+同じパスに上書き保存されたポリシーの検出と、推論サーバー経由のエキスパートでのロールアウトを確認
+"""
+import os
+import tempfile
+import numpy as np
+import scripts.train_dagger as train_dagger
+from scripts.train_dagger import _policy_key, _run_dagger_episode
+
+class _FakeEnv:
+    """行動の和だけ x が進み、3ステップで終わる環境"""
+    def reset(self, options=None):
+        self.t = 0
+        self.x = 0.0
+        return self._obs(), {}
+
+    def _obs(self):
+        return np.array([self.x, 0.0], dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        self.x += float(np.sum(action))
+        done = self.t >= 3
+        return self._obs(), 1.0, done, False, {'is_success': done} if done else {}
+
+class _FakeClient:
+    """PolicyClient と同じ呼び出し方 (act は行動、predict は (行動, None))"""
+    def __init__(self, value):
+        self.value = value
+
+    def act(self, obs):
+        return np.full(2, self.value, dtype=np.float32)
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        return self.act(obs), None
+
+def test_policy_key_changes_when_overwritten():
+    """train_bc は毎イテレーション同じパスに保存するので、キーは内容で変わる"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'dagger.zip')
+        with open(path, 'wb') as f:
+            f.write(b'iteration 1')
+        first = _policy_key(path)
+        assert _policy_key(path[:-4]) == first  # 拡張子なしでも同じファイル
+
+        with open(path, 'wb') as f:
+            f.write(b'iteration 2 weights')
+        assert _policy_key(path) != first
+
+def test_episode_with_policy_client_expert(monkeypatch):
+    """推論サーバーのエキスパートでも行動ラベルは (steps, action_dim) の配列になる"""
+    monkeypatch.setattr(train_dagger, '_worker_env', _FakeEnv())
+    monkeypatch.setattr(train_dagger, '_worker_expert', _FakeClient(0.5))
+    job = {'index': 0, 'scenario': 'step_straight', 'seed': 1, 'policy_path': None, 'beta': 1.0, 'max_steps': 10}
+    result = _run_dagger_episode(job)
+    assert result['actions'].shape == (3, 2) and np.all(result['actions'] == 0.5)
+    assert result['success'] and result['expert_fraction'] == 1.0
+
+    # beta=0 では学習中のポリシーの行動を実行し、ラベルはエキスパートの行動のまま
+    monkeypatch.setattr(train_dagger, '_load_worker_policy', lambda path: _FakeClient(-1.0))
+    result = _run_dagger_episode(dict(job, policy_path='learner.zip', beta=0.0))
+    assert np.all(result['actions'] == 0.5) and result['expert_fraction'] == 0.0
+    assert np.isclose(result['obs'][-1][0], -4.0)
+
+if __name__ == "__main__":
+    import pytest
+    test_policy_key_changes_when_overwritten()
+    with pytest.MonkeyPatch.context() as mp:
+        test_episode_with_policy_client_expert(mp)
+    print("OK")
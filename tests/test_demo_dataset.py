@@ -0,0 +1,145 @@
+"""
+デモンストレーションデータセットのテスト
+チャンクをまたぐ追記、エピソードの破棄、再オープン後の追記、ミニバッチの取得を確認
+"""
+import os
+import tempfile
+import numpy as np
+from xrobocon.demo_dataset import (DemoDatasetWriter, DemoDataset, import_legacy_demos, import_npz_demos,
+                                   is_dataset, remove_dataset)
+
+OBS_DIM = 40
+ACTION_DIM = 4
+
+def _episode(start, length):
+    """観測・アクションに通し番号を埋め込んだエピソード"""
+    steps = np.arange(start, start + length, dtype=np.float32)
+    obs = np.repeat(steps[:, None], OBS_DIM, axis=1)
+    actions = np.repeat(steps[:, None], ACTION_DIM, axis=1)
+    return obs, actions, np.ones(length, dtype=np.float32)
+
+def test_append_across_chunks_and_discard():
+    """チャンク境界をまたいで記録でき、破棄したエピソードは残らない"""
+    with tempfile.TemporaryDirectory() as root:
+        writer = DemoDatasetWriter(root, OBS_DIM, ACTION_DIM, chunk_size=16)
+
+        obs, actions, rewards = _episode(0, 10)
+        writer.begin_episode()
+        for o, a, r in zip(obs, actions, rewards):
+            writer.add(o, a, r)
+        assert writer.end_episode(keep=True, source='manual') == 10
+
+        # 破棄するエピソード
+        writer.begin_episode()
+        writer.add_batch(*_episode(100, 7))
+        assert writer.end_episode(keep=False) == 0
+
+        writer.begin_episode()
+        writer.add_batch(*_episode(10, 20))
+        writer.end_episode(keep=True, source='scripted')
+        writer.close()
+
+        dataset = DemoDataset(root)
+        assert len(dataset) == 30 and dataset.num_chunks == 2
+        assert [e['length'] for e in dataset.episodes] == [10, 20]
+        assert dataset.episodes[1]['source'] == 'scripted'
+
+        obs, actions, episode = dataset.get(np.arange(30), fields=('obs', 'actions', 'episode'))
+        assert np.array_equal(obs[:, 0], np.arange(30))
+        assert np.array_equal(episode, [0] * 10 + [1] * 20)
+
+def test_reopen_and_batches():
+    """再オープン後に追記でき、1エポックで全遷移がちょうど1回ずつ返る"""
+    with tempfile.TemporaryDirectory() as root:
+        writer = DemoDatasetWriter(root, OBS_DIM, ACTION_DIM, chunk_size=16)
+        writer.add_batch(*_episode(0, 12))
+        writer.end_episode()
+        writer.close()
+
+        writer = DemoDatasetWriter(root, OBS_DIM, ACTION_DIM)
+        writer.add_batch(*_episode(12, 25))
+        writer.end_episode()
+        writer.close()
+
+        dataset = DemoDataset(root)
+        assert len(dataset) == 37
+
+        seen = []
+        for obs, actions in dataset.iter_batches(8, rng=np.random.default_rng(0)):
+            assert len(obs) <= 8
+            assert np.array_equal(obs[:, 0], actions[:, 0])
+            seen.extend(obs[:, 0].astype(int).tolist())
+        assert sorted(seen) == list(range(37))
+
+        obs, actions = dataset.sample(64, rng=np.random.default_rng(1))
+        assert obs.shape == (64, OBS_DIM) and np.array_equal(obs[:, 0], actions[:, 0])
+
+def test_import_npz():
+    """旧形式の npz デモを取り込める"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        obs, actions, rewards = _episode(0, 5)
+        path = os.path.join(tmp_dir, 'demo_1.npz')
+        np.savez(path, obs=obs, actions=actions, rewards=rewards)
+
+        root = os.path.join(tmp_dir, 'dataset')
+        assert import_npz_demos([path], root, source='manual') == 1
+        # 2回目は取り込み済みなので何もしない
+        assert import_npz_demos([path], root) == 0
+        dataset = DemoDataset(root)
+        assert len(dataset) == 5 and dataset.episodes[0]['source_file'] == 'demo_1.npz'
+
+def test_legacy_demos_in_dagger_dataset_dir():
+    """
+    npz のあるディレクトリに DAgger が追記する順序
+    (取り込みは writer を開く前に一度だけ。その後の取り込みは何もせず、取り込んだエピソードは残る)
+    """
+    with tempfile.TemporaryDirectory() as root:
+        obs, actions, rewards = _episode(0, 4)
+        np.savez(os.path.join(root, 'demo_1.npz'), obs=obs, actions=actions, rewards=rewards)
+        assert import_legacy_demos(root, source='manual') == 1
+
+        writer = DemoDatasetWriter(root, OBS_DIM, ACTION_DIM, chunk_size=8)
+        for iteration in range(2):
+            obs, actions, rewards = _episode(100 * (iteration + 1), 3)
+            writer.begin_episode()
+            writer.add_batch(obs, actions, rewards)
+            writer.end_episode(keep=True, source='dagger')
+            assert import_legacy_demos(root, source='manual') == 0
+        writer.close()
+
+        dataset = DemoDataset(root)
+        assert [e['source'] for e in dataset.episodes] == ['manual', 'dagger', 'dagger']
+        assert len(dataset) == 10
+        rows = [int(v) for batch_obs, _ in dataset.iter_batches(16, shuffle=False) for v in batch_obs[:, 0]]
+        assert rows == list(range(4)) + [100, 101, 102, 200, 201, 202]
+
+def test_remove_dataset_keeps_other_files():
+    """作り直し用の削除はデータセットのファイルだけを消す"""
+    with tempfile.TemporaryDirectory() as root:
+        writer = DemoDatasetWriter(root, OBS_DIM, ACTION_DIM, chunk_size=4)
+        writer.begin_episode()
+        writer.add_batch(*_episode(0, 6))
+        writer.end_episode(keep=True, source='teacher')
+        writer.close()
+        with open(os.path.join(root, 'notes.txt'), 'w') as f:
+            f.write('keep')
+
+        remove_dataset(root)
+        assert not is_dataset(root) and os.listdir(root) == ['notes.txt']
+
+        # 作り直したデータセットには前の遷移が残らない
+        writer = DemoDatasetWriter(root, OBS_DIM, ACTION_DIM, chunk_size=4)
+        writer.begin_episode()
+        writer.add_batch(*_episode(50, 3))
+        writer.end_episode(keep=True, source='teacher')
+        writer.close()
+        dataset = DemoDataset(root)
+        assert len(dataset) == 3 and len(dataset.episodes) == 1
+
+if __name__ == "__main__":
+    test_append_across_chunks_and_discard()
+    test_reopen_and_batches()
+    test_import_npz()
+    test_legacy_demos_in_dagger_dataset_dir()
+    test_remove_dataset_keeps_other_files()
+    print("OK")
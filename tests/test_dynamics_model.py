@@ -0,0 +1,99 @@
+"""
+ダイナミクスモデル周りのテスト (torch 不要の部分)
+データセットからの遷移の作成・エピソード単位の分割・観測からの終了判定・想像環境の自動リセットを確認
+"""
+import tempfile
+import numpy as np
+from xrobocon.demo_dataset import DemoDataset, DemoDatasetWriter
+from xrobocon.dynamics_model import (ModelVecEnv, error_by_scenario, executed_action_episodes, split_episodes,
+                                     terminal_from_obs, transitions_from_dataset)
+
+class _DriftModel:
+    """x 座標を行動の先頭要素だけ進め、ターゲットベクトルも合わせて変える決定論的なモデル"""
+    obs_dim = 40
+    action_dim = 2
+    num_members = 3
+
+    def predict(self, obs, actions, member=None):
+        next_obs = obs.copy()
+        next_obs[:, 0] += actions[:, 0]
+        next_obs[:, 12] -= actions[:, 0]
+        return next_obs, actions[:, 0].astype(np.float32), np.zeros(len(obs))
+
+def _write_dataset(root):
+    writer = DemoDatasetWriter(root, obs_dim=40, action_dim=2, chunk_size=4)
+    for ep, (length, scenario) in enumerate([(5, 'a'), (3, 'b'), (1, 'a')]):
+        obs = np.zeros((length, 40), dtype=np.float32)
+        obs[:, 0] = np.arange(length) + 100 * ep
+        writer.begin_episode()
+        writer.add_batch(obs, np.ones((length, 2)), np.arange(length))
+        writer.end_episode(keep=True, scenario=scenario)
+    writer.close()
+
+def test_transitions_stay_within_episodes():
+    """次の観測は同じエピソードの次のステップで、エピソードをまたがない"""
+    with tempfile.TemporaryDirectory() as root:
+        _write_dataset(root)
+        data = transitions_from_dataset(DemoDataset(root))
+        # 長さ5 → 4遷移, 長さ3 → 2遷移, 長さ1 → 0遷移
+        assert len(data['obs']) == 6
+        assert np.allclose(data['next_obs'][:, 0] - data['obs'][:, 0], 1.0)
+        assert list(data['scenario']) == ['a'] * 4 + ['b'] * 2
+        assert np.allclose(data['rewards'], [0, 1, 2, 3, 0, 1])
+
+        train, holdout = split_episodes(DemoDataset(root).episodes, holdout_fraction=0.34, seed=0)
+        assert len(train) == 2 and len(holdout) == 1
+        assert {e['id'] for e in train} | {e['id'] for e in holdout} == {0, 1, 2}
+
+        report = error_by_scenario(_DriftModel(), data)
+        assert report['a']['transitions'] == 4 and report['all']['transitions'] == 6
+        assert report['all']['pos_error'] < 1e-6
+
+def test_skips_dagger_label_episodes():
+    """DAgger の行動はエキスパートのラベルなので、全ステップでエキスパートが実行したエピソードだけ使う"""
+    with tempfile.TemporaryDirectory() as root:
+        writer = DemoDatasetWriter(root, obs_dim=40, action_dim=2, chunk_size=4)
+        metadata = [{'source': 'manual'}, {'source': 'dagger', 'expert_fraction': 0.5},
+                    {'source': 'dagger', 'expert_fraction': 1.0}, {'source': 'scripted'}]
+        for meta in metadata:
+            writer.begin_episode()
+            writer.add_batch(np.zeros((3, 40)), np.ones((3, 2)), np.zeros(3))
+            writer.end_episode(keep=True, **meta)
+        writer.close()
+
+        dataset = DemoDataset(root)
+        assert [e['id'] for e in executed_action_episodes(dataset.episodes)] == [0, 2, 3]
+        assert len(transitions_from_dataset(dataset)['obs']) == 6
+
+def test_terminal_from_obs():
+    obs = np.zeros((4, 40), dtype=np.float32)
+    obs[:, 2] = 0.1
+    obs[:, 12] = [0.2, 2.0, 2.0, 0.2]
+    obs[2, 3] = 65.0  # flat では転倒、step では許容
+    obs[3, 14] = 0.15  # 目標の方が 15cm 高い
+    success, failed = terminal_from_obs(obs, 'flat')
+    assert list(success) == [True, False, False, True] and list(failed) == [False, False, True, False]
+    success, failed = terminal_from_obs(obs, 'step')
+    assert list(success) == [True, False, False, False] and not failed.any()
+
+def test_model_vec_env_resets():
+    """成功・打ち切りで自動リセットし、info に終了時の観測が入る"""
+    start = np.zeros((1, 40), dtype=np.float32)
+    start[0, 2] = 0.1
+    start[0, 12] = 1.0
+    env = ModelVecEnv(_DriftModel(), start, num_envs=2, horizon=3, env_type='flat', seed=0)
+    env.reset()
+    obs, rewards, terminated, truncated, infos = env.step(np.array([[0.6, 0.0], [0.0, 0.0]]))
+    assert terminated[0] and infos[0]['is_success'] and np.isclose(infos[0]['terminal_observation'][12], 0.4)
+    assert np.isclose(obs[0, 12], 1.0)  # リセット済み
+    assert np.isclose(rewards[0], 0.6)
+    for _ in range(2):
+        obs, rewards, terminated, truncated, infos = env.step(np.zeros((2, 2)))
+    assert truncated[1] and infos[1]['TimeLimit.truncated'] and not infos[1]['is_success']
+
+if __name__ == "__main__":
+    test_transitions_stay_within_episodes()
+    test_skips_dagger_label_episodes()
+    test_terminal_from_obs()
+    test_model_vec_env_resets()
+    print("OK")
@@ -0,0 +1,46 @@
+"""
+評価統計のテスト
+Wilson信頼区間と逐次検定による早期停止を確認
+"""
+from xrobocon.eval_stats import wilson_interval, SequentialStopper
+
+def test_wilson_interval():
+    """既知の値と一致し、0%/100%でも区間が[0, 1]に収まる"""
+    low, high = wilson_interval(5, 10, confidence=0.95)
+    assert abs(low - 0.2366) < 1e-3 and abs(high - 0.7634) < 1e-3
+
+    low, high = wilson_interval(0, 10)
+    assert low < 1e-9 and 0.0 < high < 0.35
+    low, high = wilson_interval(10, 10)
+    assert 0.65 < low < 1.0 and high > 1.0 - 1e-9
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+def test_stop_when_clearly_below_threshold():
+    """全く成功しないシナリオは最小エピソード数で打ち切られる"""
+    stopper = SequentialStopper(ci_width=0.1, threshold=0.5, min_episodes=5)
+    for i in range(4):
+        stopper.update('step_straight', False)
+        assert not stopper.is_stopped('step_straight')
+    stopper.update('step_straight', False)
+    assert stopper.stop_reasons['step_straight'] == 'below_threshold'
+
+    # 停止後の結果は記録しない
+    stopper.update('step_straight', True)
+    assert stopper.counts['step_straight'] == 5
+
+def test_borderline_scenario_keeps_sampling():
+    """成功率が閾値付近のシナリオは区間が狭くなるまで続ける"""
+    stopper = SequentialStopper(ci_width=0.2, threshold=0.5, min_episodes=5)
+    for i in range(20):
+        stopper.update('step_tier3_to_tier2', i % 2 == 0)
+    assert not stopper.is_stopped('step_tier3_to_tier2')
+
+    for i in range(100):
+        stopper.update('step_tier3_to_tier2', i % 2 == 0)
+    assert stopper.stop_reasons['step_tier3_to_tier2'] == 'ci_width'
+
+if __name__ == "__main__":
+    test_wilson_interval()
+    test_stop_when_clearly_below_threshold()
+    test_borderline_scenario_keeps_sampling()
+    print("OK")
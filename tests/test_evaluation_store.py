@@ -0,0 +1,80 @@
+"""
+評価結果ストアのテスト
+キーによる検索、再読み込み、物理条件・報酬の重みによる区別を確認
+"""
+import copy
+import os
+import tempfile
+import xrobocon.robot_configs as robot_configs
+from xrobocon.evaluation_store import EvaluationStore, file_hash, physics_profile
+
+def _record(model_hash, scenario, seed, success, robot_type='tristar_large', env_type='step'):
+    return {
+        'model_hash': model_hash, 'env_type': env_type, 'robot_type': robot_type,
+        'scenario': scenario, 'seed': seed, 'physics_profile': physics_profile(robot_type),
+        'success': success, 'reward': 10.0 if success else -1.0, 'steps': 100, 'min_dist': 0.3,
+    }
+
+def test_store_roundtrip():
+    """追記したレコードが別インスタンスから検索できる"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'episodes.jsonl')
+        store = EvaluationStore(path)
+        store.add(_record('aaa', 'step_straight', 1, True))
+        store.add(_record('aaa', 'step_straight', 2, False))
+        store.add(_record('bbb', 'step_straight', 1, True))
+
+        reloaded = EvaluationStore(path)
+        profile = physics_profile('tristar_large')
+        record = reloaded.get('aaa', 'step', 'tristar_large', 'step_straight', 2, profile)
+        assert record is not None and record['success'] is False
+        assert reloaded.get('aaa', 'step', 'tristar_large', 'step_straight', 3, profile) is None
+
+        summary = reloaded.summarize(env_type='step')
+        aaa = ('aaa', 'step', 'tristar_large', profile)
+        assert summary[aaa]['step_straight']['count'] == 2
+        assert summary[aaa]['step_straight']['success_rate'] == 0.5
+        assert summary[('bbb', 'step', 'tristar_large', profile)]['step_straight']['success_rate'] == 1.0
+
+def test_summary_separates_conditions():
+    """同じモデルでも環境やロボットが違う結果は混ぜない"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = EvaluationStore(os.path.join(tmp_dir, 'episodes.jsonl'))
+        store.add(_record('aaa', 'step_straight', 1, True))
+        store.add(_record('aaa', 'step_straight', 1, False, env_type='step_hard'))
+        store.add(_record('aaa', 'step_straight', 1, False, robot_type='tristar'))
+        summary = store.summarize(model_hash='aaa')
+        assert len(summary) == 3
+        assert all(per_model['step_straight']['count'] == 1 for per_model in summary.values())
+
+def test_file_hash_is_content_based():
+    """同じ内容のファイルは名前が違っても同じハッシュ"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, name) for name in ('a.zip', 'b.zip')]
+        for path in paths:
+            with open(path, 'wb') as f:
+                f.write(b'model weights')
+        assert file_hash(paths[0]) == file_hash(paths[1])
+
+def test_physics_profile_differs_by_robot():
+    """ロボットの物理パラメータが異なれば別の評価条件"""
+    assert physics_profile('tristar') != physics_profile('tristar_large')
+    assert physics_profile('tristar') == physics_profile('tristar')
+
+def test_physics_profile_includes_reward_weights(monkeypatch):
+    """報酬の重みを変えたら、前の評価結果は使わない"""
+    before = physics_profile('tristar_large')
+    config = copy.deepcopy(robot_configs.get_robot_config('tristar_large'))
+    config['reward_params']['height_gain_weight'] = config['reward_params'].get('height_gain_weight', 0.0) + 1.0
+    monkeypatch.setattr('xrobocon.evaluation_store.get_robot_config', lambda robot_type: config)
+    assert physics_profile('tristar_large') != before
+
+if __name__ == "__main__":
+    test_store_roundtrip()
+    test_file_hash_is_content_based()
+    test_summary_separates_conditions()
+    test_physics_profile_differs_by_robot()
+    import pytest
+    with pytest.MonkeyPatch.context() as mp:
+        test_physics_profile_includes_reward_weights(mp)
+    print("OK")
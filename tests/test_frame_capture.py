@@ -0,0 +1,80 @@
+"""
+非同期フレームキャプチャのテスト (Genesis / OpenCV 不要)
+間引き描画・変換・書き出し待ちでのフレーム破棄を確認
+"""
+import threading
+import numpy as np
+from xrobocon.frame_capture import FrameCapture, capture_fps, to_bgr_uint8
+
+class _FakeCamera:
+    """呼ばれた回数を赤チャンネルに入れた画像を返すカメラ"""
+    def __init__(self):
+        self.renders = 0
+
+    def render(self):
+        rgb = np.zeros((4, 6, 3), dtype=np.float32)
+        rgb[..., 0] = self.renders / 255.0
+        self.renders += 1
+        return rgb, None, None, None
+
+class _ListSink:
+    def __init__(self, gate=None):
+        self.frames = []
+        self.gate = gate
+        self.closed = False
+
+    def write(self, frame):
+        if self.gate is not None:
+            self.gate.wait()
+        self.frames.append(frame)
+
+    def close(self):
+        self.closed = True
+
+def test_to_bgr_uint8():
+    rgb = np.zeros((2, 2, 4), dtype=np.float32)
+    rgb[..., 0] = 1.0
+    rgb[..., 2] = 2.0  # 範囲外はクリップ
+    bgr = to_bgr_uint8(rgb)
+    assert bgr.shape == (2, 2, 3) and bgr.dtype == np.uint8
+    assert np.all(bgr[..., 0] == 255) and np.all(bgr[..., 2] == 255) and np.all(bgr[..., 1] == 0)
+    assert to_bgr_uint8(np.full((1, 1, 3), 7, dtype=np.uint8))[0, 0, 0] == 7
+
+def test_decimated_capture():
+    camera = _FakeCamera()
+    sink = _ListSink()
+    capture = FrameCapture(camera, sink, every=3)
+    for _ in range(10):
+        capture.step()
+    stats = capture.close()
+
+    # ステップ 0, 3, 6, 9 だけ描画
+    assert camera.renders == 4
+    assert stats == {'rendered': 4, 'written': 4, 'dropped': 0}
+    assert [int(f[0, 0, 2]) for f in sink.frames] == [0, 1, 2, 3]
+    assert sink.closed
+    assert np.isclose(capture_fps(4, dt=0.01), 25.0)
+
+def test_drops_frames_when_encoder_is_slow():
+    """書き出しが詰まっている間はキューの容量を超えたフレームを捨て、step() は待たない"""
+    gate = threading.Event()
+    sink = _ListSink(gate)
+    capture = FrameCapture(_FakeCamera(), sink, every=1, queue_size=2, keep_latest=True)
+    for _ in range(20):
+        capture.step()
+    gate.set()
+    stats = capture.close()
+
+    assert stats['rendered'] == 20
+    assert stats['dropped'] > 0
+    assert stats['written'] + stats['dropped'] == 20
+    # 書き出せたフレームは描画順で、最新フレームは最後に書き出したもの
+    written = [int(f[0, 0, 2]) for f in sink.frames]
+    assert written == sorted(written)
+    assert capture.latest is sink.frames[-1]
+
+if __name__ == "__main__":
+    test_to_bgr_uint8()
+    test_decimated_capture()
+    test_drops_frames_when_encoder_is_slow()
+    print("OK")
@@ -0,0 +1,62 @@
+"""
+学習メトリクスストリームのテスト
+追記・追いかけ読み込み・min/max間引きを確認
+"""
+import os
+import tempfile
+import numpy as np
+from xrobocon.metrics_stream import (MetricsStreamWriter, MetricsStreamReader, load_metrics,
+                                     decimate_minmax, KIND_EPISODE, KIND_UPDATE, NO_SCENARIO)
+
+def test_write_and_tail():
+    """書き込んだレコードが読み手に順に届き、再オープン後も追記される"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model_metrics.bin')
+        reader = MetricsStreamReader(path)
+        assert len(reader.read_new()) == 0
+
+        writer = MetricsStreamWriter(path, buffer_size=4)
+        writer.write_episode(100, 12.5, 100, scenario_type='step_straight', success=True)
+        writer.write_episode(250, -3.0, 150, scenario_type='flat_easy', success=False)
+        writer.write_update(256, fps=120.0, value_loss=0.5)
+        writer.flush()
+
+        records = reader.read_new()
+        assert len(records) == 3
+        assert list(records['kind']) == [KIND_EPISODE, KIND_EPISODE, KIND_UPDATE]
+        assert reader.scenarios[records['scenario'][1]] == 'flat_easy'
+        assert records['success'][0] == 1 and records['success'][1] == 0
+        assert records['scenario'][2] == NO_SCENARIO
+        assert np.isnan(records['policy_loss'][2]) and records['value_loss'][2] == 0.5
+        writer.close()
+
+        # 別プロセス（チャンク）からの追記
+        writer = MetricsStreamWriter(path)
+        writer.write_episode(400, 1.0, 50, scenario_type='step_straight', success=False)
+        writer.close()
+        records = reader.read_new()
+        assert len(records) == 1 and reader.scenarios[records['scenario'][0]] == 'step_straight'
+
+        all_records, scenarios = load_metrics(path)
+        assert len(all_records) == 4 and scenarios == ['step_straight', 'flat_easy']
+
+def test_decimate_minmax_keeps_extremes():
+    """間引き後も点数が上限以下で、スパイクが残る"""
+    x = np.arange(100000)
+    y = np.sin(x / 1000.0)
+    y[54321] = 10.0
+    y[12345] = -10.0
+
+    dx, dy = decimate_minmax(x, y, max_points=500)
+    assert len(dx) <= 500
+    assert dy.max() == 10.0 and dy.min() == -10.0
+    assert np.all(np.diff(dx) >= 0)
+
+    # 上限以下ならそのまま
+    sx, sy = decimate_minmax(x[:100], y[:100], max_points=500)
+    assert len(sx) == 100
+
+if __name__ == "__main__":
+    test_write_and_tail()
+    test_decimate_minmax_keeps_extremes()
+    print("OK")
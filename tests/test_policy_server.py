@@ -0,0 +1,101 @@
+"""
+ローカル推論サーバーのテスト
+複数クライアントの同時要求がまとめて推論され、各クライアントに正しい行動が返ることを確認
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+from xrobocon.policy_server import PolicyServer, PolicyClient
+
+class _LinearPolicy:
+    """観測の先頭4要素を2倍して返すポリシー"""
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, obs, deterministic=True):
+        self.calls += 1
+        return obs[:, :4] * 2.0, None
+
+def _start_server(tmp_dir, **kwargs):
+    socket_path = os.path.join(tmp_dir, 'policy.sock')
+    server = PolicyServer(socket_path, loader=lambda path: _LinearPolicy(), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    model_path = os.path.join(tmp_dir, 'model.zip')
+    with open(model_path, 'wb') as f:
+        f.write(b'weights')
+    return server, socket_path, model_path
+
+def test_concurrent_clients_are_batched():
+    """同時に届いた要求は1回の推論にまとめられる"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server, socket_path, model_path = _start_server(tmp_dir, window=0.05)
+        try:
+            clients = [PolicyClient(socket_path, model_path) for _ in range(8)]
+            # 同じモデルは一度だけ読み込まれる
+            assert len(server.models) == 1
+
+            results = [None] * len(clients)
+            def run(i):
+                obs = np.full(40, i, dtype=np.float32)
+                results[i] = clients[i].predict(obs, deterministic=True)[0]
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(len(clients))]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            for i, action in enumerate(results):
+                assert action.shape == (4,) and np.allclose(action, 2.0 * i)
+            stats = next(iter(server.stats().values()))
+            assert stats['requests'] == 8 and stats['batches'] < 8
+
+            # バッチ入力
+            batch = np.arange(3 * 40, dtype=np.float32).reshape(3, 40)
+            assert np.allclose(clients[0].act(batch), batch[:, :4] * 2.0)
+            for client in clients:
+                client.close()
+        finally:
+            server.shutdown()
+
+def test_errors_are_reported():
+    """未知のモデルは例外としてクライアントに返る"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server, socket_path, _ = _start_server(tmp_dir)
+        try:
+            client = PolicyClient(socket_path)
+            try:
+                client.load(os.path.join(tmp_dir, 'missing.zip'))
+                assert False, "expected RuntimeError"
+            except RuntimeError as e:
+                assert 'not found' in str(e)
+            client.close()
+        finally:
+            server.shutdown()
+
+def test_least_recently_used_model_is_unloaded():
+    """上書き保存されたモデルが溜まらず、解放されたモデルのクライアントは読み込み直して推論を続ける"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server, socket_path, model_path = _start_server(tmp_dir, max_models=2)
+        try:
+            client = PolicyClient(socket_path, model_path)
+            first = server.models[client.key]
+            for i in range(3):
+                with open(model_path, 'wb') as f:
+                    f.write(f'iteration {i}'.encode())
+                server.load(model_path)
+            assert len(server.models) == 2
+            assert first.stopped and not first._thread.is_alive()
+
+            obs = np.ones(40, dtype=np.float32)
+            assert np.allclose(client.act(obs), 2.0)
+            assert client.key in server.models and len(server.models) == 2
+            client.close()
+        finally:
+            server.shutdown()
+
+if __name__ == "__main__":
+    test_concurrent_clients_are_batched()
+    test_errors_are_reported()
+    test_least_recently_used_model_is_unloaded()
+    print("OK")
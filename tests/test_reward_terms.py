@@ -0,0 +1,63 @@
+"""
+報酬内訳のテスト
+エピソード内の項目ごとの集計と、メトリクスストリームへの記録を確認
+"""
+import os
+import tempfile
+import numpy as np
+from xrobocon.reward_terms import STEP_REWARD_TERMS, RewardTermRecorder, TERM_PROGRESS, TERM_FALL
+from xrobocon.metrics_stream import (MetricsStreamWriter, MetricsStreamReader, load_metrics, reward_term_means,
+                                     KIND_EPISODE, KIND_REWARD_TERM)
+
+def test_recorder_sums_steps():
+    recorder = RewardTermRecorder()
+    values = np.zeros(len(STEP_REWARD_TERMS))
+    for _ in range(3):
+        values.fill(0.0)
+        values[TERM_PROGRESS] = 1.5
+        recorder.add(values)
+    values.fill(0.0)
+    values[TERM_FALL] = -100.0
+    recorder.add(values)
+
+    terms = recorder.episode_terms()
+    assert list(terms) == list(STEP_REWARD_TERMS)
+    assert terms['progress'] == 4.5 and terms['fall'] == -100.0 and terms['success'] == 0.0
+
+    recorder.reset()
+    assert all(v == 0.0 for v in recorder.episode_terms().values())
+
+def test_reward_terms_in_stream():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model_metrics.bin')
+        writer = MetricsStreamWriter(path)
+        writer.write_episode(100, 10.0, 100, scenario_type='step_straight', success=True)
+        writer.write_reward_terms(100, {'progress': 8.0, 'fall': 0.0}, scenario_type='step_straight')
+        writer.write_episode(200, -90.0, 50, scenario_type='flat_easy', success=False)
+        writer.write_reward_terms(200, {'progress': 10.0, 'fall': -100.0}, scenario_type='flat_easy')
+        writer.close()
+
+        reader = MetricsStreamReader(path)
+        records = reader.read_new()
+        assert reader.reward_terms == ['progress', 'fall']
+        assert list(records['kind']) == [KIND_EPISODE, KIND_REWARD_TERM, KIND_REWARD_TERM,
+                                         KIND_EPISODE, KIND_REWARD_TERM, KIND_REWARD_TERM]
+        assert reader.scenarios[records['scenario'][4]] == 'flat_easy'
+
+        # 追記したライタも項目番号を引き継ぐ
+        writer = MetricsStreamWriter(path)
+        writer.write_reward_terms(300, {'fall': -100.0, 'success': 500.0})
+        writer.close()
+
+        assert len(reader.read_new()) == 2
+        assert reader.reward_terms == ['progress', 'fall', 'success']
+        all_records, _ = load_metrics(path)
+        means = reward_term_means(all_records, reader.reward_terms)
+        assert list(means) == ['progress', 'fall', 'success']
+        assert np.allclose(list(means.values()), [9.0, -200.0 / 3, 500.0])
+        assert reward_term_means(all_records, reader.reward_terms, last=1)['fall'] == -100.0
+
+if __name__ == "__main__":
+    test_recorder_sums_steps()
+    test_reward_terms_in_stream()
+    print("OK")
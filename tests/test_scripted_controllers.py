@@ -0,0 +1,56 @@
+"""
+スクリプト制御器のテスト
+観測ベクトルからの旋回方向・減速・段差検出と、バッチ入力での形状を確認
+"""
+import numpy as np
+from xrobocon.scripted_controllers import make_controller, OBS_EULER, OBS_TARGET, OBS_HEIGHT_MAP
+
+def _obs(target=(1.0, 0.0), yaw=0.0, pitch=0.0, step_row=None):
+    """ロボット正面 (yaw度) にターゲット、step_row 行目以降に段差がある観測"""
+    obs = np.zeros(40, dtype=np.float32)
+    obs[OBS_EULER] = (0.0, pitch, yaw)
+    obs[OBS_TARGET] = (target[0], target[1], 0.0)
+    height_map = np.full((5, 5), -0.2, dtype=np.float32)
+    if step_row is not None:
+        height_map[step_row:] += 0.1
+    obs[OBS_HEIGHT_MAP] = height_map.ravel()
+    return obs
+
+def test_waypoint_turns_towards_target():
+    """ターゲットが左にあれば左旋回（右輪 > 左輪）、正面なら直進"""
+    controller = make_controller('rocker_bogie')
+    left, right = controller.act(_obs(target=(0.0, 1.0)))
+    assert right > left
+    left, right = controller.act(_obs(target=(2.0, 0.0)))
+    assert np.isclose(left, right) and left > 0
+    # ターゲット上では停止
+    assert np.allclose(controller.act(_obs(target=(0.05, 0.0))), 0.0)
+
+def test_tristar_frame_on_step():
+    """段差が近いときだけフレームを回し、ピッチが大きすぎると戻す"""
+    controller = make_controller('tristar_large')
+    flat = controller.act(_obs(target=(2.0, 0.0)))
+    near = controller.act(_obs(target=(2.0, 0.0), step_row=1))
+    far = controller.act(_obs(target=(2.0, 0.0), step_row=4))
+    assert flat[0] == 0.0 and far[0] == 0.0
+    assert near[0] > 0 and near[0] == near[1]
+    assert near[2] < flat[2]  # 登坂中は減速
+
+    tilted = controller.act(_obs(target=(2.0, 0.0), step_row=1, pitch=60.0))
+    assert tilted[0] < near[0]
+
+def test_batch_matches_single():
+    """バッチ入力の結果は1件ずつの結果と一致する"""
+    controller = make_controller('tristar')
+    batch = np.stack([_obs(target=(1.0, 0.5)), _obs(yaw=90.0, step_row=0), _obs(target=(-1.0, 0.0))])
+    actions = controller.act(batch)
+    assert actions.shape == (3, 4) and actions.dtype == np.float32
+    for obs, action in zip(batch, actions):
+        assert np.allclose(controller.act(obs), action)
+    assert np.all(np.abs(actions) <= 1.0)
+
+if __name__ == "__main__":
+    test_waypoint_turns_towards_target()
+    test_tristar_frame_on_step()
+    test_batch_matches_single()
+    print("OK")
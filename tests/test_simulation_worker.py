@@ -0,0 +1,30 @@
+"""
+シミュレーションワーカーの共有フレームバッファのテスト
+"""
+import numpy as np
+from core.simulation_worker import SharedFrameBuffer
+
+def test_shared_frame_buffer():
+    """書き込んだ画像が別のハンドルから読め、同じ画像は二度返さない"""
+    writer = SharedFrameBuffer.create(8, 6)
+    reader = SharedFrameBuffer.attach(writer.name, 8, 6)
+    try:
+        assert reader.read() is None
+        
+        frame = np.full((6, 8, 3), 7, dtype=np.uint8)
+        writer.write(frame)
+        read = reader.read()
+        assert read is not None and np.array_equal(read, frame)
+        assert reader.read() is None
+        
+        # 続けて書き込んだ場合は最新の画像
+        writer.write(np.full((6, 8, 3), 1, dtype=np.uint8))
+        writer.write(np.full((6, 8, 3), 2, dtype=np.uint8))
+        assert np.all(reader.read() == 2)
+    finally:
+        reader.close()
+        writer.close()
+
+if __name__ == "__main__":
+    test_shared_frame_buffer()
+    print("OK")
@@ -0,0 +1,55 @@
+"""
+停滞検出のテスト
+止まっている・その場で回っている場合だけ停滞と判定し、前進・登坂中は打ち切らないことを確認
+"""
+from xrobocon.stall_detector import StallDetector, make_stall_detector, parse_stall_option, stall_params
+
+def _run(detector, steps, dist_fn, height_fn, speed):
+    for t in range(steps):
+        if detector.update(dist_fn(t), height_fn(t), speed):
+            return t
+    return None
+
+def test_stuck_robot_is_detected_after_window():
+    detector = StallDetector(window=50)
+    # 段の縁で止まっている: 距離・高さ・速度とも変化なし
+    assert _run(detector, 200, lambda t: 1.0, lambda t: 0.1, 0.05) == 49
+
+def test_moving_or_climbing_robot_is_not_stalled():
+    detector = StallDetector(window=50)
+    # 前進 (1ステップ 2mm 近づく)
+    assert _run(detector, 200, lambda t: 2.0 - 0.002 * t, lambda t: 0.1, 0.05) is None
+    detector.reset()
+    # 距離は縮まないが登っている
+    assert _run(detector, 200, lambda t: 1.0, lambda t: 0.1 + 0.001 * t, 0.05) is None
+    detector.reset()
+    # 距離は縮まないが速く動いている（旋回しながら回り込み中など）
+    assert _run(detector, 200, lambda t: 1.0, lambda t: 0.1, 0.5) is None
+
+def test_progress_then_stall():
+    """前進した後に止まった場合は、止まってから window ステップ以内に検出される"""
+    detector = StallDetector(window=50)
+    stop = 100
+    t = _run(detector, 400, lambda t: 2.0 - 0.01 * min(t, stop), lambda t: 0.1, 0.05)
+    assert t is not None and stop < t <= stop + 50
+
+def test_options():
+    assert make_stall_detector(None) is None
+    assert make_stall_detector(True).window == 100
+    assert make_stall_detector({'window': 20}).window == 20
+    assert parse_stall_option(None) is None
+    assert parse_stall_option([]) is True
+    assert parse_stall_option(['window=150', 'max_speed=0.2']) == {'window': 150, 'max_speed': 0.2}
+    assert stall_params({'window': 150})['min_progress'] == 0.05
+    try:
+        stall_params({'windw': 150})
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_stuck_robot_is_detected_after_window()
+    test_moving_or_climbing_robot_is_not_stalled()
+    test_progress_then_stall()
+    test_options()
+    print("OK")
@@ -0,0 +1,52 @@
+"""
+状態ダブルバッファのテスト
+書き込み中の状態を読まないこと、別スレッドからの読み取りで値が混ざらないことを確認
+"""
+import threading
+import numpy as np
+from core.state_buffer import StateDoubleBuffer
+
+def test_publish_and_read():
+    """最新の状態のコピーが読める"""
+    buffer = StateDoubleBuffer()
+    assert buffer.read() is None
+    
+    pos = np.array([1.0, 2.0, 3.0])
+    buffer.publish(pos=pos, episode_steps=5, game={'score': 10})
+    pos[:] = 0.0  # 書き込み後に元の配列を変更しても影響しない
+    state = buffer.read()
+    assert np.array_equal(state['pos'], [1.0, 2.0, 3.0])
+    assert state['episode_steps'] == 5 and state['game']['score'] == 10
+    
+    buffer.publish(pos=np.array([4.0, 5.0, 6.0]), episode_steps=6, game={'score': 20})
+    assert buffer.read()['episode_steps'] == 6
+
+def test_concurrent_reads_are_consistent():
+    """書き手スレッドと並行して読んでも、配列とスカラーが同じ書き込みのもの"""
+    buffer = StateDoubleBuffer()
+    stop = threading.Event()
+    
+    def writer():
+        i = 0
+        while not stop.is_set():
+            buffer.publish(obs=np.full(40, i, dtype=np.float32), episode_steps=i)
+            i += 1
+    
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        checked = 0
+        while checked < 2000:
+            state = buffer.read()
+            if state is None:
+                continue
+            assert np.all(state['obs'] == state['episode_steps'])
+            checked += 1
+    finally:
+        stop.set()
+        thread.join()
+
+if __name__ == "__main__":
+    test_publish_and_read()
+    test_concurrent_reads_are_consistent()
+    print("OK")
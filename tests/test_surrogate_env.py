@@ -0,0 +1,87 @@
+"""
+平地代理環境のテスト
+観測の並び・差動二輪の向き・段での停止・到達報酬と自動リセットを確認
+"""
+import numpy as np
+from xrobocon.surrogate_env import SurrogateVecEnv, XRoboconSurrogateEnv
+from xrobocon.scenarios import terrain_height
+
+def _reference_height_map(pos, yaw_deg):
+    """XRoboconBaseEnv._get_height_map と同じループでの計算"""
+    yaw = np.radians(yaw_deg)
+    values = []
+    for i in range(5):
+        for j in range(5):
+            lx = (i - 2) * 0.2 + 0.5
+            ly = (j - 2) * 0.2
+            gx = pos[0] + lx * np.cos(yaw) - ly * np.sin(yaw)
+            gy = pos[1] + lx * np.sin(yaw) + ly * np.cos(yaw)
+            values.append(float(terrain_height(gx, gy)) - pos[2])
+    return np.array(values)
+
+def test_observation_layout():
+    """観測は40次元で、高さマップとターゲットベクトルが物理環境と同じ並び"""
+    vec = SurrogateVecEnv(num_envs=8, robot_type='tristar', seed=0)
+    obs = vec.reset()
+    assert obs.shape == (8, 40) and obs.dtype == np.float32
+    for o in obs:
+        assert np.allclose(o[15:], _reference_height_map(o[0:3], o[5]), atol=1e-5)
+    assert np.allclose(obs[:, 12:14], vec.target[:, :2] - obs[:, 0:2], atol=1e-5)
+
+    # Tier 3 の縁を向いていると高さマップに段が現れる
+    vec.x[0], vec.y[0], vec.yaw[0] = 4.9, 0.0, np.pi
+    obs = vec._get_obs()
+    assert np.allclose(obs[0, 15:], _reference_height_map(obs[0, 0:3], obs[0, 5]), atol=1e-5)
+    assert obs[0, 15:].max() > obs[0, 15:].min()
+
+def test_differential_drive():
+    """前進で x が増え、右ホイールが速いと左旋回 (yaw が増える)"""
+    vec = SurrogateVecEnv(num_envs=2, robot_type='standard', seed=0, scenario='flat_long')
+    vec.reset()
+    vec.yaw[0] = 0.0
+    start = vec.x.copy(), vec.yaw.copy()
+    for _ in range(50):
+        vec.step(np.array([[1.0, 1.0], [-0.5, 0.5]]))
+    assert vec.x[0] > start[0][0] + 0.1
+    assert vec.yaw[1] > start[1][1] + 0.1
+
+def test_blocked_by_high_tier():
+    """登坂高さを超える段には上れない"""
+    vec = SurrogateVecEnv(num_envs=1, robot_type='standard', seed=0)
+    vec.reset()
+    vec.x[0], vec.y[0], vec.yaw[0] = 4.75, 0.0, np.pi
+    for _ in range(100):
+        vec.step(np.array([[1.0, 1.0]]))
+    assert vec.x[0] > 4.65 and vec.v[0] == 0.0
+
+def test_success_and_auto_reset():
+    """ターゲット到達で成功報酬・自動リセットされ、info に終了時の観測が入る"""
+    env = XRoboconSurrogateEnv(robot_type='tristar', seed=0)
+    obs, info = env.reset(options={'scenario': 'flat_short'})
+    assert info['scenario_type'] == 'flat_short'
+    total = 0.0
+    for _ in range(500):
+        obs, reward, terminated, truncated, info = env.step(np.array([0.0, 0.0, 0.8, 0.8], dtype=np.float32))
+        total += reward
+        if terminated or truncated:
+            break
+    assert terminated and info['is_success'] and info['scenario_type'] == 'flat_short'
+    assert total > 300.0
+    assert np.hypot(obs[12], obs[13]) < 0.5
+
+    vec = SurrogateVecEnv(num_envs=4, robot_type='tristar', seed=1, scenario='flat_short')
+    vec.reset()
+    for _ in range(500):
+        obs, rewards, terminated, truncated, infos = vec.step(np.tile([0.0, 0.0, 0.8, 0.8], (4, 1)))
+        if terminated.any():
+            break
+    i = int(np.flatnonzero(terminated)[0])
+    assert np.hypot(*infos[i]['terminal_observation'][12:14]) < 0.5
+    assert np.hypot(*obs[i, 12:14]) > 0.5  # リセット後の観測
+
+if __name__ == "__main__":
+    test_observation_layout()
+    test_differential_drive()
+    test_blocked_by_high_tier()
+    test_success_and_auto_reset()
+    print("OK")
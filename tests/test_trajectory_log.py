@@ -0,0 +1,93 @@
+"""
+軌跡ログのテスト
+バッファの容量を超える書き込み・既存ログへの追記（中断された書き込みの切り詰め）・読み込みとエピソード分割を確認
+"""
+import os
+import numpy as np
+import pytest
+from xrobocon.trajectory_log import (FLAG_SUCCESS, TrajectoryLogger, episode_slices, load_meta,
+                                     load_trajectory)
+
+def _write_episode(logger, length, offset=0.0):
+    logger.begin_episode()
+    for i in range(length):
+        logger.append(time=i * 0.01, pos=[offset + i, 0.0, 0.1], qpos=np.full(9, i), action=[i, -i],
+                      reward=1.0, reward_terms=[0.5, 0.5], score=i // 10,
+                      flags=FLAG_SUCCESS if i == length - 1 else 0)
+
+def test_write_and_load(tmp_path):
+    root = str(tmp_path / 'traj')
+    logger = TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=2, term_names=('progress', 'height'),
+                              capacity=16, robot_type='tristar')
+    _write_episode(logger, 20)
+    _write_episode(logger, 15, offset=100.0)
+    logger.close()
+
+    data, meta = load_trajectory(root)
+    assert meta['num_records'] == 35 and meta['num_episodes'] == 2
+    assert meta['robot_type'] == 'tristar' and meta['term_names'] == ['progress', 'height']
+    assert data['qpos'].shape == (35, 9) and data['reward_terms'].shape == (35, 2)
+
+    slices = episode_slices(data['episode'])
+    assert list(slices) == [0, 1]
+    assert slices[1] == slice(20, 35)
+    assert np.allclose(data['step'][slices[1]], np.arange(15))
+    assert np.isclose(data['pos'][20, 0], 100.0)
+    assert data['flags'][19] & FLAG_SUCCESS and not data['flags'][18] & FLAG_SUCCESS
+
+def test_append_to_existing(tmp_path):
+    root = str(tmp_path / 'traj')
+    logger = TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=2, term_names=('progress', 'height'))
+    _write_episode(logger, 5)
+    logger.close()
+
+    logger = TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=2, term_names=('progress', 'height'))
+    _write_episode(logger, 7)
+    logger.close()
+
+    data, meta = load_trajectory(root, columns=['episode', 'time'])
+    assert set(data) == {'episode', 'time'}
+    assert meta['num_records'] == 12 and meta['num_episodes'] == 2
+    assert list(episode_slices(data['episode'])) == [0, 1]
+
+    # レイアウトが違う場合は追記しない
+    with pytest.raises(ValueError):
+        TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=4)
+    assert load_meta(root)['num_records'] == 12
+
+def test_reopen_drops_unrecorded_rows(tmp_path):
+    """列の追記後・meta.json の更新前に中断されたログに追記しても、列がずれない"""
+    root = str(tmp_path / 'traj')
+    logger = TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=2, term_names=('progress', 'height'))
+    _write_episode(logger, 5)
+    logger.close()
+
+    # 一部の列にだけ、meta.json に記録されていない行が残った状態
+    for name, orphan in (('pos', np.full((3, 3), 999, dtype='<f4')), ('episode', np.full(1, 999, dtype='<i4'))):
+        with open(os.path.join(root, f"{name}.bin"), 'ab') as f:
+            f.write(orphan.tobytes())
+
+    logger = TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=2, term_names=('progress', 'height'))
+    _write_episode(logger, 4, offset=100.0)
+    logger.close()
+
+    data, meta = load_trajectory(root)
+    assert meta['num_records'] == 9
+    assert os.path.getsize(os.path.join(root, 'pos.bin')) == 9 * 3 * 4
+    assert np.allclose(data['pos'][:, 0], [0, 1, 2, 3, 4, 100, 101, 102, 103])
+    assert list(data['episode']) == [0] * 5 + [1] * 4
+    assert np.allclose(data['step'], [0, 1, 2, 3, 4, 0, 1, 2, 3])
+
+def test_empty_log(tmp_path):
+    root = str(tmp_path / 'traj')
+    TrajectoryLogger(root, n_qpos=9, n_dofs=8, action_dim=2).close()
+    data, meta = load_trajectory(root)
+    assert meta['num_records'] == 0 and data['qpos'].shape == (0, 9)
+    assert episode_slices(data['episode']) == {}
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    for test in (test_write_and_load, test_append_to_existing, test_reopen_drops_unrecorded_rows, test_empty_log):
+        with tempfile.TemporaryDirectory() as d:
+            test(pathlib.Path(d))
+    print("OK")
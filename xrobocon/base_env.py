@@ -1,3 +1,4 @@
+import copy
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
@@ -5,6 +6,7 @@ import genesis as gs
 from xrobocon.field import XRoboconField
 from xrobocon.robot import XRoboconRobot
 from xrobocon.game import XRoboconGame
+from xrobocon.robot_configs import SIM_PARAMS
 
 class XRoboconBaseEnv(gym.Env):
     """
@@ -12,7 +14,17 @@ class XRoboconBaseEnv(gym.Env):
     共通の初期化処理とインターフェースを提供します。
     """
     
-    def __init__(self, render_mode=None, robot_type='standard'):
+    # シナリオレジストリ（子クラスで定義）
+    # 各シナリオの Z 座標は start_z_offset からの相対高さで記述し、初期化時に解決する
+    SCENARIOS = []
+    SCENARIO_TYPES = []
+    SCENARIO_WEIGHTS = []
+    
+    # snapshot() で保存するエピソード中の状態（報酬計算・終了判定に使う属性）
+    SNAPSHOT_ATTRS = ('current_target', 'prev_dist', 'prev_height', 'last_action', 'current_scenario_type',
+                      'stall_detector', 'reward_term_recorder')
+    
+    def __init__(self, render_mode=None, robot_type='standard', camera_res=(640, 480)):
         super().__init__()
         
         self.render_mode = render_mode
@@ -34,8 +46,8 @@ class XRoboconBaseEnv(gym.Env):
                 camera_fov=40,
             ),
             rigid_options=gs.options.RigidOptions(
-                dt=0.01,
-                gravity=(0.0, 0.0, -9.8),
+                dt=SIM_PARAMS['dt'],
+                gravity=SIM_PARAMS['gravity'],
             ),
             show_viewer=self.visualize, # rgb_arrayの時はFalse
             renderer=self.renderer,
@@ -43,7 +55,7 @@ class XRoboconBaseEnv(gym.Env):
         
         # カメラ (rgb_array用、またはアクセス用)
         self.camera = self.scene.add_camera(
-            res=(640, 480),
+            res=tuple(camera_res),
             pos=(3.0, -3.0, 2.5),
             lookat=(0.0, 0.0, 0.5),
             fov=40,
@@ -111,6 +123,15 @@ class XRoboconBaseEnv(gym.Env):
         self.current_target = None
         self.prev_dist = 0.0
         self.prev_height = 0.0
+        
+        # シナリオカリキュラム (Noneの場合は SCENARIO_WEIGHTS で固定)
+        self.curriculum = None
+        
+        # 停滞検出 (子クラスで有効化)
+        self.stall_detector = None
+        
+        # 報酬内訳のエピソード集計 (子クラスで有効化, xrobocon/reward_terms.py)
+        self.reward_term_recorder = None
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
@@ -122,11 +143,86 @@ class XRoboconBaseEnv(gym.Env):
         raise NotImplementedError
 
     def render(self):
-        pass
+        """rgb_array モードの場合、カメラ画像を (H, W, 3) の uint8 配列で返す"""
+        if self.render_mode != "rgb_array":
+            return None
+        rgb = self.camera.render()[0]
+        if rgb.dtype != np.uint8:
+            rgb = (np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+        return rgb[..., :3]
         
     def close(self):
         pass
 
+    def _build_scenario_registry(self):
+        """
+        SCENARIOS の相対高さを start_z_offset で解決し、{type: scenario} を作成
+        reset() のたびにシナリオ辞書を作り直さないよう、初期化時に一度だけ呼び出す
+        """
+        registry = {}
+        for scenario in self.SCENARIOS:
+            resolved = dict(scenario)
+            for key in ('start_pos', 'target_pos'):
+                if key in scenario:
+                    x, y, z = scenario[key]
+                    resolved[key] = (x, y, z + self.start_z_offset)
+            for key in ('start_z', 'target_z'):
+                if key in scenario:
+                    resolved[key] = scenario[key] + self.start_z_offset
+            registry[scenario['type']] = resolved
+        return registry
+
+    def _select_scenario(self, options=None):
+        """
+        reset() 用のシナリオ選択
+        
+        Args:
+            options: reset() の options
+                - 'scenario': シナリオタイプを指定（省略時はカリキュラムまたは SCENARIO_WEIGHTS でサンプリング）
+                - 'jitter_seed': 開始位置のランダム性に使うシード（省略時は np.random のグローバル状態）
+        
+        Returns:
+            (scenario, rng): 解決済みのシナリオ辞書と、ランダム性に使う乱数生成器
+        """
+        options = options or {}
+        scenario_type = options.get('scenario')
+        
+        if scenario_type is None:
+            if self.curriculum is not None:
+                scenario_type = self.curriculum.sample()
+            else:
+                scenario_type = str(np.random.choice(self.SCENARIO_TYPES, p=self.SCENARIO_WEIGHTS))
+        elif scenario_type not in self.scenario_registry:
+            raise ValueError(f"Unknown scenario: {scenario_type}. Available: {list(self.scenario_registry.keys())}")
+        
+        jitter_seed = options.get('jitter_seed')
+        rng = np.random.default_rng(jitter_seed) if jitter_seed is not None else np.random
+        
+        return self.scenario_registry[scenario_type], rng
+
+    def snapshot(self):
+        """
+        エピソード途中の状態を保存（ロボットの物理状態・ゲームの進行・報酬計算用の状態）
+        
+        戻り値は numpy と組み込み型だけなので、別プロセスの同じ設定の環境に渡して restore() できる。
+        接触の内部キャッシュなどソルバー内部の状態は含まないため、復元後の軌道はわずかにずれることがある。
+        """
+        return {
+            'robot': self.robot.get_state(),
+            'game': self.game.get_state(),
+            'env': {name: copy.deepcopy(getattr(self, name, None)) for name in self.SNAPSHOT_ATTRS},
+        }
+    
+    def restore(self, snapshot):
+        """snapshot() で保存した状態に戻し、その時点の観測を返す"""
+        self.robot.set_state(snapshot['robot'])
+        self.game.set_state(snapshot['game'])
+        for name, value in snapshot['env'].items():
+            setattr(self, name, copy.deepcopy(value))
+        if self.target_marker is not None and self.current_target:
+            self.target_marker.set_pos(self.current_target['pos'])
+        return self._get_obs()
+
     def set_target(self, target_pos):
         """外部からターゲットを指定"""
         self.current_target = {'pos': target_pos, 'tier': 0}
@@ -137,6 +233,12 @@ class XRoboconBaseEnv(gym.Env):
         if self.target_marker is not None:
             self.target_marker.set_pos(target_pos)
 
+    def _check_stall(self, robot_pos, speed):
+        """停滞検出が有効なら1ステップ分を記録し、停滞していれば True"""
+        if self.stall_detector is None:
+            return False
+        return self.stall_detector.update(self.prev_dist, robot_pos[2], speed)
+
     def _get_obs(self):
         pos = self.robot.get_pos().cpu().numpy()
         euler = self.robot.get_euler() # numpy array
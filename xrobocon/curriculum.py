@@ -0,0 +1,137 @@
+"""
+シナリオカリキュラム管理モジュール
+
+シナリオタイプごとの直近の成功率を記録し、学習の「境界」にあるシナリオ
+（成功率が 0% でも 100% でもないもの）が多くサンプリングされるように重みを調整する。
+習得済みのシナリオや、まだ全く歯が立たないシナリオにも最低限の確率は残す。
+"""
+import json
+import os
+from collections import deque
+
+import numpy as np
+
+
+class ScenarioCurriculum:
+    """成功率に基づいてシナリオのサンプリング確率を調整するスケジューラ"""
+
+    def __init__(self, scenario_types, base_weights=None, window=50, min_episodes=10, min_prob=0.05):
+        """
+        Args:
+            scenario_types: シナリオタイプ名のリスト
+            base_weights: 事前の重み（Noneの場合は均等）。0のシナリオはサンプリングしない
+            window: 成功率を計算する直近エピソード数
+            min_episodes: この数に達するまでは成功率 50% (=未知) として扱う
+            min_prob: 有効なシナリオに残す最低確率
+        """
+        self.scenario_types = list(scenario_types)
+        if base_weights is None:
+            base_weights = [1.0] * len(self.scenario_types)
+        if len(base_weights) != len(self.scenario_types):
+            raise ValueError("base_weights must have the same length as scenario_types")
+
+        self.base_weights = np.array(base_weights, dtype=np.float64)
+        self.window = window
+        self.min_episodes = min_episodes
+        self.min_prob = min_prob
+
+        self.history = {s: deque(maxlen=window) for s in self.scenario_types}
+        self.episode_counts = {s: 0 for s in self.scenario_types}
+
+    def update(self, scenario_type, success):
+        """エピソード結果を記録"""
+        if scenario_type not in self.history:
+            return
+        self.history[scenario_type].append(1.0 if success else 0.0)
+        self.episode_counts[scenario_type] += 1
+
+    def success_rates(self):
+        """シナリオごとの直近成功率（記録がない場合はNone）"""
+        return {
+            s: (float(np.mean(h)) if len(h) > 0 else None)
+            for s, h in self.history.items()
+        }
+
+    def get_weights(self):
+        """
+        現在のサンプリング確率を計算
+
+        境界スコア p * (1 - p) は成功率 50% で最大、0% / 100% で 0 になる。
+        事前の重みを掛けて正規化した後、最低確率を保証する。
+        """
+        scores = np.zeros(len(self.scenario_types))
+        for i, s in enumerate(self.scenario_types):
+            h = self.history[s]
+            p = float(np.mean(h)) if len(h) >= self.min_episodes else 0.5
+            scores[i] = p * (1.0 - p)
+
+        enabled = self.base_weights > 0
+        if not np.any(enabled):
+            raise ValueError("At least one scenario must have a positive base weight")
+
+        weights = self.base_weights * scores
+        if weights.sum() <= 0:
+            # 全シナリオが習得済み（または全く成功しない）場合は事前の重みに戻す
+            weights = self.base_weights.copy()
+        weights = weights / weights.sum()
+
+        # 最低確率の保証（有効なシナリオのみ）
+        floor = min(self.min_prob, 1.0 / np.count_nonzero(enabled))
+        weights = np.where(enabled, np.maximum(weights, floor), 0.0)
+        return weights / weights.sum()
+
+    def sample(self):
+        """シナリオタイプをサンプリング（np.random のグローバル状態を使用し、env.reset(seed) に従う）"""
+        return str(np.random.choice(self.scenario_types, p=self.get_weights()))
+
+    def state_dict(self):
+        """チェックポイント保存用の状態"""
+        return {
+            'scenario_types': self.scenario_types,
+            'base_weights': self.base_weights.tolist(),
+            'window': self.window,
+            'min_episodes': self.min_episodes,
+            'min_prob': self.min_prob,
+            'history': {s: list(h) for s, h in self.history.items()},
+            'episode_counts': dict(self.episode_counts),
+        }
+
+    def load_state_dict(self, state):
+        """保存された状態を復元（設定は現在のものを優先し、履歴のみ引き継ぐ）"""
+        for s, h in state.get('history', {}).items():
+            if s in self.history:
+                self.history[s].extend(h[-self.window:])
+        for s, c in state.get('episode_counts', {}).items():
+            if s in self.episode_counts:
+                self.episode_counts[s] = c
+
+    def save(self, path):
+        """状態をJSONファイルに保存"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.state_dict(), f, indent=2, ensure_ascii=False)
+
+    def load(self, path):
+        """JSONファイルから状態を読み込む（ファイルがなければ何もしない）"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            self.load_state_dict(json.load(f))
+        return True
+
+    def summary(self):
+        """表示用の文字列"""
+        rates = self.success_rates()
+        weights = self.get_weights()
+        parts = []
+        for s, w in zip(self.scenario_types, weights):
+            rate = rates[s]
+            rate_str = f"{rate*100:.0f}%" if rate is not None else "-"
+            parts.append(f"{s}: 成功率={rate_str} 確率={w*100:.0f}%")
+        return " | ".join(parts)
+
+
+def curriculum_state_path(model_name):
+    """モデル名（拡張子なし）に対応するカリキュラム状態ファイルのパス"""
+    if model_name.endswith('.zip'):
+        model_name = model_name[:-4]
+    return f"{model_name}_curriculum.json"
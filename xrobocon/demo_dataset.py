@@ -0,0 +1,345 @@
+"""
+デモンストレーションデータセット
+
+観測・アクション・報酬・エピソード番号を固定長のチャンクファイル (.npy) に追記し、
+manifest.json でチャンクとエピソードの一覧を管理する。
+チャンクはメモリマップで読み書きするため、データセット全体をメモリに載せずに
+記録・ミニバッチのサンプリングができる。
+
+ディレクトリ構成:
+    <root>/manifest.json
+    <root>/chunk_00000_obs.npy       (chunk_size, obs_dim)    float32
+    <root>/chunk_00000_actions.npy   (chunk_size, action_dim) float32
+    <root>/chunk_00000_rewards.npy   (chunk_size,)            float32
+    <root>/chunk_00000_episode.npy   (chunk_size,)            int32
+"""
+import glob
+import json
+import os
+
+import numpy as np
+
+MANIFEST_NAME = 'manifest.json'
+
+# チャンクごとの配列 (名前, 1要素あたりの形状を決める関数, dtype)
+_ARRAYS = (
+    ('obs', lambda m: (m['obs_dim'],), np.float32),
+    ('actions', lambda m: (m['action_dim'],), np.float32),
+    ('rewards', lambda m: (), np.float32),
+    ('episode', lambda m: (), np.int32),
+)
+
+
+def _chunk_path(root, index, name):
+    return os.path.join(root, f"chunk_{index:05d}_{name}.npy")
+
+
+def is_dataset(root):
+    """ディレクトリがデータセット (manifest.json あり) か"""
+    return os.path.exists(os.path.join(root, MANIFEST_NAME))
+
+
+def _load_manifest(root):
+    with open(os.path.join(root, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def remove_dataset(root):
+    """データセットのファイル (manifest.json とチャンク) を削除する（ディレクトリ内のそれ以外のファイルは残す）"""
+    for path in glob.glob(os.path.join(root, 'chunk_*.npy')):
+        os.remove(path)
+    if is_dataset(root):
+        os.remove(os.path.join(root, MANIFEST_NAME))
+
+
+class DemoDatasetWriter:
+    """
+    データセットへの追記
+
+    begin_episode() → add() を繰り返す → end_episode(keep=True/False)
+    遷移はその場でチャンクに書き込み、エピソードの確定時にのみ manifest を更新する。
+    破棄したエピソードや、記録途中で中断したエピソードは manifest に含まれないため読み手からは見えない。
+    """
+
+    def __init__(self, root, obs_dim, action_dim, chunk_size=65536):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+        if is_dataset(root):
+            self.manifest = _load_manifest(root)
+            if self.manifest['obs_dim'] != obs_dim or self.manifest['action_dim'] != action_dim:
+                raise ValueError(
+                    f"Dataset {root} has obs_dim={self.manifest['obs_dim']}, action_dim={self.manifest['action_dim']} "
+                    f"(requested {obs_dim}, {action_dim})")
+        else:
+            self.manifest = {
+                'version': 1,
+                'obs_dim': obs_dim,
+                'action_dim': action_dim,
+                'chunk_size': chunk_size,
+                'num_transitions': 0,
+                'episodes': [],
+            }
+            self._save_manifest()
+
+        self.chunk_size = self.manifest['chunk_size']
+        self.cursor = self.manifest['num_transitions']
+        self.episode_start = None
+        self.episode_return = 0.0
+        self._chunk_index = None
+        self._chunk = None
+
+    @property
+    def num_transitions(self):
+        return self.manifest['num_transitions']
+
+    @property
+    def num_episodes(self):
+        return len(self.manifest['episodes'])
+
+    @property
+    def current_length(self):
+        """記録中のエピソードの長さ"""
+        return 0 if self.episode_start is None else self.cursor - self.episode_start
+
+    def _open_chunk(self, index):
+        if self._chunk_index == index:
+            return self._chunk
+        self._flush_chunk()
+        chunk = {}
+        for name, shape_fn, dtype in _ARRAYS:
+            path = _chunk_path(self.root, index, name)
+            if os.path.exists(path):
+                chunk[name] = np.load(path, mmap_mode='r+')
+            else:
+                shape = (self.chunk_size,) + shape_fn(self.manifest)
+                chunk[name] = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        self._chunk_index = index
+        self._chunk = chunk
+        return chunk
+
+    def _flush_chunk(self):
+        if self._chunk is not None:
+            for array in self._chunk.values():
+                array.flush()
+
+    def begin_episode(self):
+        """エピソードの記録を開始（記録中のエピソードは破棄）"""
+        self.cursor = self.manifest['num_transitions']
+        self.episode_start = self.cursor
+        self.episode_return = 0.0
+
+    def add(self, obs, action, reward):
+        """1遷移を追加"""
+        if self.episode_start is None:
+            self.begin_episode()
+        chunk_index, offset = divmod(self.cursor, self.chunk_size)
+        chunk = self._open_chunk(chunk_index)
+        chunk['obs'][offset] = obs
+        chunk['actions'][offset] = action
+        chunk['rewards'][offset] = reward
+        chunk['episode'][offset] = len(self.manifest['episodes'])
+        self.cursor += 1
+        self.episode_return += float(reward)
+
+    def add_batch(self, obs, actions, rewards):
+        """複数の遷移をまとめて追加（チャンク境界をまたいでもよい）"""
+        if self.episode_start is None:
+            self.begin_episode()
+        obs = np.asarray(obs, dtype=np.float32)
+        actions = np.asarray(actions, dtype=np.float32)
+        rewards = np.asarray(rewards, dtype=np.float32)
+        done = 0
+        while done < len(obs):
+            chunk_index, offset = divmod(self.cursor, self.chunk_size)
+            n = min(len(obs) - done, self.chunk_size - offset)
+            chunk = self._open_chunk(chunk_index)
+            chunk['obs'][offset:offset + n] = obs[done:done + n]
+            chunk['actions'][offset:offset + n] = actions[done:done + n]
+            chunk['rewards'][offset:offset + n] = rewards[done:done + n]
+            chunk['episode'][offset:offset + n] = len(self.manifest['episodes'])
+            self.cursor += n
+            done += n
+        self.episode_return += float(rewards.sum())
+
+    def end_episode(self, keep=True, **metadata):
+        """
+        エピソードを確定（keep=False の場合は破棄）
+
+        Args:
+            keep: データセットに残すか
+            **metadata: エピソードの付加情報 (source, robot_type, scenario など)
+
+        Returns:
+            int: 確定したエピソードの長さ（破棄した場合は0）
+        """
+        if self.episode_start is None:
+            return 0
+        length = self.cursor - self.episode_start
+        if keep and length > 0:
+            self._flush_chunk()
+            episode = {
+                'id': len(self.manifest['episodes']),
+                'start': self.episode_start,
+                'length': length,
+                'return': self.episode_return,
+            }
+            episode.update(metadata)
+            self.manifest['episodes'].append(episode)
+            self.manifest['num_transitions'] = self.cursor
+            self._save_manifest()
+        else:
+            length = 0
+            self.cursor = self.manifest['num_transitions']
+        self.episode_start = None
+        self.episode_return = 0.0
+        return length
+
+    def _save_manifest(self):
+        # 読み手が書き込み途中の manifest を読まないよう、一時ファイル経由で置き換える
+        path = os.path.join(self.root, MANIFEST_NAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        if self.episode_start is not None:
+            self.end_episode(keep=False)
+        self._flush_chunk()
+        self._chunk = None
+        self._chunk_index = None
+
+
+class DemoDataset:
+    """
+    データセットの読み込み
+
+    チャンクはメモリマップで開き、必要な部分だけを読む。
+    sample() はランダムなミニバッチ、iter_batches() はチャンク単位でシャッフルした1エポック分のミニバッチを返す。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.reload()
+
+    def reload(self):
+        """manifest を読み直す（追記された分を反映）"""
+        self.manifest = _load_manifest(self.root)
+        self.chunk_size = self.manifest['chunk_size']
+        self._chunks = {}
+
+    def __len__(self):
+        return self.manifest['num_transitions']
+
+    @property
+    def obs_dim(self):
+        return self.manifest['obs_dim']
+
+    @property
+    def action_dim(self):
+        return self.manifest['action_dim']
+
+    @property
+    def episodes(self):
+        return self.manifest['episodes']
+
+    @property
+    def num_chunks(self):
+        return (len(self) + self.chunk_size - 1) // self.chunk_size
+
+    def _chunk(self, index):
+        chunk = self._chunks.get(index)
+        if chunk is None:
+            chunk = {name: np.load(_chunk_path(self.root, index, name), mmap_mode='r') for name, _, _ in _ARRAYS}
+            self._chunks[index] = chunk
+        return chunk
+
+    def _chunk_length(self, index):
+        return min(self.chunk_size, len(self) - index * self.chunk_size)
+
+    def get(self, indices, fields=('obs', 'actions')):
+        """通し番号で遷移を取得（チャンクごとにまとめて読む）"""
+        indices = np.asarray(indices, dtype=np.int64)
+        out = {}
+        for name in fields:
+            shape_fn, dtype = next((s, d) for n, s, d in _ARRAYS if n == name)
+            out[name] = np.empty((len(indices),) + shape_fn(self.manifest), dtype=dtype)
+
+        chunk_ids = indices // self.chunk_size
+        for chunk_index in np.unique(chunk_ids):
+            mask = chunk_ids == chunk_index
+            offsets = indices[mask] - chunk_index * self.chunk_size
+            # メモリマップはオフセット順に読むと速い
+            order = np.argsort(offsets)
+            chunk = self._chunk(int(chunk_index))
+            positions = np.flatnonzero(mask)[order]
+            for name in fields:
+                out[name][positions] = chunk[name][offsets[order]]
+        return tuple(out[name] for name in fields)
+
+    def sample(self, batch_size, rng=None, fields=('obs', 'actions')):
+        """ランダムなミニバッチ"""
+        rng = rng if rng is not None else np.random.default_rng()
+        indices = rng.integers(0, len(self), size=batch_size)
+        return self.get(indices, fields)
+
+    def iter_batches(self, batch_size, shuffle=True, rng=None, fields=('obs', 'actions')):
+        """
+        1エポック分のミニバッチを返すジェネレータ
+        チャンクの順番とチャンク内の順番をシャッフルし、同時にメモリに載るのは1チャンク分だけ
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        chunk_order = rng.permutation(self.num_chunks) if shuffle else np.arange(self.num_chunks)
+        for chunk_index in chunk_order:
+            n = self._chunk_length(int(chunk_index))
+            chunk = self._chunk(int(chunk_index))
+            data = [np.asarray(chunk[name][:n]) for name in fields]
+            order = rng.permutation(n) if shuffle else np.arange(n)
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                yield tuple(d[batch] for d in data)
+
+
+def import_npz_demos(npz_files, root, chunk_size=65536, **metadata):
+    """
+    旧形式のデモファイル (demo_<ts>.npz: obs, actions, rewards) をデータセットに取り込む
+    取り込み済みのファイル（manifest の source_file が一致するもの）は飛ばす
+
+    Returns:
+        int: 取り込んだファイル数
+    """
+    imported = set()
+    if is_dataset(root):
+        imported = {e.get('source_file') for e in _load_manifest(root)['episodes']}
+
+    writer = None
+    count = 0
+    for path in sorted(npz_files):
+        if os.path.basename(path) in imported:
+            continue
+        data = np.load(path)
+        obs, actions = data['obs'], data['actions']
+        rewards = data['rewards'] if 'rewards' in data else np.zeros(len(obs), dtype=np.float32)
+        if writer is None:
+            writer = DemoDatasetWriter(root, obs.shape[1], actions.shape[1], chunk_size=chunk_size)
+        writer.begin_episode()
+        writer.add_batch(obs, actions, rewards)
+        writer.end_episode(keep=True, source_file=os.path.basename(path), **metadata)
+        count += 1
+    if writer is not None:
+        writer.close()
+    return count
+
+
+def import_legacy_demos(root, **metadata):
+    """
+    root 直下の旧形式のデモファイル (*.npz) をそのデータセットに取り込む
+
+    同じデータセットを DemoDatasetWriter で開いている間に呼ぶと、開いている側の manifest が古くなるため、
+    書き込み側を開く前に呼ぶこと。
+
+    Returns:
+        int: 取り込んだファイル数
+    """
+    return import_npz_demos(glob.glob(os.path.join(root, '*.npz')), root, **metadata)
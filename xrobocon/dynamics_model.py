@@ -0,0 +1,323 @@
+"""
+学習したダイナミクスモデルによるモデルベースのロールアウト
+
+デモ・ロールアウトのデータセット (xrobocon/demo_dataset.py) の連続する2ステップから
+(obs, action, next_obs, reward) を作り、MLP のアンサンブルで「観測の変化量と報酬」を学習する。
+学習したモデルは ModelVecEnv として N 台分まとめて進められるので、物理ステップを使わずに
+短い想像上のロールアウトで PPO / BC の学習データを増やせる。
+
+遷移に使うのは、保存された行動が実際に実行された行動であるエピソードだけ (executed_action_episodes)。
+DAgger のエピソードはエキスパートのラベルを保存しているため、学習中のポリシーの行動を実行したステップを含むものは使わない。
+
+ModelVecEnv の終了判定は観測から計算する（成功: ターゲットベクトル、失敗: ロール・ピッチ・高さ）。
+アンサンブルの予測のばらつきが大きい状態（データの外側）に入った場合は、その時点で打ち切る。
+"""
+import numpy as np
+from gymnasium import spaces
+
+# 観測から終了判定するためのルール (XRoboconEnv / XRoboconStepEnv の step() と同じ閾値)
+TERMINATION_RULES = {
+    'flat': {'max_tilt': 60.0, 'success_z': lambda tz: np.abs(tz) < 0.2},
+    'step': {'max_tilt': 70.0, 'success_z': lambda tz: tz < 0.1},
+}
+
+
+def executed_action_episodes(episodes):
+    """
+    保存された行動が実際に実行された行動であるエピソードだけを返す
+
+    手動・スクリプト制御器・教師のロールアウト (source: manual / scripted / teacher) は実行した行動を保存している。
+    DAgger (source: dagger) の actions はエキスパートのラベルで、expert_fraction < 1 のエピソードでは
+    一部のステップで学習中のポリシーの行動が実行されているため、(obs, action) → next_obs の遷移にならない。
+    """
+    return [ep for ep in episodes if ep.get('source') != 'dagger' or ep.get('expert_fraction', 0.0) >= 1.0]
+
+
+def transitions_from_dataset(dataset, episodes=None):
+    """
+    データセットのエピソード内で連続する2ステップから遷移を作る
+    （各エピソードの最後のステップは次の観測がないため使わない。
+    保存された行動が実行された行動でないエピソードは executed_action_episodes で除く）
+
+    Args:
+        dataset: DemoDataset
+        episodes: 使うエピソード（manifest のエピソード辞書のリスト。省略時は全エピソード）
+
+    Returns:
+        dict: obs, actions, next_obs, rewards, scenario（文字列の配列）, episode
+    """
+    episodes = executed_action_episodes(dataset.episodes if episodes is None else episodes)
+    current, following, scenarios, episode_ids = [], [], [], []
+    for ep in episodes:
+        if ep['length'] < 2:
+            continue
+        start = ep['start']
+        current.append(np.arange(start, start + ep['length'] - 1))
+        following.append(np.arange(start + 1, start + ep['length']))
+        scenarios.append(np.full(ep['length'] - 1, str(ep.get('scenario', 'unknown')), dtype=object))
+        episode_ids.append(np.full(ep['length'] - 1, ep['id'], dtype=np.int64))
+    if not current:
+        raise ValueError("No episodes with at least two steps")
+
+    obs, actions, rewards = dataset.get(np.concatenate(current), fields=('obs', 'actions', 'rewards'))
+    (next_obs,) = dataset.get(np.concatenate(following), fields=('obs',))
+    return {
+        'obs': obs,
+        'actions': actions,
+        'next_obs': next_obs,
+        'rewards': rewards,
+        'scenario': np.concatenate(scenarios),
+        'episode': np.concatenate(episode_ids),
+    }
+
+
+def split_episodes(episodes, holdout_fraction=0.1, seed=0):
+    """エピソード単位で学習用と検証用に分ける（同じエピソードの遷移が両方に入らないように）"""
+    episodes = list(episodes)
+    order = np.random.default_rng(seed).permutation(len(episodes))
+    num_holdout = int(round(len(episodes) * holdout_fraction)) if len(episodes) > 1 else 0
+    holdout = [episodes[i] for i in order[:num_holdout]]
+    train = [episodes[i] for i in order[num_holdout:]]
+    return train, holdout
+
+
+def terminal_from_obs(obs, env_type='step'):
+    """
+    観測から (成功, 失敗) を判定
+
+    Args:
+        obs: (N, 40)
+        env_type: 'flat' / 'step'
+    """
+    rule = TERMINATION_RULES[env_type]
+    success = (np.hypot(obs[:, 12], obs[:, 13]) < 0.5) & rule['success_z'](obs[:, 14])
+    failed = (np.abs(obs[:, 3]) > rule['max_tilt']) | (np.abs(obs[:, 4]) > rule['max_tilt']) | (obs[:, 2] < 0.0)
+    return success, failed & ~success
+
+
+class EnsembleDynamics:
+    """
+    観測の変化量と報酬を予測する MLP のアンサンブル
+
+    入力と出力はデータから求めた平均・標準偏差で正規化する。各メンバーは学習データの
+    ブートストラップ標本で学習するため、データの少ない領域ほどメンバー間の予測がばらつく。
+    """
+
+    def __init__(self, obs_dim, action_dim, num_members=5, hidden=(200, 200), seed=0):
+        import torch
+        import torch.nn as nn
+
+        self._torch = torch
+        self.obs_dim = obs_dim
+        self.action_dim = action_dim
+        self.num_members = num_members
+        self.hidden = tuple(hidden)
+        self.seed = seed
+        torch.manual_seed(seed)
+
+        self.members = []
+        for _ in range(num_members):
+            layers = []
+            in_dim = obs_dim + action_dim
+            for units in self.hidden:
+                layers += [nn.Linear(in_dim, units), nn.SiLU()]
+                in_dim = units
+            layers.append(nn.Linear(in_dim, obs_dim + 1))
+            self.members.append(nn.Sequential(*layers))
+
+        self.input_mean = np.zeros(obs_dim + action_dim, dtype=np.float32)
+        self.input_std = np.ones(obs_dim + action_dim, dtype=np.float32)
+        self.output_mean = np.zeros(obs_dim + 1, dtype=np.float32)
+        self.output_std = np.ones(obs_dim + 1, dtype=np.float32)
+
+    @staticmethod
+    def _targets(data):
+        return np.concatenate([data['next_obs'] - data['obs'], data['rewards'][:, None]], axis=1)
+
+    def fit(self, data, epochs=50, batch_size=256, lr=1e-3, verbose=True):
+        """
+        遷移 (transitions_from_dataset の戻り値) で学習
+
+        Returns:
+            list: エポックごとの平均損失
+        """
+        torch = self._torch
+        inputs = np.concatenate([data['obs'], data['actions']], axis=1).astype(np.float32)
+        targets = self._targets(data).astype(np.float32)
+        self.input_mean = inputs.mean(axis=0)
+        self.input_std = inputs.std(axis=0) + 1e-6
+        self.output_mean = targets.mean(axis=0)
+        self.output_std = targets.std(axis=0) + 1e-6
+        x = torch.from_numpy((inputs - self.input_mean) / self.input_std)
+        y = torch.from_numpy((targets - self.output_mean) / self.output_std)
+
+        rng = np.random.default_rng(self.seed)
+        n = len(x)
+        bootstraps = [rng.integers(0, n, size=n) for _ in range(self.num_members)]
+        optimizers = [torch.optim.Adam(m.parameters(), lr=lr) for m in self.members]
+        history = []
+        for epoch in range(epochs):
+            total, count = 0.0, 0
+            for member, optimizer, indices in zip(self.members, optimizers, bootstraps):
+                member.train()
+                order = indices[rng.permutation(n)]
+                for start in range(0, n, batch_size):
+                    batch = torch.from_numpy(order[start:start + batch_size])
+                    loss = ((member(x[batch]) - y[batch]) ** 2).mean()
+                    optimizer.zero_grad()
+                    loss.backward()
+                    optimizer.step()
+                    total += loss.item()
+                    count += 1
+                member.eval()
+            history.append(total / max(count, 1))
+            if verbose and ((epoch + 1) % 10 == 0 or epoch == 0):
+                print(f"Epoch {epoch + 1}/{epochs}, Loss: {history[-1]:.6f}")
+        return history
+
+    def predict(self, obs, actions, member=None):
+        """
+        Args:
+            obs: (N, obs_dim)
+            actions: (N, action_dim)
+            member: 行ごとに使うメンバー番号 (N,)。省略時はアンサンブルの平均
+
+        Returns:
+            (next_obs, rewards, disagreement): disagreement は正規化した出力のメンバー間標準偏差の平均 (N,)
+        """
+        torch = self._torch
+        inputs = np.concatenate([obs, actions], axis=1).astype(np.float32)
+        x = torch.from_numpy((inputs - self.input_mean) / self.input_std)
+        with torch.inference_mode():
+            outputs = torch.stack([m(x) for m in self.members]).numpy()  # (members, N, obs_dim + 1)
+        disagreement = outputs.std(axis=0).mean(axis=1)
+        if member is None:
+            chosen = outputs.mean(axis=0)
+        else:
+            chosen = outputs[np.asarray(member), np.arange(len(obs))]
+        chosen = chosen * self.output_std + self.output_mean
+        next_obs = (obs + chosen[:, :self.obs_dim]).astype(np.float32)
+        return next_obs, chosen[:, self.obs_dim].astype(np.float32), disagreement
+
+    def save(self, path):
+        self._torch.save({
+            'obs_dim': self.obs_dim,
+            'action_dim': self.action_dim,
+            'num_members': self.num_members,
+            'hidden': self.hidden,
+            'seed': self.seed,
+            'members': [m.state_dict() for m in self.members],
+            'normalization': {
+                'input_mean': self.input_mean, 'input_std': self.input_std,
+                'output_mean': self.output_mean, 'output_std': self.output_std,
+            },
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        import torch
+        state = torch.load(path, map_location='cpu', weights_only=False)
+        model = cls(state['obs_dim'], state['action_dim'], state['num_members'], state['hidden'], state['seed'])
+        for member, member_state in zip(model.members, state['members']):
+            member.load_state_dict(member_state)
+            member.eval()
+        for key, value in state['normalization'].items():
+            setattr(model, key, value)
+        return model
+
+
+def error_by_scenario(model, data):
+    """
+    1ステップ予測の誤差をシナリオごとに集計
+
+    Returns:
+        dict: {scenario: {'transitions', 'obs_rmse', 'pos_error', 'reward_mae', 'disagreement'}}
+              obs_rmse は観測の全次元、pos_error は位置 (m) の誤差の平均
+    """
+    next_obs, rewards, disagreement = model.predict(data['obs'], data['actions'])
+    sq_error = (next_obs - data['next_obs']) ** 2
+    pos_error = np.linalg.norm(next_obs[:, 0:3] - data['next_obs'][:, 0:3], axis=1)
+    reward_error = np.abs(rewards - data['rewards'])
+
+    report = {}
+    for scenario in sorted(set(data['scenario'])) + ['all']:
+        mask = np.ones(len(rewards), dtype=bool) if scenario == 'all' else data['scenario'] == scenario
+        report[scenario] = {
+            'transitions': int(mask.sum()),
+            'obs_rmse': float(np.sqrt(sq_error[mask].mean())),
+            'pos_error': float(pos_error[mask].mean()),
+            'reward_mae': float(reward_error[mask].mean()),
+            'disagreement': float(disagreement[mask].mean()),
+        }
+    return report
+
+
+class ModelVecEnv:
+    """
+    ダイナミクスモデルで N 台分を同時に進める想像上の環境
+
+    開始状態はデータセットの観測から選び、各ステップでは台ごとにランダムなアンサンブルメンバーで
+    次の観測と報酬を予測する。step() の戻り値と自動リセットは SurrogateVecEnv と同じ。
+    """
+
+    def __init__(self, model, start_obs, num_envs=64, horizon=20, env_type='step', max_disagreement=None,
+                 seed=None, action_space=None):
+        """
+        Args:
+            model: predict(obs, actions, member) を持つモデル (EnsembleDynamics)
+            start_obs: 開始状態の候補 (M, obs_dim)
+            num_envs: 同時に動かす台数
+            horizon: 1回の想像ロールアウトの最大ステップ数（モデル誤差の蓄積を抑えるため短くする）
+            env_type: 終了判定のルール ('flat' / 'step')
+            max_disagreement: メンバー間のばらつきがこれを超えたら打ち切る（None: 打ち切らない）
+            seed: 乱数シード
+            action_space: 行動空間（省略時は [-1, 1]^action_dim）
+        """
+        self.model = model
+        self.start_obs = np.asarray(start_obs, dtype=np.float32)
+        self.num_envs = num_envs
+        self.horizon = horizon
+        self.env_type = env_type
+        self.max_disagreement = max_disagreement
+        self.rng = np.random.default_rng(seed)
+        self.action_space = action_space or spaces.Box(low=-1.0, high=1.0, shape=(model.action_dim,),
+                                                       dtype=np.float32)
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(model.obs_dim,), dtype=np.float32)
+        self.obs = np.zeros((num_envs, model.obs_dim), dtype=np.float32)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def _reset_indices(self, indices):
+        self.obs[indices] = self.start_obs[self.rng.integers(0, len(self.start_obs), size=len(indices))]
+        self.steps[indices] = 0
+
+    def reset(self):
+        self._reset_indices(np.arange(self.num_envs))
+        return self.obs.copy()
+
+    def step(self, actions):
+        actions = np.clip(np.asarray(actions, dtype=np.float32).reshape(self.num_envs, -1),
+                          self.action_space.low, self.action_space.high)
+        member = self.rng.integers(0, self.model.num_members, size=self.num_envs)
+        next_obs, rewards, disagreement = self.model.predict(self.obs, actions, member=member)
+        self.obs = next_obs
+        self.steps += 1
+
+        success, failed = terminal_from_obs(next_obs, self.env_type)
+        terminated = success | failed
+        truncated = self.steps >= self.horizon
+        if self.max_disagreement is not None:
+            truncated |= disagreement > self.max_disagreement
+        truncated &= ~terminated
+
+        infos = [{} for _ in range(self.num_envs)]
+        done = np.flatnonzero(terminated | truncated)
+        for i in done:
+            infos[i] = {'is_success': bool(success[i]), 'terminal_observation': next_obs[i].copy()}
+            if truncated[i]:
+                infos[i]['TimeLimit.truncated'] = True
+        if len(done):
+            self._reset_indices(done)
+        return self.obs.copy(), rewards, terminated, truncated, infos
@@ -1,5 +1,6 @@
 import numpy as np
 from xrobocon.base_env import XRoboconBaseEnv
+from xrobocon.scenarios import FLAT_SCENARIOS, FLAT_START_Z_OFFSET
 
 class XRoboconEnv(XRoboconBaseEnv):
     """
@@ -7,58 +8,43 @@ class XRoboconEnv(XRoboconBaseEnv):
     平地移動訓練用の環境です。
     """
     
-    def __init__(self, render_mode=None, robot_type='tristar'):
-        super().__init__(render_mode, robot_type)
+    # シナリオレジストリ (xrobocon/scenarios.py で定義、代理環境と共有)
+    SCENARIOS = FLAT_SCENARIOS
+    SCENARIO_TYPES = [s['type'] for s in SCENARIOS]
+    SCENARIO_WEIGHTS = [s['weight'] for s in SCENARIOS]
+    
+    def __init__(self, render_mode=None, robot_type='tristar', camera_res=(640, 480)):
+        super().__init__(render_mode, robot_type, camera_res)
+        
+        # 開始高さ (平地シナリオ共通)
+        self.start_z_offset = FLAT_START_Z_OFFSET
+        
+        # シナリオレジストリ (開始高さを解決済み)
+        self.scenario_registry = self._build_scenario_registry()
         
     def reset(self, seed=None, options=None):
+        """
+        Args:
+            seed: 乱数シード
+            options: {'scenario': シナリオタイプ, 'jitter_seed': 開始位置のランダム性のシード}
+        """
         # 親クラスのreset呼び出し（seed設定など）
         # super().reset(seed=seed) # BaseEnvのresetはNotImplementedErrorなので呼ばない
         if seed is not None:
             np.random.seed(seed)
         
-        # シナリオ選択
-        # Phase 3-2a: 平地移動訓練 (Tri-star Robot)
-        # 地面（Tier 3の外側）での移動制御を学習
-        
-        # シナリオ選択 (Curriculum: Short 80%, Medium 10%, Long 10%)
-        scenario_type = np.random.choice(
-            ['flat_short', 'flat_medium', 'flat_long'],
-            p=[0.8, 0.1, 0.1]
-        )
-        
-        scenarios = [
-        {
-            'name': 'Scenario 1: 近距離移動 (平地)',
-            'type': 'flat_short',
-            'start_pos': (8.0, 0.0, 0.08),
-            'start_euler': (0, 0, 0),
-            'target_pos': (9.0, 0.0, 0.08), # 1m先
-        },
-        {
-            'name': 'Scenario 2: 中距離移動 (平地)',
-            'type': 'flat_medium',
-            'start_pos': (8.0, 0.0, 0.08),
-            'start_euler': (0, 0, 0),
-            'target_pos': (10.0, 1.0, 0.08), # 2m以上先、斜め
-        },
-        {
-            'name': 'Scenario 3: 長距離移動 (平地)',
-            'type': 'flat_long',
-            'start_pos': (8.0, 0.0, 0.08),
-            'start_euler': (0, 0, 90),     # 横向き
-            'target_pos': (8.0, 3.0, 0.08), # 3m先
-        },
-    ]
-        
-        selected_scenario = next(s for s in scenarios if s['type'] == scenario_type)
+        # シナリオ選択 (options で指定がなければ SCENARIO_WEIGHTS でサンプリング)
+        selected_scenario, rng = self._select_scenario(options)
+        scenario_type = selected_scenario['type']
         start_pos = selected_scenario['start_pos']
         start_euler = selected_scenario['start_euler']
         target_pos = selected_scenario['target_pos']
+        jitter = selected_scenario['jitter']
             
         # ランダム性を少し加える（±5cm、±5度）
-        start_x = start_pos[0] + np.random.uniform(-0.05, 0.05)
-        start_y = start_pos[1] + np.random.uniform(-0.05, 0.05)
-        start_yaw = start_euler[2] + np.random.uniform(-5, 5)
+        start_x = start_pos[0] + rng.uniform(-jitter['xy'], jitter['xy'])
+        start_y = start_pos[1] + rng.uniform(-jitter['xy'], jitter['xy'])
+        start_yaw = start_euler[2] + rng.uniform(-jitter['yaw'], jitter['yaw'])
         
         # シーンリセット (物理状態のクリア)
         self.scene.reset()
@@ -78,7 +64,9 @@ class XRoboconEnv(XRoboconBaseEnv):
         # 高さトラッキング用（報酬計算に使用）
         self.prev_height = start_pos[2]
         
-        return self._get_obs(), {}
+        self.current_scenario_type = scenario_type
+        
+        return self._get_obs(), {'scenario_type': scenario_type}
         
     def _set_random_target(self):
         """(廃止予定) ランダムなターゲットを設定"""
@@ -92,6 +80,7 @@ class XRoboconEnv(XRoboconBaseEnv):
         reward = 0.0
         terminated = False
         truncated = False
+        success = False
         
         # 状態取得
         robot_pos = self.robot.get_pos().cpu().numpy()
@@ -122,6 +111,7 @@ class XRoboconEnv(XRoboconBaseEnv):
                     reward += 50.0
                 
                 terminated = True
+                success = True
             
         # 2. 安定性報酬 (転倒防止)
         stability_penalty = abs(euler[0]) * 0.05 + abs(euler[1]) * 0.05
@@ -152,5 +142,11 @@ class XRoboconEnv(XRoboconBaseEnv):
         # 時間切れ
         if not self.game.is_running:
             truncated = True
+        
+        # エピソード終了時に成功フラグとシナリオを記録
+        info = {}
+        if terminated or truncated:
+            info['is_success'] = success
+            info['scenario_type'] = self.current_scenario_type
             
-        return self._get_obs(), reward, terminated, truncated, {}
+        return self._get_obs(), reward, terminated, truncated, info
@@ -0,0 +1,32 @@
+"""
+評価進捗プロトコル
+
+evaluate_model.py --progress_json が標準出力に書き出す構造化進捗行の形式。
+1行1イベントで、接頭辞の後に JSON を続ける:
+
+    @@EVAL {"event": "episode", "index": 0, "scenario": "step_straight", "success": true, "reward": 12.3, ...}
+
+イベントの種類:
+    start:   評価開始 (num_episodes, env_type, robot_type)
+    episode: 1エピソード完了 (index, scenario, success, reward, steps, min_dist, cached)
+    summary: 評価終了 (success_rate, avg_reward, std_reward, avg_steps, avg_dist, episodes_run, episodes_saved)
+"""
+import json
+
+PROGRESS_PREFIX = '@@EVAL '
+
+
+def format_progress(event, **data):
+    """進捗イベントを1行の文字列にする"""
+    data['event'] = event
+    return PROGRESS_PREFIX + json.dumps(data, ensure_ascii=False)
+
+
+def parse_progress(line):
+    """進捗行ならイベントの辞書を、そうでなければNoneを返す"""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(PROGRESS_PREFIX):])
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,75 @@
+"""
+評価統計モジュール
+
+成功率の信頼区間（Wilsonスコア区間）と、シナリオごとの逐次検定による
+評価打ち切り（早期停止）の判定を行う。
+"""
+from statistics import NormalDist
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """
+    成功率のWilsonスコア信頼区間
+
+    Args:
+        successes: 成功回数
+        n: 試行回数
+        confidence: 信頼水準
+
+    Returns:
+        tuple: (下限, 上限)。n=0 の場合は (0.0, 1.0)
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    p = successes / n
+    denom = 1.0 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * ((p * (1.0 - p) / n + z * z / (4 * n * n)) ** 0.5) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class SequentialStopper:
+    """
+    シナリオごとに成功率の信頼区間を更新し、十分な結果が得られたシナリオの評価を打ち切る
+
+    次のいずれかを満たした時点で停止する（min_episodes 以上の場合のみ）:
+    - 信頼区間の幅が ci_width 以下
+    - 信頼区間の下限が threshold より上（明らかに合格）
+    - 信頼区間の上限が threshold より下（明らかに不合格）
+    """
+
+    def __init__(self, ci_width=0.2, threshold=0.5, confidence=0.95, min_episodes=5):
+        self.ci_width = ci_width
+        self.threshold = threshold
+        self.confidence = confidence
+        self.min_episodes = min_episodes
+        self.counts = {}
+        self.successes = {}
+        self.stop_reasons = {}
+
+    def update(self, scenario_type, success):
+        """エピソード結果を記録し、停止条件を判定"""
+        if self.is_stopped(scenario_type):
+            return
+        self.counts[scenario_type] = self.counts.get(scenario_type, 0) + 1
+        self.successes[scenario_type] = self.successes.get(scenario_type, 0) + (1 if success else 0)
+
+        n = self.counts[scenario_type]
+        if n < self.min_episodes:
+            return
+        low, high = self.interval(scenario_type)
+        if low > self.threshold:
+            self.stop_reasons[scenario_type] = 'above_threshold'
+        elif high < self.threshold:
+            self.stop_reasons[scenario_type] = 'below_threshold'
+        elif high - low <= self.ci_width:
+            self.stop_reasons[scenario_type] = 'ci_width'
+
+    def interval(self, scenario_type):
+        """シナリオの現在の信頼区間"""
+        return wilson_interval(self.successes.get(scenario_type, 0), self.counts.get(scenario_type, 0),
+                               self.confidence)
+
+    def is_stopped(self, scenario_type):
+        return scenario_type in self.stop_reasons
@@ -0,0 +1,136 @@
+"""
+評価結果ストア
+
+エピソード単位の評価結果を JSON Lines 形式で保存する。
+各レコードは (モデルファイルのハッシュ, 環境タイプ, ロボットタイプ, シナリオ, シード, 物理プロファイル)
+をキーとして持ち、同じ条件のエピソードは再評価せずにストアの結果を使う。
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from xrobocon.reward_terms import REWARD_VERSION
+from xrobocon.robot_configs import SIM_PARAMS, get_robot_config
+
+KEY_FIELDS = ('model_hash', 'env_type', 'robot_type', 'scenario', 'seed', 'physics_profile')
+# summarize() で集計をまとめる単位（同じモデルでも評価条件が違えば別の行）
+SUMMARY_FIELDS = ('model_hash', 'env_type', 'robot_type', 'physics_profile')
+
+# ファイルハッシュのキャッシュ {path: (mtime, size, hash)}
+_file_hash_cache = {}
+
+
+def file_hash(path):
+    """ファイル内容の SHA-256（ファイル名や置き場所が変わっても同じモデルは同じハッシュ）"""
+    stat = os.stat(path)
+    cached = _file_hash_cache.get(path)
+    if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _file_hash_cache[path] = (stat.st_mtime, stat.st_size, digest)
+    return digest
+
+
+def physics_profile(robot_type, stall=None):
+    """
+    物理条件の識別子
+
+    シミュレーション共通パラメータ、ロボットの物理・制御・報酬パラメータと報酬コードのバージョンのハッシュ。
+    トルクや質量、報酬の重みを変更した場合は別の評価条件として扱われる。
+    stall (停滞検出のパラメータ) を指定した場合はそれも含める（省略時は従来と同じ値）。
+    """
+    config = get_robot_config(robot_type)
+    profile = {
+        'sim': SIM_PARAMS,
+        'physics': config.get('physics', {}),
+        'control': config.get('control', {}),
+        'reward': config.get('reward_params', {}),
+        'reward_version': REWARD_VERSION,
+    }
+    if stall is not None:
+        profile['stall'] = stall
+    text = json.dumps(profile, sort_keys=True, default=list)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def make_key(model_hash, env_type, robot_type, scenario, seed, physics_profile):
+    """レコードのキー文字列"""
+    return '|'.join(str(v) for v in (model_hash, env_type, robot_type, scenario, seed, physics_profile))
+
+
+class EvaluationStore:
+    """エピソード単位の評価結果を保存・検索するストア"""
+
+    def __init__(self, path=None):
+        if path is None:
+            # デフォルトはプロジェクトルート/evaluation_results/episodes.jsonl
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            path = os.path.join(project_root, 'evaluation_results', 'episodes.jsonl')
+        self.path = path
+        self.records = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で中断された行は無視
+                    continue
+                self.records[make_key(*(record[k] for k in KEY_FIELDS))] = record
+
+    def get(self, model_hash, env_type, robot_type, scenario, seed, physics_profile):
+        """条件に一致するレコード（なければNone）"""
+        return self.records.get(make_key(model_hash, env_type, robot_type, scenario, seed, physics_profile))
+
+    def add(self, record):
+        """レコードを追記（同じキーの既存レコードは置き換え）"""
+        record = dict(record)
+        record.setdefault('timestamp', datetime.now().isoformat(timespec='seconds'))
+        self.records[make_key(*(record[k] for k in KEY_FIELDS))] = record
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def query(self, **conditions):
+        """条件（フィールド名=値）にすべて一致するレコードの一覧"""
+        return [
+            r for r in self.records.values()
+            if all(r.get(k) == v for k, v in conditions.items())
+        ]
+
+    def summarize(self, **conditions):
+        """
+        条件に一致するレコードを (モデル, 環境, ロボット, 物理プロファイル)・シナリオごとに集計
+
+        Returns:
+            dict: {(model_hash, env_type, robot_type, physics_profile):
+                   {scenario: {'count', 'success', 'success_rate', 'avg_reward', 'model_path'}}}
+        """
+        summary = {}
+        for r in self.query(**conditions):
+            group = tuple(r.get(k) for k in SUMMARY_FIELDS)
+            s = summary.setdefault(group, {}).setdefault(
+                r['scenario'], {'count': 0, 'success': 0, 'reward': 0.0, 'model_path': r.get('model_path')})
+            s['count'] += 1
+            s['success'] += 1 if r['success'] else 0
+            s['reward'] += r['reward']
+
+        for scenarios in summary.values():
+            for s in scenarios.values():
+                s['success_rate'] = s['success'] / s['count']
+                s['avg_reward'] = s.pop('reward') / s['count']
+        return summary
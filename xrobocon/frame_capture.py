@@ -0,0 +1,167 @@
+"""
+オフスクリーン描画の非同期キャプチャ
+
+シミュレーションの every ステップごとにカメラで描画し、フレームを有界キュー経由で
+バックグラウンドのエンコードスレッドに渡す。uint8/BGR への変換と書き出し (MP4 / PNG連番) はスレッド側で行う。
+キューが満杯のときはそのフレームを捨てて先に進むので、描画と書き出しで制御・物理のループが待たされることはない。
+
+描画 (camera.render()) は OpenGL コンテキストを持つメインスレッドで行う必要がある。
+使い方:
+    capture = FrameCapture(env.camera, make_frame_sink('episode.mp4', capture_fps(4)), every=4)
+    for ...:
+        env.step(action)
+        if capture.due():
+            env.camera.set_pose(...)   # 追従カメラなど（描画するステップだけ）
+        capture.step()
+    print(capture.close())
+"""
+import os
+import queue
+import threading
+
+import numpy as np
+
+from xrobocon.robot_configs import SIM_PARAMS
+
+
+def capture_fps(every, dt=None):
+    """every ステップごとに描画したときの動画のフレームレート（実時間と同じ速さで再生される値）"""
+    dt = SIM_PARAMS['dt'] if dt is None else dt
+    return 1.0 / (dt * every)
+
+
+def to_bgr_uint8(rgb):
+    """camera.render() の RGB (float [0, 1] または uint8, 3/4チャンネル) を OpenCV 用の BGR uint8 に変換"""
+    rgb = np.asarray(rgb)[..., :3]
+    if rgb.dtype != np.uint8:
+        rgb = (np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+    return np.ascontiguousarray(rgb[..., ::-1])
+
+
+class VideoSink:
+    """MP4 への書き出し (cv2.VideoWriter)。フレームサイズは最初のフレームで決まる"""
+
+    def __init__(self, path, fps, fourcc='mp4v'):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.writer = None
+
+    def write(self, frame):
+        import cv2
+        if self.writer is None:
+            height, width = frame.shape[:2]
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+            if not self.writer.isOpened():
+                raise RuntimeError(f"Cannot open video writer for {self.path}")
+        self.writer.write(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+
+
+class PngSequenceSink:
+    """PNG 連番への書き出し (<dir>/frame_000000.png, ...)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame):
+        import cv2
+        cv2.imwrite(os.path.join(self.directory, f"frame_{self.count:06d}.png"), frame)
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+def make_frame_sink(output, fps):
+    """出力先が .mp4 / .avi なら動画、それ以外はディレクトリとみなして PNG 連番"""
+    if os.path.splitext(output)[1].lower() in ('.mp4', '.avi'):
+        return VideoSink(output, fps)
+    return PngSequenceSink(output)
+
+
+class FrameCapture:
+    """
+    間引き描画 + 有界キュー + エンコードスレッド
+
+    統計 (close() の戻り値):
+        rendered: 描画したフレーム数, written: 書き出したフレーム数, dropped: キューが満杯で捨てたフレーム数
+    """
+
+    def __init__(self, camera, sink=None, every=1, queue_size=16, keep_latest=False):
+        """
+        Args:
+            camera: render() が (rgb, ...) を返すカメラ (env.camera)
+            sink: write(frame) / close() を持つ書き出し先 (None なら書き出さない)
+            every: 描画の間隔 (シミュレーションのステップ数)
+            queue_size: エンコード待ちのフレームの上限
+            keep_latest: 変換済みの最新フレームを latest に保持する（プレビュー表示用）
+        """
+        self.camera = camera
+        self.sink = sink
+        self.every = max(1, int(every))
+        self.keep_latest = keep_latest
+        self.latest = None
+        self.step_count = 0
+        self.rendered = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, name='frame-capture', daemon=True)
+        self.thread.start()
+
+    def due(self):
+        """次の step() で描画するか"""
+        return self.step_count % self.every == 0
+
+    def step(self):
+        """シミュレーションの1ステップごとに呼ぶ。描画する番なら描画してキューに入れる"""
+        if self.due():
+            self.submit(self.camera.render()[0])
+        self.step_count += 1
+
+    def submit(self, rgb):
+        """描画済みのフレームをキューに入れる（満杯なら捨てる）。入れたら True"""
+        self.rendered += 1
+        try:
+            self.queue.put_nowait(rgb)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            rgb = self.queue.get()
+            if rgb is None:
+                break
+            if self.error is not None:
+                # 書き出しに失敗した後はキューを空にするだけ
+                continue
+            frame = to_bgr_uint8(rgb)
+            if self.keep_latest:
+                self.latest = frame
+            if self.sink is not None:
+                try:
+                    self.sink.write(frame)
+                    self.written += 1
+                except Exception as e:
+                    self.error = e
+
+    def close(self):
+        """キューに残ったフレームを書き出してスレッドを終了し、統計を返す"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.sink is not None:
+            self.sink.close()
+        if self.error is not None:
+            raise self.error
+        return {'rendered': self.rendered, 'written': self.written, 'dropped': self.dropped}
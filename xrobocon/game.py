@@ -1,3 +1,4 @@
+import copy
 import numpy as np
 import time
 
@@ -134,6 +135,24 @@ class XRoboconGame:
         self.score += points
         print(f"Spot Collected! ID={spot['id']}, Tier={spot['tier']}, Points={points}, Total Score={self.score}")
         
+    def get_state(self):
+        """ゲームの進行状態（スナップショット用）"""
+        return {
+            'score': self.score,
+            'elapsed_time': self.elapsed_time,
+            'is_running': self.is_running,
+            'time_limit': self.time_limit,
+            'spots': copy.deepcopy(self.spots),
+        }
+
+    def set_state(self, state):
+        """get_state() で取得した進行状態を復元"""
+        self.score = state['score']
+        self.elapsed_time = state['elapsed_time']
+        self.is_running = state['is_running']
+        self.time_limit = state['time_limit']
+        self.spots = copy.deepcopy(state['spots'])
+
     def get_info(self):
         """表示用情報を返す"""
         return {
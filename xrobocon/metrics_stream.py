@@ -0,0 +1,280 @@
+"""
+学習メトリクスストリーム
+
+学習中のメトリクスを固定長レコードの追記専用バイナリファイルに書き出す。
+GUIなどの読み手はファイルを追いかけて新しいレコードだけを読み込む（標準出力の解析は不要）。
+
+レコードの種類:
+    KIND_EPISODE: エピソード終了 (timesteps, ep_reward, ep_length, scenario, success)
+    KIND_UPDATE:  ロールアウト/PPO更新 (timesteps, fps, 各種損失)
+    KIND_REWARD_TERM: エピソードの報酬内訳の1項目 (timesteps, scenario, term, ep_reward = 項目のエピソード内合計)
+
+シナリオ名・報酬項目名はレコードには番号で格納し、名前の一覧は `<path>.json` に保存する。
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+KIND_EPISODE = 0
+KIND_UPDATE = 1
+KIND_REWARD_TERM = 2
+
+NO_SCENARIO = 255
+
+RECORD_DTYPE = np.dtype([
+    ('kind', 'u1'),
+    ('scenario', 'u1'),       # シナリオ番号 (NO_SCENARIO = なし)
+    ('success', 'i1'),        # 1: 成功, 0: 失敗, -1: 不明
+    ('term', 'u1'),           # 報酬項目番号 (KIND_REWARD_TERM のみ)
+    ('_pad', 'u1', (4,)),
+    ('timesteps', '<i8'),
+    ('wall_time', '<f8'),
+    ('ep_reward', '<f4'),
+    ('ep_length', '<f4'),
+    ('fps', '<f4'),
+    ('policy_loss', '<f4'),
+    ('value_loss', '<f4'),
+    ('entropy_loss', '<f4'),
+    ('approx_kl', '<f4'),
+    ('clip_fraction', '<f4'),
+])
+
+# KIND_UPDATE レコードの損失フィールドと SB3 ロガーのキーの対応
+LOSS_KEYS = {
+    'policy_loss': 'train/policy_gradient_loss',
+    'value_loss': 'train/value_loss',
+    'entropy_loss': 'train/entropy_loss',
+    'approx_kl': 'train/approx_kl',
+    'clip_fraction': 'train/clip_fraction',
+}
+
+
+def metrics_stream_path(model_name):
+    """モデル名（拡張子なし）に対応するメトリクスファイルのパス"""
+    if model_name.endswith('.zip'):
+        model_name = model_name[:-4]
+    return f"{model_name}_metrics.bin"
+
+
+def _meta_path(path):
+    return path + '.json'
+
+
+def _load_meta(path):
+    meta_path = _meta_path(path)
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_scenarios(path):
+    return _load_meta(path).get('scenarios', [])
+
+
+class MetricsStreamWriter:
+    """
+    メトリクスを追記するライタ
+
+    レコードは事前確保したバッファに溜め、満杯になるか flush_interval 秒経過した時点でまとめて書き込む。
+    既存のファイルには追記するため、チャンクごとにプロセスを再起動する学習でも1本の系列になる。
+    """
+
+    def __init__(self, path, buffer_size=256, flush_interval=1.0):
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=RECORD_DTYPE)
+        self.count = 0
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+        meta = _load_meta(path)
+        self.scenarios = meta.get('scenarios', [])
+        self.reward_terms = meta.get('reward_terms', [])
+        self.file = open(path, 'ab')
+
+    def _save_meta(self):
+        # 読み手が途中の状態を読まないよう、一時ファイル経由で置き換える
+        tmp_path = _meta_path(self.path) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'scenarios': self.scenarios, 'reward_terms': self.reward_terms}, f,
+                      ensure_ascii=False)
+        os.replace(tmp_path, _meta_path(self.path))
+
+    def _scenario_index(self, scenario_type):
+        if scenario_type is None:
+            return NO_SCENARIO
+        if scenario_type not in self.scenarios:
+            self.scenarios.append(scenario_type)
+            self._save_meta()
+        return self.scenarios.index(scenario_type)
+
+    def _term_index(self, name):
+        if name not in self.reward_terms:
+            self.reward_terms.append(name)
+            self._save_meta()
+        return self.reward_terms.index(name)
+
+    def _next_record(self, kind, timesteps):
+        if self.count >= len(self.buffer):
+            self.flush()
+        rec = self.buffer[self.count]
+        rec.fill(0)
+        for name in ('ep_reward', 'ep_length', 'fps') + tuple(LOSS_KEYS):
+            rec[name] = np.nan
+        rec['kind'] = kind
+        rec['scenario'] = NO_SCENARIO
+        rec['success'] = -1
+        rec['timesteps'] = timesteps
+        rec['wall_time'] = time.time()
+        self.count += 1
+        return rec
+
+    def write_episode(self, timesteps, reward, length, scenario_type=None, success=None):
+        """エピソード終了レコードを追加"""
+        rec = self._next_record(KIND_EPISODE, timesteps)
+        rec['ep_reward'] = reward
+        rec['ep_length'] = length
+        rec['scenario'] = self._scenario_index(scenario_type)
+        if success is not None:
+            rec['success'] = 1 if success else 0
+        self._maybe_flush()
+
+    def write_reward_terms(self, timesteps, terms, scenario_type=None):
+        """エピソードの報酬内訳 {項目名: 合計} を項目ごとのレコードとして追加"""
+        scenario = self._scenario_index(scenario_type)
+        for name, value in terms.items():
+            rec = self._next_record(KIND_REWARD_TERM, timesteps)
+            rec['scenario'] = scenario
+            rec['term'] = self._term_index(name)
+            rec['ep_reward'] = value
+        self._maybe_flush()
+
+    def write_update(self, timesteps, fps=None, **losses):
+        """更新レコード（FPS・損失）を追加"""
+        rec = self._next_record(KIND_UPDATE, timesteps)
+        if fps is not None:
+            rec['fps'] = fps
+        for name, value in losses.items():
+            if name in LOSS_KEYS and value is not None:
+                rec[name] = value
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.count > 0:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.file.flush()
+            self.count = 0
+        self.last_flush = time.time()
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+class MetricsStreamReader:
+    """
+    メトリクスファイルを追いかけて読むリーダ
+
+    read_new() は前回以降に追記された完全なレコードのみを返す（書き込み途中の端数は次回に持ち越す）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.scenarios = []
+        self.reward_terms = []
+
+    def read_new(self):
+        """新しいレコードの配列（RECORD_DTYPE）を返す"""
+        if not os.path.exists(self.path):
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # ファイルが作り直された
+            self.offset = 0
+        num_records = (size - self.offset) // RECORD_DTYPE.itemsize
+        if num_records <= 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(num_records * RECORD_DTYPE.itemsize)
+        self.offset += len(data)
+        meta = _load_meta(self.path)
+        self.scenarios = meta.get('scenarios', [])
+        self.reward_terms = meta.get('reward_terms', [])
+        return np.frombuffer(data, dtype=RECORD_DTYPE)
+
+
+def load_metrics(path):
+    """メトリクスファイル全体をメモリマップで開く（レコード配列, シナリオ名の一覧）"""
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    num_records = size // RECORD_DTYPE.itemsize
+    if num_records == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE), _load_scenarios(path)
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(num_records,))
+    return records, _load_scenarios(path)
+
+
+def reward_term_means(records, reward_terms, last=None):
+    """
+    KIND_REWARD_TERM レコードから報酬項目ごとのエピソード内合計の平均を求める
+
+    Args:
+        records: レコード配列
+        reward_terms: 項目名の一覧（メタデータの reward_terms）
+        last: 各項目の直近 last エピソードだけを使う（None なら全エピソード）
+
+    Returns:
+        dict: {項目名: 平均} (記録のない項目は含まない)
+    """
+    records = records[records['kind'] == KIND_REWARD_TERM]
+    means = {}
+    for index, name in enumerate(reward_terms):
+        values = records['ep_reward'][records['term'] == index]
+        if last is not None:
+            values = values[-last:]
+        if len(values) > 0:
+            means[name] = float(np.mean(values))
+    return means
+
+
+def decimate_minmax(x, y, max_points=2000):
+    """
+    描画用の min/max 間引き
+
+    系列を max_points/2 個の区間に分け、各区間の最小値と最大値の点だけを残す。
+    外れ値やスパイクを失わずに、点数を描画幅に応じた一定数に抑える。
+
+    Returns:
+        tuple: (x, y) 間引き後の配列
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+
+    num_buckets = max_points // 2
+    edges = np.linspace(0, n, num_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    lengths = np.diff(edges)
+
+    # 各区間内の最小・最大の位置を求める（区間長は高々1つ違うので、端数は最後の値で埋める）
+    width = int(lengths.max())
+    idx = starts[:, None] + np.minimum(np.arange(width)[None, :], lengths[:, None] - 1)
+    values = y[idx]
+    min_idx = idx[np.arange(num_buckets), np.nanargmin(values, axis=1)]
+    max_idx = idx[np.arange(num_buckets), np.nanargmax(values, axis=1)]
+
+    # x の順序を保つように区間内で並べる
+    keep = np.sort(np.stack([min_idx, max_idx], axis=1), axis=1).ravel()
+    return x[keep], y[keep]
@@ -0,0 +1,222 @@
+"""
+書き出したポリシーの推論ランタイム
+
+学習済みPPO (zip) の決定論的な行動（アクション分布の平均を行動空間でクリップしたもの）だけを
+TorchScript (.pt) / ONNX (.onnx) に書き出し、軽量なクラスで推論する。
+SB3 の model.predict() が毎回行う観測の検証・分布の構築・変換を省くため、1回あたりの推論が速い。
+
+書き出したファイルの隣に <prefix>.json（観測・行動の次元、行動空間の範囲、元モデル）を保存する。
+PolicyRuntime は predict(obs, deterministic=True) を持つので、SB3 モデルの代わりにそのまま使える。
+"""
+import importlib.util
+import json
+import os
+import time
+
+import numpy as np
+
+EXPORTED_EXTENSIONS = ('.pt', '.onnx')
+
+
+def is_exported_policy(path):
+    """書き出したポリシーのパスか"""
+    return path.endswith(EXPORTED_EXTENSIONS)
+
+
+def missing_onnx_modules():
+    """ONNX の書き出し・推論に必要で、インストールされていないモジュール (onnx / onnxruntime)"""
+    return [name for name in ('onnx', 'onnxruntime') if importlib.util.find_spec(name) is None]
+
+
+def metadata_path(path):
+    """書き出したポリシーのメタデータ (<prefix>.json) のパス"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def export_policy(model, output_prefix, formats=('torchscript', 'onnx'), source=None):
+    """
+    PPOモデルの決定論的アクターを書き出す
+
+    Args:
+        model: 学習済みPPOモデル
+        output_prefix: 出力パス（拡張子なし）
+        formats: 'torchscript' / 'onnx' の組み合わせ
+        source: メタデータに記録する元モデルのパス
+
+    Returns:
+        list: 書き出したファイルのパス
+    """
+    import torch
+    import torch.nn as nn
+
+    policy = model.policy.to('cpu').eval()
+    low = torch.as_tensor(model.action_space.low, dtype=torch.float32)
+    high = torch.as_tensor(model.action_space.high, dtype=torch.float32)
+
+    class DeterministicActor(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.features_extractor = getattr(policy, 'pi_features_extractor', policy.features_extractor)
+            self.mlp_extractor = policy.mlp_extractor
+            self.action_net = policy.action_net
+            self.register_buffer('low', low)
+            self.register_buffer('high', high)
+
+        def forward(self, obs):
+            features = self.features_extractor(obs)
+            latent = self.mlp_extractor.forward_actor(features)
+            return torch.max(torch.min(self.action_net(latent), self.high), self.low)
+
+    actor = DeterministicActor().eval()
+    obs_dim = int(np.prod(model.observation_space.shape))
+    example = torch.zeros(1, obs_dim, dtype=torch.float32)
+
+    written = []
+    os.makedirs(os.path.dirname(os.path.abspath(output_prefix)), exist_ok=True)
+    with torch.no_grad():
+        if 'torchscript' in formats:
+            path = output_prefix + '.pt'
+            # 重みを定数として埋め込み、推論時の属性参照を省く
+            traced = torch.jit.trace(actor, example).eval()
+            torch.jit.freeze(traced).save(path)
+            written.append(path)
+        if 'onnx' in formats:
+            path = output_prefix + '.onnx'
+            torch.onnx.export(actor, example, path, input_names=['obs'], output_names=['action'],
+                              dynamic_axes={'obs': {0: 'batch'}, 'action': {0: 'batch'}}, opset_version=17)
+            written.append(path)
+
+    write_metadata(output_prefix, model.observation_space, model.action_space, written, source=source)
+    return written
+
+
+def write_metadata(output_prefix, observation_space, action_space, files, source=None, **extra):
+    """書き出したポリシーのメタデータ (<prefix>.json) を保存"""
+    metadata = {
+        'obs_dim': int(np.prod(observation_space.shape)),
+        'action_dim': int(np.prod(action_space.shape)),
+        'action_low': action_space.low.tolist(),
+        'action_high': action_space.high.tolist(),
+        'source': source,
+        'files': [os.path.basename(p) for p in files],
+    }
+    metadata.update(extra)
+    with open(output_prefix + '.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+
+class PolicyRuntime:
+    """
+    書き出したポリシーの推論
+
+    act(obs) は (obs_dim,) なら (action_dim,)、(N, obs_dim) なら (N, action_dim) を返す。
+    """
+
+    def __init__(self, path, num_threads=1):
+        """
+        Args:
+            path: .pt (TorchScript) または .onnx
+            num_threads: 推論スレッド数（小さなMLPでは1が最も速い）
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Exported policy not found: {path}")
+        self.path = path
+        self.metadata = {}
+        if os.path.exists(metadata_path(path)):
+            with open(metadata_path(path), 'r', encoding='utf-8') as f:
+                self.metadata = json.load(f)
+
+        if path.endswith('.onnx'):
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = num_threads
+            self._session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+            self._input_name = self._session.get_inputs()[0].name
+            self._run = self._run_onnx
+        else:
+            import torch
+            torch.set_num_threads(num_threads)
+            self._torch = torch
+            self._module = torch.jit.load(path, map_location='cpu').eval()
+            self._run = self._run_torchscript
+
+    def _run_onnx(self, obs):
+        return self._session.run(None, {self._input_name: obs})[0]
+
+    def _run_torchscript(self, obs):
+        with self._torch.inference_mode():
+            return self._module(self._torch.from_numpy(obs)).numpy()
+
+    def act(self, obs):
+        obs = np.ascontiguousarray(obs, dtype=np.float32)
+        if obs.ndim == 1:
+            return self._run(obs[None, :])[0]
+        return self._run(obs)
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        """SB3 の model.predict() と同じ呼び出し方 (行動, None) を返す"""
+        return self.act(obs), None
+
+
+def load_policy(model_path, env=None):
+    """
+    推論用にモデルを読み込む
+    .pt / .onnx は PolicyRuntime、それ以外は従来どおり SB3 の PPO として読み込む
+    """
+    if is_exported_policy(model_path):
+        return PolicyRuntime(model_path)
+    import xrobocon.common as common
+    return common.load_trained_model(model_path, env)
+
+
+def measure_latency(predict, obs, repeats=1000, warmup=50):
+    """
+    predict(obs) の1回あたりの所要時間を計測
+
+    Returns:
+        dict: {'mean_us', 'p50_us', 'p99_us'}
+    """
+    for _ in range(warmup):
+        predict(obs)
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        predict(obs)
+        times[i] = time.perf_counter() - start
+    times *= 1e6
+    return {'mean_us': float(times.mean()), 'p50_us': float(np.percentile(times, 50)),
+            'p99_us': float(np.percentile(times, 99))}
+
+
+def print_policy_latency(policy, obs=None, repeats=1000):
+    """
+    読み込んだポリシーの predict() 1回あたりの推論時間を表示
+
+    書き出したポリシーの場合は act() と、メタデータの元モデル (zip) が残っていれば SB3 の predict() も並べる。
+
+    Args:
+        policy: load_policy() で読み込んだモデル
+        obs: 計測に使う観測 (obs_dim,)。省略時はゼロの観測（MLP の推論時間は値に依存しない）
+        repeats: 計測回数
+    """
+    if obs is None:
+        if isinstance(policy, PolicyRuntime):
+            obs = np.zeros(policy.metadata['obs_dim'], dtype=np.float32)
+        else:
+            obs = np.zeros(policy.observation_space.shape, dtype=np.float32)
+    obs = np.asarray(obs, dtype=np.float32)
+    rows = [('predict', lambda o: policy.predict(o, deterministic=True))]
+    if isinstance(policy, PolicyRuntime):
+        rows.append(('act', policy.act))
+        source = policy.metadata.get('source')
+        if source and os.path.exists(source):
+            from stable_baselines3 import PPO
+            reference = PPO.load(source, device='cpu')
+            rows.append((f'SB3 predict ({os.path.basename(source)})',
+                         lambda o: reference.predict(o, deterministic=True)))
+
+    print(f"\n推論時間 ({os.path.basename(getattr(policy, 'path', '') or type(policy).__name__)}, batch=1, {repeats}回)")
+    for name, fn in rows:
+        stats = measure_latency(fn, obs, repeats=repeats)
+        print(f"  {name:<36} mean {stats['mean_us']:>8.1f}us  p50 {stats['p50_us']:>8.1f}us  p99 {stats['p99_us']:>8.1f}us")
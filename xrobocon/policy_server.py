@@ -0,0 +1,321 @@
+"""
+ローカル推論サーバー
+
+同じマシンで複数の評価・可視化・DAgger プロセスを動かす際に、各プロセスがポリシーを読み込んで
+1サンプルずつ推論する代わりに、1つのサーバーがモデルをハッシュごとに一度だけ読み込み、
+短い時間窓に届いた観測をまとめてバッチ推論する。
+読み込んだモデルは max_models 個まで保持し、超えたら最も長く使われていないものを解放する
+（DAgger のように同じパスへ上書き保存を繰り返しても、古いモデルが溜まり続けない）。
+
+通信は Unix ドメインソケットで、メッセージは固定長ヘッダ + 可変長データ:
+    ヘッダ  '<BIII' = (op, rows, cols, extra_len)
+    extra   extra_len バイト（モデルのパス / キー / エラーメッセージ）
+    payload rows * cols 個の float32（観測 / 行動）
+
+    OP_LOAD: クライアント→サーバー extra=モデルのパス   / 応答 extra=モデルのキー, cols=行動の次元
+    OP_ACT:  クライアント→サーバー extra=モデルのキー, payload=観測 (rows, obs_dim) / 応答 payload=行動
+    OP_UNKNOWN: サーバー→クライアント OP_ACT のキーのモデルが読み込まれていない（解放済み）。クライアントは読み込み直す
+    OP_ERROR: サーバー→クライアント extra=エラーメッセージ
+"""
+import os
+import queue
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from xrobocon.evaluation_store import file_hash
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'xrobocon_policy.sock')
+
+OP_LOAD = 1
+OP_ACT = 2
+OP_UNKNOWN = 3
+OP_ERROR = 255
+
+_HEADER = struct.Struct('<BIII')
+
+
+def _recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Connection closed")
+        received += n
+    return buf
+
+
+def send_message(sock, op, extra=b'', array=None):
+    """メッセージを送信（array は float32 の2次元配列）"""
+    if array is None:
+        rows, cols, payload = 0, 0, b''
+    else:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        rows, cols = array.shape
+        payload = array.tobytes()
+    sock.sendall(_HEADER.pack(op, rows, cols, len(extra)) + extra + payload)
+
+
+def recv_message(sock):
+    """メッセージを受信して (op, rows, cols, extra, array) を返す"""
+    op, rows, cols, extra_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    extra = bytes(_recv_exact(sock, extra_len)) if extra_len else b''
+    array = None
+    if rows * cols:
+        array = np.frombuffer(_recv_exact(sock, rows * cols * 4), dtype=np.float32).reshape(rows, cols)
+    return op, rows, cols, extra, array
+
+
+def load_inference_policy(path):
+    """サーバーでのモデル読み込み（.pt / .onnx は PolicyRuntime、zip は CPU の PPO）"""
+    from xrobocon.policy_runtime import PolicyRuntime, is_exported_policy
+    if is_exported_policy(path):
+        return PolicyRuntime(path)
+    from stable_baselines3 import PPO
+    return PPO.load(path, device='cpu')
+
+
+class _ModelBatcher:
+    """1モデル分の推論キュー。専用スレッドが時間窓内の要求をまとめて推論する"""
+
+    def __init__(self, policy, window, max_batch):
+        self.policy = policy
+        self.window = window
+        self.max_batch = max_batch
+        self.action_dim = None
+        self.batches = 0
+        self.requests = 0
+        self.stopped = False
+        self._stop_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, obs):
+        """
+        観測 (rows, obs_dim) を推論して行動を返す（バッチ推論が終わるまで待つ）
+        停止済み（モデルが解放された）の場合は None
+        """
+        request = {'obs': obs, 'done': threading.Event(), 'actions': None, 'error': None}
+        with self._stop_lock:
+            # 停止の合図より後ろに要求を積むと処理されずに待ち続けるため、停止と排他にする
+            if self.stopped:
+                return None
+            self._queue.put(request)
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+        return request['actions']
+
+    def stop(self):
+        """受け付け済みの要求を処理してからスレッドを止める"""
+        with self._stop_lock:
+            if self.stopped:
+                return
+            self.stopped = True
+            self._queue.put(None)
+        self._thread.join(timeout=1.0)
+
+    def _loop(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            rows = len(request['obs'])
+            # 最初の要求から window 秒の間に届いた要求をまとめる
+            deadline = time.perf_counter() + self.window
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+                rows += len(request['obs'])
+
+            try:
+                obs = np.concatenate([r['obs'] for r in batch]) if len(batch) > 1 else batch[0]['obs']
+                actions, _ = self.policy.predict(obs, deterministic=True)
+                actions = np.asarray(actions, dtype=np.float32).reshape(len(obs), -1)
+                start = 0
+                for r in batch:
+                    r['actions'] = actions[start:start + len(r['obs'])]
+                    start += len(r['obs'])
+            except Exception as e:
+                for r in batch:
+                    r['error'] = e
+            self.batches += 1
+            self.requests += len(batch)
+            for r in batch:
+                r['done'].set()
+
+
+class PolicyServer:
+    """
+    Unix ソケットで観測を受け取り、モデルごとにバッチ推論して行動を返すサーバー
+
+    モデルはファイルのハッシュをキーに一度だけ読み込み、同じモデルを使うクライアント間で共有する。
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, window=0.002, max_batch=256, loader=load_inference_policy,
+                 max_models=8):
+        """
+        Args:
+            socket_path: ソケットのパス
+            window: 最初の要求からバッチを締め切るまでの時間 (秒)
+            max_batch: 1回の推論の最大サンプル数
+            loader: モデルのパスから predict(obs, deterministic=True) を持つオブジェクトを作る関数
+            max_models: 同時に保持するモデル数（超えたら最も長く使われていないモデルを解放）
+        """
+        self.socket_path = socket_path
+        self.window = window
+        self.max_batch = max_batch
+        self.loader = loader
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self._models_lock = threading.Lock()
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._handle_connection(self.request)
+
+        self._server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        self._server.daemon_threads = True
+
+    def load(self, model_path):
+        """モデルを読み込んでキーを返す（読み込み済みなら再利用）"""
+        key = file_hash(model_path)
+        evicted = []
+        with self._models_lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+            else:
+                self.models[key] = _ModelBatcher(self.loader(model_path), self.window, self.max_batch)
+                print(f"Loaded {model_path} ({key[:12]})")
+                while len(self.models) > self.max_models:
+                    evicted.append(self.models.popitem(last=False))
+        for old_key, batcher in evicted:
+            batcher.stop()
+            print(f"Unloaded {old_key[:12]} (least recently used)")
+        return key
+
+    def _get_batcher(self, key):
+        """推論に使うモデル（使った順を更新）。読み込まれていなければ None"""
+        with self._models_lock:
+            batcher = self.models.get(key)
+            if batcher is not None:
+                self.models.move_to_end(key)
+            return batcher
+
+    def _handle_connection(self, sock):
+        while True:
+            try:
+                op, rows, cols, extra, obs = recv_message(sock)
+            except (ConnectionError, OSError):
+                return
+            try:
+                if op == OP_LOAD:
+                    path = extra.decode('utf-8')
+                    if not os.path.exists(path):
+                        raise FileNotFoundError(f"Model file not found: {path}")
+                    send_message(sock, OP_LOAD, self.load(path).encode('utf-8'))
+                elif op == OP_ACT:
+                    batcher = self._get_batcher(extra.decode('utf-8'))
+                    actions = batcher.submit(obs) if batcher is not None else None
+                    if actions is None:
+                        send_message(sock, OP_UNKNOWN)
+                    else:
+                        send_message(sock, OP_ACT, array=actions)
+                else:
+                    raise ValueError(f"Unknown op: {op}")
+            except Exception as e:
+                send_message(sock, OP_ERROR, f"{type(e).__name__}: {e}".encode('utf-8'))
+
+    def stats(self):
+        """モデルごとの {'batches', 'requests'}"""
+        with self._models_lock:
+            return {key: {'batches': b.batches, 'requests': b.requests} for key, b in self.models.items()}
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._models_lock:
+            batchers = list(self.models.values())
+        for batcher in batchers:
+            batcher.stop()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class PolicyClient:
+    """
+    推論サーバーの薄いクライアント
+
+    predict(obs, deterministic=True) を持つので、SB3 モデルの代わりにそのまま使える。
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, model_path=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.key = None
+        self.model_path = None
+        if model_path is not None:
+            self.load(model_path)
+
+    def _request(self, op, extra=b'', array=None):
+        send_message(self.sock, op, extra, array)
+        op, rows, cols, extra, array = recv_message(self.sock)
+        if op == OP_ERROR:
+            raise RuntimeError(f"Policy server error: {extra.decode('utf-8')}")
+        return op, extra, array
+
+    def load(self, model_path):
+        """使うモデルを切り替える（サーバーが読み込み済みなら即座に返る）"""
+        if not os.path.exists(model_path) and os.path.exists(model_path + ".zip"):
+            model_path += ".zip"
+        _, extra, _ = self._request(OP_LOAD, os.path.abspath(model_path).encode('utf-8'))
+        self.key = extra.decode('utf-8')
+        self.model_path = model_path
+
+    def act(self, obs):
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.ndim == 1
+        batch = obs[None, :] if single else obs
+        op, _, actions = self._request(OP_ACT, self.key.encode('utf-8'), batch)
+        if op == OP_UNKNOWN:
+            # サーバーがモデルを解放していたら読み込み直す
+            if self.model_path is None:
+                raise RuntimeError("Policy server error: unknown model key (load the model first)")
+            self.load(self.model_path)
+            op, _, actions = self._request(OP_ACT, self.key.encode('utf-8'), batch)
+            if op == OP_UNKNOWN:
+                raise RuntimeError(f"Policy server error: {self.model_path} was unloaded again")
+        return actions[0] if single else actions
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        """SB3 の model.predict() と同じ呼び出し方 (行動, None) を返す"""
+        return self.act(obs), None
+
+    def close(self):
+        self.sock.close()
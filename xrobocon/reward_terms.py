@@ -0,0 +1,49 @@
+"""
+報酬内訳
+
+段差環境 (step / step_hard) の1ステップの報酬は、以下の項目の合計として計算する。
+各項目の値は環境が事前確保した配列に書き込み、報酬はその合計。
+reward_breakdown=True の環境ではエピソード内の項目ごとの合計を RewardTermRecorder で集計し、
+終了ステップの info['reward_terms'] に {項目名: 合計} として載せる。
+"""
+import numpy as np
+
+# 報酬の計算（各環境の step() の報酬部分）を変更したら上げる。
+# 評価結果ストアの物理プロファイルに含まれ、変更前の評価結果は再利用されなくなる
+REWARD_VERSION = 1
+
+STEP_REWARD_TERMS = (
+    'progress',      # ターゲットへの距離の改善
+    'height',        # 高さの獲得
+    'specialized',   # ロボット専用の登坂報酬 (tristar / rocker_bogie)
+    'alignment',     # ターゲット方向への整列
+    'proximity',     # ターゲット付近のボーナス
+    'slowdown',      # ターゲット付近の減速（ボーナス / ペナルティ）
+    'success',       # 成功報酬 + 速度ボーナス
+    'stability',     # 傾きペナルティ
+    'frame',         # フレーム使用ペナルティ
+    'speed_limit',   # 速度超過ペナルティ
+    'fall',          # 転倒・落下
+)
+
+(TERM_PROGRESS, TERM_HEIGHT, TERM_SPECIALIZED, TERM_ALIGNMENT, TERM_PROXIMITY, TERM_SLOWDOWN, TERM_SUCCESS,
+ TERM_STABILITY, TERM_FRAME, TERM_SPEED_LIMIT, TERM_FALL) = range(len(STEP_REWARD_TERMS))
+
+
+class RewardTermRecorder:
+    """エピソード内の報酬項目ごとの合計"""
+
+    def __init__(self, names=STEP_REWARD_TERMS):
+        self.names = tuple(names)
+        self.episode_sums = np.zeros(len(self.names))
+
+    def reset(self):
+        self.episode_sums.fill(0.0)
+
+    def add(self, values):
+        """1ステップ分の項目の値 (len(names),) を加算"""
+        self.episode_sums += values
+
+    def episode_terms(self):
+        """{項目名: エピソード内の合計}"""
+        return dict(zip(self.names, self.episode_sums.tolist()))
@@ -154,6 +154,19 @@ class XRoboconRobot:
         # 速度リセット
         self.entity.set_dofs_velocity(torch.zeros(self.n_dofs, device=gs.device))
 
+    def get_state(self):
+        """関節位置・速度（浮遊ベースを含む）を取得（スナップショット用、プロセス間で渡せるよう numpy で返す）"""
+        return {
+            'qpos': self.entity.get_qpos().cpu().numpy().copy(),
+            'dofs_vel': self.entity.get_dofs_velocity().cpu().numpy().copy(),
+        }
+
+    def set_state(self, state):
+        """get_state() で取得した関節位置・速度を復元"""
+        self.entity.set_qpos(torch.as_tensor(state['qpos'], dtype=torch.float32, device=gs.device))
+        # set_qpos は速度を0にするため、位置の後に速度を設定する
+        self.entity.set_dofs_velocity(torch.as_tensor(state['dofs_vel'], dtype=torch.float32, device=gs.device))
+
     def get_pos(self):
         """ロボットの位置を取得"""
         return self.entity.get_pos()
@@ -3,6 +3,12 @@
 各ロボットタイプごとの物理パラメータ、開始位置、制御パラメータを定義
 """
 
+# シミュレーション共通パラメータ（全ロボット・全環境で共通）
+SIM_PARAMS = {
+    'dt': 0.01,                    # 物理ステップ (s)
+    'gravity': (0.0, 0.0, -9.8),   # 重力加速度 (m/s^2)
+}
+
 # ロボット設定辞書
 ROBOT_CONFIGS = {
     'standard': {
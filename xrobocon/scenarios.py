@@ -0,0 +1,59 @@
+"""
+Genesis に依存しないシナリオ・地形の定義
+
+物理環境 (XRoboconEnv) と、物理を使わない代理環境 (surrogate_env.py) で同じ定義を共有する。
+"""
+import numpy as np
+
+# Phase 3-2a: 平地移動訓練 (Tri-star Robot)
+# 地面（Tier 3の外側）での移動制御を学習 (Curriculum: Short 80%, Medium 10%, Long 10%)
+# Z座標は start_z_offset からの相対高さ
+FLAT_SCENARIOS = [
+    {
+        'name': 'Scenario 1: 近距離移動 (平地)',
+        'type': 'flat_short',
+        'weight': 0.8,
+        'start_pos': (8.0, 0.0, 0.0),
+        'start_euler': (0, 0, 0),
+        'target_pos': (9.0, 0.0, 0.0),   # 1m先
+        'jitter': {'xy': 0.05, 'yaw': 5.0},
+    },
+    {
+        'name': 'Scenario 2: 中距離移動 (平地)',
+        'type': 'flat_medium',
+        'weight': 0.1,
+        'start_pos': (8.0, 0.0, 0.0),
+        'start_euler': (0, 0, 0),
+        'target_pos': (10.0, 1.0, 0.0),  # 2m以上先、斜め
+        'jitter': {'xy': 0.05, 'yaw': 5.0},
+    },
+    {
+        'name': 'Scenario 3: 長距離移動 (平地)',
+        'type': 'flat_long',
+        'weight': 0.1,
+        'start_pos': (8.0, 0.0, 0.0),
+        'start_euler': (0, 0, 90),       # 横向き
+        'target_pos': (8.0, 3.0, 0.0),   # 3m先
+        'jitter': {'xy': 0.05, 'yaw': 5.0},
+    },
+]
+
+# 平地シナリオ共通の開始高さ (m)
+FLAT_START_Z_OFFSET = 0.08
+
+# フィールドの段 (半径, 上面の高さ) を内側から順に。XRoboconField.get_terrain_height と同じ値
+TIER_LEVELS = (
+    (1.85, 0.6),   # Tier 1
+    (3.25, 0.35),  # Tier 2
+    (4.65, 0.1),   # Tier 3
+)
+
+
+def terrain_height(x, y):
+    """座標 (x, y) の地形高さ（配列をまとめて計算できる）"""
+    r = np.hypot(x, y)
+    height = np.zeros_like(r, dtype=np.float64)
+    # 外側の段から順に上書きし、内側の段ほど高くする
+    for radius, level in reversed(TIER_LEVELS):
+        height = np.where(r <= radius, level, height)
+    return height
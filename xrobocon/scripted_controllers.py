@@ -0,0 +1,147 @@
+"""
+スクリプト制御器（エキスパート）
+
+ポリシーと同じ観測ベクトル (40次元) だけを入力にして行動を返す閉ループ制御器。
+観測を (N, 40) のバッチで受け取れば (N, action_dim) の行動をまとめて返すため、
+デモの大量生成・DAgger のラベル付け・ベースライン評価に使える。
+
+観測ベクトルの構成 (XRoboconBaseEnv._get_obs):
+    [0:3]   ロボット位置 (m)
+    [3:6]   オイラー角 roll, pitch, yaw (度)
+    [6:9]   速度 (m/s)
+    [9:12]  角速度
+    [12:15] ターゲットへの相対位置 (m)
+    [15:40] 前方の高さマップ 5x5 (ロボット高さからの相対値, 行=前方 0.1〜0.9m, 列=左右)
+
+制御器は内部状態を持たないため、バッチ内の環境ごとの状態管理は不要。
+ゲインは初期値であり、ロボットや地形に合わせて params で上書きする。
+"""
+import numpy as np
+
+OBS_POS = slice(0, 3)
+OBS_EULER = slice(3, 6)
+OBS_VEL = slice(6, 9)
+OBS_TARGET = slice(12, 15)
+OBS_HEIGHT_MAP = slice(15, 40)
+HEIGHT_MAP_SHAPE = (5, 5)
+
+
+def _as_batch(obs):
+    obs = np.asarray(obs, dtype=np.float32)
+    return (obs[None, :], True) if obs.ndim == 1 else (obs, False)
+
+
+def _wrap_angle(angle):
+    """角度 (rad) を -pi〜pi に正規化"""
+    return np.arctan2(np.sin(angle), np.cos(angle))
+
+
+class WaypointController:
+    """
+    差動二輪のウェイポイント追従
+
+    ターゲット方向との角度差で旋回量、距離で前進量を決め、左右の駆動量に変換する。
+    角度差が大きい間は前進量を cos(角度差) で絞ってその場旋回を優先し、ターゲット付近では減速する。
+    """
+
+    DEFAULT_PARAMS = {
+        'forward_gain': 1.0,      # 距離 1m あたりの前進量
+        'max_forward': 0.8,       # 前進量の上限
+        'min_forward': 0.15,      # ターゲット付近でも残す前進量
+        'turn_gain': 1.5,         # 角度差 1rad あたりの旋回量
+        'max_turn': 0.6,          # 旋回量の上限
+        'stop_distance': 0.15,    # この距離以内では停止
+    }
+
+    def __init__(self, robot_type='standard', **params):
+        self.robot_type = robot_type
+        self.params = dict(self.DEFAULT_PARAMS)
+        self.params.update(params)
+
+    def drive_commands(self, obs):
+        """(N, 40) の観測から (前進量, 旋回量) を計算 (旋回量は左回りが正)"""
+        p = self.params
+        target = obs[:, OBS_TARGET]
+        yaw = np.radians(obs[:, OBS_EULER][:, 2])
+        dist = np.linalg.norm(target[:, :2], axis=1)
+
+        heading_error = _wrap_angle(np.arctan2(target[:, 1], target[:, 0]) - yaw)
+        turn = np.clip(heading_error * p['turn_gain'], -p['max_turn'], p['max_turn'])
+
+        forward = np.clip(dist * p['forward_gain'], p['min_forward'], p['max_forward'])
+        forward = forward * np.clip(np.cos(heading_error), 0.0, 1.0)
+        forward = np.where(dist < p['stop_distance'], 0.0, forward)
+        return forward, turn
+
+    def act(self, obs):
+        obs, single = _as_batch(obs)
+        forward, turn = self.drive_commands(obs)
+        actions = np.clip(np.stack([forward - turn, forward + turn], axis=1), -1.0, 1.0).astype(np.float32)
+        return actions[0] if single else actions
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        """SB3 の model.predict() と同じ呼び出し方 (行動, None) を返す"""
+        return self.act(obs), None
+
+
+class TristarClimbController(WaypointController):
+    """
+    Tri-star の段差登坂
+
+    ホイールはウェイポイント追従で動かし、フレームは高さマップで前方の段差を検出したときに回転させる。
+    - 前方に段差（手前の列との高低差が step_threshold 以上）があり、near_rows 以内に迫っていればフレームを回転し、
+      ホイールは climb_forward まで減速して段差に押し付ける
+    - ピッチが max_pitch を超えたらフレームの回転を戻して転倒を防ぐ
+    - 段差がなければフレームは 0（ホイール走行）
+    """
+
+    DEFAULT_PARAMS = dict(WaypointController.DEFAULT_PARAMS, **{
+        'step_threshold': 0.05,   # 段差とみなす高低差 (m)
+        'near_rows': 2,           # 段差が高さマップの手前何行以内なら登坂動作に入るか (1行 = 0.2m)
+        'frame_gain': 0.8,        # 登坂中のフレーム回転量
+        'climb_forward': 0.4,     # 登坂中の前進量の上限
+        'max_pitch': 35.0,        # これを超えるピッチ (度) ではフレームを戻す
+        'pitch_gain': 0.05,       # ピッチ超過 1度あたりのフレーム戻し量
+    })
+
+    def frame_commands(self, obs):
+        """(N, 40) の観測からフレームの回転量を計算"""
+        p = self.params
+        height_map = obs[:, OBS_HEIGHT_MAP].reshape(-1, *HEIGHT_MAP_SHAPE)
+        # 進行方向の中央3列の平均を前方の地形プロファイルとする
+        profile = height_map[:, :, 1:4].mean(axis=2)
+        rise = profile - profile[:, :1]
+        step_ahead = (rise[:, :p['near_rows'] + 1] > p['step_threshold']).any(axis=1)
+
+        frame = np.where(step_ahead, p['frame_gain'], 0.0)
+        pitch = obs[:, OBS_EULER][:, 1]
+        frame = frame - np.clip(pitch - p['max_pitch'], 0.0, None) * p['pitch_gain']
+        return np.clip(frame, -1.0, 1.0), step_ahead
+
+    def act(self, obs):
+        obs, single = _as_batch(obs)
+        forward, turn = self.drive_commands(obs)
+        frame, climbing = self.frame_commands(obs)
+        forward = np.where(climbing, np.minimum(forward, self.params['climb_forward']), forward)
+
+        wheels = np.stack([forward - turn, forward + turn], axis=1)
+        actions = np.concatenate([np.stack([frame, frame], axis=1), wheels], axis=1)
+        actions = np.clip(actions, -1.0, 1.0).astype(np.float32)
+        return actions[0] if single else actions
+
+
+# ロボットタイプごとの制御器
+CONTROLLERS = {
+    'standard': WaypointController,
+    'rocker_bogie': WaypointController,
+    'rocker_bogie_large': WaypointController,
+    'tristar': TristarClimbController,
+    'tristar_large': TristarClimbController,
+}
+
+
+def make_controller(robot_type, **params):
+    """ロボットタイプに対応する制御器を作成"""
+    if robot_type not in CONTROLLERS:
+        raise ValueError(f"No scripted controller for robot type: {robot_type}. Available: {list(CONTROLLERS.keys())}")
+    return CONTROLLERS[robot_type](robot_type=robot_type, **params)
@@ -0,0 +1,111 @@
+"""
+停滞検出
+
+段の縁に引っかかったり、その場で回転し続けたりしているエピソードを、時間切れを待たずに打ち切るための判定。
+直近 window ステップの間に
+    - ターゲットへの距離が min_progress 以上縮んでいない
+    - 高さが min_height_gain 以上上がっていない
+    - 平均速度が max_speed 未満
+のすべてを満たしたら停滞とみなす。値はあらかじめ確保したリングバッファに記録する。
+"""
+import numpy as np
+
+# info['truncation_reason'] の値
+TRUNCATION_STALLED = 'stalled'
+TRUNCATION_TIME_LIMIT = 'time_limit'
+
+DEFAULT_STALL_PARAMS = {
+    'window': 100,           # 判定に使うステップ数 (dt=0.01 で1秒)
+    'min_progress': 0.05,    # 距離の最小改善量 (m)
+    'min_height_gain': 0.02, # 最小の高さ獲得量 (m)
+    'max_speed': 0.3,        # 平均速度がこれ以上なら動いているとみなす (m/s)
+}
+
+
+def stall_params(stall_detection):
+    """
+    環境の stall_detection 引数を判定パラメータに解決
+
+    Args:
+        stall_detection: None/False (無効), True (既定値), dict (DEFAULT_STALL_PARAMS の一部を上書き)
+
+    Returns:
+        dict または None (無効)
+    """
+    if not stall_detection:
+        return None
+    params = dict(DEFAULT_STALL_PARAMS)
+    if isinstance(stall_detection, dict):
+        unknown = set(stall_detection) - set(DEFAULT_STALL_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown stall parameters: {sorted(unknown)}. Available: {list(DEFAULT_STALL_PARAMS)}")
+        params.update(stall_detection)
+    return params
+
+
+def make_stall_detector(stall_detection):
+    """環境の stall_detection 引数から StallDetector を作る（無効なら None）"""
+    params = stall_params(stall_detection)
+    return StallDetector(**params) if params is not None else None
+
+
+def parse_stall_option(values):
+    """
+    コマンドラインの --stall [key=value ...] を stall_detection 引数に変換
+
+    None (指定なし) → None, [] → True (既定値), ['window=150'] → {'window': 150}
+    """
+    if values is None:
+        return None
+    if not values:
+        return True
+    overrides = {}
+    for item in values:
+        key, _, value = item.partition('=')
+        overrides[key] = int(value) if key == 'window' else float(value)
+    return overrides
+
+
+class StallDetector:
+    """直近 window ステップの距離・高さ・速度から停滞を判定"""
+
+    def __init__(self, window=100, min_progress=0.05, min_height_gain=0.02, max_speed=0.3):
+        if window < 2:
+            raise ValueError("window must be at least 2 steps")
+        self.window = int(window)
+        self.min_progress = min_progress
+        self.min_height_gain = min_height_gain
+        self.max_speed = max_speed
+        # 列: 距離, 高さ, 速度
+        self._buffer = np.zeros((self.window, 3))
+        self._count = 0
+        self._speed_sum = 0.0
+
+    @property
+    def params(self):
+        return {'window': self.window, 'min_progress': self.min_progress,
+                'min_height_gain': self.min_height_gain, 'max_speed': self.max_speed}
+
+    def reset(self):
+        self._count = 0
+        self._speed_sum = 0.0
+
+    def update(self, dist, height, speed):
+        """
+        1ステップ分を記録して停滞しているかを返す（window ステップ分たまるまでは常に False）
+        """
+        slot = self._count % self.window
+        if self._count >= self.window:
+            self._speed_sum -= self._buffer[slot, 2]
+        self._buffer[slot] = (dist, height, speed)
+        self._speed_sum += speed
+        self._count += 1
+        if self._count < self.window:
+            return False
+
+        # slot の次が window ステップ前（最も古い）の記録
+        oldest = self._buffer[(slot + 1) % self.window]
+        progress = oldest[0] - dist
+        height_gain = height - oldest[1]
+        mean_speed = self._speed_sum / self.window
+        return progress < self.min_progress and height_gain < self.min_height_gain and mean_speed < self.max_speed
@@ -1,6 +1,10 @@
 import numpy as np
 from xrobocon.base_env import XRoboconBaseEnv
 from xrobocon.robot_configs import get_start_height
+from xrobocon.stall_detector import make_stall_detector, TRUNCATION_STALLED, TRUNCATION_TIME_LIMIT
+from xrobocon.reward_terms import (STEP_REWARD_TERMS, RewardTermRecorder, TERM_PROGRESS, TERM_HEIGHT,
+                                   TERM_SPECIALIZED, TERM_ALIGNMENT, TERM_PROXIMITY, TERM_SLOWDOWN, TERM_SUCCESS,
+                                   TERM_STABILITY, TERM_FRAME, TERM_SPEED_LIMIT, TERM_FALL)
 
 class XRoboconStepEnv(XRoboconBaseEnv):
     """
@@ -8,65 +12,95 @@ class XRoboconStepEnv(XRoboconBaseEnv):
     段差乗り越え（Tier 1への登坂）訓練用の環境です。
     """
     
-    def __init__(self, render_mode=None, robot_type='tristar'):
-        super().__init__(render_mode, robot_type)
-        
-        # ロボット設定から開始高さを取得
-        self.start_z_offset = get_start_height(robot_type, 'step')
-        
-        # エピソード時間を延長 (5秒 = 500ステップ)
-        self.game.time_limit = 5.0
-        
-    def reset(self, seed=None, options=None):
-        if seed is not None:
-            np.random.seed(seed)
-        
-        # シナリオ選択
-        # Phase 3-2b: 段差乗り越え訓練 (Curriculum Learning)
-        # 1. Flat Easy (平地移動の基礎) - 50%
-        # 2. Ground -> Tier 3 (高さ10cm) - 25%
-        # 3. Tier 3 -> Tier 2 (高さ25cm) - 25%
-        
-        scenario_type = np.random.choice(
-            ['flat_easy', 'step_straight', 'step_tier3_to_tier2'],
-            p=[0.5, 0.25, 0.25] # Phase 2: 平地50%, 段差50%
-        )
-        
-        scenarios = [
+    # シナリオレジストリ
+    # Phase 3-2b: 段差乗り越え訓練 (Curriculum Learning)
+    # 1. Flat Easy (平地移動の基礎) - 50%
+    # 2. Ground -> Tier 3 (高さ10cm) - 25%
+    # 3. Tier 3 -> Tier 2 (高さ25cm) - 25%
+    # Z座標は start_z_offset からの相対高さ
+    SCENARIOS = [
         {
             'name': 'Scenario 0: 平地移動 (Flat Easy)',
             'type': 'flat_easy',
-            'start_pos': (5.0, -2.0, self.start_z_offset), # 平地エリア
-            'start_euler': (0, 0, 90),                      # Y軸プラス方向
-            'target_pos': (5.0, 0.0, self.start_z_offset), # 2m先 (同じ高さ)
+            'weight': 0.5,
+            'start_pos': (5.0, -2.0, 0.0),  # 平地エリア
+            'start_euler': (0, 0, 90),       # Y軸プラス方向
+            'target_pos': (5.0, 0.0, 0.0),   # 2m先 (同じ高さ)
+            'jitter': {'xy': 0.05, 'yaw': 5.0},
         },
         {
             'name': 'Scenario 1: 正面段差登坂 (Ground -> Tier 3)',
             'type': 'step_straight',
-            'start_pos': (5.5, 0.0, self.start_z_offset), # Tier 3の外側
-            'start_euler': (0, 0, 180),                    # 中心方向
+            'weight': 0.25,
+            'start_pos': (5.5, 0.0, 0.0),    # Tier 3の外側
+            'start_euler': (0, 0, 180),      # 中心方向
             # Tier 3の中央: (Tier 2半径3.25 + Tier 3半径4.65) / 2 = 3.95m
-            'target_pos': (3.95, 0.0, 0.1 + self.start_z_offset), # Tier 3の中央
+            'target_pos': (3.95, 0.0, 0.1),  # Tier 3の中央
+            'jitter': {'xy': 0.05, 'yaw': 5.0},
         },
         {
             'name': 'Scenario 2: 2段目登坂 (Tier 3 -> Tier 2)',
             'type': 'step_tier3_to_tier2',
-            'start_pos': (3.95, 0.0, 0.1 + self.start_z_offset),  # Tier 3の中央
-            'start_euler': (0, 0, 180),     # 中心方向
+            'weight': 0.25,
+            'start_pos': (3.95, 0.0, 0.1),   # Tier 3の中央
+            'start_euler': (0, 0, 180),      # 中心方向
             # Tier 2の中央: (Tier 1半径1.85 + Tier 2半径3.25) / 2 = 2.55m
-            'target_pos': (2.55, 0.0, 0.35 + self.start_z_offset),  # Tier 2の中央
+            'target_pos': (2.55, 0.0, 0.35), # Tier 2の中央
+            'jitter': {'xy': 0.05, 'yaw': 5.0},
         },
     ]
+    SCENARIO_TYPES = [s['type'] for s in SCENARIOS]
+    SCENARIO_WEIGHTS = [s['weight'] for s in SCENARIOS] # Phase 2: 平地50%, 段差50%
+    
+    def __init__(self, render_mode=None, robot_type='tristar', curriculum=None, camera_res=(640, 480),
+                 stall_detection=None, reward_breakdown=False):
+        """
+        Args:
+            stall_detection: 停滞したエピソードの打ち切り (None: 無効, True: 既定値, dict: DEFAULT_STALL_PARAMS の上書き)
+            reward_breakdown: エピソード内の報酬項目ごとの合計を終了時の info['reward_terms'] に載せる
+        """
+        super().__init__(render_mode, robot_type, camera_res)
+        
+        # シナリオカリキュラム (Noneの場合は SCENARIO_WEIGHTS で固定)
+        self.curriculum = curriculum
+        
+        # ロボット設定から開始高さを取得
+        self.start_z_offset = get_start_height(robot_type, 'step')
+        
+        # シナリオレジストリ (開始高さを解決済み)
+        self.scenario_registry = self._build_scenario_registry()
+        
+        # エピソード時間を延長 (5秒 = 500ステップ)
+        self.game.time_limit = 5.0
+        
+        # 停滞検出 (xrobocon/stall_detector.py)
+        self.stall_detector = make_stall_detector(stall_detection)
+        
+        # 報酬項目 (xrobocon/reward_terms.py)。step() で毎回書き込む配列を事前確保
+        self.step_reward_terms = np.zeros(len(STEP_REWARD_TERMS))
+        self.reward_term_recorder = RewardTermRecorder() if reward_breakdown else None
+        
+    def reset(self, seed=None, options=None):
+        """
+        Args:
+            seed: 乱数シード
+            options: {'scenario': シナリオタイプ, 'jitter_seed': 開始位置のランダム性のシード}
+        """
+        if seed is not None:
+            np.random.seed(seed)
         
-        selected_scenario = next(s for s in scenarios if s['type'] == scenario_type)
+        # シナリオ選択 (options で指定がなければカリキュラム / SCENARIO_WEIGHTS でサンプリング)
+        selected_scenario, rng = self._select_scenario(options)
+        scenario_type = selected_scenario['type']
         start_pos = selected_scenario['start_pos']
         start_euler = selected_scenario['start_euler']
         target_pos = selected_scenario['target_pos']
+        jitter = selected_scenario['jitter']
             
         # ランダム性を少し加える
-        start_x = start_pos[0] + np.random.uniform(-0.05, 0.05)
-        start_y = start_pos[1] + np.random.uniform(-0.05, 0.05)
-        start_yaw = start_euler[2] + np.random.uniform(-5, 5)
+        start_x = start_pos[0] + rng.uniform(-jitter['xy'], jitter['xy'])
+        start_y = start_pos[1] + rng.uniform(-jitter['xy'], jitter['xy'])
+        start_yaw = start_euler[2] + rng.uniform(-jitter['yaw'], jitter['yaw'])
         
         # シーンリセット
         self.scene.reset()
@@ -91,6 +125,11 @@ class XRoboconStepEnv(XRoboconBaseEnv):
         
         self.current_scenario_type = scenario_type
         
+        if self.stall_detector is not None:
+            self.stall_detector.reset()
+        if self.reward_term_recorder is not None:
+            self.reward_term_recorder.reset()
+        
         return self._get_obs(), {'scenario_type': scenario_type}
     
     def _calculate_tristar_climbing_rewards(self, robot_pos, action, config):
@@ -326,10 +365,12 @@ class XRoboconStepEnv(XRoboconBaseEnv):
         # 共通のアクション適用
         self._apply_action(action)
         
-        # 報酬計算
-        reward = 0.0
+        # 報酬計算 (項目ごとに事前確保した配列へ書き込み、合計を報酬とする)
+        terms = self.step_reward_terms
+        terms.fill(0.0)
         terminated = False
         truncated = False
+        success = False
         
         # 状態取得
         robot_pos = self.robot.get_pos().cpu().numpy()
@@ -343,7 +384,7 @@ class XRoboconStepEnv(XRoboconBaseEnv):
             dist = np.linalg.norm(robot_pos[:2] - target_pos[:2])
             
             # 距離報酬 (平地と同じ)
-            reward += (self.prev_dist - dist) * 100.0
+            terms[TERM_PROGRESS] = (self.prev_dist - dist) * 100.0
             self.prev_dist = dist
             
             # 2. 高さ報酬 (段差を登ることを奨励)
@@ -359,7 +400,7 @@ class XRoboconStepEnv(XRoboconBaseEnv):
                 else:
                     height_weight = 500.0  # デフォルト
                 
-                reward += z_diff * height_weight
+                terms[TERM_HEIGHT] = z_diff * height_weight
             self.prev_height = robot_pos[2]
             
             # 2.5. 専用報酬の計算
@@ -374,7 +415,7 @@ class XRoboconStepEnv(XRoboconBaseEnv):
                 else:
                     specialized_reward = 0.0
                 
-                reward += specialized_reward
+                terms[TERM_SPECIALIZED] = specialized_reward
                 
                 # 整列報酬 (Alignment Reward)
                 # ターゲット方向を向いているか
@@ -388,69 +429,85 @@ class XRoboconStepEnv(XRoboconBaseEnv):
                     
                     # 正面を向いているほど報酬 (最大 weight, 真後ろなら 0)
                     align_score = (1.0 - abs(angle_diff) / np.pi)
-                    reward += align_score * config['reward_params'].get('alignment_reward_weight', 0.0)
+                    terms[TERM_ALIGNMENT] = align_score * config['reward_params'].get('alignment_reward_weight', 0.0)
             
             # ターゲット付近でのボーナス報酬（距離に応じて増加）
             if dist < 1.0:
                 # 1m以内に入ったら、距離に応じてボーナス
                 proximity_bonus = (1.0 - dist) * 50.0  # 最大50.0
-                reward += proximity_bonus
+                terms[TERM_PROXIMITY] = proximity_bonus
                 
                 # ターゲット付近での減速報酬
                 # 距離が近いほど、低速であることに高い報酬
-                speed = np.linalg.norm(vel)
                 if dist < 0.7:
                     # 目標速度: 距離に応じて0.1～0.3m/s
                     target_speed = 0.1 + dist * 0.3  # 距離0.1m→0.13m/s, 距離0.7m→0.31m/s
                     
                     if speed < target_speed:
                         # 目標速度以下なら報酬
-                        slowdown_bonus = (target_speed - speed) * 30.0
-                        reward += slowdown_bonus
+                        terms[TERM_SLOWDOWN] = (target_speed - speed) * 30.0
                     else:
                         # 目標速度より速いとペナルティ
-                        slowdown_penalty = (speed - target_speed) * 20.0
-                        reward -= slowdown_penalty
+                        terms[TERM_SLOWDOWN] = -(speed - target_speed) * 20.0
             
             # ターゲット到達判定
             # ターゲットから0.5m以内 かつ 高さがターゲット付近 (ターゲット高さ - 10cm以上)
             if dist < 0.5 and robot_pos[2] > target_pos[2] - 0.1:
                 # 成功時、速度が低いほど高報酬
-                speed = np.linalg.norm(vel)
                 speed_bonus = max(0, (0.3 - speed) * 100.0)  # 速度0.3m/s以下でボーナス
-                reward += 500.0 + speed_bonus  # 成功報酬 + 速度ボーナス
+                terms[TERM_SUCCESS] = 500.0 + speed_bonus  # 成功報酬 + 速度ボーナス
                 terminated = True
+                success = True
             
         # 3. 安定性報酬 (転倒防止)
         # 段差登坂時はある程度の傾きは許容する必要があるが、転倒はNG
-        stability_penalty = abs(euler[0]) * 0.02 + abs(euler[1]) * 0.02 # 平地より少し緩く
-        reward -= stability_penalty
+        terms[TERM_STABILITY] = -(abs(euler[0]) * 0.02 + abs(euler[1]) * 0.02) # 平地より少し緩く
         
         # 4. 効率化のための追加ペナルティ
         # フレーム使用ペナルティ (段差ではフレームを使う必要があるかもしれないので、平地より緩くするか、あるいは最初は無しで様子見)
         # 一旦、平地と同じ設定にしておく（無駄な動きは抑制）
         if self.robot_type == 'tristar':
-            frame_penalty = (abs(action[0]) + abs(action[1])) * 0.1 # 平地(0.5)より緩く
-            reward -= frame_penalty
+            terms[TERM_FRAME] = -(abs(action[0]) + abs(action[1])) * 0.1 # 平地(0.5)より緩く
             
         # 速度超過ペナルティ
         if speed > 1.5:
-            reward -= (speed - 1.5) * 2.0
+            terms[TERM_SPEED_LIMIT] = -(speed - 1.5) * 2.0
         
         # 5. 転倒・落下判定 (終了条件)
         if abs(euler[0]) > 70 or abs(euler[1]) > 70: # 段差なので少し許容
-            reward -= 100.0
+            terms[TERM_FALL] -= 100.0
             terminated = True
             
         if robot_pos[2] < 0.0:
-            reward -= 100.0
+            terms[TERM_FALL] -= 100.0
             terminated = True
+        
+        reward = float(terms.sum())
+        if self.reward_term_recorder is not None:
+            self.reward_term_recorder.add(terms)
             
-        # 時間切れ
+        # 時間切れ・停滞
+        truncation_reason = None
         if not self.game.is_running:
             truncated = True
+            truncation_reason = TRUNCATION_TIME_LIMIT
+        elif not terminated and self._check_stall(robot_pos, speed):
+            truncated = True
+            truncation_reason = TRUNCATION_STALLED
             
         # アクション保存
         self.last_action = action.copy()
+        
+        # エピソード終了時に成功フラグを記録
+        info = {}
+        if terminated or truncated:
+            info['is_success'] = success
+            info['scenario_type'] = self.current_scenario_type
+            if truncation_reason is not None:
+                info['truncation_reason'] = truncation_reason
+            if self.reward_term_recorder is not None:
+                info['reward_terms'] = self.reward_term_recorder.episode_terms()
+            if self.curriculum is not None:
+                self.curriculum.update(self.current_scenario_type, success)
             
-        return self._get_obs(), reward, terminated, truncated, {}
+        return self._get_obs(), reward, terminated, truncated, info
@@ -8,63 +8,76 @@ class XRoboconStepEnv(XRoboconBaseEnv):
     段差乗り越え（Tier 1への登坂）訓練用の環境です。
     """
     
-    def __init__(self, render_mode=None, robot_type='tristar'):
-        super().__init__(render_mode, robot_type)
-        
-        # ロボット設定から開始高さを取得
-        self.start_z_offset = get_start_height(robot_type, 'step')
-        
-        # エピソード時間を延長 (5秒 = 500ステップ)
-        self.game.time_limit = 5.0
-        
-    def reset(self, seed=None, options=None):
-        if seed is not None:
-            np.random.seed(seed)
-        
-        # シナリオ選択
-        # Phase 3-2b: 段差乗り越え訓練 (Curriculum Learning)
-        # 1. Flat Easy (平地移動の基礎) - 50%
-        # 2. Ground -> Tier 3 (高さ10cm) - 25%
-        # 3. Tier 3 -> Tier 2 (高さ25cm) - 25%
-        
-        scenario_type = np.random.choice(
-            ['flat_easy', 'step_straight', 'step_tier3_to_tier2'],
-            p=[1.0, 0.0, 0.0] # Phase 1: 平地のみ (100%)
-        )
-        
-        scenarios = [
+    # シナリオレジストリ
+    # Z座標は start_z_offset からの相対高さ
+    SCENARIOS = [
         {
             'name': 'Scenario 0: 平地移動 (Flat Easy)',
             'type': 'flat_easy',
-            'start_pos': (5.0, -2.0, self.start_z_offset), # 平地エリア
-            'start_euler': (0, 0, 90),                      # Y軸プラス方向
-            'target_pos': (5.0, 0.0, self.start_z_offset), # 2m先 (同じ高さ)
+            'weight': 1.0,
+            'start_pos': (5.0, -2.0, 0.0),  # 平地エリア
+            'start_euler': (0, 0, 90),       # Y軸プラス方向
+            'target_pos': (5.0, 0.0, 0.0),   # 2m先 (同じ高さ)
+            'jitter': {'xy': 0.05, 'yaw': 5.0},
         },
         {
             'name': 'Scenario 1: 正面段差登坂 (Ground -> Tier 3)',
             'type': 'step_straight',
-            'start_pos': (5.5, 0.0, self.start_z_offset), # Tier 3 (R=4.65) の外側
-            'start_euler': (0, 0, 180),                    # 中心方向
-            'target_pos': (4.0, 0.0, 0.1 + self.start_z_offset), # Tier 3の上
+            'weight': 0.0,
+            'start_pos': (5.5, 0.0, 0.0),    # Tier 3 (R=4.65) の外側
+            'start_euler': (0, 0, 180),      # 中心方向
+            'target_pos': (4.0, 0.0, 0.1),   # Tier 3の上
+            'jitter': {'xy': 0.05, 'yaw': 5.0},
         },
         {
             'name': 'Scenario 2: 2段目登坂 (Tier 3 -> Tier 2)',
             'type': 'step_tier3_to_tier2',
-            'start_pos': (4.0, 0.0, 0.1 + self.start_z_offset),  # Tier 3の上 (Z=0.1)
-            'start_euler': (0, 0, 180),     # 中心方向
-            'target_pos': (2.5, 0.0, 0.35 + self.start_z_offset),  # Tier 2の上 (Z=0.35)
+            'weight': 0.0,
+            'start_pos': (4.0, 0.0, 0.1),    # Tier 3の上 (Z=0.1)
+            'start_euler': (0, 0, 180),      # 中心方向
+            'target_pos': (2.5, 0.0, 0.35),  # Tier 2の上 (Z=0.35)
+            'jitter': {'xy': 0.05, 'yaw': 5.0},
         },
     ]
+    SCENARIO_TYPES = [s['type'] for s in SCENARIOS]
+    SCENARIO_WEIGHTS = [s['weight'] for s in SCENARIOS] # Phase 1: 平地のみ (100%)
+    
+    def __init__(self, render_mode=None, robot_type='tristar', curriculum=None, camera_res=(640, 480)):
+        super().__init__(render_mode, robot_type, camera_res)
+        
+        # シナリオカリキュラム (Noneの場合は SCENARIO_WEIGHTS で固定)
+        self.curriculum = curriculum
         
-        selected_scenario = next(s for s in scenarios if s['type'] == scenario_type)
+        # ロボット設定から開始高さを取得
+        self.start_z_offset = get_start_height(robot_type, 'step')
+        
+        # シナリオレジストリ (開始高さを解決済み)
+        self.scenario_registry = self._build_scenario_registry()
+        
+        # エピソード時間を延長 (5秒 = 500ステップ)
+        self.game.time_limit = 5.0
+        
+    def reset(self, seed=None, options=None):
+        """
+        Args:
+            seed: 乱数シード
+            options: {'scenario': シナリオタイプ, 'jitter_seed': 開始位置のランダム性のシード}
+        """
+        if seed is not None:
+            np.random.seed(seed)
+        
+        # シナリオ選択 (options で指定がなければカリキュラム / SCENARIO_WEIGHTS でサンプリング)
+        selected_scenario, rng = self._select_scenario(options)
+        scenario_type = selected_scenario['type']
         start_pos = selected_scenario['start_pos']
         start_euler = selected_scenario['start_euler']
         target_pos = selected_scenario['target_pos']
+        jitter = selected_scenario['jitter']
             
         # ランダム性を少し加える
-        start_x = start_pos[0] + np.random.uniform(-0.05, 0.05)
-        start_y = start_pos[1] + np.random.uniform(-0.05, 0.05)
-        start_yaw = start_euler[2] + np.random.uniform(-5, 5)
+        start_x = start_pos[0] + rng.uniform(-jitter['xy'], jitter['xy'])
+        start_y = start_pos[1] + rng.uniform(-jitter['xy'], jitter['xy'])
+        start_yaw = start_euler[2] + rng.uniform(-jitter['yaw'], jitter['yaw'])
         
         # シーンリセット
         self.scene.reset()
@@ -208,6 +221,7 @@ class XRoboconStepEnv(XRoboconBaseEnv):
         reward = 0.0
         terminated = False
         truncated = False
+        success = False
         
         # 状態取得
         robot_pos = self.robot.get_pos().cpu().numpy()
@@ -267,6 +281,7 @@ class XRoboconStepEnv(XRoboconBaseEnv):
                 # 到達ボーナス
                 reward += 500.0
                 terminated = True
+                success = True
             
         # 3. 安定性報酬 (転倒防止)
         # 段差登坂時はある程度の傾きは許容する必要があるが、転倒はNG
@@ -299,5 +314,13 @@ class XRoboconStepEnv(XRoboconBaseEnv):
             
         # アクション保存
         self.last_action = action.copy()
+        
+        # エピソード終了時に成功フラグを記録
+        info = {}
+        if terminated or truncated:
+            info['is_success'] = success
+            info['scenario_type'] = self.current_scenario_type
+            if self.curriculum is not None:
+                self.curriculum.update(self.current_scenario_type, success)
             
-        return self._get_obs(), reward, terminated, truncated, {}
+        return self._get_obs(), reward, terminated, truncated, info
@@ -1,7 +1,12 @@
 import numpy as np
 from xrobocon.base_env import XRoboconBaseEnv
 from xrobocon.robot_configs import get_start_height
+from xrobocon.stall_detector import make_stall_detector, TRUNCATION_STALLED, TRUNCATION_TIME_LIMIT
 from xrobocon.reward_functions import RewardConfig
+from xrobocon.reward_terms import (STEP_REWARD_TERMS, RewardTermRecorder, TERM_PROGRESS, TERM_HEIGHT,
+                                   TERM_SPECIALIZED, TERM_ALIGNMENT, TERM_PROXIMITY, TERM_SLOWDOWN, TERM_SUCCESS,
+                                   TERM_SPEED_LIMIT, TERM_FALL)
+from xrobocon.step_env import XRoboconStepEnv
 
 class XRoboconStepHardEnv(XRoboconBaseEnv):
     """
@@ -10,117 +15,116 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
     段差シナリオ80%、平地20%の割合で学習します。
     """
     
-    def __init__(self, render_mode=None, robot_type='tristar'):
-        super().__init__(render_mode, robot_type)
+    # シナリオレジストリ（段差特化）
+    # 1. Flat Easy (平地移動の基礎) - 20%
+    # 2. Ground -> Tier 3 (高さ10cm) - 40%
+    # 3. Tier 3 -> Tier 2 (高さ25cm) - 40%
+    # フィールド中心からの半径で開始・目標位置を定義し、角度はランダム（段差に直角、中心方向を向く）
+    # Z座標は start_z_offset からの相対高さ
+    SCENARIOS = [
+        {
+            'name': 'Scenario 0: 平地移動 (Flat Easy)',
+            'type': 'flat_easy',
+            'weight': 0.2,
+            'start_radius': 5.0,   # フィールド外側
+            'target_radius': 3.0,  # 中心方向に2m先
+            'start_z': 0.0,
+            'target_z': 0.0,
+            'jitter': {'angle': (0.0, 360.0), 'xy': 0.05, 'yaw': 5.0},
+        },
+        {
+            'name': 'Scenario 1: 段差直進 (Ground -> Tier 3)',
+            'type': 'step_straight',
+            'weight': 0.4,
+            'start_radius': 5.5,   # Tier 3の外側
+            # Tier 3の中央: (Tier 2半径3.25 + Tier 3半径4.65) / 2 = 3.95m
+            'target_radius': 3.95,
+            'start_z': 0.0,
+            'target_z': 0.1,
+            'jitter': {'angle': (0.0, 360.0), 'xy': 0.05, 'yaw': 5.0},
+        },
+        {
+            'name': 'Scenario 2: 段差間移動 (Tier 3 -> Tier 2)',
+            'type': 'step_tier3_to_tier2',
+            'weight': 0.4,
+            'start_radius': 3.95,  # Tier 3の中央
+            # Tier 2の中央: (Tier 1半径1.85 + Tier 2半径3.25) / 2 = 2.55m
+            'target_radius': 2.55,
+            'start_z': 0.1,
+            'target_z': 0.35,
+            'jitter': {'angle': (0.0, 360.0), 'xy': 0.05, 'yaw': 5.0},
+        },
+    ]
+    SCENARIO_TYPES = [s['type'] for s in SCENARIOS]
+    SCENARIO_WEIGHTS = [s['weight'] for s in SCENARIOS] # 段差80%, 平地20%
+    
+    def __init__(self, render_mode=None, robot_type='tristar', curriculum=None, camera_res=(640, 480),
+                 stall_detection=None, reward_breakdown=False):
+        """
+        Args:
+            stall_detection: 停滞したエピソードの打ち切り (None: 無効, True: 既定値, dict: DEFAULT_STALL_PARAMS の上書き)
+            reward_breakdown: エピソード内の報酬項目ごとの合計を終了時の info['reward_terms'] に載せる
+        """
+        super().__init__(render_mode, robot_type, camera_res)
+        
+        # シナリオカリキュラム (Noneの場合は SCENARIO_WEIGHTS で固定)
+        self.curriculum = curriculum
         
         # ロボット設定から開始高さを取得
         self.start_z_offset = get_start_height(robot_type, 'step')
         
+        # シナリオレジストリ (開始高さを解決済み)
+        self.scenario_registry = self._build_scenario_registry()
+        
         # エピソード時間を延長 (5秒 = 500ステップ)
         self.game.time_limit = 5.0
         
+        # 停滞検出 (xrobocon/stall_detector.py)
+        self.stall_detector = make_stall_detector(stall_detection)
+        
+        # 報酬項目 (xrobocon/reward_terms.py)。step() で毎回書き込む配列を事前確保
+        self.step_reward_terms = np.zeros(len(STEP_REWARD_TERMS))
+        self.reward_term_recorder = RewardTermRecorder() if reward_breakdown else None
+        
         # 報酬設定（パラメータを一元管理）
         self.reward_config = RewardConfig()
         # 必要に応じてパラメータを調整
         # 例: self.reward_config.success_base_reward = 1000.0
         
     def reset(self, seed=None, options=None):
+        """
+        Args:
+            seed: 乱数シード
+            options: {'scenario': シナリオタイプ, 'jitter_seed': 角度・開始位置のランダム性のシード}
+        """
         if seed is not None:
             np.random.seed(seed)
         
-        # シナリオ選択（段差特化）
-        # 1. Flat Easy (平地移動の基礎) - 20%
-        # 2. Ground -> Tier 3 (高さ10cm) - 40%
-        # 3. Tier 3 -> Tier 2 (高さ25cm) - 40%
-        
-        scenario_type = np.random.choice(
-            ['flat_easy', 'step_straight', 'step_tier3_to_tier2'],
-            p=[0.2, 0.4, 0.4]  # 段差80%, 平地20%
-        )
-        
-        scenarios = [
-        {
-            'name': 'Scenario 0: 平地移動 (Flat Easy)',
-            'type': 'flat_easy',
-            'start_pos': (4.97, -1.99, self.start_z_offset),
-            'target_pos': (5.00, 0.00, self.start_z_offset),
-            'start_yaw': 90.0,
-        },
-        {
-            'name': 'Scenario 1: 段差直進 (Ground -> Tier 3)',
-            'type': 'step_straight',
-            'start_pos': (5.5, 0.0, self.start_z_offset),  # Tier 3の外側
-            # Tier 3の中央: (Tier 2半径3.25 + Tier 3半径4.65) / 2 = 3.95m
-            'target_pos': (3.95, 0.0, self.start_z_offset + 0.1),  # Tier 3の中央
-            'start_yaw': 180.0,  # 中心方向
-        },
-        {
-            'name': 'Scenario 2: 段差間移動 (Tier 3 -> Tier 2)',
-            'type': 'step_tier3_to_tier2',
-            'start_pos': (3.95, 0.0, self.start_z_offset + 0.1),  # Tier 3の中央
-            # Tier 2の中央: (Tier 1半径1.85 + Tier 2半径3.25) / 2 = 2.55m
-            'target_pos': (2.55, 0.0, self.start_z_offset + 0.35),  # Tier 2の中央
-            'start_yaw': 180.0,  # 中心方向
-        }
-        ]
-        
-        # シナリオタイプに基づいて選択
-        scenario = next(s for s in scenarios if s['type'] == scenario_type)
+        # シナリオ選択 (options で指定がなければカリキュラム / SCENARIO_WEIGHTS でサンプリング)
+        scenario, rng = self._select_scenario(options)
+        scenario_type = scenario['type']
+        jitter = scenario['jitter']
         
         # ランダムな角度を生成（0-360度）
-        random_angle = np.random.uniform(0, 360)
+        random_angle = rng.uniform(*jitter['angle'])
         angle_rad = np.radians(random_angle)
         
-        # シナリオタイプに応じてターゲット位置と開始位置を計算
-        if scenario_type == 'flat_easy':
-            # 平地: ランダムな位置からランダムな方向へ
-            start_radius = 5.0  # フィールド外側
-            start_x = start_radius * np.cos(angle_rad)
-            start_y = start_radius * np.sin(angle_rad)
-            start_z = self.start_z_offset
-            
-            # ターゲット: 中心方向に2m先
-            target_radius = start_radius - 2.0
-            target_x = target_radius * np.cos(angle_rad)
-            target_y = target_radius * np.sin(angle_rad)
-            target_z = self.start_z_offset
-            
-            start_yaw = random_angle + 180  # 中心方向
-            
-        elif scenario_type == 'step_straight':
-            # Tier 3の中央をターゲット（ランダムな角度）
-            target_radius = 3.95  # Tier 3の中央
-            target_x = target_radius * np.cos(angle_rad)
-            target_y = target_radius * np.sin(angle_rad)
-            target_z = self.start_z_offset + 0.1
-            
-            # 開始位置: Tier 3の外側（段差に直角）
-            start_radius = 5.5
-            start_x = start_radius * np.cos(angle_rad)
-            start_y = start_radius * np.sin(angle_rad)
-            start_z = self.start_z_offset
-            
-            start_yaw = random_angle + 180  # 中心方向（段差に直角）
-            
-        elif scenario_type == 'step_tier3_to_tier2':
-            # Tier 2の中央をターゲット（ランダムな角度）
-            target_radius = 2.55  # Tier 2の中央
-            target_x = target_radius * np.cos(angle_rad)
-            target_y = target_radius * np.sin(angle_rad)
-            target_z = self.start_z_offset + 0.35
-            
-            # 開始位置: Tier 3の中央（段差に直角）
-            start_radius = 3.95
-            start_x = start_radius * np.cos(angle_rad)
-            start_y = start_radius * np.sin(angle_rad)
-            start_z = self.start_z_offset + 0.1
-            
-            start_yaw = random_angle + 180  # 中心方向（段差に直角）
+        # ターゲット: 同じ角度方向の目標半径上
+        target_x = scenario['target_radius'] * np.cos(angle_rad)
+        target_y = scenario['target_radius'] * np.sin(angle_rad)
+        target_z = scenario['target_z']
+        
+        # 開始位置: 同じ角度方向の開始半径上（段差に直角）
+        start_x = scenario['start_radius'] * np.cos(angle_rad)
+        start_y = scenario['start_radius'] * np.sin(angle_rad)
+        start_z = scenario['start_z']
+        
+        start_yaw = random_angle + 180  # 中心方向（段差に直角）
         
         # 微調整（±5cm）
-        start_x += np.random.uniform(-0.05, 0.05)
-        start_y += np.random.uniform(-0.05, 0.05)
-        start_yaw += np.random.uniform(-5, 5)
+        start_x += rng.uniform(-jitter['xy'], jitter['xy'])
+        start_y += rng.uniform(-jitter['xy'], jitter['xy'])
+        start_yaw += rng.uniform(-jitter['yaw'], jitter['yaw'])
         
         # シーンリセット
         self.scene.reset()
@@ -145,6 +149,11 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
         
         self.current_scenario_type = scenario_type
         
+        if self.stall_detector is not None:
+            self.stall_detector.reset()
+        if self.reward_term_recorder is not None:
+            self.reward_term_recorder.reset()
+        
         return self._get_obs(), {'scenario_type': scenario_type}
     
     def step(self, action):
@@ -152,10 +161,12 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
         # 共通のアクション適用
         self._apply_action(action)
         
-        # 報酬計算
-        reward = 0.0
+        # 報酬計算 (項目ごとに事前確保した配列へ書き込み、合計を報酬とする)
+        terms = self.step_reward_terms
+        terms.fill(0.0)
         terminated = False
         truncated = False
+        success = False
         
         # 状態取得
         robot_pos = self.robot.get_pos().cpu().numpy()
@@ -169,7 +180,7 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
             dist = np.linalg.norm(robot_pos[:2] - target_pos[:2])
             
             # 距離報酬 (平地と同じ)
-            reward += (self.prev_dist - dist) * 100.0
+            terms[TERM_PROGRESS] = (self.prev_dist - dist) * 100.0
             self.prev_dist = dist
             
             # 2. 高さ報酬 (段差を登ることを奨励)
@@ -185,26 +196,24 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
                 else:
                     height_weight = 500.0  # デフォルト
                 
-                reward += z_diff * height_weight
+                terms[TERM_HEIGHT] = z_diff * height_weight
             self.prev_height = robot_pos[2]
             
             # 2.5. 専用報酬の計算
             from xrobocon.robot_configs import get_robot_config
             config = get_robot_config(self.robot_type)
             if config['reward_params'].get('use_specialized_rewards', False):
-                # ロボットタイプに応じて専用報酬を計算
+                # ロボットタイプに応じて専用報酬を計算（step_env.py の実装をこの環境の状態で呼び出す）
                 if self.robot_type in ['tristar', 'tristar_large']:
-                    from xrobocon.step_env import XRoboconStepEnv
-                    step_env = XRoboconStepEnv()
-                    specialized_reward = step_env._calculate_tristar_climbing_rewards(robot_pos, action, config)
+                    specialized_reward = XRoboconStepEnv._calculate_tristar_climbing_rewards(
+                        self, robot_pos, action, config)
                 elif self.robot_type == 'rocker_bogie':
-                    from xrobocon.step_env import XRoboconStepEnv
-                    step_env = XRoboconStepEnv()
-                    specialized_reward = step_env._calculate_rocker_bogie_climbing_rewards(robot_pos, action, config)
+                    specialized_reward = XRoboconStepEnv._calculate_rocker_bogie_climbing_rewards(
+                        self, robot_pos, action, config)
                 else:
                     specialized_reward = 0.0
                 
-                reward += specialized_reward
+                terms[TERM_SPECIALIZED] = specialized_reward
                 
                 # 整列報酬 (Alignment Reward)
                 # ターゲット方向を向いているか
@@ -218,13 +227,13 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
                     
                     # 正面を向いているほど報酬 (最大 weight, 真後ろなら 0)
                     alignment = (1.0 + np.cos(angle_diff)) / 2.0
-                    reward += alignment * config['reward_params'].get('alignment_reward_weight', 0.0)
+                    terms[TERM_ALIGNMENT] = alignment * config['reward_params'].get('alignment_reward_weight', 0.0)
             
             # 3. ターゲット付近でのボーナス報酬（距離に応じて増加）
             if dist < 1.0:
                 # 1m以内に入ったら、距離に応じてボーナス
                 proximity_bonus = (1.0 - dist) * 50.0  # 最大50.0
-                reward += proximity_bonus
+                terms[TERM_PROXIMITY] = proximity_bonus
                 
                 # ターゲット付近での減速報酬
                 # 距離が近いほど、低速であることに高い報酬
@@ -234,38 +243,58 @@ class XRoboconStepHardEnv(XRoboconBaseEnv):
                     
                     if speed < target_speed:
                         # 目標速度以下なら報酬
-                        slowdown_bonus = (target_speed - speed) * 30.0
-                        reward += slowdown_bonus
+                        terms[TERM_SLOWDOWN] = (target_speed - speed) * 30.0
                     else:
                         # 目標速度より速いとペナルティ
-                        slowdown_penalty = (speed - target_speed) * 20.0
-                        reward -= slowdown_penalty
+                        terms[TERM_SLOWDOWN] = -(speed - target_speed) * 20.0
             
             # 4. 成功判定
             if dist < 0.5:
                 # 成功時、速度が低いほど高報酬
                 speed_bonus = max(0, (0.3 - speed) * 100.0)  # 速度0.3m/s以下でボーナス
-                reward += 500.0 + speed_bonus  # 成功報酬 + 速度ボーナス
+                terms[TERM_SUCCESS] = 500.0 + speed_bonus  # 成功報酬 + 速度ボーナス
                 terminated = True
+                success = True
         
         # 速度超過ペナルティ
         if speed > 1.5:
-            reward -= (speed - 1.5) * 2.0
+            terms[TERM_SPEED_LIMIT] = -(speed - 1.5) * 2.0
         
         # 5. 転倒・落下判定 (終了条件)
         if abs(euler[0]) > 70 or abs(euler[1]) > 70: # 段差なので少し許容
-            reward -= 100.0
+            terms[TERM_FALL] -= 100.0
             terminated = True
             
         if robot_pos[2] < 0.0:
-            reward -= 100.0
+            terms[TERM_FALL] -= 100.0
             terminated = True
+        
+        reward = float(terms.sum())
+        if self.reward_term_recorder is not None:
+            self.reward_term_recorder.add(terms)
             
-        # 時間切れ
+        # 時間切れ・停滞
+        truncation_reason = None
         if not self.game.is_running:
             truncated = True
+            truncation_reason = TRUNCATION_TIME_LIMIT
+        elif not terminated and self._check_stall(robot_pos, speed):
+            truncated = True
+            truncation_reason = TRUNCATION_STALLED
             
         # アクション保存
         self.last_action = action.copy()
+        
+        # エピソード終了時に成功フラグを記録
+        info = {}
+        if terminated or truncated:
+            info['is_success'] = success
+            info['scenario_type'] = self.current_scenario_type
+            if truncation_reason is not None:
+                info['truncation_reason'] = truncation_reason
+            if self.reward_term_recorder is not None:
+                info['reward_terms'] = self.reward_term_recorder.episode_terms()
+            if self.curriculum is not None:
+                self.curriculum.update(self.current_scenario_type, success)
             
-        return self._get_obs(), reward, terminated, truncated, {}
+        return self._get_obs(), reward, terminated, truncated, info
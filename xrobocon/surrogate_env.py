@@ -0,0 +1,246 @@
+"""
+平地移動の運動学的代理環境 (Genesis 不要)
+
+差動二輪の運動学 + 段の高さモデルを NumPy で N 台分まとめて計算する。
+観測 (40次元)・行動空間・報酬は XRoboconEnv と同じなので、ここで事前学習したポリシーを
+train_rl_step.py の --base としてそのまま物理環境で微調整できる。
+
+物理との違い:
+    - 行動の左右ホイール指令を目標速度に変換し、一次遅れで追従させる（トルク・摩擦・慣性は扱わない）
+    - ロール・ピッチは常に0（転倒しない）。段の上り幅が max_step_height を超える移動は止める
+    - tristar / tristar_large のフレーム指令は移動に使わない（tristar のフレーム使用ペナルティは計算する）
+"""
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+
+from xrobocon.robot_configs import SIM_PARAMS, get_robot_config
+from xrobocon.scenarios import FLAT_SCENARIOS, FLAT_START_Z_OFFSET, terrain_height
+
+OBS_DIM = 40
+TIME_LIMIT = 180.0  # XRoboconGame.time_limit と同じ
+
+# 高さマップのローカル座標 (XRoboconBaseEnv._get_height_map と同じ並び: 行=前方, 列=左右)
+_GRID = (np.arange(5) - 2) * 0.2
+_LOCAL_X = np.repeat(_GRID + 0.5, 5)
+_LOCAL_Y = np.tile(_GRID, 5)
+
+
+def action_dim_for(robot_type):
+    """ロボットタイプの行動次元 (XRoboconBaseEnv と同じ)"""
+    return 4 if robot_type in ('tristar', 'tristar_large') else 2
+
+
+def track_width_for(robot_type):
+    """左右ホイール間の距離（ベースの幅、円形ベースは直径）"""
+    physics = get_robot_config(robot_type)['physics']
+    if 'base_size' in physics:
+        return float(physics['base_size'][1])
+    return 2.0 * float(physics['base_radius'])
+
+
+class SurrogateVecEnv:
+    """
+    N台分の平地代理環境
+
+    step() は終了した環境を自動でリセットし、その環境の info に 'terminal_observation' を入れる
+    （SB3 の VecEnv と同じ約束）。
+    """
+
+    def __init__(self, num_envs=64, robot_type='tristar', seed=None, response_time=0.15, speed_scale=1.0,
+                 scenario=None, curriculum=None):
+        """
+        Args:
+            num_envs: 同時に動かす台数
+            robot_type: ロボットタイプ（行動次元・最高速度・車幅・登坂高さを robot_configs から取る）
+            seed: 乱数シード
+            response_time: 指令速度への追従の時定数 (秒)
+            speed_scale: 最高速度の倍率（物理での実効速度に合わせる）
+            scenario: シナリオタイプを固定する場合に指定
+            curriculum: ScenarioCurriculum（指定時は sample() でシナリオを選ぶ）
+        """
+        config = get_robot_config(robot_type)
+        self.num_envs = num_envs
+        self.robot_type = robot_type
+        self.dt = SIM_PARAMS['dt']
+        self.max_steps = int(round(TIME_LIMIT / self.dt))
+        self.max_speed = config['control']['max_speed'] * speed_scale
+        self.track_width = track_width_for(robot_type)
+        self.max_step_height = config['capabilities']['max_step_height']
+        self.alpha = min(self.dt / response_time, 1.0)
+        self.fixed_scenario = scenario
+        self.curriculum = curriculum
+        self.rng = np.random.default_rng(seed)
+
+        self.action_space = spaces.Box(low=-1.0, high=1.0, shape=(action_dim_for(robot_type),), dtype=np.float32)
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(OBS_DIM,), dtype=np.float32)
+
+        # シナリオ (相対高さを解決済み)
+        self.scenarios = []
+        for s in FLAT_SCENARIOS:
+            resolved = dict(s)
+            for key in ('start_pos', 'target_pos'):
+                x, y, z = s[key]
+                resolved[key] = (x, y, z + FLAT_START_Z_OFFSET)
+            self.scenarios.append(resolved)
+        self.scenario_types = [s['type'] for s in self.scenarios]
+        self.scenario_weights = np.array([s['weight'] for s in self.scenarios], dtype=np.float64)
+        self.scenario_weights /= self.scenario_weights.sum()
+
+        n = num_envs
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.z = np.zeros(n)
+        self.yaw = np.zeros(n)  # ラジアン
+        self.v = np.zeros(n)
+        self.w = np.zeros(n)
+        self.target = np.zeros((n, 3))
+        self.prev_dist = np.zeros(n)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.scenario_index = np.zeros(n, dtype=np.int64)
+        self._obs = np.zeros((n, OBS_DIM), dtype=np.float32)
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def _sample_scenario(self):
+        if self.fixed_scenario is not None:
+            return self.scenario_types.index(self.fixed_scenario)
+        if self.curriculum is not None:
+            return self.scenario_types.index(self.curriculum.sample())
+        return int(self.rng.choice(len(self.scenarios), p=self.scenario_weights))
+
+    def _reset_indices(self, indices):
+        """指定した環境をリセット（XRoboconEnv.reset と同じ開始位置のばらつき）"""
+        for i in indices:
+            k = self._sample_scenario()
+            s = self.scenarios[k]
+            jitter = s['jitter']
+            self.scenario_index[i] = k
+            self.x[i] = s['start_pos'][0] + self.rng.uniform(-jitter['xy'], jitter['xy'])
+            self.y[i] = s['start_pos'][1] + self.rng.uniform(-jitter['xy'], jitter['xy'])
+            self.yaw[i] = np.radians(s['start_euler'][2] + self.rng.uniform(-jitter['yaw'], jitter['yaw']))
+            self.target[i] = s['target_pos']
+        idx = np.asarray(indices, dtype=np.int64)
+        self.z[idx] = terrain_height(self.x[idx], self.y[idx]) + FLAT_START_Z_OFFSET
+        self.v[idx] = 0.0
+        self.w[idx] = 0.0
+        self.steps[idx] = 0
+        self.prev_dist[idx] = np.hypot(self.target[idx, 0] - self.x[idx], self.target[idx, 1] - self.y[idx])
+
+    def reset(self):
+        """全環境をリセットして観測 (num_envs, 40) を返す"""
+        self._reset_indices(range(self.num_envs))
+        return self._get_obs().copy()
+
+    def _get_obs(self):
+        """XRoboconBaseEnv._get_obs と同じ並びの観測を self._obs に書き込む"""
+        obs = self._obs
+        cos_yaw = np.cos(self.yaw)
+        sin_yaw = np.sin(self.yaw)
+        obs[:, 0] = self.x
+        obs[:, 1] = self.y
+        obs[:, 2] = self.z
+        obs[:, 3] = 0.0
+        obs[:, 4] = 0.0
+        obs[:, 5] = np.degrees(np.arctan2(sin_yaw, cos_yaw))
+        obs[:, 6] = self.v * cos_yaw
+        obs[:, 7] = self.v * sin_yaw
+        obs[:, 8] = 0.0
+        obs[:, 9] = 0.0
+        obs[:, 10] = 0.0
+        obs[:, 11] = self.w
+        obs[:, 12] = self.target[:, 0] - self.x
+        obs[:, 13] = self.target[:, 1] - self.y
+        obs[:, 14] = self.target[:, 2] - self.z
+        gx = self.x[:, None] + _LOCAL_X * cos_yaw[:, None] - _LOCAL_Y * sin_yaw[:, None]
+        gy = self.y[:, None] + _LOCAL_X * sin_yaw[:, None] + _LOCAL_Y * cos_yaw[:, None]
+        obs[:, 15:] = terrain_height(gx, gy) - self.z[:, None]
+        return obs
+
+    def step(self, actions):
+        """
+        Args:
+            actions: (num_envs, action_dim)
+
+        Returns:
+            (obs, rewards, terminated, truncated, infos)
+        """
+        actions = np.clip(np.asarray(actions, dtype=np.float64).reshape(self.num_envs, -1), -1.0, 1.0)
+        left, right = (actions[:, 2], actions[:, 3]) if actions.shape[1] == 4 else (actions[:, 0], actions[:, 1])
+
+        # 差動二輪: 指令速度に一次遅れで追従
+        v_cmd = self.max_speed * (left + right) * 0.5
+        w_cmd = self.max_speed * (right - left) / self.track_width
+        self.v += (v_cmd - self.v) * self.alpha
+        self.w += (w_cmd - self.w) * self.alpha
+        self.yaw += self.w * self.dt
+        new_x = self.x + self.v * np.cos(self.yaw) * self.dt
+        new_y = self.y + self.v * np.sin(self.yaw) * self.dt
+
+        # 段: 登坂高さを超える上りは止まる（下りはそのまま降りる）
+        ground = terrain_height(new_x, new_y)
+        blocked = ground - (self.z - FLAT_START_Z_OFFSET) > self.max_step_height + 1e-9
+        self.x = np.where(blocked, self.x, new_x)
+        self.y = np.where(blocked, self.y, new_y)
+        self.v = np.where(blocked, 0.0, self.v)
+        self.z = np.where(blocked, self.z, ground + FLAT_START_Z_OFFSET)
+        self.steps += 1
+
+        # 報酬 (XRoboconEnv.step と同じ。ロール・ピッチは0なので安定性ペナルティと転倒はない)
+        speed = np.abs(self.v)
+        dist = np.hypot(self.target[:, 0] - self.x, self.target[:, 1] - self.y)
+        rewards = (self.prev_dist - dist) * 100.0
+        self.prev_dist = dist
+        success = (dist < 0.5) & (np.abs(self.z - self.target[:, 2]) < 0.2)
+        rewards += np.where(success, 300.0 + np.where(speed < 0.1, 100.0, np.where(speed < 0.5, 50.0, 0.0)), 0.0)
+        if self.robot_type == 'tristar':
+            rewards -= (np.abs(actions[:, 0]) + np.abs(actions[:, 1])) * 0.5
+        rewards -= np.maximum(speed - 1.5, 0.0) * 2.0
+        terminated = success
+        truncated = (self.steps >= self.max_steps) & ~terminated
+
+        obs = self._get_obs()
+        infos = [{} for _ in range(self.num_envs)]
+        done = np.flatnonzero(terminated | truncated)
+        if len(done):
+            for i in done:
+                infos[i] = {'is_success': bool(success[i]),
+                            'scenario_type': self.scenario_types[self.scenario_index[i]],
+                            'terminal_observation': obs[i].copy()}
+                if truncated[i]:
+                    infos[i]['TimeLimit.truncated'] = True
+            self._reset_indices(done)
+            obs = self._get_obs()
+        return obs.copy(), rewards.astype(np.float32), terminated, truncated, infos
+
+
+class XRoboconSurrogateEnv(gym.Env):
+    """SurrogateVecEnv を1台分の gymnasium 環境として使うラッパー（動作確認・既存スクリプト用）"""
+
+    def __init__(self, robot_type='tristar', **kwargs):
+        super().__init__()
+        self.vec = SurrogateVecEnv(num_envs=1, robot_type=robot_type, **kwargs)
+        self.robot_type = robot_type
+        self.action_space = self.vec.action_space
+        self.observation_space = self.vec.observation_space
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if seed is not None:
+            self.vec.seed(seed)
+        options = options or {}
+        previous = self.vec.fixed_scenario
+        if options.get('scenario') is not None:
+            self.vec.fixed_scenario = options['scenario']
+        obs = self.vec.reset()[0]
+        self.vec.fixed_scenario = previous
+        return obs, {'scenario_type': self.vec.scenario_types[self.vec.scenario_index[0]]}
+
+    def step(self, action):
+        obs, rewards, terminated, truncated, infos = self.vec.step(np.asarray(action)[None, :])
+        info = infos[0]
+        if terminated[0] or truncated[0]:
+            # 1台分のときは自動リセット前の観測を返す
+            obs = info.pop('terminal_observation')[None, :]
+        return obs[0], float(rewards[0]), bool(terminated[0]), bool(truncated[0]), info
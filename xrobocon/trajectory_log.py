@@ -0,0 +1,209 @@
+"""
+軌跡ログ
+
+1ステップごとの固定レイアウトのレコード（時刻・ベース姿勢・関節位置/速度・行動・報酬とその内訳・得点）を
+事前確保したリングバッファに書き込み、満杯になるか close() の時点で列ごとのファイルへ追記する。
+物理を再計算せずに、ビューアでの再生やグラフ作成ができる。
+
+ディレクトリ構成:
+    <root>/meta.json        列の dtype・形状、レコード数、ロボットタイプ、報酬内訳の名前
+    <root>/<列名>.bin       各列の生データ（レコード順に連続）
+
+列:
+    episode (i4), step (i4), time (f4: ゲームの経過時間), pos (3), quat (4: w, x, y, z),
+    qpos (n_qpos), dofs_vel (n_dofs), action (action_dim), reward (f4), reward_terms (len(term_names)),
+    score (i4), flags (u1: FLAG_*)
+"""
+import json
+import os
+
+import numpy as np
+
+META_NAME = 'meta.json'
+
+FLAG_TERMINATED = 1
+FLAG_TRUNCATED = 2
+FLAG_SUCCESS = 4
+
+
+def _columns(n_qpos, n_dofs, action_dim, num_terms):
+    """列の定義 [(名前, dtype, 1レコードあたりの形状)]"""
+    return [
+        ('episode', '<i4', ()),
+        ('step', '<i4', ()),
+        ('time', '<f4', ()),
+        ('pos', '<f4', (3,)),
+        ('quat', '<f4', (4,)),
+        ('qpos', '<f4', (n_qpos,)),
+        ('dofs_vel', '<f4', (n_dofs,)),
+        ('action', '<f4', (action_dim,)),
+        ('reward', '<f4', ()),
+        ('reward_terms', '<f4', (num_terms,)),
+        ('score', '<i4', ()),
+        ('flags', 'u1', ()),
+    ]
+
+
+def is_trajectory(root):
+    return os.path.exists(os.path.join(root, META_NAME))
+
+
+class TrajectoryLogger:
+    """
+    軌跡ログの書き込み
+
+    append() は事前確保したバッファの1行に値をコピーするだけで、ファイルへの書き込みは capacity 行ごと。
+    既存のログに追記する場合はレイアウトが一致している必要がある。
+    """
+
+    def __init__(self, root, n_qpos, n_dofs, action_dim, term_names=(), capacity=4096, **metadata):
+        """
+        Args:
+            root: 出力ディレクトリ
+            n_qpos / n_dofs: 関節位置・速度の次元（浮遊ベースを含む）
+            action_dim: 行動の次元
+            term_names: 報酬内訳の名前（空なら reward_terms 列は0列）
+            capacity: バッファの行数（この行数ごとにファイルへ書き込む）
+            **metadata: meta.json に保存する付加情報 (robot_type, env_type, model など)
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        columns = _columns(n_qpos, n_dofs, action_dim, len(term_names))
+        self.dtype = np.dtype([(name, dtype, shape) for name, dtype, shape in columns])
+        layout = [[name, dtype, list(shape)] for name, dtype, shape in columns]
+
+        if is_trajectory(root):
+            self.meta = load_meta(root)
+            if self.meta['columns'] != layout:
+                raise ValueError(f"Trajectory log {root} has a different record layout")
+            self._truncate_columns()
+        else:
+            self.meta = {'version': 1, 'columns': layout, 'term_names': list(term_names), 'num_records': 0,
+                         'num_episodes': 0}
+            self.meta.update(metadata)
+            for name, _, _ in columns:
+                open(os.path.join(root, f"{name}.bin"), 'wb').close()
+            self._save_meta()
+
+        self.term_names = list(term_names)
+        self.buffer = np.zeros(capacity, dtype=self.dtype)
+        self.count = 0
+        self.episode = self.meta['num_episodes']
+        self.step = 0
+
+    def _truncate_columns(self):
+        """
+        列ファイルを meta.json のレコード数に切り詰める
+
+        flush() は列を追記してから meta.json を更新するため、その間にプロセスが終了すると
+        記録されていない行が列の末尾に残る。そのまま追記すると列ごとに行がずれる。
+        """
+        num_records = self.meta['num_records']
+        for name in self.dtype.names:
+            path = os.path.join(self.root, f"{name}.bin")
+            expected = num_records * self.dtype[name].itemsize
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < expected:
+                raise ValueError(f"Trajectory log {self.root}: {name}.bin is shorter than {num_records} records")
+            if size > expected:
+                os.truncate(path, expected)
+
+    def begin_episode(self):
+        """次のレコードから新しいエピソード番号を使う"""
+        if self.step > 0:
+            self.episode += 1
+        self.step = 0
+
+    def append(self, **values):
+        """1レコードを追加（省略した列は0）"""
+        if self.count == len(self.buffer):
+            self.flush()
+        row = self.buffer[self.count]
+        row['episode'] = self.episode
+        row['step'] = self.step
+        for name, value in values.items():
+            row[name] = value
+        self.count += 1
+        self.step += 1
+
+    def log_env_step(self, env, action, reward, terminated, truncated, info, reward_terms=None):
+        """env.step() の直後に環境の状態を読み取って1レコードを追加"""
+        flags = (FLAG_TERMINATED if terminated else 0) | (FLAG_TRUNCATED if truncated else 0)
+        if info.get('is_success'):
+            flags |= FLAG_SUCCESS
+        entity = env.robot.entity
+        self.append(
+            time=env.game.elapsed_time,
+            pos=env.robot.get_pos().cpu().numpy(),
+            quat=entity.get_quat().cpu().numpy(),
+            qpos=entity.get_qpos().cpu().numpy(),
+            dofs_vel=entity.get_dofs_velocity().cpu().numpy(),
+            action=action,
+            reward=reward,
+            reward_terms=reward_terms if reward_terms is not None else 0.0,
+            score=env.game.score,
+            flags=flags,
+        )
+
+    def flush(self):
+        """バッファの内容を列ごとのファイルに追記し、meta.json のレコード数を更新"""
+        if self.count == 0:
+            return
+        rows = self.buffer[:self.count]
+        for name in self.dtype.names:
+            with open(os.path.join(self.root, f"{name}.bin"), 'ab') as f:
+                f.write(np.ascontiguousarray(rows[name]).tobytes())
+        self.meta['num_records'] += self.count
+        self.meta['num_episodes'] = self.episode + (1 if self.step > 0 else 0)
+        self._save_meta()
+        self.count = 0
+
+    def _save_meta(self):
+        path = os.path.join(self.root, META_NAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        self.flush()
+
+
+def load_meta(root):
+    with open(os.path.join(root, META_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_trajectory(root, columns=None):
+    """
+    軌跡ログを列ごとにメモリマップで読み込む
+
+    Args:
+        root: ログのディレクトリ
+        columns: 読み込む列名（省略時は全列）
+
+    Returns:
+        (data, meta): data は {列名: (num_records, ...) の配列}
+    """
+    meta = load_meta(root)
+    n = meta['num_records']
+    data = {}
+    for name, dtype, shape in meta['columns']:
+        if columns is not None and name not in columns:
+            continue
+        if n == 0:
+            data[name] = np.zeros((0,) + tuple(shape), dtype=dtype)
+            continue
+        data[name] = np.memmap(os.path.join(root, f"{name}.bin"), dtype=dtype, mode='r',
+                               shape=(n,) + tuple(shape))
+    return data, meta
+
+
+def episode_slices(episode_column):
+    """エピソード番号の列から {エピソード番号: slice} を作る（レコードはエピソードごとに連続）"""
+    episode_column = np.asarray(episode_column)
+    if len(episode_column) == 0:
+        return {}
+    starts = np.flatnonzero(np.diff(episode_column)) + 1
+    bounds = np.concatenate([[0], starts, [len(episode_column)]])
+    return {int(episode_column[a]): slice(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])}